@@ -6,4 +6,4 @@ rm -f ./build/*.teal
 
 set -e # die on error
 
-python ./compile.py "$1" ./build/approval.teal ./build/clear.teal
+python ./compile.py "$1" ./build/approval.teal ./build/clear.teal "${@:2}"
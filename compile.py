@@ -1,29 +1,42 @@
 import importlib
 import sys
 
-from pyteal_helpers import program
+from pyteal_helpers import program, sourcemap
 
 if __name__ == "__main__":
-    mod = sys.argv[1]
+    # With --source-map, a map from the TEAL lines back to the PyTeal
+    # call sites is written next to each output file (<file>.map.json).
+    source_map = "--source-map" in sys.argv
+    argv = [arg for arg in sys.argv if arg != "--source-map"]
+
+    mod = argv[1]
 
     try:
-        approval_out = sys.argv[2]
+        approval_out = argv[2]
     except IndexError:
         approval_out = None
 
     try:
-        clear_out = sys.argv[3]
+        clear_out = argv[3]
     except IndexError:
         clear_out = None
 
     contract = importlib.import_module(mod)
 
+    with sourcemap.capture() as maps:
+        approval = program.application(contract.approval())
+        clear    = program.application(contract.clear())
+
     if approval_out is None:
-        print(program.application(contract.approval()))
+        print(approval)
     else:
         with open(approval_out, "w") as h:
-            h.write(program.application(contract.approval()))
+            h.write(approval)
+        if source_map:
+            maps[0].save(approval_out + ".map.json")
 
     if clear_out is not None:
         with open(clear_out, "w") as h:
-            h.write(program.application(contract.clear()))
+            h.write(clear)
+        if source_map:
+            maps[1].save(clear_out + ".map.json")
@@ -0,0 +1,302 @@
+from algosdk.v2client import algod
+from algosdk import (
+    account,
+    mnemonic
+)
+
+from pyteal_helpers import funding, utils
+from pyteal_helpers.blocks import BlockFollower
+from pyteal_helpers.node import LocalNode
+
+from dataclasses import dataclass
+
+import argparse
+import math
+import random
+import threading
+import time
+
+import run
+from contract import UINT64_MAX
+
+
+
+@dataclass
+class BenchmarkReport:
+    """
+        Outcome of a benchmark. rounds holds the number of calls
+        confirmed in each round; expected is the counter's value obtained
+        by replaying the confirmed calls in ledger order, saturating at 0
+        and UINT64_MAX, and saturated the number of calls that left the
+        counter unchanged.
+    """
+    calls    : int
+    confirmed: int
+    rejected : int
+    errors   : int
+    duration : float
+    rounds   : dict[int, int]
+    start    : int
+    final    : int
+    expected : int
+    replayed : int
+    saturated: int
+
+    @property
+    def verified(self) -> bool:
+        """
+            True if the ledger holds exactly the confirmed calls and the
+            counter's final value is the expected one.
+        """
+        return self.replayed == self.confirmed and self.final == self.expected
+
+    @property
+    def throughput(self) -> float:
+        """
+            Confirmed calls per second.
+        """
+        return self.confirmed / self.duration if self.duration > 0 else 0.0
+
+    @property
+    def calls_per_round(self) -> float:
+        """
+            Mean number of calls confirmed in the rounds that had any.
+        """
+        return self.confirmed / len(self.rounds) if self.rounds else 0.0
+
+    @property
+    def max_calls_per_round(self) -> int:
+        return max(self.rounds.values(), default=0)
+
+    def format(self) -> str:
+        return "\n".join([
+            f"calls      : {self.calls} ({self.confirmed} confirmed, {self.rejected} rejected, {self.errors} errors)",
+            f"duration   : {self.duration:.3f} s",
+            f"throughput : {self.throughput:.1f} calls/s",
+            f"rounds     : {len(self.rounds)} ({self.calls_per_round:.2f} calls/round, max {self.max_calls_per_round})",
+            f"counter    : {self.start} -> {self.final} (expected {self.expected}, {self.saturated} saturated calls)",
+            f"verified   : {'yes' if self.verified else 'NO'} ({self.replayed} calls found in the ledger)",
+        ])
+
+
+def fund_callers(
+    algod_client: algod.AlgodClient,
+    funder_pk   : str,
+    callers     : int,
+    calls       : int,
+    seed        : str = "counter-benchmark"
+) -> list[tuple[str, str]]:
+    """
+        Derive the callers from a seed and fund them for their calls.
+        Callers left funded by a previous run with the same seed are
+        reused.
+
+        Args:
+            algod_client (algod.AlgodClient): algod client.
+            funder_pk (str): private key of the account funding callers.
+            callers (int): number of callers.
+            calls (int): calls each caller will perform.
+            seed (str, default="counter-benchmark"): seed of the callers'
+            keys.
+
+        Returns:
+            (list[tuple[str, str]]): callers' private keys and addresses.
+    """
+    accounts = utils.derive_accounts(seed, callers)
+    # The counter has no local state: callers only pay their calls' fees.
+    funding.top_up(algod_client, funder_pk, accounts.addresses(), funding.FundPlan().transactions(calls))
+    return list(accounts)
+
+
+def run_benchmark(
+    algod_client: algod.AlgodClient,
+    app_id      : int,
+    callers     : list[tuple[str, str]],
+    calls       : int,
+    concurrency : int,
+    dec_ratio   : float = 0.5,
+    rng         : random.Random | None = None
+) -> BenchmarkReport:
+    """
+        Fire "inc"/"dec" calls at the counter from many callers at once,
+        then check the counter's final value against the confirmed calls.
+
+        Call i is sent by caller i % len(callers); each of the concurrency
+        workers owns a share of the callers and sends one call at a time,
+        so a caller never has two calls in flight. Since concurrent calls
+        may be confirmed in any order and saturated calls are no-ops, the
+        expected value is computed by replaying, in ledger order, the
+        calls found in the blocks produced during the run.
+
+        Args:
+            algod_client (algod.AlgodClient): algod client, also used by
+            the run.py operations.
+            app_id (int): application index.
+            callers (list[tuple[str, str]]): callers, see fund_callers.
+            calls (int): total number of calls.
+            concurrency (int): number of calls in flight at most.
+            dec_ratio (float, default=0.5): share of "dec" calls.
+            rng (random.Random | None, default=None): source of the calls'
+            directions.
+
+        Returns:
+            (BenchmarkReport): throughput, calls per round and outcome of
+            the verification.
+    """
+    if len(callers) < concurrency:
+        raise ValueError(f"{len(callers)} callers can't sustain a concurrency of {concurrency}")
+
+    rng = rng if rng is not None else random.Random()
+    run.algod_client = algod_client
+
+    increases = [rng.random() >= dec_ratio for _ in range(calls)]
+
+    lock    = threading.Lock()
+    samples : list[int] = []
+    errors  = [0]
+
+    def worker(index: int):
+        for i in range(calls):
+            if i % len(callers) % concurrency != index:
+                continue
+            account_pk, _ = callers[i % len(callers)]
+            try:
+                confirmation_round = run.modify_counter(
+                    account_pk=account_pk,
+                    app_id=app_id,
+                    increase=increases[i]
+                )
+            except Exception as e:
+                # e.g. the confirmation didn't come within the wait rounds.
+                print(e)
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                samples.append(confirmation_round)
+
+    start       = run.get_global_state(app_id).get("counter", 0)
+    first_round = algod_client.status()["last-round"] + 1
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=worker, args=(index,))
+        for index in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    last_round = algod_client.status()["last-round"]
+    final      = run.get_global_state(app_id).get("counter", 0)
+
+    rounds = {}
+    for confirmation_round in samples:
+        if confirmation_round != -1:
+            rounds[confirmation_round] = rounds.get(confirmation_round, 0) + 1
+
+    expected, replayed, saturated = start, 0, 0
+    follower = BlockFollower(
+        algod_client,
+        start_round=first_round,
+        stop_round=last_round,
+        app_ids={app_id}
+    )
+    for _, block in follower.blocks():
+        for signed_txn in block.get("txns", []):
+            if signed_txn is None:
+                continue
+            operation = signed_txn["txn"].get("apaa", [b""])[0]
+            if   operation == b"inc" and expected < UINT64_MAX:
+                expected += 1
+            elif operation == b"dec" and expected > 0:
+                expected -= 1
+            elif operation in (b"inc", b"dec"):
+                saturated += 1
+            else:
+                continue
+            replayed += 1
+
+    return BenchmarkReport(
+        calls=calls,
+        confirmed=sum(rounds.values()),
+        rejected=samples.count(-1),
+        errors=errors[0],
+        duration=duration,
+        rounds=rounds,
+        start=start,
+        final=final,
+        expected=expected,
+        replayed=replayed,
+        saturated=saturated
+    )
+
+
+if __name__ == "__main__":
+    # Usage: PYTHONPATH=../.. python ./benchmark.py [options]
+    # Runs against an in-process local node unless --algod is given.
+    parser = argparse.ArgumentParser(description="counter stress benchmark")
+    parser.add_argument("--callers"    , type=int  , default=64)
+    parser.add_argument("--calls"      , type=int  , default=2000)
+    parser.add_argument("--concurrency", type=int  , default=16)
+    parser.add_argument("--dec-ratio"  , type=float, default=0.5, help="share of \"dec\" calls")
+    parser.add_argument("--start"      , default="0",
+                        help="initial value of the counter, or \"max\" for UINT64_MAX; local node only")
+    parser.add_argument("--seed"       , type=int  , help="seed of the calls' directions")
+    parser.add_argument("--block-interval", type=float,
+                        help="on the local node, pool the calls and close a block every given seconds; "
+                             "otherwise every call gets its own round")
+    parser.add_argument("--max-block-txns", type=int, help="on the local node, transactions per block")
+    parser.add_argument("--algod"      , help="algod address, e.g. http://localhost:4001")
+    parser.add_argument("--faucet"     , help="faucet mnemonic, required with --algod")
+    args = parser.parse_args()
+
+    start = UINT64_MAX if args.start == "max" else int(args.start)
+    if not 0 <= start <= UINT64_MAX:
+        parser.error("--start must be a uint64")
+    if start and args.algod is not None:
+        parser.error("--start is only supported on the local node")
+
+    node = None
+    if args.algod is None:
+        faucet_pk, faucet_addr = account.generate_account()
+        node = LocalNode(
+            genesis={faucet_addr: 10 ** 15},
+            block_interval=args.block_interval,
+            max_block_txns=args.max_block_txns
+        ).start()
+        algod_client = node.algod_client()
+    else:
+        algod_client = utils.get_algod_client(args.algod)
+        faucet_pk = mnemonic.to_private_key(args.faucet)
+    run.algod_client = algod_client
+
+    app_id = run.deploy(creator_pk=faucet_pk)
+    if start:
+        # The contract can only move the counter by one, so the initial
+        # value is written straight into the local node's ledger.
+        with node.lock:
+            node.ledger.apps[app_id].global_state[b"counter"] = start
+
+    callers = fund_callers(
+        algod_client,
+        funder_pk=faucet_pk,
+        callers=args.callers,
+        calls=math.ceil(args.calls / args.callers)
+    )
+
+    report = run_benchmark(
+        algod_client,
+        app_id=app_id,
+        callers=callers,
+        calls=args.calls,
+        concurrency=args.concurrency,
+        dec_ratio=args.dec_ratio,
+        rng=random.Random(args.seed)
+    )
+    print(report.format())
+
+    if node is not None:
+        node.stop()
@@ -7,6 +7,8 @@ from algosdk import (
 
 from pyteal import *
 
+from pyteal_helpers import state
+
 import base64
 import os
 
@@ -16,6 +18,11 @@ GENESIS_ADDRESS      = "S4Z25GO6DW6ZL6FKX5O3YFFVQEXAMMPZQOGO7VP3LHKRWJUJHKRF5WOM
 algod_address = "http://localhost:4001"
 algod_token   = "aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa"
 algod_client  = algod.AlgodClient(algod_token, algod_address)
+# Global state layout.
+GLOBAL_STATE_SCHEMA = state.KeyValueSchema({
+    "owner"  : state.ADDRESS,
+    "counter": state.UINT
+})
 
 def feed_accounts(accounts):
     """
@@ -141,7 +148,10 @@ def get_global_state(app_id):
     try:
         app_info = algod_client.application_info(app_id)
 
-        global_state = app_info["params"]["global-state"]
+        global_state = state.decode_state(
+            app_info["params"].get("global-state", []),
+            GLOBAL_STATE_SCHEMA
+        )
     except error.AlgodHTTPError as e:
         print(e)
     finally:
@@ -171,13 +181,8 @@ def test():
         )
 
     global_state = get_global_state(app_id)
-    
-    key = base64.b64encode("counter".encode()).decode()
-    for item in global_state:
-        if item["key"] == key:
-            value = item["value"]
-            print(f"Counter's value: {value['uint']}")
-            break
+
+    print(f"Counter's value: {global_state.get('counter')}")
 
 if __name__ == "__main__":
     test()
\ No newline at end of file
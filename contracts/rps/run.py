@@ -7,6 +7,8 @@ from algosdk import (
 )
 from pyteal import *
 
+from pyteal_helpers import fees, search, state
+
 import hashlib
 import base64
 import json
@@ -31,6 +33,21 @@ indexer_client  = indexer.IndexerClient(
     indexer_token="", 
     indexer_address=indexer_address
 )
+# Local state layout.
+LOCAL_STATE_SCHEMA = state.KeyValueSchema({
+    "opponent"  : state.ADDRESS,
+    "wager"     : state.UINT,
+    "commitment": state.BYTES,
+    "reveal"    : state.BYTES
+})
+# Storage of the application.
+APP_GLOBAL_SCHEMA = transaction.StateSchema(num_uints=0, num_byte_slices=0)
+APP_LOCAL_SCHEMA  = transaction.StateSchema(num_uints=1, num_byte_slices=3)
+# Local state readers, indexed by application index.
+local_state_readers = {}
+# Inner transactions issued by the operations: "reveal" pays the winner,
+# or refunds both players in case of a tie.
+fee_planner = fees.FeePlanner({"reveal": 2})
 
 def feed_accounts(accounts):
     """
@@ -67,9 +84,6 @@ def deploy(creator_pk):
         clear_result  = algod_client.compile(clear)
         clear_program = base64.b64decode(clear_result["result"])
         
-        local_schema  = transaction.StateSchema(num_uints=1, num_byte_slices=3)
-        global_schema = transaction.StateSchema(num_uints=0, num_byte_slices=0)
-
         suggested_parameters = algod_client.suggested_params()
 
         unsigned_txnn = transaction.ApplicationCreateTxn(
@@ -78,8 +92,8 @@ def deploy(creator_pk):
             on_complete=transaction.OnComplete.NoOpOC,
             approval_program=approval_program,
             clear_program=clear_program,
-            global_schema=global_schema,
-            local_schema=local_schema
+            global_schema=APP_GLOBAL_SCHEMA,
+            local_schema=APP_LOCAL_SCHEMA
         )
         signed_txn = unsigned_txnn.sign(creator_pk)
 
@@ -131,6 +145,8 @@ def optin(account_pk, app_id):
 
         confirmation_round = result["confirmed-round"]
 
+        _advance_local_state_readers(confirmation_round)
+
         return confirmation_round
     except error.AlgodHTTPError as e:
         print(e)
@@ -195,6 +211,8 @@ def create_challenge(challenger_pk, commitment, app_id, opponent_addr):
 
         confirmation_round = result["confirmed-round"]
 
+        _advance_local_state_readers(confirmation_round)
+
         return confirmation_round
     except error.AlgodHTTPError as e:
         print(e)
@@ -257,6 +275,8 @@ def accept_challenge(opponent_pk, opponent_reveal, app_id, challenger_addr):
 
         confirmation_round = result["confirmed-round"]
 
+        _advance_local_state_readers(confirmation_round)
+
         return confirmation_round
     except error.AlgodHTTPError as e:
         print(e)
@@ -278,9 +298,9 @@ def reveal(challenger_pk, challenger_reveal, app_id, opponent_addr):
     """
     sender = account.address_from_private_key(challenger_pk)
     try:
-        suggested_parameters = algod_client.suggested_params()
-        suggested_parameters.flat_fee = True
-        suggested_parameters.fee = 3000
+        suggested_parameters = fee_planner.params(
+            algod_client.suggested_params(), "reveal"
+        )
 
         app_args = []
         app_args.append("reveal".encode())
@@ -305,6 +325,8 @@ def reveal(challenger_pk, challenger_reveal, app_id, opponent_addr):
 
         confirmation_round = result["confirmed-round"]
 
+        _advance_local_state_readers(confirmation_round)
+
         return confirmation_round
     except error.AlgodHTTPError as e:
         print(e)
@@ -319,41 +341,104 @@ def get_local_state(address, app_id):
             * app_id (int): application index.
 
         Returns:
-            (dict): application's local state.
+            (dict): application's local state, empty if the account
+            hasn't opted in.
     """
     formatted_local_state = {}
     try:
-        account_info = algod_client.account_info(address)
-        for app_local_state in account_info["apps-local-state"]:
-            if app_local_state["id"] == app_id:
-                local_state = app_local_state["key-value"]
-                for ls in local_state:
-                    k, v_dict = ls["key"], ls["value"]
-                    if v_dict["type"] == 1: 
-                        v = v_dict["bytes"]
-                    else: 
-                        v = v_dict["uint"]
-                    k = base64.b64decode(k).decode()
-                    formatted_local_state[k] = v
+        formatted_local_state = _get_local_state_reader(app_id).read(address)
     except error.AlgodHTTPError as e:
-        print(e)
+        if not _not_opted_in(e):
+            print(e)
     finally:
         return formatted_local_state
 
-def find_transactions_by_addr(address):
+def get_local_states(addresses, app_id):
+    """
+        Get application's local state of many accounts concurrently.
+
+        Args:
+            * addresses (list): accounts' addresses.
+            * app_id (int): application index.
+
+        Returns:
+            (dict): application's local state of each account that
+            could be read, indexed by address; accounts that haven't
+            opted in are left out.
+    """
+    formatted_local_states, errors = _get_local_state_reader(app_id).read_many(addresses)
+    for e in errors.values():
+        if not _not_opted_in(e):
+            print(e)
+    return formatted_local_states
+
+def _not_opted_in(e):
+    """
+        Tell whether an error reading a local state means the account
+        hasn't opted in (algod answers 404).
+
+        Args:
+            * e (Exception): error raised by the read.
+
+        Returns:
+            * (bool): True if the account has no local state.
+    """
+    return isinstance(e, error.AlgodHTTPError) and e.code == 404
+
+def _get_local_state_reader(app_id):
+    """
+        Get the (cached) local state reader of an application.
+
+        Args:
+            * app_id (int): application index.
+
+        Returns:
+            (state.LocalStateReader): local state reader.
+    """
+    if app_id not in local_state_readers:
+        local_state_readers[app_id] = state.LocalStateReader(
+            algod_client, app_id, LOCAL_STATE_SCHEMA
+        )
+    return local_state_readers[app_id]
+
+def _advance_local_state_readers(confirmation_round):
+    """
+        Invalidate the local states read before a confirmed transaction.
+
+        Args:
+            * confirmation_round (int): confirmation round.
+    """
+    for reader in local_state_readers.values():
+        reader.advance(confirmation_round)
+
+def find_transactions_by_addr(address, min_round=None, max_round=None):
     """
         Find transactions by address.
 
         Args:
             * address (str): address used to filter transactions.
+            * min_round (int, default=None): if set, skip transactions 
+            confirmed before this round.
+            * max_round (int, default=None): if set, skip transactions 
+            confirmed after this round.
 
         Returns:
-            * (list): transactions associated with the specified
-            address.
+            * (generator): transactions associated with the specified
+            address. Pages are fetched lazily from the indexer, so the
+            whole history can be scanned in constant memory.
+    """
+    return search.search_transactions(
+        indexer_client,
+        address=address,
+        min_round=min_round,
+        max_round=max_round
+    )
+
+def _bytes_to_b64(value):
+    """
+        Serialize bytes local state values as base64 strings.
     """
-    return indexer_client.search_transactions(
-        address=address
-    )["transactions"]
+    return base64.b64encode(value).decode()
 
 def test():
     accounts = [account.generate_account() for _ in range(0, 3)]
@@ -372,14 +457,16 @@ def test():
         print(
             json.dumps(
                 get_local_state(accounts[1][1], app_id),
-                indent=4
+                indent=4,
+                default=_bytes_to_b64
             )
         )
         print(f"{accounts[2][1]} local state:")
         print(
             json.dumps(
                 get_local_state(accounts[2][1], app_id),
-                indent=4
+                indent=4,
+                default=_bytes_to_b64
             )
         )
         
@@ -403,14 +490,16 @@ def test():
                 print(
                     json.dumps(
                         get_local_state(accounts[1][1], app_id),
-                        indent=4
+                        indent=4,
+                        default=_bytes_to_b64
                     )
                 )
                 print(f"{accounts[2][1]} local state:")
                 print(
                     json.dumps(
                         get_local_state(accounts[2][1], app_id),
-                        indent=4
+                        indent=4,
+                        default=_bytes_to_b64
                     )
                 )
                 
@@ -0,0 +1,288 @@
+from algosdk.v2client import algod
+from algosdk import (
+    account,
+    logic,
+    mnemonic
+)
+
+from pyteal_helpers import funding, utils
+from pyteal_helpers.node import LocalNode
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import argparse
+import math
+import random
+import threading
+import time
+
+import run
+
+# Phases of a game, in order.
+PHASES = ("challenge", "accept", "reveal")
+PLAYS  = "rps"
+# Wager sent by both players (hardcoded in the run.py operations).
+WAGER = 123456
+# Fees paid by a player in a game: the challenger pays for the challenge
+# group and for the reveal (which also covers up to two inner payments),
+# the opponent for the accept group.
+MAX_GAME_FEE = run.fee_planner.group_fee([None, None, "reveal"])
+
+
+@dataclass
+class TournamentReport:
+    """
+        Outcome of a tournament. latencies holds, for each phase, the
+        submission to confirmation time of its confirmed calls, in
+        seconds, sorted; fees the microAlgos spent by the players.
+    """
+    games    : int
+    completed: int
+    duration : float
+    fees     : int
+    latencies: dict[str, list[float]] = field(default_factory=dict)
+    failures : dict[str, int] = field(default_factory=dict)
+
+    @property
+    def throughput(self) -> float:
+        """
+            Completed games per second.
+        """
+        return self.completed / self.duration if self.duration > 0 else 0.0
+
+    def percentile(self, phase: str, p: float) -> float:
+        """
+            Confirmation latency of a phase at percentile p (0-100),
+            nearest rank.
+        """
+        latencies = self.latencies.get(phase, [])
+        if not latencies:
+            return 0.0
+        rank = max(math.ceil(p / 100 * len(latencies)), 1)
+        return latencies[rank - 1]
+
+    def format(self) -> str:
+        failed = ", ".join(f"{count} at {phase}" for phase, count in self.failures.items() if count)
+        rows = [
+            f"games      : {self.games} ({self.completed} completed{', failed ' + failed if failed else ''})",
+            f"duration   : {self.duration:.3f} s",
+            f"throughput : {self.throughput:.1f} games/s",
+            f"fees       : {self.fees} microAlgos"
+            f" ({self.fees / self.completed if self.completed else 0:.0f} per completed game)",
+        ]
+        for phase in PHASES:
+            rows.append(
+                f"{phase:<11}: p50 {self.percentile(phase, 50) * 1000:.1f} ms, "
+                f"p95 {self.percentile(phase, 95) * 1000:.1f} ms, "
+                f"p99 {self.percentile(phase, 99) * 1000:.1f} ms"
+            )
+        return "\n".join(rows)
+
+
+def setup_players(
+    algod_client: algod.AlgodClient,
+    funder_pk   : str,
+    app_id      : int,
+    players     : int,
+    games       : int,
+    seed        : str = "rps-tournament",
+    concurrency : int = 8
+) -> list[tuple[str, str]]:
+    """
+        Derive the players from a seed, fund them for their games and opt
+        them in to the application. Players left by a previous run with
+        the same seed are only topped up, and not opted in again to the
+        same application.
+
+        Args:
+            algod_client (algod.AlgodClient): algod client.
+            funder_pk (str): private key of the account funding players.
+            app_id (int): application index.
+            players (int): number of players.
+            games (int): games each player will take part in.
+            seed (str, default="rps-tournament"): seed of the players' keys.
+            concurrency (int, default=8): players opted in at once.
+
+        Returns:
+            (list[tuple[str, str]]): players' private keys and addresses.
+    """
+    accounts = utils.derive_accounts(seed, players)
+    # The opt-in, then a player losing every game spends its wager and
+    # its fees each time.
+    plan = funding.FundPlan().opt_in_app(run.APP_LOCAL_SCHEMA).transactions(1)
+    plan.spend(games * (WAGER + MAX_GAME_FEE))
+    funding.top_up(algod_client, funder_pk, accounts.addresses(), plan)
+
+    def optin(player):
+        account_pk, account_addr = player
+        applications = algod_client.account_info(account_addr)["apps-local-state"]
+        if not any(app["id"] == app_id for app in applications):
+            if run.optin(account_pk, app_id) == -1:
+                raise RuntimeError(f"{account_addr} couldn't opt in")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(optin, accounts))
+
+    return list(accounts)
+
+
+def run_tournament(
+    algod_client: algod.AlgodClient,
+    app_id      : int,
+    players     : list[tuple[str, str]],
+    rounds      : int,
+    concurrency : int,
+    rng         : random.Random | None = None
+) -> TournamentReport:
+    """
+        Play a round-robin-like tournament: in each round the players are
+        shuffled and paired up, and every pair plays one game
+        (challenge, accept, reveal) with random plays and a fresh random
+        commitment. Up to concurrency games are in flight at once; since a
+        player is in one game per round, games never contend for players.
+
+        Args:
+            algod_client (algod.AlgodClient): algod client, also used by
+            the run.py operations.
+            app_id (int): application index.
+            players (list[tuple[str, str]]): players, see setup_players.
+            rounds (int): number of rounds.
+            concurrency (int): number of games in flight at most.
+            rng (random.Random | None, default=None): source of pairings,
+            plays and nonces.
+
+        Returns:
+            (TournamentReport): throughput, per-phase latency and fees.
+    """
+    rng = rng if rng is not None else random.Random()
+    run.algod_client = algod_client
+
+    # Plays and commitments are drawn upfront, since the generator isn't
+    # shared between threads.
+    games = []
+    for _ in range(rounds):
+        shuffled = rng.sample(players, len(players))
+        for challenger, opponent in zip(shuffled[0::2], shuffled[1::2]):
+            # Only the first character of a reveal is the play; the rest
+            # is the nonce hiding it in the commitment.
+            challenger_reveal = rng.choice(PLAYS) + rng.randbytes(16).hex()
+            opponent_reveal   = rng.choice(PLAYS)
+            games.append((challenger, opponent, challenger_reveal, opponent_reveal))
+
+    lock      = threading.Lock()
+    latencies = {phase: [] for phase in PHASES}
+    failures  = {phase: 0 for phase in PHASES}
+    completed = [0]
+
+    def play(game):
+        (challenger_pk, challenger_addr), (opponent_pk, opponent_addr), challenger_reveal, opponent_reveal = game
+        calls = (
+            ("challenge", lambda: run.create_challenge(challenger_pk, challenger_reveal, app_id, opponent_addr)),
+            ("accept"   , lambda: run.accept_challenge(opponent_pk, opponent_reveal, app_id, challenger_addr)),
+            ("reveal"   , lambda: run.reveal(challenger_pk, challenger_reveal, app_id, opponent_addr)),
+        )
+        for phase, call in calls:
+            submitted = time.perf_counter()
+            try:
+                confirmation_round = call()
+            except Exception as e:
+                # e.g. the confirmation didn't come within the wait rounds.
+                print(e)
+                confirmation_round = -1
+            latency = time.perf_counter() - submitted
+
+            with lock:
+                if confirmation_round == -1:
+                    failures[phase] += 1
+                    return
+                latencies[phase].append(latency)
+        with lock:
+            completed[0] += 1
+
+    balances_before = _balances(algod_client, players, app_id)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # One batch per round: the next one only starts once every player
+        # is free again.
+        per_round = len(players) // 2
+        for i in range(0, len(games), per_round):
+            list(executor.map(play, games[i : i + per_round]))
+    duration = time.perf_counter() - started
+
+    # Wagers only move between the players and the application, so
+    # whatever left both was spent in fees.
+    balances_after = _balances(algod_client, players, app_id)
+
+    return TournamentReport(
+        games=len(games),
+        completed=completed[0],
+        duration=duration,
+        fees=balances_before - balances_after,
+        latencies={phase: sorted(values) for phase, values in latencies.items()},
+        failures=failures
+    )
+
+
+def _balances(algod_client, players, app_id):
+    addresses = [address for _, address in players]
+    addresses.append(logic.get_application_address(app_id))
+    return sum(
+        algod_client.account_info(address, exclude="all")["amount"]
+        for address in addresses
+    )
+
+
+if __name__ == "__main__":
+    # Usage: PYTHONPATH=../.. python ./tournament.py [options]
+    # Runs against an in-process local node unless --algod is given.
+    parser = argparse.ArgumentParser(description="Rock, Paper, Scissors tournament simulator")
+    parser.add_argument("--players"    , type=int, default=200)
+    parser.add_argument("--rounds"     , type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed"       , type=int, help="seed of pairings, plays and commitments")
+    parser.add_argument("--algod"      , help="algod address, e.g. http://localhost:4001")
+    parser.add_argument("--faucet"     , help="faucet mnemonic, required with --algod")
+    args = parser.parse_args()
+
+    if args.players < 2 or args.players % 2:
+        parser.error("--players must be an even number of at least 2")
+
+    node = None
+    if args.algod is None:
+        faucet_pk, faucet_addr = account.generate_account()
+        node = LocalNode(genesis={faucet_addr: 10 ** 15}).start()
+        algod_client = node.algod_client()
+    else:
+        algod_client = utils.get_algod_client(args.algod)
+        faucet_pk = mnemonic.to_private_key(args.faucet)
+    run.algod_client = algod_client
+
+    app_id = run.deploy(creator_pk=faucet_pk)
+    # The application account needs its own minimum balance to receive
+    # the wagers.
+    utils.fund_accounts(
+        algod_client, faucet_pk, [logic.get_application_address(app_id)], funding.FundPlan().total
+    )
+
+    players = setup_players(
+        algod_client,
+        funder_pk=faucet_pk,
+        app_id=app_id,
+        players=args.players,
+        games=args.rounds
+    )
+
+    report = run_tournament(
+        algod_client,
+        app_id=app_id,
+        players=players,
+        rounds=args.rounds,
+        concurrency=args.concurrency,
+        rng=random.Random(args.seed)
+    )
+    print(report.format())
+
+    if node is not None:
+        node.stop()
@@ -1,3 +1,4 @@
+from algosdk import abi as sdk_abi
 from pyteal import *
 
 global_admin          = Bytes("admin")
@@ -262,14 +263,22 @@ def swap(
     )
     
 
-if __name__ == "__main__":
-    import json 
-
-    approval_program, clear_state_program, contract = router.compile_program(
+def compile_programs() -> tuple[str, str, sdk_abi.Contract]:
+    """
+        Compile the approval and clear programs (TEAL source) and the ABI
+        description of the contract, as written to build/ below.
+    """
+    return router.compile_program(
         version=6, 
         optimize=OptimizeOptions(scratch_slots=True)
     )
 
+
+if __name__ == "__main__":
+    import json 
+
+    approval_program, clear_state_program, contract = compile_programs()
+
     with open("../../build/approval.teal", "w") as f:
         f.write(approval_program)
     with open("../../build/clear.teal"   , "w") as f:
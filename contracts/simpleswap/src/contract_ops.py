@@ -13,12 +13,41 @@ from algosdk import (
 )
 from pyteal import *
 
+from pyteal_helpers import cache, fees, state, submit
+
 import base64
 
+# Read-through cache shared by the getters below and the faucet. Every
+# operation that confirms a transaction advances it, invalidating the
+# reads made at earlier rounds; reads older than a second are revalidated
+# against the current round.
+read_cache = cache.read_cache
+# Inner transactions issued by the contract's methods: "optin_assets"
+# opts the application in to both assets, "swap" sends the destination
+# asset. The fees of the operations below are planned from them.
+fee_planner = fees.FeePlanner({"optin_assets": 2, "swap": 1})
+# Storage of the application.
+APP_GLOBAL_SCHEMA = transaction.StateSchema(num_uints=4, num_byte_slices=2)
+APP_LOCAL_SCHEMA  = transaction.StateSchema(num_uints=0, num_byte_slices=0)
+# Sent to the application by "optin_assets": the minimum balance of its
+# two ASA holdings.
+OPTIN_ASSETS_AMOUNT = 200_000
+# Global state layout.
+GLOBAL_STATE_SCHEMA = state.KeyValueSchema({
+    "admin"         : state.ADDRESS,
+    "admin-proposal": state.ADDRESS,
+    "asset-id-from" : state.UINT,
+    "asset-id-to"   : state.UINT,
+    "R"             : state.UINT,
+    "r"             : state.UINT
+})
+
 
 def deploy(
     algod_client: algod.AlgodClient,
-    creator_pk  : str
+    creator_pk  : str,
+    approval    : str | None = None,
+    clear       : str | None = None
 ) -> int:
     """
         Deploy the smart contract.
@@ -26,13 +55,19 @@ def deploy(
         Args:
             algod_client (algod.AlgodClient): algod client.
             creator_pk (str): smart contract's creator private key.
+            approval (str | None, default=None): TEAL source of the
+            approval program, read from build/ if None.
+            clear (str | None, default=None): TEAL source of the clear
+            program, read from build/ if None.
 
         Returns:
             (int): if successful, return the appilcation index of the
             deployed smart contract; otherwise, return -1.
     """
-    with open("../../build/approval.teal", "r") as f: approval = f.read()
-    with open("../../build/clear.teal"   , "r") as f: clear    = f.read()
+    if approval is None:
+        with open("../../build/approval.teal", "r") as f: approval = f.read()
+    if clear is None:
+        with open("../../build/clear.teal"   , "r") as f: clear    = f.read()
 
     try:
         sender = account.address_from_private_key(creator_pk)
@@ -43,9 +78,6 @@ def deploy(
         clear_result  = algod_client.compile(clear)
         clear_program = base64.b64decode(clear_result["result"])
 
-        local_schema  = transaction.StateSchema(num_uints=0, num_byte_slices=0)
-        global_schema = transaction.StateSchema(num_uints=4, num_byte_slices=2)
-
         suggested_parameters = algod_client.suggested_params()
 
         unsigned_txn = transaction.ApplicationCreateTxn(
@@ -54,8 +86,8 @@ def deploy(
             on_complete=transaction.OnComplete.NoOpOC,
             approval_program=approval_program,
             clear_program=clear_program,
-            global_schema=global_schema,
-            local_schema=local_schema
+            global_schema=APP_GLOBAL_SCHEMA,
+            local_schema=APP_LOCAL_SCHEMA
         )
         signed_txn = unsigned_txn.sign(creator_pk)
 
@@ -69,6 +101,8 @@ def deploy(
 
         app_id = result["application-index"]
 
+        read_cache.advance(result["confirmed-round"])
+
         return app_id
     except error.AlgodHTTPError as e:
         print(e)
@@ -120,6 +154,8 @@ def propose_admin(
 
         confirmation_round = result.confirmed_round
 
+        read_cache.advance(confirmation_round)
+
         return confirmation_round
     except error.AlgodHTTPError as e:
         print(e)
@@ -168,6 +204,8 @@ def accept_admin_role(
 
         confirmation_round = result.confirmed_round
 
+        read_cache.advance(confirmation_round)
+
         return confirmation_round
     except error.AlgodHTTPError as e:
         print(e)
@@ -221,6 +259,8 @@ def set_rate(
 
         confirmation_round = result.confirmed_round
 
+        read_cache.advance(confirmation_round)
+
         return confirmation_round
     except error.AlgodHTTPError as e:
         print(e)
@@ -256,8 +296,6 @@ def optin_assets(
         signer = AccountTransactionSigner(admin_pk)
 
         suggested_parameters = algod_client.suggested_params()
-        suggested_parameters.flat_fee = True
-        suggested_parameters.fee = 1000
 
         with open("./src/api.json") as f:
             js = f.read()
@@ -265,19 +303,17 @@ def optin_assets(
 
         payment_txn = transaction.PaymentTxn(
             sender=sender,
-            sp=suggested_parameters,
+            sp=fee_planner.params(suggested_parameters),
             receiver=logic.get_application_address(app_id),
-            amt=200000
+            amt=OPTIN_ASSETS_AMOUNT
         )
         signed_payment_txn = TransactionWithSigner(payment_txn, signer)
 
-        suggested_parameters.fee = 3000
-
         atc.add_method_call(
             app_id=app_id,
             method=_get_method(c, "optin_assets"),
             sender=sender,
-            sp=suggested_parameters,
+            sp=fee_planner.params(suggested_parameters, "optin_assets"),
             signer=signer,
             method_args=[asset_id_from, asset_id_to, signed_payment_txn],
             foreign_assets=[asset_id_from, asset_id_to]
@@ -287,6 +323,8 @@ def optin_assets(
 
         confirmation_round = result.confirmed_round
 
+        read_cache.advance(confirmation_round)
+
         return confirmation_round
     except error.AlgodHTTPError as e:
         print(e)
@@ -299,7 +337,8 @@ def swap(
     app_id        : int, 
     asset_id_from : int, 
     asset_id_to   : int, 
-    amount_to_swap: int
+    amount_to_swap: int,
+    policy        : submit.FeeBumpPolicy | None = None
 ):
     """
         Call smart contract method "swap".
@@ -311,6 +350,10 @@ def swap(
             asset_id_from (int): source ASA's ID.
             asset_id_to (int): destination ASA's ID.
             amount_to_swap (int): amount to swap.
+            policy (submit.FeeBumpPolicy | None, default=None): for
+            high-priority swaps, resubmit the group with bumped fees while
+            it is pending (see submit.send_with_fee_bumping); the planned
+            fees are the ones of the first submission.
 
         Returns:
             (int): if successful, return the confirmation round; 
@@ -324,8 +367,6 @@ def swap(
         signer = AccountTransactionSigner(account_pk)
 
         suggested_parameters = algod_client.suggested_params()
-        suggested_parameters.flat_fee = True
-        suggested_parameters.fee = 2000
 
         with open("./src/api.json") as f:
             js = f.read()
@@ -333,31 +374,34 @@ def swap(
 
         asset_transfer_txn = transaction.AssetTransferTxn(
             sender=sender,
-            sp=suggested_parameters,
+            sp=fee_planner.params(suggested_parameters),
             receiver=logic.get_application_address(app_id),
             amt=amount_to_swap,
             index=asset_id_from
         )
         asset_transfer_txn_signed = TransactionWithSigner(asset_transfer_txn, signer)
 
-        suggested_parameters.fee = 1000
-        
         atc.add_method_call(
             app_id=app_id,
             method=_get_method(c, "swap"),
             sender=sender,
-            sp=suggested_parameters,
+            sp=fee_planner.params(suggested_parameters, "swap"),
             signer=signer,
             method_args=[asset_transfer_txn_signed],
             foreign_assets=[asset_id_from, asset_id_to]
         )
 
-        result = atc.execute(algod_client, 2)
+        if policy is not None:
+            confirmation_round = submit.send_with_fee_bumping(
+                algod_client, atc.build_group(), policy
+            )["confirmed-round"]
+        else:
+            confirmation_round = atc.execute(algod_client, 2).confirmed_round
 
-        confirmation_round = result.confirmed_round
+        read_cache.advance(confirmation_round)
 
         return confirmation_round
-    except error.AlgodHTTPError as e:
+    except (error.AlgodHTTPError, error.ConfirmationTimeoutError) as e:
         print(e)
         return -1
 
@@ -412,6 +456,8 @@ def create_asa(
 
         asset_id = result["asset-index"]
 
+        read_cache.advance(result["confirmed-round"])
+
         return asset_id
     except error.AlgodHTTPError as e:
         print(e)
@@ -457,6 +503,8 @@ def optin_asa(
 
         confirmation_round = result["confirmed-round"]
 
+        read_cache.advance(confirmation_round)
+
         return confirmation_round
     except error.AlgodHTTPError as e:
         print(e)
@@ -508,6 +556,8 @@ def send_asa(
 
         confirmation_round = result["confirmed-round"]
 
+        read_cache.advance(confirmation_round)
+
         return confirmation_round
     except error.AlgodHTTPError as e:
         print(e)
@@ -530,7 +580,12 @@ def get_account_info(
     """
     account_info = {}
     try:
-        account_info = algod_client.account_info(account_addr)
+        account_info = read_cache.get(
+            ("account_info", algod_client.algod_address, account_addr),
+            lambda: algod_client.account_info(account_addr),
+            round_of=lambda response: response.get("round"),
+            current_round=lambda: algod_client.status()["last-round"]
+        )
     except error.AlgodHTTPError as e:
         print(e)
     finally:
@@ -539,7 +594,8 @@ def get_account_info(
 
 def get_application_global_state(
     indexer_client: indexer.IndexerClient,
-    app_id        : int
+    app_id        : int,
+    schema        : state.KeyValueSchema | None = None
 ) -> dict:
     """
         Get application's global state.
@@ -547,29 +603,25 @@ def get_application_global_state(
         Args:
             indexer_client (indexer.IndexerClient): indexer client.
             app_id (int): application index.
+            schema (state.KeyValueSchema | None, default=None): layout 
+            used to decode the values (e.g. GLOBAL_STATE_SCHEMA); if None,
+            bytes values are returned as raw bytes.
 
         Returns:
             (dict): application's global state.
     """
     global_state = {}
     try:
-        app = indexer_client.applications(app_id)
-
-        for variable in app["application"]["params"]["global-state"]: 
-            key   = variable["key"]
-            value = variable["value"]
-
-            key_decoded = base64.b64decode(key).decode()
-
-            if value["type"] == 1:
-                value_decoded = base64.b64decode(value["bytes"])
-            else:
-                value_decoded = value["uint"]
-
-            print(key_decoded)
-            print(value_decoded)
+        app = read_cache.get(
+            ("applications", indexer_client.indexer_address, app_id),
+            lambda: indexer_client.applications(app_id),
+            round_of=lambda response: response.get("current-round")
+        )
 
-            global_state[key_decoded] = value_decoded
+        global_state = state.decode_state(
+            app["application"]["params"].get("global-state", []),
+            schema
+        )
     except error.IndexerHTTPError as e:
         print(e)
     finally:
@@ -591,7 +643,46 @@ def get_asa_details(
             (dict): asset information.
     """
     try:
-        return indexer_client.asset_info(asset_id=asset_id)
+        return read_cache.get(
+            ("asset_info", indexer_client.indexer_address, asset_id),
+            lambda: indexer_client.asset_info(asset_id=asset_id),
+            round_of=lambda response: response.get("current-round")
+        )
+    except error.IndexerHTTPError as e:
+        print(e)
+        return {}
+
+
+def get_asa_params(
+    indexer_client: indexer.IndexerClient,
+    asset_id: int
+) -> dict:
+    """
+        Get the immutable parameters of an asset (creator, decimals, 
+        total supply, name and unit name). Since they can't change,
+        they are cached for the whole process lifetime.
+
+        Args:
+            indexer_client (indexer.IndexerClient): indexer client.
+            asset_id (int): asset id.
+
+        Returns:
+            (dict): asset's immutable parameters.
+    """
+    def fetch():
+        params = indexer_client.asset_info(asset_id=asset_id)["asset"]["params"]
+        return {
+            key: params[key]
+            for key in ["creator", "decimals", "total", "name", "unit-name"]
+            if key in params
+        }
+
+    try:
+        return read_cache.get(
+            ("asset_params", indexer_client.indexer_address, asset_id),
+            fetch,
+            permanent=True
+        )
     except error.IndexerHTTPError as e:
         print(e)
         return {}
@@ -0,0 +1,249 @@
+from algosdk.future import transaction
+from algosdk.v2client import algod, indexer
+from algosdk import account, constants, logic
+
+from pyteal_helpers import utils
+from pyteal_helpers.funding import FundPlan
+from pyteal_helpers.submit import FeeBumpPolicy
+from src.contract_ops import *
+from src.faucet import Faucet
+
+# Rate set on the application: R = 5, r = 1, i.e. 0.5.
+RATE_INTEGER = 5
+RATE_DECIMAL = 1
+# Supply of the tokens and amount of each one held by the application,
+# large enough for any number of swaps by test or load accounts.
+TOKEN_TOTAL     = 10 ** 15
+TOKEN_LIQUIDITY = 10 ** 12
+
+
+def deployer_plan(calls: int = 0, optin_assets: bool = False) -> FundPlan:
+    """
+        Balance of an account deploying the application, then sending
+        calls administrative calls (e.g. "set_rate") and, if optin_assets
+        is set, calling "optin_assets".
+    """
+    plan = FundPlan().create_app(APP_GLOBAL_SCHEMA).transactions(1 + calls)
+    if optin_assets:
+        plan.spend(OPTIN_ASSETS_AMOUNT + fee_planner.group_fee([None, "optin_assets"]))
+    return plan
+
+
+def app_funding() -> int:
+    """
+        MicroAlgos the application account needs besides the ones sent by
+        "optin_assets" (the minimum balance of its ASA holdings).
+    """
+    return FundPlan().hold_assets(2).total - OPTIN_ASSETS_AMOUNT
+
+
+def user_plan(swaps: int = 0, policy: FeeBumpPolicy | None = None) -> FundPlan:
+    """
+        Balance of an account holding both tokens (the fees of the opt-ins
+        are paid by the faucet, see SwapEnvironment.new_account), then
+        performing swaps calls to "swap", with fees bumped up to the
+        policy's limits if one is given.
+    """
+    group_fee = fee_planner.group_fee([None, "swap"])
+    if policy is not None:
+        group_fee = policy.max_group_fee([
+            fee_planner.fee(constants.min_txn_fee), fee_planner.fee(constants.min_txn_fee, "swap")
+        ])
+    return FundPlan().hold_assets(2).spend(swaps * group_fee)
+
+
+class SwapEnvironment:
+    """
+        Deployed, funded and opted-in simpleswap application, with two
+        tokens and the rate set, shared by the test cases of a process
+        (see tests/fixtures.py) and used by the load generator.
+
+        Users must not change the state of the application: they get
+        isolated accounts from new_account() and, to exercise the
+        administrative methods, a fresh application from new_app().
+
+        Applications are deployed from the TEAL sources approval and
+        clear, or from build/ if they aren't given (see deploy).
+    """
+
+    def __init__(
+        self,
+        algod_client  : algod.AlgodClient,
+        indexer_client: indexer.IndexerClient,
+        faucet        : Faucet,
+        approval      : str | None = None,
+        clear         : str | None = None
+    ):
+        self.algod_client   = algod_client
+        self.indexer_client = indexer_client
+        self.faucet         = faucet
+        self.approval       = approval
+        self.clear          = clear
+
+        self.asa_creator_pk, self.asa_creator_addr = self.new_account(
+            # Two ASA creations and two liquidity transfers.
+            amount=FundPlan().hold_assets(2).transactions(4).total
+        )
+
+        self.token_a_id, self.token_b_id = [
+            _check(create_asa(
+                algod_client=algod_client,
+                asa_creator_pk=self.asa_creator_pk,
+                asa_manager_pk=self.asa_creator_pk,
+                token_conf={
+                    "unit_name" : unit_name,
+                    "asset_name": asset_name,
+                    "total"     : TOKEN_TOTAL,
+                    "decimals"  : 6
+                }
+            ), "create_asa")
+            for unit_name, asset_name in (("Token A", "token-a"), ("Token B", "token-b"))
+        ]
+
+        self.admin_pk, self.admin_addr, self.app_id = self.new_app(
+            # The deployment, 'set_rate' and 'optin_assets'.
+            admin_amount=deployer_plan(calls=1, optin_assets=True).total
+        )
+        self.app_addr = logic.get_application_address(self.app_id)
+
+        self.faucet.dispense(
+            algod_client=algod_client,
+            receiver_addr=self.app_addr,
+            amount=app_funding()
+        )
+
+        _check(optin_assets(
+            algod_client=algod_client,
+            admin_pk=self.admin_pk,
+            app_id=self.app_id,
+            asset_id_from=self.token_a_id,
+            asset_id_to=self.token_b_id
+        ), "optin_assets")
+
+        for asset_id in (self.token_a_id, self.token_b_id):
+            _check(send_asa(
+                algod_client=algod_client,
+                sender_pk=self.asa_creator_pk,
+                receiver_addr=self.app_addr,
+                asset_id=asset_id,
+                amount=TOKEN_LIQUIDITY
+            ), "send_asa")
+
+        _check(set_rate(
+            algod_client=algod_client,
+            admin_pk=self.admin_pk,
+            app_id=self.app_id,
+            new_rate_integer=RATE_INTEGER,
+            new_rate_decimal=RATE_DECIMAL
+        ), "set_rate")
+
+
+    def new_account(
+        self,
+        amount      : int,
+        token_amount: int | None = None
+    ) -> tuple[str, str]:
+        """
+            Generate an account and fund it in a single atomic group: the
+            faucet payment and, if token_amount is given, the opt-ins to
+            both test tokens and the transfer of token_amount of each.
+            The faucet pays the fees of the whole group.
+
+            Args:
+                amount (int): microAlgos sent to the account.
+                token_amount (int | None, default=None): amount of each
+                token sent to the account; None skips the opt-ins.
+
+            Returns:
+                (tuple[str, str]): account's private key and address.
+        """
+        private_key, address = account.generate_account()
+
+        suggested_parameters = self.algod_client.suggested_params()
+        suggested_parameters.flat_fee = True
+        suggested_parameters.fee = 0
+
+        signing_keys, transactions = [], []
+        if token_amount is not None:
+            for asset_id in (self.token_a_id, self.token_b_id):
+                signing_keys.append(private_key)
+                transactions.append(transaction.AssetTransferTxn(
+                    sender=address,
+                    sp=suggested_parameters,
+                    receiver=address,
+                    amt=0,
+                    index=asset_id
+                ))
+            if token_amount > 0:
+                for asset_id in (self.token_a_id, self.token_b_id):
+                    signing_keys.append(self.asa_creator_pk)
+                    transactions.append(transaction.AssetTransferTxn(
+                        sender=self.asa_creator_addr,
+                        sp=suggested_parameters,
+                        receiver=address,
+                        amt=token_amount,
+                        index=asset_id
+                    ))
+
+        suggested_parameters = self.algod_client.suggested_params()
+        suggested_parameters.flat_fee = True
+        suggested_parameters.fee = suggested_parameters.min_fee * (len(transactions) + 1)
+
+        payment_txn = transaction.PaymentTxn(
+            sender=account.address_from_private_key(self.faucet.private_key),
+            sp=suggested_parameters,
+            receiver=address,
+            amt=amount
+        )
+
+        signed_txns = utils.make_atomic(
+            [self.faucet.private_key] + signing_keys,
+            [payment_txn] + transactions
+        )
+        txn_id = self.algod_client.send_transactions(signed_txns)
+
+        result = transaction.wait_for_confirmation(
+            algod_client=self.algod_client,
+            txid=txn_id,
+            wait_rounds=2
+        )
+        read_cache.advance(result["confirmed-round"])
+
+        return private_key, address
+
+
+    def new_app(self, admin_amount: int | None = None) -> tuple[str, str, int]:
+        """
+            Deploy a fresh application from a new administrator account.
+
+            Args:
+                admin_amount (int | None, default=None): microAlgos sent to
+                the administrator. None covers the deployment and one
+                administrative call (see deployer_plan).
+
+            Returns:
+                (tuple[str, str, int]): administrator's private key and
+                address, application index.
+        """
+        if admin_amount is None:
+            admin_amount = deployer_plan(calls=1).total
+        admin_pk, admin_addr = self.new_account(amount=admin_amount)
+
+        app_id = _check(deploy(
+            algod_client=self.algod_client,
+            creator_pk=admin_pk,
+            approval=self.approval,
+            clear=self.clear
+        ), "deploy")
+
+        return admin_pk, admin_addr, app_id
+
+
+def _check(result: int, operation: str) -> int:
+    if result == -1:
+        raise RuntimeError(f"swap environment setup failed: '{operation}' returned -1")
+    return result
+
+
+if __name__ == "__main__":
+    pass
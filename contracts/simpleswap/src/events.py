@@ -0,0 +1,145 @@
+from algosdk.v2client import algod
+from algosdk.abi import Contract
+
+from dataclasses import dataclass
+from typing import Iterator
+
+from pyteal_helpers import blocks
+
+import os
+
+
+API_PATH = os.path.join(os.path.dirname(__file__), "api.json")
+
+
+@dataclass(frozen=True)
+class SwapEvent:
+    """
+        A confirmed call to the "swap" method.
+
+        Attributes:
+            round (int): confirmation round.
+            timestamp (int): block timestamp (seconds since epoch).
+            offset (int): position of the application call in the block.
+            app_id (int): application index.
+            sender (str): address of the account that swapped.
+            asset_in (int): ASA's ID sent to the application.
+            amount_in (int): amount of asset_in sent.
+            asset_out (int): ASA's ID received from the application.
+            amount_out (int): amount of asset_out received.
+    """
+    round     : int
+    timestamp : int
+    offset    : int
+    app_id    : int
+    sender    : str
+    asset_in  : int
+    amount_in : int
+    asset_out : int
+    amount_out: int
+
+
+def get_swap_selector() -> bytes:
+    """
+        Get the ABI selector of the "swap" method.
+
+        Returns:
+            (bytes): 4-byte method selector.
+    """
+    with open(API_PATH) as f:
+        c = Contract.from_json(f.read())
+    return c.get_method_by_name("swap").get_selector()
+
+
+def follow_swaps(
+    algod_client   : algod.AlgodClient,
+    app_id         : int,
+    start_round    : int = 1,
+    checkpoint_path: str = None,
+    stop_round     : int = None
+) -> Iterator[SwapEvent]:
+    """
+        Stream the swaps performed on a simpleswap application.
+
+        Args:
+            algod_client (algod.AlgodClient): algod client.
+            app_id (int): application index.
+            start_round (int, default=1): first round to scan, unless 
+            a checkpoint exists.
+            checkpoint_path (str, default=None): file used to persist 
+            the next round to scan, so that the stream resumes from it 
+            after a restart.
+            stop_round (int, default=None): last round to scan; if None,
+            keep following new blocks.
+
+        Yields:
+            (SwapEvent): swap events, in ledger order.
+    """
+    follower = blocks.BlockFollower(
+        algod_client=algod_client,
+        start_round=start_round,
+        checkpoint_path=checkpoint_path,
+        stop_round=stop_round,
+        app_ids={app_id}
+    )
+    selector = get_swap_selector()
+    for round, block in follower.blocks():
+        yield from decode_swaps(block, round, app_id, selector)
+
+
+def decode_swaps(
+    block   : dict,
+    round   : int,
+    app_id  : int,
+    selector: bytes
+) -> list[SwapEvent]:
+    """
+        Extract the swaps performed on an application from a block.
+
+        Args:
+            block (dict): block, as decoded by blocks.decode_block.
+            round (int): block's round.
+            app_id (int): application index.
+            selector (bytes): "swap" method selector.
+
+        Returns:
+            (list): swap events contained in the block.
+    """
+    events = []
+    txns = {
+        offset: txn for offset, txn, _ in blocks.iter_transactions(block)
+    }
+    for offset, txn, apply_data in blocks.iter_transactions(block):
+        if txn.get("type") != "appl" or txn.get("apid", 0) != app_id:
+            continue
+
+        app_args = txn.get("apaa", [])
+        if not app_args or blocks.decode_bytes(app_args[0]) != selector:
+            continue
+
+        # The asset transfer paying the application is the transaction 
+        # right before the method call in the group.
+        payment = blocks.group_transaction(txns, offset - 1, txn)
+
+        inner_txns = blocks.inner_transactions(apply_data)
+        if payment.get("type") != "axfer" or len(inner_txns) != 1:
+            continue
+
+        events.append(
+            SwapEvent(
+                round=round,
+                timestamp=block.get("ts", 0),
+                offset=offset,
+                app_id=app_id,
+                sender=blocks.decode_address(txn["snd"]),
+                asset_in=payment.get("xaid", 0),
+                amount_in=payment.get("aamt", 0),
+                asset_out=inner_txns[0].get("xaid", 0),
+                amount_out=inner_txns[0].get("aamt", 0)
+            )
+        )
+    return events
+
+
+if __name__ == "__main__":
+    pass
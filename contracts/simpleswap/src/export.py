@@ -0,0 +1,236 @@
+from algosdk.v2client import algod
+from algosdk import encoding
+
+from pyteal_helpers import utils
+from src import events
+
+import numpy as np
+
+import json
+import os
+import struct
+import sys
+
+
+# Column name -> (dtype, shape of a single row).
+COLUMNS = {
+    "round"     : ("<u8", ()),
+    "sender"    : ("u1" , (32,)),
+    "asset_in"  : ("<u8", ()),
+    "amount_in" : ("<u8", ()),
+    "asset_out" : ("<u8", ()),
+    "amount_out": ("<u8", ()),
+    "rate"      : ("<f8", ()),
+}
+# Size of the .npy headers (magic string, length and padded dict), fixed
+# so that they can be rewritten in place whatever the row count.
+NPY_HEADER_SIZE = 128
+
+
+def export_swaps(
+    algod_client: algod.AlgodClient,
+    app_id      : int,
+    directory   : str,
+    stop_round  : int,
+    start_round : int = 1,
+    batch_size  : int = 10_000
+) -> int:
+    """
+        Append the swaps of a simpleswap application to a columnar store.
+
+        Every column is a NumPy .npy file in the directory, appended in 
+        place, so the history can be loaded with load_swaps (memory-mapped)
+        instead of being parsed. The directory remembers the last exported
+        round: a later call continues from the round after it, so the 
+        store can be extended one round range at a time.
+
+        Args:
+            algod_client (algod.AlgodClient): algod client.
+            app_id (int): application index.
+            directory (str): columnar store directory.
+            stop_round (int): last round to export.
+            start_round (int, default=1): first round to export, for a 
+            new store.
+            batch_size (int, default=10000): number of swaps buffered 
+            before being written.
+
+        Returns:
+            (int): number of rows in the store.
+    """
+    os.makedirs(directory, exist_ok=True)
+    meta = _load_meta(directory, app_id, start_round)
+    _truncate(directory, meta["rows"])
+
+    buffer = []
+    for event in events.follow_swaps(
+        algod_client=algod_client,
+        app_id=app_id,
+        start_round=meta["last-round"] + 1,
+        stop_round=stop_round
+    ):
+        buffer.append(event)
+        if len(buffer) >= batch_size:
+            # Only rounds that were fully read can be marked as exported.
+            complete = [e for e in buffer if e.round < event.round]
+            buffer = buffer[len(complete):]
+            if complete:
+                _append(directory, meta, complete, complete[-1].round)
+
+    _append(directory, meta, buffer, stop_round)
+
+    return meta["rows"]
+
+
+def load_swaps(directory: str) -> dict:
+    """
+        Load the swap history exported by export_swaps.
+
+        Args:
+            directory (str): columnar store directory.
+
+        Returns:
+            (dict): column name -> read-only memory-mapped array, where
+            "sender" has shape (rows, 32) and holds raw public keys (see
+            sender_address).
+    """
+    meta = _load_meta(directory, None, 1)
+    return {
+        name: np.load(_column_path(directory, name), mmap_mode="r")[: meta["rows"]]
+        for name in COLUMNS
+    }
+
+
+def sender_address(sender_row: np.ndarray) -> str:
+    """
+        Convert a row of the "sender" column to an address.
+
+        Args:
+            sender_row (np.ndarray): 32-byte public key.
+
+        Returns:
+            (str): base32 address.
+    """
+    return encoding.encode_address(sender_row.tobytes())
+
+
+def _append(directory: str, meta: dict, swaps: list, last_round: int):
+    """
+        Append swaps to every column, then persist the row count and the
+        last exported round.
+    """
+    if swaps:
+        columns = {
+            "round"     : [e.round for e in swaps],
+            "sender"    : [encoding.decode_address(e.sender) for e in swaps],
+            "asset_in"  : [e.asset_in for e in swaps],
+            "amount_in" : [e.amount_in for e in swaps],
+            "asset_out" : [e.asset_out for e in swaps],
+            "amount_out": [e.amount_out for e in swaps],
+            # Effective rate of the swap: amount received per unit sent.
+            "rate"      : [e.amount_out / e.amount_in for e in swaps],
+        }
+        for name, (dtype, row_shape) in COLUMNS.items():
+            if name == "sender":
+                values = np.frombuffer(b"".join(columns[name]), dtype=dtype)
+                values = values.reshape((len(swaps),) + row_shape)
+            else:
+                values = np.asarray(columns[name], dtype=dtype)
+            _append_npy(_column_path(directory, name), values, meta["rows"])
+        meta["rows"] += len(swaps)
+
+    meta["last-round"] = max(meta["last-round"], last_round)
+    _save_meta(directory, meta)
+
+
+def _append_npy(path: str, values: np.ndarray, rows: int):
+    """
+        Append rows to a .npy file in place, rewriting its header.
+    """
+    mode = "r+b" if os.path.exists(path) else "w+b"
+    with open(path, mode) as f:
+        _write_npy_header(f, values.dtype, (rows + len(values),) + values.shape[1:])
+        f.seek(NPY_HEADER_SIZE + rows * values[0:1].nbytes)
+        f.write(np.ascontiguousarray(values).tobytes())
+        f.truncate()
+
+
+def _write_npy_header(f, dtype: np.dtype, shape: tuple):
+    """
+        Write a version 1.0 .npy header of exactly NPY_HEADER_SIZE bytes
+        at the start of f, padded with spaces as numpy does.
+
+        Raises:
+            ValueError: if the header doesn't fit, or the file has a
+            header of another size (its data would be overwritten).
+    """
+    f.seek(0)
+    if f.read(8)[:6] == np.lib.format.MAGIC_PREFIX:
+        (length,) = struct.unpack("<H", f.read(2))
+        if 10 + length != NPY_HEADER_SIZE:
+            raise ValueError(f"{f.name}: .npy header of {10 + length} bytes, expected {NPY_HEADER_SIZE}")
+
+    header = repr({
+        "descr"        : np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        "fortran_order": False,
+        "shape"        : tuple(shape),
+    }).encode("latin1")
+    # Magic string and version (8 bytes), header length (2 bytes), then
+    # the dict ending with a newline.
+    length = NPY_HEADER_SIZE - 10
+    if len(header) + 1 > length:
+        raise ValueError(f"{f.name}: .npy header {header!r} doesn't fit in {NPY_HEADER_SIZE} bytes")
+    f.seek(0)
+    f.write(np.lib.format.magic(1, 0) + struct.pack("<H", length) + header.ljust(length - 1) + b"\n")
+
+
+def _truncate(directory: str, rows: int):
+    """
+        Drop the rows written after the last persisted row count (left
+        behind by an interrupted export).
+    """
+    for name, (dtype, row_shape) in COLUMNS.items():
+        path = _column_path(directory, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r+b") as f:
+            _write_npy_header(f, dtype, (rows,) + row_shape)
+            f.truncate(NPY_HEADER_SIZE + rows * np.dtype(dtype).itemsize * int(np.prod(row_shape)))
+
+
+def _load_meta(directory: str, app_id: int, start_round: int) -> dict:
+    try:
+        with open(os.path.join(directory, "meta.json"), "r") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return {"app-id": app_id, "last-round": start_round - 1, "rows": 0}
+
+    if app_id is not None and meta["app-id"] != app_id:
+        raise ValueError(
+            f"{directory} holds the swaps of application {meta['app-id']}, not {app_id}"
+        )
+    return meta
+
+
+def _save_meta(directory: str, meta: dict):
+    tmp_path = os.path.join(directory, "meta.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(directory, "meta.json"))
+
+
+def _column_path(directory: str, name: str) -> str:
+    return os.path.join(directory, f"{name}.npy")
+
+
+if __name__ == "__main__":
+    # Usage: PYTHONPATH=../.. python -m src.export <directory> <app_id>
+    algod_client = utils.get_algod_client()
+
+    rows = export_swaps(
+        algod_client=algod_client,
+        app_id=int(sys.argv[2]),
+        directory=sys.argv[1],
+        stop_round=algod_client.status()["last-round"]
+    )
+
+    print(f"{rows} swaps exported.")
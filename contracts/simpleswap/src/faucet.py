@@ -6,6 +6,8 @@ from algosdk import (
     error
 )
 
+from pyteal_helpers.cache import read_cache
+
 
 class Faucet:
 
@@ -56,6 +58,8 @@ class Faucet:
 
             confirmation_round = result["confirmed-round"]
 
+            read_cache.advance(confirmation_round)
+
             return confirmation_round
         except error.AlgodHTTPError as e:
             print(e)
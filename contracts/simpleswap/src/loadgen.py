@@ -0,0 +1,287 @@
+from algosdk.v2client import algod
+from algosdk import account, error, mnemonic
+
+from pyteal_helpers import utils
+from pyteal_helpers.node import LocalNode
+from pyteal_helpers.submit import FeeBumpPolicy
+from src.contract_ops import swap
+from src.environment import SwapEnvironment, user_plan
+from src.faucet import Faucet
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import argparse
+import math
+import threading
+import time
+
+
+
+@dataclass
+class LoadReport:
+    """
+        Outcome of a load run. latencies holds the submission to
+        confirmation time of every confirmed swap, in seconds, sorted;
+        rounds the number of swaps confirmed in each round;
+        error_messages the errors of the swaps that got no answer.
+    """
+    swaps         : int
+    rejected      : int
+    duration      : float
+    latencies     : list[float]
+    rounds        : dict[int, int]
+    error_messages: list[str]
+
+    @property
+    def errors(self) -> int:
+        return len(self.error_messages)
+
+    @property
+    def confirmed(self) -> int:
+        return len(self.latencies)
+
+    @property
+    def throughput(self) -> float:
+        """
+            Confirmed swaps per second.
+        """
+        return self.confirmed / self.duration if self.duration > 0 else 0.0
+
+    @property
+    def swaps_per_round(self) -> float:
+        """
+            Mean number of swaps confirmed in the rounds that had any.
+        """
+        return self.confirmed / len(self.rounds) if self.rounds else 0.0
+
+    @property
+    def max_swaps_per_round(self) -> int:
+        return max(self.rounds.values(), default=0)
+
+    def percentile(self, p: float) -> float:
+        """
+            Confirmation latency at percentile p (0-100), nearest rank.
+        """
+        if not self.latencies:
+            return 0.0
+        rank = max(math.ceil(p / 100 * len(self.latencies)), 1)
+        return self.latencies[rank - 1]
+
+    def format(self) -> str:
+        return "\n".join([
+            f"swaps      : {self.swaps} ({self.confirmed} confirmed, {self.rejected} rejected, {self.errors} errors)",
+            f"duration   : {self.duration:.3f} s",
+            f"throughput : {self.throughput:.1f} swaps/s",
+            f"rounds     : {len(self.rounds)} ({self.swaps_per_round:.2f} swaps/round, max {self.max_swaps_per_round})",
+            f"latency    : p50 {self.percentile(50) * 1000:.1f} ms, "
+            f"p95 {self.percentile(95) * 1000:.1f} ms, "
+            f"p99 {self.percentile(99) * 1000:.1f} ms",
+        ] + [
+            f"error      : {message} ({count}x)"
+            for message, count in Counter(self.error_messages).most_common()
+        ])
+
+
+def fund_users(
+    environment   : SwapEnvironment,
+    users         : int,
+    swaps_per_user: int,
+    amount_to_swap: int,
+    concurrency   : int = 8,
+    policy        : FeeBumpPolicy | None = None
+) -> list[tuple[str, str]]:
+    """
+        Create users opted in to both tokens, funded for their swaps.
+
+        Args:
+            environment (SwapEnvironment): swap environment.
+            users (int): number of users.
+            swaps_per_user (int): swaps each user will perform.
+            amount_to_swap (int): amount of token each swap sends.
+            concurrency (int, default=8): users funded at once.
+            policy (FeeBumpPolicy | None, default=None): fee bumping
+            policy of the swaps, users are funded for its highest fees.
+
+        Returns:
+            (list[tuple[str, str]]): users' private keys and addresses.
+    """
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(
+            lambda _: environment.new_account(
+                amount=user_plan(swaps_per_user, policy).total,
+                token_amount=amount_to_swap * swaps_per_user
+            ),
+            range(users)
+        ))
+
+
+def run_load(
+    algod_client  : algod.AlgodClient,
+    environment   : SwapEnvironment,
+    users         : list[tuple[str, str]],
+    swaps         : int,
+    concurrency   : int,
+    rate          : float = 0,
+    amount_to_swap: int = 1000,
+    policy        : FeeBumpPolicy | None = None
+) -> LoadReport:
+    """
+        Drive swaps against the environment's application and measure
+        them.
+
+        Each of the concurrency workers owns a share of the users and
+        sends one swap at a time; every user performs swaps/len(users)
+        swaps (rounded up for the first ones) in alternate directions.
+        Swaps are started no faster than rate per second overall
+        (unlimited if 0).
+
+        Args:
+            algod_client (algod.AlgodClient): algod client.
+            environment (SwapEnvironment): swap environment.
+            users (list[tuple[str, str]]): users, see fund_users.
+            swaps (int): total number of swaps.
+            concurrency (int): number of swaps in flight at most.
+            rate (float, default=0): swaps started per second.
+            amount_to_swap (int, default=1000): amount of token each swap
+            sends.
+            policy (FeeBumpPolicy | None, default=None): send the swaps as
+            high-priority ones, bumping their fees while they are pending.
+
+        Returns:
+            (LoadReport): throughput, latency and rejections.
+    """
+    if len(users) < concurrency:
+        raise ValueError(f"{len(users)} users can't sustain a concurrency of {concurrency}")
+
+    lock    = threading.Lock()
+    samples : list[tuple[float, int]] = []
+    errors  : list[str] = []
+
+    directions = [
+        (environment.token_a_id, environment.token_b_id),
+        (environment.token_b_id, environment.token_a_id)
+    ]
+
+    def worker(index: int):
+        # Swap i belongs to user i % len(users), so every user performs
+        # the same number of swaps, in alternate directions.
+        for i in range(swaps):
+            if i % len(users) % concurrency != index:
+                continue
+            if rate > 0:
+                delay = started + i / rate - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+
+            account_pk, _ = users[i % len(users)]
+            asset_id_from, asset_id_to = directions[i // len(users) % 2]
+
+            submitted = time.perf_counter()
+            try:
+                confirmation_round = swap(
+                    algod_client=algod_client,
+                    account_pk=account_pk,
+                    app_id=environment.app_id,
+                    asset_id_from=asset_id_from,
+                    asset_id_to=asset_id_to,
+                    amount_to_swap=amount_to_swap,
+                    policy=policy
+                )
+            except (error.ConfirmationTimeoutError, error.AlgodHTTPError) as e:
+                # e.g. the confirmation didn't come within the wait rounds.
+                with lock:
+                    errors.append(str(e))
+                continue
+            latency = time.perf_counter() - submitted
+
+            with lock:
+                samples.append((latency, confirmation_round))
+
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=worker, args=(index,))
+        for index in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    rounds = {}
+    for _, confirmation_round in samples:
+        if confirmation_round != -1:
+            rounds[confirmation_round] = rounds.get(confirmation_round, 0) + 1
+
+    return LoadReport(
+        swaps=swaps,
+        rejected=sum(1 for _, confirmation_round in samples if confirmation_round == -1),
+        duration=duration,
+        latencies=sorted(latency for latency, confirmation_round in samples if confirmation_round != -1),
+        rounds=rounds,
+        error_messages=errors
+    )
+
+
+if __name__ == "__main__":
+    # Usage: PYTHONPATH=../.. python -m src.loadgen [options]
+    # Runs against an in-process local node unless --algod is given.
+    parser = argparse.ArgumentParser(description="simpleswap load generator")
+    parser.add_argument("--users"      , type=int  , default=16)
+    parser.add_argument("--swaps"      , type=int  , default=1000)
+    parser.add_argument("--concurrency", type=int  , default=8)
+    parser.add_argument("--rate"       , type=float, default=0, help="swaps started per second, 0 for unlimited")
+    parser.add_argument("--amount"     , type=int  , default=1000, help="amount of token sent by each swap")
+    parser.add_argument("--bump"       , action="store_true",
+                        help="resubmit pending swaps with bumped fees (see pyteal_helpers/submit.py)")
+    parser.add_argument("--block-interval", type=float,
+                        help="on the local node, pool the swaps and close a block every given seconds; "
+                             "otherwise every group gets its own round")
+    parser.add_argument("--max-block-txns", type=int, help="on the local node, transactions per block")
+    parser.add_argument("--algod"      , help="algod address, e.g. http://localhost:4001")
+    parser.add_argument("--faucet"     , help="faucet mnemonic, required with --algod")
+    args = parser.parse_args()
+
+    node = None
+    if args.algod is None:
+        faucet_pk, faucet_addr = account.generate_account()
+        node = LocalNode(
+            genesis={faucet_addr: 10 ** 15},
+            block_interval=args.block_interval,
+            max_block_txns=args.max_block_txns
+        ).start()
+        algod_client = node.algod_client()
+        indexer_client = node.indexer_client()
+        faucet = Faucet(passphrase=mnemonic.from_private_key(faucet_pk))
+    else:
+        algod_client = utils.get_algod_client(args.algod)
+        indexer_client = None
+        faucet = Faucet(passphrase=args.faucet)
+
+    policy = FeeBumpPolicy() if args.bump else None
+
+    environment = SwapEnvironment(algod_client, indexer_client, faucet)
+    users = fund_users(
+        environment,
+        users=args.users,
+        swaps_per_user=math.ceil(args.swaps / args.users),
+        amount_to_swap=args.amount,
+        policy=policy
+    )
+
+    report = run_load(
+        algod_client=algod_client,
+        environment=environment,
+        users=users,
+        swaps=args.swaps,
+        concurrency=args.concurrency,
+        rate=args.rate,
+        amount_to_swap=args.amount,
+        policy=policy
+    )
+    print(report.format())
+
+    if node is not None:
+        node.stop()
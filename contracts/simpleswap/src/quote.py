@@ -0,0 +1,144 @@
+from algosdk.v2client import indexer
+
+from src.contract_ops import get_application_global_state
+
+import numpy as np
+
+
+UINT64_MAX = 0xffffffffffffffff
+
+# 10^r for every r whose power fits in a uint64 (r <= 19); the contract's
+# Exp(Int(10), r) fails for any larger r.
+_POWERS_OF_TEN = np.array([10 ** r for r in range(20)], dtype=np.uint64)
+
+
+def quote(
+    amount      : int,
+    rate_integer: int,
+    rate_decimal: int,
+    forward     : bool = True
+) -> int:
+    """
+        Compute the amount returned by the "swap" method, with the exact
+        uint64 semantics of the contract.
+
+        Args:
+            amount (int): amount of the asset sent to the application.
+            rate_integer (int): integer part of the swap rate (global R).
+            rate_decimal (int): number of decimals of the swap rate (global r).
+            forward (bool, default=True): if True, the asset sent is the 
+            source asset (y = x * R / 10^r); otherwise, it is the destination
+            asset (x = y * 10^r / R).
+
+        Returns:
+            (int): if the swap would succeed, return the amount sent back 
+            by the application; otherwise, return -1.
+    """
+    if not (0 <= amount <= UINT64_MAX and 0 <= rate_integer <= UINT64_MAX):
+        return -1
+    if amount == 0 or rate_integer == 0 or not 0 <= rate_decimal < len(_POWERS_OF_TEN):
+        return -1
+
+    rate_decimals = 10 ** rate_decimal
+    if forward:
+        product, divisor = amount * rate_integer, rate_decimals
+    else:
+        product, divisor = amount * rate_decimals, rate_integer
+
+    if product > UINT64_MAX:
+        return -1
+
+    amount_out = product // divisor
+    # The contract asserts on the swapped amount itself: a swap that would
+    # return 0 is rejected.
+    return amount_out if amount_out > 0 else -1
+
+
+def quote_many(
+    amounts      : np.ndarray,
+    rate_integers: np.ndarray,
+    rate_decimals: np.ndarray,
+    forward      : np.ndarray | bool = True
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+        Vectorized version of quote, evaluated element-wise over arrays
+        (or scalars) broadcast against each other.
+
+        Args:
+            amounts (np.ndarray): amounts sent to the application.
+            rate_integers (np.ndarray): integer parts of the swap rate.
+            rate_decimals (np.ndarray): numbers of decimals of the swap rate.
+            forward (np.ndarray | bool, default=True): direction of each 
+            swap (see quote).
+
+        Returns:
+            (tuple): the uint64 array of amounts sent back (0 where the
+            swap would fail) and the boolean array telling which swaps 
+            would succeed.
+    """
+    amounts, rate_integers, rate_decimals, forward = np.broadcast_arrays(
+        np.asarray(amounts, dtype=np.uint64),
+        np.asarray(rate_integers, dtype=np.uint64),
+        np.asarray(rate_decimals, dtype=np.uint64),
+        np.asarray(forward, dtype=bool),
+    )
+
+    ok = (amounts > 0) & (rate_integers > 0) & (rate_decimals < len(_POWERS_OF_TEN))
+    powers = _POWERS_OF_TEN[np.where(ok, rate_decimals, 0).astype(np.intp)]
+
+    multiplier = np.where(forward, rate_integers, powers)
+    divisor    = np.where(forward, powers, rate_integers)
+
+    # a * b overflows a uint64 exactly when a > UINT64_MAX // b (b > 0).
+    safe_multiplier = np.where(ok, multiplier, 1)
+    ok &= amounts <= np.uint64(UINT64_MAX) // safe_multiplier
+
+    with np.errstate(over="ignore"):
+        product = np.where(ok, amounts, 0) * safe_multiplier
+    amounts_out = product // np.where(ok, divisor, 1)
+
+    ok &= amounts_out > 0
+    return np.where(ok, amounts_out, 0).astype(np.uint64), ok
+
+
+def quote_swap(
+    indexer_client: indexer.IndexerClient,
+    app_id        : int,
+    asset_id_from : int,
+    amount_to_swap: int
+) -> int:
+    """
+        Quote a swap against the current state of an application.
+
+        Args:
+            indexer_client (indexer.IndexerClient): indexer client.
+            app_id (int): application index.
+            asset_id_from (int): ASA's ID sent to the application.
+            amount_to_swap (int): amount to swap.
+
+        Returns:
+            (int): if the swap would succeed, return the amount sent back
+            by the application; otherwise, return -1.
+    """
+    app_global_state = get_application_global_state(
+        indexer_client=indexer_client,
+        app_id=app_id
+    )
+
+    if asset_id_from == app_global_state.get("asset-id-from"):
+        forward = True
+    elif asset_id_from == app_global_state.get("asset-id-to"):
+        forward = False
+    else:
+        return -1
+
+    return quote(
+        amount=amount_to_swap,
+        rate_integer=app_global_state.get("R", 0),
+        rate_decimal=app_global_state.get("r", 0),
+        forward=forward
+    )
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,117 @@
+from algosdk.v2client import algod, indexer
+from algosdk.future import transaction
+from algosdk import account, logic
+
+from pyteal_helpers import program
+from pyteal_helpers.funding import FundPlan
+from contracts.rps import contract as rps_contract, run as rps_run
+
+import base64
+import functools
+import threading
+
+from src.contract import compile_programs
+from src.environment import SwapEnvironment
+from src.faucet import Faucet
+
+# Environments built by this process, by algod address. Each worker
+# process builds its own, with freshly generated accounts, so parallel
+# runs never share mutable state apart from the faucet balance.
+_environments      = {}
+_environments_lock = threading.Lock()
+
+
+@functools.cache
+def programs() -> tuple[str, str]:
+    """
+        TEAL sources of the simpleswap approval and clear programs,
+        compiled in process once: build/ holds whichever contract was
+        built last.
+    """
+    approval, clear, _ = compile_programs()
+    return approval, clear
+
+
+def get_swap_environment(
+    algod_client  : algod.AlgodClient,
+    indexer_client: indexer.IndexerClient,
+    faucet        : Faucet
+) -> "SwapEnvironment":
+    """
+        Get the swap environment of this process, building it on first use.
+
+        Args:
+            algod_client (algod.AlgodClient): algod client.
+            indexer_client (indexer.IndexerClient): indexer client.
+            faucet (Faucet): faucet funding the environment's accounts.
+
+        Returns:
+            (SwapEnvironment): session-scoped swap environment.
+    """
+    with _environments_lock:
+        environment = _environments.get(algod_client.algod_address)
+        if environment is None:
+            environment = SwapEnvironment(algod_client, indexer_client, faucet, *programs())
+            _environments[algod_client.algod_address] = environment
+        return environment
+
+
+def deploy_rps(algod_client: algod.AlgodClient, creator_pk: str) -> int:
+    """
+        Deploy the Rock, Paper, Scissors contract (contracts/rps), whose
+        local state and two-transaction groups the shared helpers are
+        also tested against. The programs are compiled on the fly, like
+        the simpleswap ones (see programs).
+
+        Args:
+            algod_client (algod.AlgodClient): algod client.
+            creator_pk (str): creator's private key.
+
+        Returns:
+            (int): application index.
+    """
+    approval, clear = [
+        base64.b64decode(algod_client.compile(program.application(teal))["result"])
+        for teal in (rps_contract.approval(), rps_contract.clear())
+    ]
+    txn_id = algod_client.send_transaction(
+        transaction.ApplicationCreateTxn(
+            sender=account.address_from_private_key(creator_pk),
+            sp=algod_client.suggested_params(),
+            on_complete=transaction.OnComplete.NoOpOC,
+            approval_program=approval,
+            clear_program=clear,
+            global_schema=rps_run.APP_GLOBAL_SCHEMA,
+            local_schema=rps_run.APP_LOCAL_SCHEMA
+        ).sign(creator_pk)
+    )
+    return transaction.wait_for_confirmation(algod_client, txn_id, wait_rounds=2)["application-index"]
+
+
+def new_rps_app(environment: SwapEnvironment, faucet: Faucet) -> int:
+    """
+        Deploy the Rock, Paper, Scissors contract from a new account and
+        fund the minimum balance of the application account, which holds
+        the wagers.
+
+        Args:
+            environment (SwapEnvironment): environment funding the creator.
+            faucet (Faucet): faucet funding the application account.
+
+        Returns:
+            (int): application index.
+    """
+    creator_pk, _ = environment.new_account(
+        amount=FundPlan().create_app(rps_run.APP_GLOBAL_SCHEMA).transactions(1).total
+    )
+    app_id = deploy_rps(environment.algod_client, creator_pk)
+    faucet.dispense(
+        algod_client=environment.algod_client,
+        receiver_addr=logic.get_application_address(app_id),
+        amount=FundPlan().total
+    )
+    return app_id
+
+
+if __name__ == "__main__":
+    pass
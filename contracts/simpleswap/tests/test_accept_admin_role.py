@@ -1,10 +1,10 @@
-from algosdk import account, encoding
+from algosdk import encoding
+
+from pyteal_helpers.funding import FundPlan
 
 from tests.test_base import BaseTestCase
 from src.contract_ops import *
 
-import time
-
 
 class AcceptAdminRoleTestCase(BaseTestCase):
 
@@ -12,37 +12,18 @@ class AcceptAdminRoleTestCase(BaseTestCase):
     def setUpClass(cls) -> None:
         super(AcceptAdminRoleTestCase, cls).setUpClass()
 
-        cls.admin_pk    , cls.admin_addr     = account.generate_account()
-        cls.new_admin_pk, cls.new_admin_addr = account.generate_account()
+        cls.environment = cls.get_swap_environment()
 
-        cls.faucet.dispense(
-            algod_client=cls.algod_client,
-            receiver_addr=cls.admin_addr, 
-            # Total balance required is 416000 microAlgos:
-            # 1) 415000 microAlgos are required to deploy the smart-contract:
-            #   * 100,000 is the minimum standard required balance;
-            #   * 100,000 is the per page creation application fee;
-            #   * (25,000 + 3,500 ) * 4 = 114,000 is the addition per integer entry;
-            #   * (25,000 + 25,000) * 2 =  50,000 is the addition per byte slice entry;
-            #   * 1000 is the transaction fee.
-            # 2) 1000 microAlgos are the fee required to perform the smart-contract call 
-            #    'propose_admin'.
-            amount=416_000
-        )
 
-        cls.faucet.dispense(
-            algod_client=cls.algod_client,
-            receiver_addr=cls.new_admin_addr, 
-            # Total balance required is 101000 microAlgos:
-            # 1) 100,000 microAlgos is the minimum standard required balance;
-            # 2) 1000 microAlgos are the fee required to perform the smart-contract call 
-            #    'accept_admin_role'.
-            amount=101_000
-        )
-
-        cls.app_id = deploy(
-            algod_client=cls.algod_client,
-            creator_pk=cls.admin_pk
+    @classmethod
+    def setUpFixture(cls) -> None:
+        # The administrator's balance covers the deployment and the
+        # smart-contract call 'propose_admin' (see SwapEnvironment.new_app).
+        cls.admin_pk, cls.admin_addr, cls.app_id = cls.environment.new_app()
+
+        cls.new_admin_pk, cls.new_admin_addr = cls.environment.new_account(
+            # The smart-contract call 'accept_admin_role'.
+            amount=FundPlan().transactions(1).total
         )
 
         propose_admin(
@@ -62,7 +43,7 @@ class AcceptAdminRoleTestCase(BaseTestCase):
         self.assertGreater(accept_admin_role_cr, -1)
 
         # Wait for indexer to catch-up newest algod updates.
-        time.sleep(1)
+        self.wait_for_indexer()
 
         app_global_state = get_application_global_state(
             indexer_client=self.indexer_client,
@@ -0,0 +1,132 @@
+import os
+import tempfile
+from unittest import mock
+
+from pyteal_helpers import activity
+from pyteal_helpers.funding import FundPlan
+
+from tests.fixtures import new_rps_app
+from tests.test_base import BaseTestCase
+from src.contract_ops import *
+from src.environment import user_plan
+from src.events import API_PATH
+from contracts.rps import run as rps_run
+
+CHALLENGER_REVEAL = "r-nonce"
+OPPONENT_REVEAL   = "p"
+WAGER             = 123456
+
+
+class ActivityTestCase(BaseTestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super(ActivityTestCase, cls).setUpClass()
+
+        cls.environment = cls.get_swap_environment()
+
+        cls.rps_app_id = new_rps_app(cls.environment, cls.faucet)
+        # The rps operations use the module's algod client.
+        cls.rps_client_patch = mock.patch.object(rps_run, "algod_client", cls.algod_client)
+        cls.rps_client_patch.start()
+
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.rps_client_patch.stop()
+        super(ActivityTestCase, cls).tearDownClass()
+
+
+    @classmethod
+    def setUpFixture(cls) -> None:
+        # The opt-in, the challenge or its acceptance (a call and the
+        # payment of the wager) and the reveal, paying for its two inner
+        # payments.
+        plan = (
+            FundPlan()
+            .opt_in_app(rps_run.APP_LOCAL_SCHEMA)
+            .transactions(3)
+            .transactions(1, fee=3000)
+            .spend(WAGER)
+        )
+        cls.challenger_pk, cls.challenger_addr = cls.environment.new_account(amount=plan.total)
+        cls.opponent_pk, cls.opponent_addr = cls.environment.new_account(amount=plan.total)
+        cls.asa_user_pk, cls.asa_user_addr = cls.environment.new_account(
+            amount=user_plan(swaps=1).total,
+            token_amount=1_000_000
+        )
+
+
+    def setUp(self) -> None:
+        super(ActivityTestCase, self).setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+
+        self.index = activity.ActivityIndex(os.path.join(directory.name, "activity.db"), API_PATH)
+        self.addCleanup(self.index.connection.close)
+        self.index.register(self.rps_app_id, "rps")
+        self.index.register(self.environment.app_id, "simpleswap")
+
+
+    def test_rps_calls(self):
+        for account_pk in (self.challenger_pk, self.opponent_pk):
+            self.assertGreater(rps_run.optin(account_pk, self.rps_app_id), -1)
+        challenge_cr = rps_run.create_challenge(
+            self.challenger_pk, CHALLENGER_REVEAL, self.rps_app_id, self.opponent_addr
+        )
+        accept_cr = rps_run.accept_challenge(
+            self.opponent_pk, OPPONENT_REVEAL, self.rps_app_id, self.challenger_addr
+        )
+        reveal_cr = rps_run.reveal(
+            self.challenger_pk, CHALLENGER_REVEAL, self.rps_app_id, self.opponent_addr
+        )
+        self.assertGreater(reveal_cr, -1)
+
+        self.index.ingest(self.algod_client, stop_round=reveal_cr)
+        self.assertEqual(self.index.last_round, reveal_cr)
+
+        rows = self.index.connection.execute(
+            "SELECT round, sender, operation, opponent, wager, winner FROM rps_calls "
+            "WHERE app_id = ? ORDER BY round, offset",
+            (self.rps_app_id,)
+        ).fetchall()
+        self.assertEqual(rows[-3:], [
+            (challenge_cr, self.challenger_addr, "challenge", self.opponent_addr, WAGER, None),
+            (accept_cr, self.opponent_addr, "accept", self.challenger_addr, WAGER, None),
+            # Paper beats rock: the opponent takes the pot.
+            (reveal_cr, self.challenger_addr, "reveal", self.opponent_addr, WAGER, self.opponent_addr),
+        ])
+        self.assertEqual(
+            [row[2] for row in rows[:-3]],
+            ["optin", "optin"]
+        )
+
+
+    def test_swaps(self):
+        swap_cr = swap(
+            algod_client=self.algod_client,
+            account_pk=self.asa_user_pk,
+            app_id=self.environment.app_id,
+            asset_id_from=self.environment.token_a_id,
+            asset_id_to=self.environment.token_b_id,
+            amount_to_swap=500_000
+        )
+        self.assertGreater(swap_cr, -1)
+
+        # Ingested in two batches, resuming after the last round.
+        self.index.ingest(self.algod_client, stop_round=swap_cr - 1, batch_rounds=7)
+        self.index.ingest(self.algod_client, stop_round=swap_cr)
+
+        rows = self.index.connection.execute(
+            "SELECT round, sender, asset_in, amount_in, asset_out, amount_out FROM swaps "
+            "WHERE sender = ?",
+            (self.asa_user_addr,)
+        ).fetchall()
+        self.assertEqual(rows, [(
+            swap_cr, self.asa_user_addr,
+            self.environment.token_a_id, 500_000, self.environment.token_b_id, 250_000
+        )])
+
+
+if __name__ == "__main__":
+    pass
@@ -1,14 +1,49 @@
 from algosdk.v2client import algod, indexer
+from algosdk import account, mnemonic
 
+import os
+import time
 import unittest
 
+from contracts.rps import run as rps_run
+from pyteal_helpers.cache import read_cache
+from pyteal_helpers.node import LocalNode
 from src.faucet import Faucet
+from tests.fixtures import SwapEnvironment, get_swap_environment
+
+# Run against an in-process stand-in node instead of the sandbox, unless
+# LOCAL_NODE=0 is set.
+USE_LOCAL_NODE = os.environ.get("LOCAL_NODE", "1") != "0"
+
+# Local node shared by the test cases of a process, with the faucet's
+# private key funded at genesis.
+local_node = None
+
+
+def get_local_node() -> tuple[LocalNode, str]:
+    global local_node
+    if local_node is None:
+        faucet_pk, faucet_addr = account.generate_account()
+        local_node = (LocalNode(genesis={faucet_addr: 10 ** 15}).start(), faucet_pk)
+    return local_node
 
 
 class BaseTestCase(unittest.TestCase):
 
+    # Snapshot of the local ledger taken after setUpFixture.
+    snapshot = None
+
     @classmethod
     def setUpClass(cls) -> None:
+        if USE_LOCAL_NODE:
+            node, faucet_pk = get_local_node()
+            cls.algod_client   = node.algod_client()
+            cls.indexer_client = node.indexer_client()
+            cls.faucet = Faucet(
+                passphrase=mnemonic.from_private_key(faucet_pk)
+            )
+            return
+
         # Algod client configuration.
         cls.algod_address = "http://localhost:4001"
         cls.algod_token   = "aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa"
@@ -28,6 +63,56 @@ class BaseTestCase(unittest.TestCase):
             passphrase="<FAUCET_MNEMONIC>"
         )
 
+    @classmethod
+    def tearDownClass(cls) -> None:
+        if cls.snapshot is not None:
+            local_node[0].release(cls.snapshot)
+            cls.snapshot = None
+
+    @classmethod
+    def setUpFixture(cls) -> None:
+        """
+            Build, as class attributes, the state every test of the class
+            starts from. On the local node it runs once: the ledger is
+            snapshotted afterwards and restored after every test, so tests
+            are isolated at no setup cost. On the sandbox it runs before
+            every test.
+        """
+        pass
+
+    def setUp(self) -> None:
+        cls = type(self)
+        if cls.snapshot is None:
+            cls.setUpFixture()
+            if USE_LOCAL_NODE:
+                cls.snapshot = local_node[0].snapshot()
+
+    def tearDown(self) -> None:
+        if self.snapshot is not None:
+            local_node[0].restore(self.snapshot)
+            # Rounds are rewound too: reads cached at later rounds are stale.
+            read_cache.clear()
+            rps_run.local_state_readers.clear()
+
+    @classmethod
+    def get_swap_environment(cls) -> SwapEnvironment:
+        """
+            Get the swap environment shared by the test cases of this
+            process (see tests/fixtures.py).
+        """
+        return get_swap_environment(cls.algod_client, cls.indexer_client, cls.faucet)
+
+    def wait_for_indexer(self, timeout=10.0):
+        """
+            Wait for the indexer to catch-up with the latest algod round.
+        """
+        last_round = self.algod_client.status()["last-round"]
+        deadline = time.monotonic() + timeout
+        while self.indexer_client.health()["round"] < last_round:
+            if time.monotonic() > deadline:
+                self.fail(f"indexer didn't reach round {last_round}")
+            time.sleep(0.1)
+
 
 if __name__ == "__main__":
     pass
\ No newline at end of file
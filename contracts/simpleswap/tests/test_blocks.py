@@ -0,0 +1,272 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import msgpack
+from algosdk import account, encoding, error
+from algosdk.future import transaction
+
+from pyteal_helpers import blocks
+from pyteal_helpers.node import LocalNode
+
+
+def go_string(raw: bytes) -> str:
+    # algod encodes Go strings (state keys, byte values, logs) as msgpack
+    # str holding arbitrary bytes.
+    return raw.decode("utf-8", "surrogateescape")
+
+
+def algod_block(app_id: int, sender: bytes, group: bytes) -> bytes:
+    """
+        Block of an application call grouped with a payment, followed by
+        an ungrouped payment, as encoded by algod (canonical msgpack:
+        sorted keys, empty fields omitted, "gen"/"gh" moved out of the
+        transactions).
+    """
+    call = {
+        "dt": {
+            "gd": {
+                go_string(b"counter"): {"at": 2, "ui": 5},
+                go_string(b"\xff\x00key"): {"at": 1, "bs": go_string(b"\x01\xfe")},
+            },
+            "itx": [{
+                "dt" : {"lg": [go_string(b"inner")]},
+                "txn": {"amt": 7, "fv": 9, "lv": 1009, "rcv": sender, "snd": sender, "type": "pay"},
+            }],
+            "ld": {0: {go_string(b"wager"): {"at": 2, "ui": 123456}}},
+            "lg": [go_string(b"plain"), go_string(b"\x80\xff")],
+        },
+        "hgi": True,
+        "sig": bytes(64),
+        "txn": {
+            "apaa": [b"\x00\x01", b"arg"],
+            "apap": b"\x06\x81\x01",
+            "apat": [sender],
+            "apid": app_id,
+            "fee" : 1000,
+            "fv"  : 9,
+            "grp" : group,
+            "lv"  : 1009,
+            "note": b"\xff" * 8,
+            "snd" : sender,
+            "type": "appl",
+        },
+    }
+    payment = {
+        "hgi": True,
+        "sig": bytes(64),
+        "txn": {"amt": 1, "fee": 1000, "fv": 9, "grp": group, "lv": 1009, "rcv": sender, "snd": sender, "type": "pay"},
+    }
+    other = {
+        "hgi": True,
+        "sig": bytes(64),
+        "txn": {"amt": 2, "fee": 1000, "fv": 9, "lv": 1009, "rcv": sender, "snd": sender, "type": "pay"},
+    }
+    block = {
+        "block": {
+            "earn": 0,
+            "fees": sender,
+            "gen" : "sandnet-v1",
+            "gh"  : bytes(32),
+            "prev": "blk-" + "A" * 52,
+            "rnd" : 10,
+            "rwd" : sender,
+            "seed": bytes(32),
+            "tc"  : 12,
+            "ts"  : 1_700_000_000,
+            "txn" : bytes(32),
+            "txns": [call, payment, other],
+        },
+        "cert": {"prop": {"dig": bytes(32), "oprop": sender}, "rnd": 10, "step": 2, "vote": []},
+    }
+    return msgpack.Packer(use_bin_type=True, unicode_errors="surrogateescape").pack(block)
+
+
+class PrunedClient:
+    """
+        Algod client in front of the local node that no longer serves
+        the blocks before first_round, as a non-archival node.
+    """
+
+    def __init__(self, algod_client, first_round: int):
+        self.algod_client = algod_client
+        self.first_round  = first_round
+        self.waits        = 0
+
+    def block_info(self, round, **kwargs):
+        if round < self.first_round:
+            raise error.AlgodHTTPError(f"round {round} not available", 404)
+        return self.algod_client.block_info(round, **kwargs)
+
+    def status_after_block(self, block_num):
+        self.waits += 1
+        return self.algod_client.status_after_block(block_num)
+
+    def __getattr__(self, name):
+        return getattr(self.algod_client, name)
+
+
+class BlockFollowerTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.faucet_pk, cls.faucet_addr = account.generate_account()
+        cls.node = LocalNode(genesis={cls.faucet_addr: 10 ** 12}).start()
+        cls.algod_client = cls.node.algod_client()
+        cls.snapshot = cls.node.snapshot()
+
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.node.stop()
+
+
+    def tearDown(self) -> None:
+        # Every test starts from the genesis round.
+        self.node.restore(self.snapshot)
+
+
+    def pay(self, amount: int) -> int:
+        signed_txn = transaction.PaymentTxn(
+            sender=self.faucet_addr,
+            sp=self.algod_client.suggested_params(),
+            receiver=self.faucet_addr,
+            amt=amount
+        ).sign(self.faucet_pk)
+        txid = self.algod_client.send_transaction(signed_txn)
+        return transaction.wait_for_confirmation(self.algod_client, txid, 1)["confirmed-round"]
+
+
+    def amounts(self, follower) -> list[tuple[int, list[int]]]:
+        return [
+            (round, [txn.get("amt", 0) for _, txn, _ in blocks.iter_transactions(block)])
+            for round, block in follower.blocks()
+        ]
+
+
+    def test_blocks(self):
+        for amount in (1, 2, 3):
+            self.pay(amount)
+
+        follower = blocks.BlockFollower(self.algod_client, start_round=2, stop_round=3)
+        self.assertEqual(self.amounts(follower), [(2, [2]), (3, [3])])
+
+
+    def test_wait(self):
+        # The follower waits for the rounds the ledger hasn't reached.
+        follower = blocks.BlockFollower(self.algod_client, stop_round=2)
+        payer = threading.Thread(target=lambda: [self.pay(amount) for amount in (1, 2)])
+        payer.start()
+        self.assertEqual(self.amounts(follower), [(1, [1]), (2, [2])])
+        payer.join()
+
+
+    def test_checkpoint(self):
+        for amount in (1, 2, 3):
+            self.pay(amount)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "checkpoint.json")
+            follower = blocks.BlockFollower(self.algod_client, checkpoint_path=path, stop_round=3)
+            for round, _ in follower.blocks():
+                if round == 2:
+                    break
+
+            # Round 2 was handed out but not passed: it is delivered again.
+            self.assertEqual(blocks.Checkpoint(path).load(1), 2)
+            self.assertEqual(self.amounts(follower), [(2, [2]), (3, [3])])
+            self.assertEqual(blocks.Checkpoint(path).load(1), 4)
+
+
+    def test_pruned(self):
+        for amount in (1, 2):
+            self.pay(amount)
+
+        # A round the ledger already passed isn't waited for.
+        algod_client = PrunedClient(self.algod_client, first_round=2)
+        follower = blocks.BlockFollower(algod_client, stop_round=2)
+        with self.assertRaises(error.AlgodHTTPError):
+            list(follower.blocks())
+        self.assertEqual(algod_client.waits, 0)
+
+
+class DecodeBlockTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        _, address = account.generate_account()
+        cls.sender = encoding.decode_address(address)
+        cls.group  = bytes(range(32))
+        cls.data   = algod_block(42, cls.sender, cls.group)
+
+
+    def test_decode_block(self):
+        block = blocks.decode_block(self.data)
+
+        self.assertEqual((block["rnd"], block["ts"]), (10, 1_700_000_000))
+        self.assertEqual(len(block["txns"]), 3)
+
+        call = block["txns"][0]
+        # Signatures and the "has genesis id" flag are skipped.
+        self.assertEqual(set(call), {"txn", "dt"})
+        self.assertEqual(call["txn"], {
+            "apaa": [b"\x00\x01", b"arg"],
+            "apat": [self.sender],
+            "apid": 42,
+            "fee" : 1000,
+            "grp" : self.group,
+            "snd" : self.sender,
+            "type": "appl",
+        })
+
+        # State keys, byte values and logs are bytes, whether they are
+        # valid UTF-8 or not.
+        eval_delta = call["dt"]
+        self.assertEqual(eval_delta["gd"], {
+            b"counter": {"at": 2, "ui": 5},
+            b"\xff\x00key": {"at": 1, "bs": b"\x01\xfe"},
+        })
+        self.assertEqual(eval_delta["ld"], {0: {b"wager": {"at": 2, "ui": 123456}}})
+        self.assertEqual(eval_delta["lg"], [b"plain", b"\x80\xff"])
+        self.assertEqual(eval_delta["itx"], [{
+            "txn": {"amt": 7, "rcv": self.sender, "snd": self.sender, "type": "pay"},
+            "dt" : {"lg": [b"inner"]},
+        }])
+        self.assertEqual(
+            blocks.inner_transactions(call),
+            [{"amt": 7, "rcv": self.sender, "snd": self.sender, "type": "pay"}]
+        )
+
+
+    def test_decode_block_app_ids(self):
+        # The payment grouped with the call is kept, the other one is
+        # replaced by None, keeping the offsets.
+        block = blocks.decode_block(self.data, app_ids={42})
+        self.assertEqual([offset for offset, _, _ in blocks.iter_transactions(block)], [0, 1])
+        self.assertIsNone(block["txns"][2])
+
+        block = blocks.decode_block(self.data, app_ids={43})
+        self.assertEqual(block["txns"], [None, None, None])
+
+
+class GroupTransactionTestCase(unittest.TestCase):
+
+    def test_group_transaction(self):
+        txns = {
+            0: {"type": "axfer", "grp": b"a"},
+            1: {"type": "appl", "grp": b"a"},
+            2: {"type": "appl", "grp": b"b"},
+            3: {"type": "appl"},
+        }
+
+        self.assertEqual(blocks.group_transaction(txns, 0, txns[1]), txns[0])
+        # Neighbours from another group, or around ungrouped transactions.
+        self.assertEqual(blocks.group_transaction(txns, 1, txns[2]), {})
+        self.assertEqual(blocks.group_transaction(txns, 2, txns[3]), {})
+        self.assertEqual(blocks.group_transaction(txns, 4, txns[3]), {})
+        self.assertEqual(blocks.group_transaction(txns, -1, txns[0]), {})
+
+
+if __name__ == "__main__":
+    pass
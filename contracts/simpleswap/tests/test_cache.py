@@ -0,0 +1,160 @@
+import unittest
+from unittest import mock
+
+from pyteal_helpers import cache
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Source:
+    """
+        Responses reporting the round they were read at, counting the
+        reads.
+    """
+
+    def __init__(self, round: int = 1):
+        self.round  = round
+        self.reads  = 0
+        self.checks = 0
+
+    def fetch(self, value="value"):
+        self.reads += 1
+        return {"round": self.round, "value": value}
+
+    def current_round(self):
+        self.checks += 1
+        return self.round
+
+
+class RoundCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clock = Clock()
+        patcher = mock.patch.object(cache.time, "monotonic", self.clock)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.cache  = cache.RoundCache(max_age=1.0)
+        self.source = Source()
+
+
+    def get(self, key="key", **kwargs):
+        return self.cache.get(
+            key,
+            lambda: self.source.fetch(key),
+            round_of=lambda response: response["round"],
+            **kwargs
+        )
+
+
+    def test_hit_miss(self):
+        self.assertEqual(self.get()["value"], "key")
+        self.assertEqual(self.get()["value"], "key")
+        self.get("other")
+
+        self.assertEqual(self.source.reads, 2)
+        self.assertEqual(self.cache.stats(), {
+            "hits": 1, "misses": 2, "entries": 2, "permanent": 0, "round": 1
+        })
+
+
+    def test_copies(self):
+        # Modifying a value doesn't affect the cached one.
+        self.get()["value"] = "changed"
+        self.assertEqual(self.get()["value"], "key")
+
+        params = self.cache.get("params", lambda: {"decimals": 6}, permanent=True)
+        params["decimals"] = 0
+        self.assertEqual(self.cache.get("params", lambda: {}, permanent=True), {"decimals": 6})
+
+
+    def test_fetch_error(self):
+        def fetch():
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            self.cache.get("key", fetch)
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+
+    def test_advance(self):
+        self.get()
+        self.cache.advance(1)
+        self.get()
+        self.assertEqual(self.source.reads, 1)
+
+        # The ledger moved past the round of the entry.
+        self.cache.advance(2)
+        self.source.round = 2
+        self.get()
+        self.assertEqual(self.source.reads, 2)
+
+
+    def test_response_round(self):
+        self.get()
+        # A response from a later round invalidates the older entries.
+        self.source.round = 2
+        self.get("other")
+        self.get()
+        self.assertEqual(self.source.reads, 3)
+
+        # A response older than the known round is returned, not cached.
+        self.source.round = 1
+        self.get("late")
+        self.get("late")
+        self.assertEqual(self.source.reads, 5)
+        self.assertEqual(self.cache.round, 2)
+
+
+    def test_permanent(self):
+        fetches = []
+        for _ in range(2):
+            self.cache.get("params", lambda: fetches.append(1) or "params", permanent=True)
+            self.cache.advance(self.cache.round + 1)
+            self.clock.now += 10
+        self.assertEqual(len(fetches), 1)
+
+        self.cache.clear()
+        self.cache.get("params", lambda: fetches.append(1) or "params", permanent=True)
+        self.assertEqual(len(fetches), 2)
+
+
+    def test_max_age(self):
+        self.get()
+        self.get("other")
+        self.clock.now += 1.0
+
+        # Stale entries are revalidated by one round check for all of
+        # them while the round doesn't change.
+        self.get(current_round=self.source.current_round)
+        self.get("other", current_round=self.source.current_round)
+        self.assertEqual(self.source.checks, 1)
+        self.assertEqual(self.source.reads, 2)
+
+        # Another client moved the ledger: the next check invalidates.
+        self.clock.now += 1.0
+        self.source.round = 2
+        self.assertEqual(self.get(current_round=self.source.current_round)["round"], 2)
+        self.assertEqual(self.source.checks, 2)
+        self.assertEqual(self.source.reads, 3)
+
+
+    def test_max_age_without_round(self):
+        # Without a way to check the round, stale entries are read again.
+        self.get()
+        self.clock.now += 0.5
+        self.get()
+        self.clock.now += 0.5
+        self.get()
+        self.assertEqual(self.source.reads, 2)
+
+
+if __name__ == "__main__":
+    pass
@@ -1,9 +1,8 @@
-from algosdk import account, encoding
+from algosdk import encoding
 
 from tests.test_base import BaseTestCase
 from src.contract_ops import *
-
-import time 
+from src.environment import deployer_plan
 
 
 class DeployTestCase(BaseTestCase):
@@ -12,30 +11,27 @@ class DeployTestCase(BaseTestCase):
     def setUpClass(cls) -> None:
         super(DeployTestCase, cls).setUpClass()
 
-        cls.creator_pk, cls.creator_addr = account.generate_account()
-
-        cls.faucet.dispense(
-            algod_client=cls.algod_client,
-            receiver_addr=cls.creator_addr,
-            # Total balance required is 415000 microAlgos:
-            # * 100,000 is the minimum standard required balance;
-            # * 100,000 is the per page creation application fee;
-            # * (25,000 + 3,500 ) * 4 = 114,000 is the addition per integer entry;
-            # * (25,000 + 25,000) * 2 =  50,000 is the addition per byte slice entry;
-            # * 1000 is the transaction fee.
-            amount=415_000
+        cls.environment = cls.get_swap_environment()
+
+
+    @classmethod
+    def setUpFixture(cls) -> None:
+        cls.creator_pk, cls.creator_addr = cls.environment.new_account(
+            amount=deployer_plan().total
         )
 
 
     def test_deploy(self):
         app_id = deploy(
             algod_client=self.algod_client,
-            creator_pk=self.creator_pk
+            creator_pk=self.creator_pk,
+            approval=self.environment.approval,
+            clear=self.environment.clear
         )
         self.assertGreater(app_id, -1)
 
         # Wait for indexer to catch-up newest algod updates.
-        time.sleep(1)
+        self.wait_for_indexer()
 
         app_global_state = get_application_global_state(
             indexer_client=self.indexer_client,
@@ -0,0 +1,132 @@
+from pyteal_helpers import ledger
+from pyteal_helpers.dryrun import DryrunClient, dryrun
+
+from tests.test_base import BaseTestCase, USE_LOCAL_NODE
+from src.contract_ops import *
+from src.environment import user_plan
+
+
+class DryrunTestCase(BaseTestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super(DryrunTestCase, cls).setUpClass()
+
+        cls.environment = cls.get_swap_environment()
+
+        cls.app_id     = cls.environment.app_id
+        cls.token_a_id = cls.environment.token_a_id
+        cls.token_b_id = cls.environment.token_b_id
+
+        cls.approval = cls.environment.approval
+
+
+    @classmethod
+    def setUpFixture(cls) -> None:
+        cls.asa_user_pk, cls.asa_user_addr = cls.environment.new_account(
+            amount=user_plan(swaps=1).total,
+            token_amount=1_000_000
+        )
+
+
+    def swap(self, algod_client, amount_to_swap):
+        return swap(
+            algod_client=algod_client,
+            account_pk=self.asa_user_pk,
+            app_id=self.app_id,
+            asset_id_from=self.token_a_id,
+            asset_id_to=self.token_b_id,
+            amount_to_swap=amount_to_swap
+        )
+
+
+    def test_compile(self):
+        result = self.algod_client.compile(self.approval, source_map=True)
+        program = base64.b64decode(result["result"])
+        self.assertEqual(result["hash"], logic.address(program))
+
+        if USE_LOCAL_NODE:
+            # The local node returns tagged source, never bytecode.
+            self.assertTrue(program.startswith(ledger.SOURCE_PROGRAM_PREFIX))
+            self.assertEqual(ledger.decompile_teal(program), self.approval)
+            with self.assertRaises(ledger.LedgerError):
+                ledger.decompile_teal(self.approval.encode())
+        else:
+            self.assertFalse(program.startswith(ledger.SOURCE_PROGRAM_PREFIX))
+
+
+    def test_dryrun_swap(self):
+        last_round = self.algod_client.status()["last-round"]
+
+        report = dryrun(
+            swap,
+            self.algod_client,
+            sources=[self.approval],
+            account_pk=self.asa_user_pk,
+            app_id=self.app_id,
+            asset_id_from=self.token_a_id,
+            asset_id_to=self.token_b_id,
+            amount_to_swap=500_000
+        )
+        self.assertTrue(report.passed)
+        self.assertEqual(len(report.calls), 1)
+
+        call = report.calls[0]
+        self.assertGreater(call.cost, 0)
+        self.assertLessEqual(call.cost, call.budget_added)
+        # The amount of token B owed is computed in scratch space.
+        self.assertIn(250_000, call.scratch.values())
+
+        # Nothing was sent.
+        self.assertEqual(self.algod_client.status()["last-round"], last_round)
+
+
+    def test_dryrun_swap_failure(self):
+        report = dryrun(
+            swap,
+            self.algod_client,
+            sources=[self.approval],
+            account_pk=self.asa_user_pk,
+            app_id=self.app_id,
+            asset_id_from=self.token_a_id,
+            asset_id_to=self.token_b_id,
+            amount_to_swap=0
+        )
+        self.assertFalse(report.passed)
+
+        failure = report.calls[0].failure
+        self.assertIsNotNone(failure)
+        self.assertEqual(failure.source, "assert")
+        self.assertEqual(self.approval.splitlines()[failure.line - 1].strip(), "assert")
+
+
+    def test_dryrun_set_rate_state_delta(self):
+        admin_pk, _, app_id = self.environment.new_app()
+
+        report = dryrun(
+            set_rate,
+            self.algod_client,
+            admin_pk=admin_pk,
+            app_id=app_id,
+            new_rate_integer=7,
+            new_rate_decimal=2
+        )
+        self.assertTrue(report.passed)
+        self.assertEqual(report.calls[0].global_delta, {b"R": 7, b"r": 2})
+
+
+    def test_dryrun_client_submits(self):
+        client = DryrunClient(self.algod_client, sources=[self.approval])
+
+        swap_cr = self.swap(client, 500_000)
+        self.assertGreater(swap_cr, -1)
+        self.assertTrue(client.reports[-1].passed)
+
+        # Rejected by the dryrun, so never sent.
+        swap_cr = self.swap(client, 0)
+        self.assertEqual(swap_cr, -1)
+        self.assertFalse(client.reports[-1].passed)
+
+
+if __name__ == "__main__":
+    pass
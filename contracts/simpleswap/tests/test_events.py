@@ -0,0 +1,86 @@
+from algosdk import encoding
+
+from tests.test_base import BaseTestCase
+from src.contract_ops import *
+from src.environment import user_plan
+from src import events
+
+
+class EventsTestCase(BaseTestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super(EventsTestCase, cls).setUpClass()
+
+        cls.environment = cls.get_swap_environment()
+
+        cls.app_id     = cls.environment.app_id
+        cls.token_a_id = cls.environment.token_a_id
+        cls.token_b_id = cls.environment.token_b_id
+        cls.selector   = events.get_swap_selector()
+
+
+    @classmethod
+    def setUpFixture(cls) -> None:
+        cls.asa_user_pk, cls.asa_user_addr = cls.environment.new_account(
+            amount=user_plan(swaps=2).total,
+            token_amount=1_000_000
+        )
+
+
+    def swap(self, asset_id_from, asset_id_to):
+        swap_cr = swap(
+            algod_client=self.algod_client,
+            account_pk=self.asa_user_pk,
+            app_id=self.app_id,
+            asset_id_from=asset_id_from,
+            asset_id_to=asset_id_to,
+            amount_to_swap=500_000
+        )
+        self.assertGreater(swap_cr, -1)
+        return swap_cr
+
+
+    def test_follow_swaps(self):
+        start_round = self.swap(self.token_a_id, self.token_b_id)
+        stop_round  = self.swap(self.token_b_id, self.token_a_id)
+
+        swaps = list(events.follow_swaps(
+            self.algod_client, self.app_id, start_round=start_round, stop_round=stop_round
+        ))
+
+        self.assertEqual(
+            [
+                (swap_event.round, swap_event.sender, swap_event.asset_in,
+                 swap_event.amount_in, swap_event.asset_out, swap_event.amount_out)
+                for swap_event in swaps
+            ],
+            [
+                (start_round, self.asa_user_addr, self.token_a_id, 500_000, self.token_b_id, 250_000),
+                (stop_round, self.asa_user_addr, self.token_b_id, 500_000, self.token_a_id, 1_000_000),
+            ]
+        )
+
+
+    def test_other_group(self):
+        sender = encoding.decode_address(self.asa_user_addr)
+        transfer = {"type": "axfer", "snd": sender, "xaid": self.token_a_id, "aamt": 10}
+        call = {"type": "appl", "snd": sender, "apid": self.app_id, "apaa": [self.selector]}
+        apply_data = {"dt": {"itx": [{"txn": {"type": "axfer", "xaid": self.token_b_id, "aamt": 5}}]}}
+
+        def block(*txns):
+            return {"rnd": 1, "ts": 0, "txns": [dict(apply_data, txn=txn) for txn in txns]}
+
+        self.assertEqual(
+            len(events.decode_swaps(block(dict(transfer, grp=b"a"), dict(call, grp=b"a")), 1, self.app_id, self.selector)),
+            1
+        )
+        # The transfer right before the call belongs to another group.
+        self.assertEqual(
+            events.decode_swaps(block(dict(transfer, grp=b"a"), dict(call, grp=b"b")), 1, self.app_id, self.selector),
+            []
+        )
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,139 @@
+import os
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+from tests.test_base import BaseTestCase
+from src.contract_ops import *
+from src.environment import user_plan
+from src import export
+
+
+class ExportTestCase(BaseTestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super(ExportTestCase, cls).setUpClass()
+
+        cls.environment = cls.get_swap_environment()
+
+        cls.app_id     = cls.environment.app_id
+        cls.token_a_id = cls.environment.token_a_id
+        cls.token_b_id = cls.environment.token_b_id
+
+
+    @classmethod
+    def setUpFixture(cls) -> None:
+        cls.asa_user_pk, cls.asa_user_addr = cls.environment.new_account(
+            amount=user_plan(swaps=3).total,
+            token_amount=1_000_000
+        )
+
+
+    def setUp(self) -> None:
+        super(ExportTestCase, self).setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+
+    def swap(self, asset_id_from, asset_id_to, amount_to_swap=500_000):
+        swap_cr = swap(
+            algod_client=self.algod_client,
+            account_pk=self.asa_user_pk,
+            app_id=self.app_id,
+            asset_id_from=asset_id_from,
+            asset_id_to=asset_id_to,
+            amount_to_swap=amount_to_swap
+        )
+        self.assertGreater(swap_cr, -1)
+        return swap_cr
+
+
+    def test_export_swaps(self):
+        first_round = self.swap(self.token_a_id, self.token_b_id)
+        last_round  = self.swap(self.token_b_id, self.token_a_id)
+
+        rows = export.export_swaps(
+            self.algod_client, self.app_id, self.directory,
+            stop_round=last_round, start_round=first_round, batch_size=1
+        )
+        self.assertEqual(rows, 2)
+
+        swaps = export.load_swaps(self.directory)
+        self.assertEqual(set(swaps), set(export.COLUMNS))
+        self.assertEqual(swaps["round"].tolist(), [first_round, last_round])
+        self.assertEqual(swaps["sender"].shape, (2, 32))
+        self.assertEqual(
+            [export.sender_address(sender) for sender in swaps["sender"]],
+            [self.asa_user_addr, self.asa_user_addr]
+        )
+        self.assertEqual(swaps["asset_in"].tolist(), [self.token_a_id, self.token_b_id])
+        self.assertEqual(swaps["amount_in"].tolist(), [500_000, 500_000])
+        self.assertEqual(swaps["asset_out"].tolist(), [self.token_b_id, self.token_a_id])
+        self.assertEqual(swaps["amount_out"].tolist(), [250_000, 1_000_000])
+        np.testing.assert_allclose(swaps["rate"], [0.5, 2.0])
+
+
+    def test_incremental_export(self):
+        first_round = self.swap(self.token_a_id, self.token_b_id)
+        self.assertEqual(
+            export.export_swaps(self.algod_client, self.app_id, self.directory, first_round, first_round),
+            1
+        )
+
+        # Later calls continue after the last exported round.
+        last_round = self.swap(self.token_a_id, self.token_b_id, amount_to_swap=200_000)
+        for _ in range(2):
+            self.assertEqual(
+                export.export_swaps(self.algod_client, self.app_id, self.directory, last_round),
+                2
+            )
+        swaps = export.load_swaps(self.directory)
+        self.assertEqual(swaps["round"].tolist(), [first_round, last_round])
+        self.assertEqual(swaps["amount_out"].tolist(), [250_000, 100_000])
+
+        with self.assertRaises(ValueError):
+            export.export_swaps(self.algod_client, self.app_id + 1, self.directory, last_round)
+
+
+class NpyHeaderTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "column.npy")
+
+
+    def test_append(self):
+        # The row count grows by a digit: the header keeps its size.
+        rows = np.arange(10 * 32, dtype="u1").reshape(10, 32)
+        export._append_npy(self.path, rows[:9], 0)
+        export._append_npy(self.path, rows[9:], 9)
+
+        with open(self.path, "rb") as f:
+            np.lib.format.read_magic(f)
+            np.lib.format.read_array_header_1_0(f)
+            self.assertEqual(f.tell(), export.NPY_HEADER_SIZE)
+        np.testing.assert_array_equal(np.load(self.path), rows)
+        np.testing.assert_array_equal(np.load(self.path, mmap_mode="r"), rows)
+
+
+    def test_header_errors(self):
+        # A header that doesn't fit.
+        dtype = np.dtype([(f"field_{i}", "<u8") for i in range(8)])
+        with self.assertRaises(ValueError):
+            export._append_npy(self.path, np.zeros(1, dtype=dtype), 0)
+
+        # A file whose header has another size.
+        header = repr({"descr": "<u8", "fortran_order": False, "shape": (0,)}).encode()
+        with open(self.path, "wb") as f:
+            f.write(np.lib.format.magic(1, 0) + struct.pack("<H", 54) + header.ljust(53) + b"\n")
+        with self.assertRaises(ValueError):
+            export._append_npy(self.path, np.zeros(1, dtype="<u8"), 0)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,130 @@
+from algosdk.future import transaction
+
+from pyteal_helpers import fees
+
+from tests.test_base import BaseTestCase
+from src.contract_ops import *
+from src.environment import app_funding, deployer_plan
+
+import threading
+
+
+class FeesTestCase(BaseTestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super(FeesTestCase, cls).setUpClass()
+
+        cls.environment = cls.get_swap_environment()
+
+        cls.token_a_id = cls.environment.token_a_id
+        cls.token_b_id = cls.environment.token_b_id
+
+
+    @classmethod
+    def setUpFixture(cls) -> None:
+        cls.admin_pk, _, cls.app_id = cls.environment.new_app(
+            admin_amount=deployer_plan(optin_assets=True).total
+        )
+        cls.faucet.dispense(
+            algod_client=cls.algod_client,
+            receiver_addr=logic.get_application_address(cls.app_id),
+            amount=app_funding()
+        )
+
+
+    def test_params(self):
+        planner = fees.FeePlanner({"swap": 1})
+        suggested_parameters = transaction.SuggestedParams(
+            fee=0, first=1, last=1001, gh="", min_fee=2000
+        )
+
+        self.assertEqual(planner.params(suggested_parameters).fee, 2000)
+        self.assertEqual(planner.params(suggested_parameters, "swap").fee, 4000)
+        self.assertTrue(planner.params(suggested_parameters, "swap").flat_fee)
+        # The suggested parameters are left untouched.
+        self.assertFalse(suggested_parameters.flat_fee)
+
+        self.assertEqual(planner.group_fee([None, "swap"]), 3000)
+        self.assertEqual(planner.group_fee([None, "unknown"]), 2000)
+
+
+    def test_measure(self):
+        declared = fee_planner.inner_txns("optin_assets")
+        try:
+            inner_txns = fee_planner.measure(
+                "optin_assets",
+                optin_assets,
+                self.algod_client,
+                admin_pk=self.admin_pk,
+                app_id=self.app_id,
+                asset_id_from=self.token_a_id,
+                asset_id_to=self.token_b_id
+            )
+        finally:
+            fee_planner.declare("optin_assets", declared)
+
+        self.assertEqual(inner_txns, 2)
+        # The dryrun sent nothing.
+        app_info = self.algod_client.account_info(logic.get_application_address(self.app_id))
+        self.assertEqual(app_info["assets"], [])
+
+
+    def test_measure_shared(self):
+        # While the count is measured, other threads plan with the
+        # declared one; the measured count replaces it at the end.
+        seen = []
+
+        def operation(*args, **kwargs):
+            reader = threading.Thread(
+                target=lambda: seen.append(fee_planner.inner_txns("optin_assets"))
+            )
+            reader.start()
+            reader.join()
+            return optin_assets(*args, **kwargs)
+
+        declared = fee_planner.inner_txns("optin_assets")
+        fee_planner.declare("optin_assets", 5)
+        try:
+            inner_txns = fee_planner.measure(
+                "optin_assets",
+                operation,
+                self.algod_client,
+                admin_pk=self.admin_pk,
+                app_id=self.app_id,
+                asset_id_from=self.token_a_id,
+                asset_id_to=self.token_b_id
+            )
+            self.assertEqual(fee_planner.inner_txns("optin_assets"), 2)
+        finally:
+            fee_planner.declare("optin_assets", declared)
+
+        self.assertEqual(inner_txns, 2)
+        self.assertGreater(len(seen), 1)
+        self.assertEqual(set(seen), {5})
+
+
+    def test_planned_optin_assets(self):
+        admin_addr = account.address_from_private_key(self.admin_pk)
+        balance = self.algod_client.account_info(admin_addr)["amount"]
+
+        optin_assets_cr = optin_assets(
+            algod_client=self.algod_client,
+            admin_pk=self.admin_pk,
+            app_id=self.app_id,
+            asset_id_from=self.token_a_id,
+            asset_id_to=self.token_b_id
+        )
+        self.assertGreater(optin_assets_cr, -1)
+
+        # 200000 microAlgos sent to the application, plus one fee for the
+        # payment, one for the call and one for each of its two inner
+        # transactions.
+        self.assertEqual(
+            balance - self.algod_client.account_info(admin_addr)["amount"],
+            204_000
+        )
+
+
+if __name__ == "__main__":
+    pass
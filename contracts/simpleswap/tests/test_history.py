@@ -0,0 +1,203 @@
+import hashlib
+import os
+import tempfile
+from unittest import mock
+
+from pyteal_helpers import history, state
+from pyteal_helpers.funding import FundPlan
+
+from tests.fixtures import new_rps_app
+from tests.test_base import BaseTestCase
+from src.contract_ops import *
+from contracts.rps import run as rps_run
+
+CHALLENGER_REVEAL = "r-nonce"
+OPPONENT_REVEAL   = "p"
+WAGER             = 123456
+
+
+class HistoryTestCase(BaseTestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super(HistoryTestCase, cls).setUpClass()
+
+        cls.environment = cls.get_swap_environment()
+
+        cls.rps_app_id = new_rps_app(cls.environment, cls.faucet)
+        # The rps operations use the module's algod client.
+        cls.rps_client_patch = mock.patch.object(rps_run, "algod_client", cls.algod_client)
+        cls.rps_client_patch.start()
+
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.rps_client_patch.stop()
+        super(HistoryTestCase, cls).tearDownClass()
+
+
+    @classmethod
+    def setUpFixture(cls) -> None:
+        # The opt-in, the challenge or its acceptance (a call and the
+        # payment of the wager) and the reveal, paying for its two inner
+        # payments.
+        plan = (
+            FundPlan()
+            .opt_in_app(rps_run.APP_LOCAL_SCHEMA)
+            .transactions(3)
+            .transactions(1, fee=3000)
+            .spend(WAGER)
+        )
+        cls.challenger_pk, cls.challenger_addr = cls.environment.new_account(amount=plan.total)
+        cls.opponent_pk, cls.opponent_addr = cls.environment.new_account(amount=plan.total)
+
+
+    def setUp(self) -> None:
+        super(HistoryTestCase, self).setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+
+    def play(self) -> dict[str, int]:
+        # Confirmation round of every step of a game.
+        rounds = {}
+        rounds["optin"] = rps_run.optin(self.challenger_pk, self.rps_app_id)
+        rounds["optin-opponent"] = rps_run.optin(self.opponent_pk, self.rps_app_id)
+        rounds["challenge"] = rps_run.create_challenge(
+            self.challenger_pk, CHALLENGER_REVEAL, self.rps_app_id, self.opponent_addr
+        )
+        rounds["accept"] = rps_run.accept_challenge(
+            self.opponent_pk, OPPONENT_REVEAL, self.rps_app_id, self.challenger_addr
+        )
+        rounds["reveal"] = rps_run.reveal(
+            self.challenger_pk, CHALLENGER_REVEAL, self.rps_app_id, self.opponent_addr
+        )
+        for operation, round in rounds.items():
+            self.assertGreater(round, -1, operation)
+        return rounds
+
+
+    def local_states(self, state_history: history.StateHistory, round: int) -> dict:
+        local_states = state_history.state_at(round)["local"]
+        return {
+            address: local_states.get(address)
+            for address in (self.challenger_addr, self.opponent_addr)
+        }
+
+
+    def test_local_state(self):
+        rounds = self.play()
+        state_history = history.StateHistory(
+            self.directory, self.rps_app_id, snapshot_interval=2, schema=rps_run.LOCAL_STATE_SCHEMA
+        )
+        state_history.ingest(self.algod_client, rounds["reveal"])
+        self.assertEqual(state_history.last_round, rounds["reveal"])
+
+        empty = {"opponent": "", "wager": 0, "commitment": b"", "reveal": b""}
+        self.assertEqual(
+            self.local_states(state_history, rounds["optin"] - 1),
+            {self.challenger_addr: None, self.opponent_addr: None}
+        )
+        self.assertEqual(
+            self.local_states(state_history, rounds["optin"]),
+            {self.challenger_addr: empty, self.opponent_addr: None}
+        )
+        self.assertEqual(
+            self.local_states(state_history, rounds["challenge"]),
+            {
+                self.challenger_addr: dict(
+                    empty,
+                    opponent=self.opponent_addr,
+                    wager=WAGER,
+                    commitment=hashlib.sha256(CHALLENGER_REVEAL.encode()).digest()
+                ),
+                self.opponent_addr: empty,
+            }
+        )
+        self.assertEqual(
+            self.local_states(state_history, rounds["accept"])[self.opponent_addr],
+            dict(empty, opponent=self.challenger_addr, wager=WAGER, reveal=OPPONENT_REVEAL.encode())
+        )
+
+        # The reveal resets both players: same state as the ledger's.
+        reader = state.LocalStateReader(self.algod_client, self.rps_app_id, rps_run.LOCAL_STATE_SCHEMA)
+        self.assertEqual(
+            self.local_states(state_history, rounds["reveal"]),
+            {address: reader.read(address) for address in (self.challenger_addr, self.opponent_addr)}
+        )
+        self.assertEqual(self.local_states(state_history, rounds["reveal"])[self.opponent_addr], empty)
+
+        with self.assertRaises(ValueError):
+            state_history.state_at(rounds["reveal"] + 1)
+
+
+    def test_reopen(self):
+        rounds = self.play()
+        state_history = history.StateHistory(self.directory, self.rps_app_id, snapshot_interval=2)
+        state_history.ingest(self.algod_client, rounds["accept"])
+        self.assertTrue(os.listdir(os.path.join(self.directory, "snapshots")))
+
+        # A reopened history resumes after the last ingested round, and
+        # rebuilds any round from its snapshots and deltas.
+        reopened = history.StateHistory(self.directory, self.rps_app_id, snapshot_interval=2)
+        self.assertEqual(reopened.last_round, rounds["accept"])
+        for round in rounds.values():
+            if round <= rounds["accept"]:
+                self.assertEqual(reopened.state_at(round), state_history.state_at(round))
+
+        reopened.ingest(self.algod_client, rounds["reveal"])
+        self.assertEqual(reopened.state_at(rounds["challenge"]), state_history.state_at(rounds["challenge"]))
+        # Without a schema keys are strings and values ints or bytes.
+        self.assertEqual(
+            reopened.state_at(rounds["reveal"])["local"][self.opponent_addr],
+            {"opponent": b"", "wager": 0, "commitment": b"", "reveal": b""}
+        )
+
+
+    def test_interrupted_ingest(self):
+        rounds = self.play()
+        state_history = history.StateHistory(self.directory, self.rps_app_id)
+        state_history.ingest(self.algod_client, rounds["accept"])
+
+        # A crash before meta.json is replaced leaves the previous one.
+        with mock.patch.object(history.os, "replace", side_effect=OSError("crash")):
+            with self.assertRaises(OSError):
+                state_history.ingest(self.algod_client, rounds["reveal"])
+
+        reopened = history.StateHistory(self.directory, self.rps_app_id)
+        self.assertEqual(reopened.last_round, rounds["accept"])
+        reopened.ingest(self.algod_client, rounds["reveal"])
+        self.assertEqual(
+            reopened.state_at(rounds["reveal"])["local"][self.opponent_addr]["wager"], 0
+        )
+
+
+    def test_global_state(self):
+        admin_pk, admin_addr, app_id = self.environment.new_app()
+        set_rate_cr = set_rate(
+            algod_client=self.algod_client,
+            admin_pk=admin_pk,
+            app_id=app_id,
+            new_rate_integer=5,
+            new_rate_decimal=1
+        )
+        self.assertGreater(set_rate_cr, -1)
+
+        state_history = history.StateHistory(self.directory, app_id, schema=GLOBAL_STATE_SCHEMA)
+        state_history.ingest(self.algod_client, set_rate_cr)
+
+        self.assertEqual(state_history.state_at(set_rate_cr - 1)["global"]["admin"], admin_addr)
+        self.assertEqual(
+            {key: state_history.state_at(set_rate_cr)["global"][key] for key in ("R", "r")},
+            {"R": 5, "r": 1}
+        )
+        self.assertEqual(
+            state_history.state_at(set_rate_cr)["global"],
+            get_application_global_state(self.indexer_client, app_id, GLOBAL_STATE_SCHEMA)
+        )
+        self.assertEqual(state_history.state_at(set_rate_cr)["local"], {})
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,327 @@
+import base64
+import unittest
+
+from algosdk import account, logic
+from algosdk.atomic_transaction_composer import (
+    AtomicTransactionComposer,
+    AccountTransactionSigner,
+    TransactionWithSigner
+)
+from algosdk.future import transaction
+from pyteal import OptimizeOptions
+
+from pyteal_helpers import ledger, sourcemap
+from pyteal_helpers.funding import FundPlan
+from pyteal_helpers.profile import Profiler
+from src.contract import router
+
+
+class LedgerTestCase(unittest.TestCase):
+    """
+        Same scenario as the "swap" integration test, evaluated by the
+        in-memory ledger instead of a node.
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        with sourcemap.capture() as source_maps:
+            approval, clear, cls.contract = router.compile_program(
+                version=6,
+                optimize=OptimizeOptions(scratch_slots=True)
+            )
+        cls.approval = approval
+        cls.approval_source_map = source_maps[0]
+
+        cls.faucet_pk, faucet_addr = account.generate_account()
+        cls.ledger = ledger.Ledger(genesis={faucet_addr: 10 ** 12})
+
+        cls.global_schema = transaction.StateSchema(num_uints=4, num_byte_slices=2)
+
+        # The deployment, 'optin_assets' (a payment and a call paying for
+        # its two inner transactions) and 'set_rate'.
+        cls.sm_creator_pk, cls.sm_creator_addr = cls.new_account(
+            FundPlan().create_app(cls.global_schema).transactions(6).total
+        )
+        # Two ASA creations and four transfers.
+        cls.asa_creator_pk, cls.asa_creator_addr = cls.new_account(
+            FundPlan().hold_assets(2).transactions(6).total
+        )
+        # Two opt-ins and two swaps (an asset transfer and a call paying
+        # for its inner transfer).
+        cls.asa_user_pk, cls.asa_user_addr = cls.new_account(
+            FundPlan().hold_assets(2).transactions(2).transactions(2, fee=3000).total
+        )
+
+        cls.app_id = cls.send(
+            transaction.ApplicationCreateTxn(
+                sender=cls.sm_creator_addr,
+                sp=cls.suggested_params(),
+                on_complete=transaction.OnComplete.NoOpOC,
+                approval_program=ledger.compile_teal(approval),
+                clear_program=ledger.compile_teal(clear),
+                global_schema=cls.global_schema,
+                local_schema=transaction.StateSchema(num_uints=0, num_byte_slices=0)
+            ).sign(cls.sm_creator_pk)
+        ).apply_data["apid"]
+        cls.app_addr = logic.get_application_address(cls.app_id)
+
+        cls.token_a_id, cls.token_b_id = [
+            cls.send(
+                transaction.AssetConfigTxn(
+                    sender=cls.asa_creator_addr,
+                    sp=cls.suggested_params(),
+                    total=1_000_000_000,
+                    decimals=6,
+                    unit_name=unit_name,
+                    manager=cls.asa_creator_addr,
+                    strict_empty_address_check=False
+                ).sign(cls.asa_creator_pk)
+            ).apply_data["caid"]
+            for unit_name in ("Token A", "Token B")
+        ]
+
+        cls.pay(cls.faucet_pk, cls.app_addr, FundPlan().hold_assets(2).total)
+
+        payment = TransactionWithSigner(
+            transaction.PaymentTxn(
+                sender=cls.sm_creator_addr,
+                sp=cls.suggested_params(),
+                receiver=cls.app_addr,
+                amt=0
+            ),
+            AccountTransactionSigner(cls.sm_creator_pk)
+        )
+        cls.call(
+            cls.sm_creator_pk, "optin_assets",
+            [cls.token_a_id, cls.token_b_id, payment], fee=3000
+        )
+
+        for asset_id in (cls.token_a_id, cls.token_b_id):
+            cls.send_asa(cls.asa_creator_pk, cls.app_addr, asset_id, 1_000_000)
+            cls.send_asa(cls.asa_user_pk, cls.asa_user_addr, asset_id, 0)
+            cls.send_asa(cls.asa_creator_pk, cls.asa_user_addr, asset_id, 1_000_000)
+
+        cls.call(cls.sm_creator_pk, "set_rate", [5, 1])
+
+    @classmethod
+    def suggested_params(cls, fee=1000) -> transaction.SuggestedParams:
+        return transaction.SuggestedParams(
+            fee=fee,
+            first=cls.ledger.round + 1,
+            last=cls.ledger.round + 1000,
+            gh=base64.b64encode(ledger.GENESIS_HASH).decode(),
+            gen=ledger.GENESIS_ID,
+            flat_fee=True
+        )
+
+    @classmethod
+    def send(cls, *signed_txns) -> ledger.Record:
+        txids = cls.ledger.send([signed_txn.dictify() for signed_txn in signed_txns])
+        return cls.ledger.records[txids[-1]]
+
+    @classmethod
+    def new_account(cls, amount):
+        private_key, address = account.generate_account()
+        cls.pay(cls.faucet_pk, address, amount)
+        return private_key, address
+
+    @classmethod
+    def pay(cls, sender_pk, receiver_addr, amount):
+        return cls.send(
+            transaction.PaymentTxn(
+                sender=account.address_from_private_key(sender_pk),
+                sp=cls.suggested_params(),
+                receiver=receiver_addr,
+                amt=amount
+            ).sign(sender_pk)
+        )
+
+    @classmethod
+    def send_asa(cls, sender_pk, receiver_addr, asset_id, amount):
+        return cls.send(
+            transaction.AssetTransferTxn(
+                sender=account.address_from_private_key(sender_pk),
+                sp=cls.suggested_params(),
+                receiver=receiver_addr,
+                amt=amount,
+                index=asset_id
+            ).sign(sender_pk)
+        )
+
+    @classmethod
+    def call(cls, sender_pk, method_name, method_args, fee=1000):
+        return cls.send(*cls.method_call(sender_pk, method_name, method_args, fee))
+
+    @classmethod
+    def method_call(cls, sender_pk, method_name, method_args, fee=1000):
+        atc = AtomicTransactionComposer()
+        atc.add_method_call(
+            app_id=cls.app_id,
+            method=cls.contract.get_method_by_name(method_name),
+            sender=account.address_from_private_key(sender_pk),
+            sp=cls.suggested_params(fee),
+            signer=AccountTransactionSigner(sender_pk),
+            method_args=method_args,
+            foreign_assets=[cls.token_a_id, cls.token_b_id]
+        )
+        return atc.gather_signatures()
+
+    def swap(self, asset_id_from, amount_to_swap):
+        return self.send(*self.swap_group(asset_id_from, amount_to_swap))
+
+    def swap_group(self, asset_id_from, amount_to_swap):
+        asset_transfer_txn = TransactionWithSigner(
+            transaction.AssetTransferTxn(
+                sender=self.asa_user_addr,
+                sp=self.suggested_params(fee=2000),
+                receiver=self.app_addr,
+                amt=amount_to_swap,
+                index=asset_id_from
+            ),
+            AccountTransactionSigner(self.asa_user_pk)
+        )
+        return self.method_call(self.asa_user_pk, "swap", [asset_transfer_txn])
+
+    def balances(self, address):
+        return {
+            asset_id: holding[0]
+            for asset_id, holding in self.ledger.account(address).assets.items()
+        }
+
+
+    def test_swap(self):
+        self.swap(self.token_a_id, 500_000)
+        self.swap(self.token_b_id, 500_000)
+
+        self.assertEqual(
+            self.balances(self.asa_user_addr),
+            {self.token_a_id: 1_500_000, self.token_b_id: 750_000}
+        )
+        self.assertEqual(
+            self.balances(self.app_addr),
+            {self.token_a_id: 500_000, self.token_b_id: 1_250_000}
+        )
+
+
+    def test_rejected_swap_is_rolled_back(self):
+        balances = self.balances(self.asa_user_addr)
+        last_round = self.ledger.round
+
+        # The user doesn't hold that much token B.
+        with self.assertRaises(ledger.LedgerError):
+            self.swap(self.token_b_id, balances[self.token_b_id] + 1)
+        # The contract holds less than the 2 * 10^6 units of token A owed.
+        with self.assertRaises(ledger.LedgerError):
+            self.swap(self.token_b_id, 1_000_000)
+
+        self.assertEqual(self.balances(self.asa_user_addr), balances)
+        self.assertEqual(self.ledger.round, last_round)
+
+
+
+    def test_snapshot_restore(self):
+        balances     = self.balances(self.asa_user_addr)
+        global_state = dict(self.ledger.apps[self.app_id].global_state)
+        last_round   = self.ledger.round
+
+        snapshot = self.ledger.snapshot()
+        for _ in range(2):
+            swap_txid = self.swap(self.token_a_id, 500_000).txid
+            self.assertNotEqual(self.balances(self.asa_user_addr), balances)
+
+            self.ledger.restore(snapshot)
+
+            self.assertEqual(self.balances(self.asa_user_addr), balances)
+            self.assertEqual(self.ledger.apps[self.app_id].global_state, global_state)
+            self.assertEqual(self.ledger.round, last_round)
+            self.assertNotIn(swap_txid, self.ledger.records)
+
+        self.ledger.release(snapshot)
+        with self.assertRaises(ledger.LedgerError):
+            self.ledger.restore(snapshot)
+
+
+
+    def test_apply_groups(self):
+        balances   = self.balances(self.asa_user_addr)
+        last_round = self.ledger.round
+        groups = [
+            [signed_txn.dictify() for signed_txn in self.swap_group(asset_id, amount)]
+            for asset_id, amount in [
+                (self.token_a_id, 100_000),
+                # The user doesn't hold that much token B.
+                (self.token_b_id, balances[self.token_b_id] + 1),
+                (self.token_a_id, 200_000),
+            ]
+        ]
+
+        # A dry run leaves the ledger untouched.
+        outcomes = self.ledger.apply_groups(groups, commit=False)
+        self.assertIsInstance(outcomes[1], ledger.LedgerError)
+        self.assertEqual(self.balances(self.asa_user_addr), balances)
+        self.assertEqual(self.ledger.round, last_round)
+        self.assertFalse(any(record.txid in self.ledger.records for record in outcomes[0].records))
+
+        snapshot = self.ledger.snapshot()
+        outcomes = self.ledger.apply_groups(groups)
+        # Both swaps share one round, the failing group is left out.
+        block = self.ledger.blocks[-1]
+        self.assertEqual(block.round, last_round + 1)
+        self.assertEqual(
+            [record.txid for record in block.records],
+            [record.txid for record in outcomes[0].records + outcomes[2].records]
+        )
+        self.assertEqual([record.offset for record in block.records], [0, 1, 2, 3])
+        self.assertEqual(
+            self.balances(self.asa_user_addr)[self.token_a_id],
+            balances[self.token_a_id] - 300_000
+        )
+        self.ledger.restore(snapshot)
+        self.ledger.release(snapshot)
+
+
+    def test_fund_plan(self):
+        self.assertEqual(
+            self.ledger.min_balance(self.sm_creator_addr),
+            FundPlan().create_app(self.global_schema).min_balance
+        )
+        self.assertEqual(
+            self.ledger.min_balance(self.app_addr),
+            FundPlan().hold_assets(2).min_balance
+        )
+        # The funding is exact: what is left is the minimum balance.
+        self.assertEqual(
+            self.ledger.account(self.asa_creator_addr).amount,
+            self.ledger.min_balance(self.asa_creator_addr)
+        )
+
+
+    def test_profile_swap(self):
+        signed_txns = self.swap_group(self.token_a_id, 500_000)
+        result = self.ledger.apply_group(
+            [signed_txn.dictify() for signed_txn in signed_txns], commit=False, trace=True
+        )
+        execution = result.calls[1]
+
+        profiler = Profiler(
+            self.ledger.program(ledger.compile_teal(self.approval)),
+            self.approval_source_map
+        )
+        profiler.add(execution)
+
+        self.assertEqual(profiler.cost, execution.cost)
+        self.assertEqual(sum(line.cost for line in profiler.lines.values()), execution.cost)
+        # The router dispatches to the "swap" method's subroutine.
+        swap = [s for s in profiler.subroutines.values() if s.name.startswith("swap")]
+        self.assertEqual(len(swap), 1)
+        self.assertEqual(swap[0].calls, 1)
+        self.assertEqual(profiler.subroutines["main"].inclusive_cost, execution.cost)
+        # The cost traces back to the method's body in contract.py.
+        self.assertTrue(any(
+            site.function == "swap" and site.file.endswith("contract.py")
+            for site in profiler.call_sites()
+        ))
+
+
+if __name__ == "__main__":
+    unittest.main()
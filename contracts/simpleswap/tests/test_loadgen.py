@@ -0,0 +1,80 @@
+from algosdk import error
+from unittest import mock
+
+from tests.test_base import BaseTestCase
+from src import loadgen
+from src.loadgen import fund_users, run_load
+
+
+class LoadgenTestCase(BaseTestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super(LoadgenTestCase, cls).setUpClass()
+
+        cls.environment = cls.get_swap_environment()
+
+
+    @classmethod
+    def setUpFixture(cls) -> None:
+        cls.users = fund_users(
+            cls.environment,
+            users=4,
+            swaps_per_user=3,
+            amount_to_swap=1000
+        )
+
+
+    def test_run_load(self):
+        report = run_load(
+            algod_client=self.algod_client,
+            environment=self.environment,
+            users=self.users,
+            swaps=12,
+            concurrency=2
+        )
+        self.assertEqual(report.confirmed, 12)
+        self.assertEqual(report.rejected, 0)
+        self.assertEqual(report.error_messages, [])
+        self.assertEqual(sum(report.rounds.values()), 12)
+        self.assertLessEqual(report.percentile(50), report.percentile(95))
+        self.assertLessEqual(report.percentile(95), report.percentile(99))
+        self.assertGreater(report.throughput, 0)
+
+
+    def test_run_load_rejections(self):
+        # The contract rejects swaps of amount 0.
+        report = run_load(
+            algod_client=self.algod_client,
+            environment=self.environment,
+            users=self.users,
+            swaps=4,
+            concurrency=4,
+            amount_to_swap=0
+        )
+        self.assertEqual(report.confirmed, 0)
+        self.assertEqual(report.rejected, 4)
+        self.assertEqual(report.rounds, {})
+
+
+    def test_run_load_errors(self):
+        # Swaps that get no answer are counted with their messages.
+        def swap(**kwargs):
+            raise error.ConfirmationTimeoutError("no confirmation")
+
+        with mock.patch.object(loadgen, "swap", swap):
+            report = run_load(
+                algod_client=self.algod_client,
+                environment=self.environment,
+                users=self.users,
+                swaps=4,
+                concurrency=2
+            )
+        self.assertEqual(report.confirmed, 0)
+        self.assertEqual(report.errors, 4)
+        self.assertEqual(report.error_messages, ["no confirmation"] * 4)
+        self.assertIn("error      : no confirmation (4x)", report.format())
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,129 @@
+import math
+import unittest
+
+from algosdk import account, error
+from algosdk.future import transaction
+
+from pyteal_helpers.node import LocalNode
+
+
+class PooledNodeTestCase(unittest.TestCase):
+    """
+        Local node pooling the sent groups, with blocks closed by the
+        test (close_block) rather than on a timer.
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.faucet_pk, cls.faucet_addr = account.generate_account()
+        cls.node = LocalNode(
+            genesis={cls.faucet_addr: 10 ** 12}, block_interval=math.inf, max_block_txns=3
+        ).start()
+        cls.algod_client = cls.node.algod_client()
+        cls.snapshot = cls.node.snapshot()
+
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.node.stop()
+
+
+    def tearDown(self) -> None:
+        self.node.restore(self.snapshot)
+
+
+    def payment(self, sender=None, receiver=None, amount=0, fee=1000, validity=1000, **kwargs):
+        sender_pk, sender_addr = sender or (self.faucet_pk, self.faucet_addr)
+        sp = self.algod_client.suggested_params()
+        sp.flat_fee, sp.fee = True, fee
+        sp.last = sp.first + validity
+        return transaction.PaymentTxn(
+            sender=sender_addr, sp=sp, receiver=receiver or sender_addr, amt=amount, **kwargs
+        ).sign(sender_pk)
+
+
+    def send(self, *args, **kwargs) -> str:
+        return self.algod_client.send_transaction(self.payment(*args, **kwargs))
+
+
+    def confirmed_round(self, txid: str) -> int:
+        return self.algod_client.pending_transaction_info(txid).get("confirmed-round", 0)
+
+
+    def test_pending_pool(self):
+        txids = [self.send(amount=amount) for amount in range(3)]
+
+        pool = self.algod_client.pending_transactions(max_txns=2)
+        self.assertEqual(pool["total-transactions"], 3)
+        self.assertEqual(len(pool["top-transactions"]), 2)
+        info = self.algod_client.pending_transaction_info(txids[0])
+        self.assertEqual((info["pool-error"], info.get("confirmed-round", 0)), ("", 0))
+
+        with self.assertRaises(error.AlgodHTTPError):
+            self.algod_client.send_transaction(self.payment(amount=0))
+
+        # One block holds the three groups.
+        block = self.node.close_block()
+        self.assertEqual([record.txid for record in block.records], txids)
+        self.assertEqual({self.confirmed_round(txid) for txid in txids}, {block.round})
+        self.assertEqual(self.algod_client.pending_transactions()["total-transactions"], 0)
+
+
+    def test_fee_order(self):
+        # Only three transactions fit in a block: the lowest fee waits.
+        txids = [self.send(amount=1, fee=fee) for fee in (1000, 3000, 2000, 4000)]
+
+        block = self.node.close_block()
+        self.assertEqual([record.txid for record in block.records], [txids[3], txids[1], txids[2]])
+        self.assertEqual(self.confirmed_round(txids[0]), 0)
+
+        self.assertEqual([record.txid for record in self.node.close_block().records], [txids[0]])
+
+
+    def test_dependent_groups(self):
+        # A group spending funds that are still pooled is accepted.
+        user = account.generate_account()
+        funding = self.send(receiver=user[1], amount=1_000_000)
+        spending = self.send(sender=user, receiver=self.faucet_addr, amount=500_000)
+
+        block = self.node.close_block()
+        self.assertEqual([record.txid for record in block.records], [funding, spending])
+
+        with self.assertRaises(error.AlgodHTTPError):
+            self.send(sender=user, receiver=self.faucet_addr, amount=1_000_000)
+
+
+    def test_pool_errors(self):
+        # A lease held by a pooled group rejects the other groups using
+        # it, even with a higher fee.
+        lease = b"\x01" * 32
+        expiring = self.send(amount=1, lease=lease, validity=1)
+        with self.assertRaises(error.AlgodHTTPError) as raised:
+            self.send(amount=2, fee=2000, lease=lease)
+        self.assertIn("overlapping lease", str(raised.exception))
+
+        # Groups left out of the block of their last valid round leave
+        # the pool, and their lease with them.
+        for amount in range(3):
+            self.send(amount=amount, fee=2000)
+        self.assertEqual(self.algod_client.pending_transaction_info(expiring)["pool-error"], "")
+        self.node.close_block()
+        self.assertIn("txn dead", self.algod_client.pending_transaction_info(expiring)["pool-error"])
+        bumped = self.send(amount=2, fee=2000, lease=lease)
+        block = self.node.close_block()
+        self.assertEqual([record.txid for record in block.records], [bumped])
+
+
+    def test_block_interval(self):
+        # Blocks are closed on a timer, empty or not.
+        with LocalNode(genesis={self.faucet_addr: 10 ** 12}, block_interval=0.05) as node:
+            algod_client = node.algod_client()
+            txid = algod_client.send_transaction(self.payment(amount=1))
+            confirmed_round = transaction.wait_for_confirmation(algod_client, txid, 4)["confirmed-round"]
+            self.assertGreater(
+                algod_client.status_after_block(confirmed_round)["last-round"], confirmed_round
+            )
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+
+from src.quote import *
+
+
+class QuoteTestCase(unittest.TestCase):
+
+    def test_quote(self):
+        # Same rate and amounts used in the "swap" integration test:
+        # R = 5, r = 1, i.e. a 0.5 rate.
+        self.assertEqual(quote(500_000, 5, 1, forward=True) , 250_000)
+        self.assertEqual(quote(500_000, 5, 1, forward=False), 1_000_000)
+
+
+    def test_quote_failures(self):
+        # Zero amount.
+        self.assertEqual(quote(0, 5, 1), -1)
+        # Unset rate.
+        self.assertEqual(quote(500_000, 0, 1), -1)
+        # 10^r overflows.
+        self.assertEqual(quote(500_000, 5, 20), -1)
+        # x * R overflows.
+        self.assertEqual(quote(UINT64_MAX, 2, 0), -1)
+        # y * 10^r overflows.
+        self.assertEqual(quote(UINT64_MAX // 10 + 1, 5, 1, forward=False), -1)
+        # The swapped amount rounds down to 0.
+        self.assertEqual(quote(1, 5, 1), -1)
+
+
+    def test_quote_many(self):
+        rng = np.random.default_rng(0)
+
+        amounts       = rng.integers(0, 2 ** 63, size=2_000, dtype=np.uint64)
+        amounts[:500] = rng.integers(0, 1_000, size=500, dtype=np.uint64)
+        rate_integers = rng.integers(0, 2 ** 40, size=2_000, dtype=np.uint64)
+        rate_decimals = rng.integers(0, 22, size=2_000, dtype=np.uint64)
+        forward       = rng.integers(0, 2, size=2_000).astype(bool)
+
+        amounts_out, ok = quote_many(amounts, rate_integers, rate_decimals, forward)
+
+        for i in range(len(amounts)):
+            expected = quote(
+                int(amounts[i]),
+                int(rate_integers[i]),
+                int(rate_decimals[i]),
+                bool(forward[i])
+            )
+            self.assertEqual(bool(ok[i]), expected > -1)
+            self.assertEqual(int(amounts_out[i]), max(expected, 0))
+
+
+if __name__ == "__main__":
+    pass
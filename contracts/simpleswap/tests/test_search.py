@@ -0,0 +1,69 @@
+import unittest
+from unittest import mock
+
+from algosdk import account
+from algosdk.future import transaction
+
+from pyteal_helpers import node as node_module, search
+from pyteal_helpers.node import LocalNode
+
+PAYMENTS = 7
+
+
+class SearchTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        faucet_pk, faucet_addr = account.generate_account()
+        _, cls.receiver_addr = account.generate_account()
+        cls.node = LocalNode(genesis={faucet_addr: 10 ** 12}).start()
+        cls.indexer_client = cls.node.indexer_client()
+
+        algod_client = cls.node.algod_client()
+        for i in range(PAYMENTS):
+            signed_txn = transaction.PaymentTxn(
+                sender=faucet_addr,
+                sp=algod_client.suggested_params(),
+                receiver=cls.receiver_addr,
+                amt=100_000 + i
+            ).sign(faucet_pk)
+            algod_client.send_transaction(signed_txn)
+
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.node.stop()
+
+
+    def test_search_transactions(self):
+        for prefetch in (True, False):
+            transactions = list(search.search_transactions(
+                self.indexer_client, page_size=2, prefetch=prefetch, address=self.receiver_addr
+            ))
+            self.assertEqual(
+                [txn["payment-transaction"]["amount"] for txn in transactions],
+                [100_000 + i for i in range(PAYMENTS)]
+            )
+
+
+    def test_capped_limit(self):
+        # The indexer returns fewer transactions than requested: short
+        # pages are followed until one comes empty.
+        with mock.patch.object(node_module, "MAX_SEARCH_LIMIT", 3):
+            for prefetch in (True, False):
+                pages = list(search.search_pages(
+                    self.indexer_client, page_size=5, prefetch=prefetch, address=self.receiver_addr
+                ))
+                self.assertEqual([len(page["transactions"]) for page in pages], [3, 3, 1, 0])
+
+
+    def test_no_match(self):
+        _, addr = account.generate_account()
+        pages = list(search.search_pages(self.indexer_client, address=addr))
+
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(pages[0]["transactions"], [])
+
+
+if __name__ == "__main__":
+    pass
@@ -1,10 +1,8 @@
-from algosdk import account
+from pyteal_helpers.funding import FundPlan
 
 from tests.test_base import BaseTestCase
 from src.contract_ops import *
 
-import time
-
 
 class SetRateTestCase(BaseTestCase):
 
@@ -12,30 +10,21 @@ class SetRateTestCase(BaseTestCase):
     def setUpClass(cls) -> None:
         super(SetRateTestCase, cls).setUpClass()
 
-        cls.admin_pk, cls.admin_addr = account.generate_account()
-        cls.user_pk , cls.user_addr  = account.generate_account()
-
-        cls.faucet.dispense(
-            algod_client=cls.algod_client,
-            receiver_addr=cls.admin_addr, 
-            # Total balance required is 416000 microAlgos:
-            # 1) 415000 microAlgos are required to deploy the smart-contract:
-            #   * 100,000 is the minimum standard required balance;
-            #   * 100,000 is the per page creation application fee;
-            #   * (25,000 + 3,500 ) * 4 = 114,000 is the addition per integer entry;
-            #   * (25,000 + 25,000) * 2 =  50,000 is the addition per byte slice entry;
-            #   * 1000 is the transaction fee.
-            # 2) 1000 microAlgos are the fee required to perform the smart-contract call 
-            #    'set_rate'.
-            amount=416_000
-        )
+        cls.environment = cls.get_swap_environment()
 
         cls.new_rate_integer = 5
         cls.new_rate_decimal = 1
 
-        cls.app_id = deploy(
-            algod_client=cls.algod_client,
-            creator_pk=cls.admin_pk
+
+    @classmethod
+    def setUpFixture(cls) -> None:
+        # The administrator's balance covers the deployment and the
+        # smart-contract call 'set_rate' (see SwapEnvironment.new_app).
+        cls.admin_pk, cls.admin_addr, cls.app_id = cls.environment.new_app()
+
+        cls.user_pk, cls.user_addr = cls.environment.new_account(
+            # The smart-contract call 'set_rate'.
+            amount=FundPlan().transactions(1).total
         )
 
 
@@ -50,7 +39,7 @@ class SetRateTestCase(BaseTestCase):
         self.assertGreater(set_rate_cr, -1)
 
         # Wait for indexer to catch-up newest algod updates.
-        time.sleep(1)
+        self.wait_for_indexer()
 
         app_global_state = get_application_global_state(
             indexer_client=self.indexer_client,
@@ -0,0 +1,253 @@
+from algosdk import account, encoding, error
+
+from pyteal_helpers import state
+from pyteal_helpers.funding import FundPlan
+
+from tests.fixtures import new_rps_app
+from tests.test_base import BaseTestCase
+from contracts.rps import run as rps_run
+
+import base64
+import contextlib
+import hashlib
+import io
+import unittest
+from unittest import mock
+
+CHALLENGER_REVEAL = "r-nonce"
+OPPONENT_REVEAL   = "p"
+WAGER             = 123456
+
+
+def key_value(name: str, uint: int | None = None, raw: bytes | None = None) -> dict:
+    # TealKeyValue entry as returned by algod and indexer.
+    if raw is not None:
+        value = {"type": state.TEAL_BYTES, "bytes": base64.b64encode(raw).decode(), "uint": 0}
+    else:
+        value = {"type": state.TEAL_UINT, "bytes": "", "uint": uint}
+    return {"key": base64.b64encode(name.encode()).decode(), "value": value}
+
+
+class CountingClient:
+    """
+        Algod client counting the requests made through it.
+    """
+
+    def __init__(self, algod_client):
+        self.algod_client = algod_client
+        self.calls        = {}
+
+    def __getattr__(self, name):
+        method = getattr(self.algod_client, name)
+
+        def call(*args, **kwargs):
+            self.calls[name] = self.calls.get(name, 0) + 1
+            return method(*args, **kwargs)
+        return call
+
+
+class DecodeStateTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        _, cls.addr = account.generate_account()
+        cls.key_values = [
+            key_value("wager", uint=7),
+            key_value("commitment", raw=b"\x00\xff"),
+            key_value("opponent", raw=encoding.decode_address(cls.addr)),
+            key_value("extra", uint=3),
+        ]
+
+
+    def test_decode_state(self):
+        # Without a schema, values keep the type algod reports.
+        self.assertEqual(
+            state.decode_state(self.key_values),
+            {
+                "wager": 7,
+                "commitment": b"\x00\xff",
+                "opponent": encoding.decode_address(self.addr),
+                "extra": 3,
+            }
+        )
+        self.assertEqual(state.decode_state([]), {})
+
+
+    def test_decode_schema(self):
+        decoded = state.decode_state(self.key_values, rps_run.LOCAL_STATE_SCHEMA)
+
+        self.assertEqual(decoded["wager"], 7)
+        self.assertEqual(decoded["commitment"], b"\x00\xff")
+        self.assertEqual(decoded["opponent"], self.addr)
+        # Keys missing from the schema are decoded generically.
+        self.assertEqual(decoded["extra"], 3)
+
+        # Empty addresses decode to "".
+        self.assertEqual(
+            rps_run.LOCAL_STATE_SCHEMA.decode([key_value("opponent", raw=b"")])["opponent"],
+            ""
+        )
+
+        with self.assertRaises(ValueError):
+            state.KeyValueSchema({"wager": "int"})
+
+
+    def test_decode_raw(self):
+        decoded = rps_run.LOCAL_STATE_SCHEMA.decode_raw({
+            b"wager": 7,
+            b"opponent": encoding.decode_address(self.addr),
+            b"reveal": b"",
+        })
+
+        self.assertEqual(decoded, {"wager": 7, "opponent": self.addr, "reveal": b""})
+        self.assertEqual(rps_run.LOCAL_STATE_SCHEMA.decode_raw({b"opponent": b""}), {"opponent": ""})
+
+
+    def test_decode_key(self):
+        # Keys that aren't UTF-8 decode the same way from algod entries
+        # and from raw deltas.
+        raw_key = b"\xffkey"
+        key_values = [{"key": base64.b64encode(raw_key).decode(), "value": {"type": state.TEAL_UINT, "uint": 1}}]
+        name, = rps_run.LOCAL_STATE_SCHEMA.decode_raw({raw_key: 1})
+
+        self.assertEqual(state.decode_state(key_values), {name: 1})
+        self.assertEqual(rps_run.LOCAL_STATE_SCHEMA.decode(key_values), {name: 1})
+        self.assertEqual(name.encode("utf-8", "surrogateescape"), raw_key)
+
+        # Decoded names are cached, up to KEY_CACHE_SIZE of them.
+        for i in range(state.KEY_CACHE_SIZE + 1):
+            state.decode_state([key_value(f"key-{i}", uint=i)])
+        self.assertEqual(state._decode_key.cache_info().currsize, state.KEY_CACHE_SIZE)
+
+
+    def test_decode_global_states(self):
+        applications = [
+            {"id": 1, "params": {"global-state": [key_value("wager", uint=1)]}},
+            {"id": 2, "params": {}},
+        ]
+
+        self.assertEqual(state.decode_global_states(applications), {1: {"wager": 1}, 2: {}})
+
+
+class StateTestCase(BaseTestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super(StateTestCase, cls).setUpClass()
+
+        cls.environment = cls.get_swap_environment()
+
+        cls.app_id = new_rps_app(cls.environment, cls.faucet)
+        # The rps operations use the module's algod client.
+        cls.rps_client_patch = mock.patch.object(rps_run, "algod_client", cls.algod_client)
+        cls.rps_client_patch.start()
+
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.rps_client_patch.stop()
+        super(StateTestCase, cls).tearDownClass()
+
+
+    @classmethod
+    def setUpFixture(cls) -> None:
+        # The opt-in, then the challenge or its acceptance (a call and the
+        # payment of the wager).
+        plan = FundPlan().opt_in_app(rps_run.APP_LOCAL_SCHEMA).transactions(3).spend(WAGER)
+        cls.challenger_pk, cls.challenger_addr = cls.environment.new_account(amount=plan.total)
+        cls.opponent_pk, cls.opponent_addr = cls.environment.new_account(amount=plan.total)
+
+        for account_pk in (cls.challenger_pk, cls.opponent_pk):
+            if rps_run.optin(account_pk, cls.app_id) == -1:
+                raise RuntimeError("state fixture setup failed: 'optin' returned -1")
+        if rps_run.create_challenge(
+            cls.challenger_pk, CHALLENGER_REVEAL, cls.app_id, cls.opponent_addr
+        ) == -1:
+            raise RuntimeError("state fixture setup failed: 'create_challenge' returned -1")
+
+
+    def test_read(self):
+        algod_client = CountingClient(self.algod_client)
+        reader = state.LocalStateReader(algod_client, self.app_id, rps_run.LOCAL_STATE_SCHEMA)
+
+        local_state = reader.read(self.challenger_addr)
+        self.assertEqual(local_state["opponent"], self.opponent_addr)
+        self.assertEqual(local_state["wager"], WAGER)
+        self.assertEqual(
+            local_state["commitment"],
+            hashlib.sha256(CHALLENGER_REVEAL.encode()).digest()
+        )
+
+        # Served from the cache without any request: the round was
+        # checked less than round_ttl seconds ago.
+        calls = dict(algod_client.calls)
+        self.assertEqual(reader.read(self.challenger_addr), local_state)
+        self.assertEqual(algod_client.calls, calls)
+
+
+    def test_read_advance(self):
+        algod_client = CountingClient(self.algod_client)
+        reader = state.LocalStateReader(algod_client, self.app_id, rps_run.LOCAL_STATE_SCHEMA)
+        self.assertEqual(reader.read(self.opponent_addr)["wager"], 0)
+
+        confirmation_round = rps_run.accept_challenge(
+            self.opponent_pk, OPPONENT_REVEAL, self.app_id, self.challenger_addr
+        )
+        self.assertGreater(confirmation_round, -1)
+
+        # Invalidated by the confirmation round, without asking algod.
+        reader.advance(confirmation_round)
+        self.assertEqual(reader.read(self.opponent_addr)["wager"], WAGER)
+        self.assertEqual(algod_client.calls["status"], 1)
+        self.assertEqual(algod_client.calls["account_application_info"], 2)
+
+
+    def test_read_round_ttl(self):
+        # With no time to live, every read checks the round, so changes
+        # made by other clients are seen right away.
+        algod_client = CountingClient(self.algod_client)
+        reader = state.LocalStateReader(
+            algod_client, self.app_id, rps_run.LOCAL_STATE_SCHEMA, round_ttl=0
+        )
+        self.assertEqual(reader.read(self.opponent_addr)["wager"], 0)
+        self.assertEqual(reader.read(self.opponent_addr)["wager"], 0)
+        self.assertEqual(algod_client.calls["status"], 2)
+        self.assertEqual(algod_client.calls["account_application_info"], 1)
+
+        rps_run.accept_challenge(self.opponent_pk, OPPONENT_REVEAL, self.app_id, self.challenger_addr)
+        self.assertEqual(reader.read(self.opponent_addr)["wager"], WAGER)
+
+
+    def test_read_many(self):
+        _, outsider_addr = account.generate_account()
+        addresses = [self.challenger_addr, outsider_addr, self.opponent_addr]
+
+        algod_client = CountingClient(self.algod_client)
+        reader = state.LocalStateReader(algod_client, self.app_id, rps_run.LOCAL_STATE_SCHEMA)
+
+        # The account that isn't opted in fails alone.
+        local_states, errors = reader.read_many(addresses)
+        self.assertEqual(set(local_states), {self.challenger_addr, self.opponent_addr})
+        self.assertEqual(local_states[self.challenger_addr]["wager"], WAGER)
+        self.assertEqual(list(errors), [outsider_addr])
+        self.assertIsInstance(errors[outsider_addr], error.AlgodHTTPError)
+
+        # One round check per batch; opted-in accounts are cached.
+        reader.read_many(addresses)
+        self.assertEqual(algod_client.calls["status"], 2)
+        self.assertEqual(algod_client.calls["account_application_info"], 4)
+
+        # Accounts that haven't opted in have no local state, silently.
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.assertEqual(
+                set(rps_run.get_local_states(addresses, self.app_id)),
+                {self.challenger_addr, self.opponent_addr}
+            )
+            self.assertEqual(rps_run.get_local_state(outsider_addr, self.app_id), {})
+        self.assertEqual(rps_run.get_local_state(self.challenger_addr, self.app_id)["wager"], WAGER)
+        self.assertEqual(output.getvalue(), "")
+
+
+if __name__ == "__main__":
+    pass
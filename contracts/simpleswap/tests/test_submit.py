@@ -0,0 +1,362 @@
+from pyteal_helpers.node import LocalNode
+from pyteal_helpers.submit import FeeBumpPolicy
+
+from tests.test_base import BaseTestCase, USE_LOCAL_NODE, get_local_node
+from src.contract_ops import *
+from src.environment import user_plan
+
+import math
+import unittest
+
+
+class CongestedClient:
+    """
+        Algod client in front of the local node whose first held sends
+        are held back, as by a congested pending pool: they are delivered
+        along with the next send if late is set (the node's rejections of
+        them are kept in rejected), and never otherwise. Waiting for a
+        block closes an empty round. Suggested parameters are valid for
+        validity rounds if set.
+    """
+
+    def __init__(self, algod_client, held: int, late: bool = False, validity: int | None = None):
+        self.algod_client = algod_client
+        self.held         = held
+        self.late         = late
+        self.validity     = validity
+        self.sent         = []
+        self.withheld     = []
+        self.rejected     = []
+
+    def suggested_params(self):
+        suggested_parameters = self.algod_client.suggested_params()
+        if self.validity is not None:
+            suggested_parameters.last = suggested_parameters.first + self.validity
+        return suggested_parameters
+
+    def send_transactions(self, txns, **kwargs):
+        self.sent.append(txns)
+        if self.held > 0:
+            self.held -= 1
+            self.withheld.append(txns)
+            return txns[0].get_txid()
+        if self.late:
+            for withheld in self.withheld:
+                try:
+                    self.algod_client.send_transactions(withheld)
+                except error.AlgodHTTPError as e:
+                    self.rejected.append(str(e))
+            self.withheld = []
+        return self.algod_client.send_transactions(txns, **kwargs)
+
+    def status_after_block(self, block_num):
+        node, _ = get_local_node()
+        with node.lock:
+            node.ledger.advance()
+        return self.algod_client.status_after_block(block_num)
+
+    def __getattr__(self, name):
+        return getattr(self.algod_client, name)
+
+
+class PooledClient:
+    """
+        Algod client of a pooled local node (see LocalNode.block_interval)
+        closing a block whenever one is waited for, after calling
+        before_block, e.g. to fill the pending pool.
+    """
+
+    def __init__(self, node: LocalNode, before_block):
+        self.node         = node
+        self.algod_client = node.algod_client()
+        self.before_block = before_block
+        self.sent         = []
+
+    def send_transactions(self, txns, **kwargs):
+        txid = self.algod_client.send_transactions(txns, **kwargs)
+        self.sent.append(txns)
+        return txid
+
+    def status_after_block(self, block_num):
+        self.before_block()
+        self.node.close_block()
+        return self.algod_client.status_after_block(block_num)
+
+    def __getattr__(self, name):
+        return getattr(self.algod_client, name)
+
+
+@unittest.skipUnless(USE_LOCAL_NODE, "congestion is simulated on the local node")
+class SubmitTestCase(BaseTestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super(SubmitTestCase, cls).setUpClass()
+
+        cls.environment = cls.get_swap_environment()
+
+        cls.app_id     = cls.environment.app_id
+        cls.token_a_id = cls.environment.token_a_id
+        cls.token_b_id = cls.environment.token_b_id
+
+
+    @classmethod
+    def setUpFixture(cls) -> None:
+        cls.asa_user_pk, cls.asa_user_addr = cls.environment.new_account(
+            amount=user_plan(swaps=1, policy=FeeBumpPolicy()).total,
+            token_amount=1_000_000
+        )
+
+
+    def swap(self, algod_client, policy):
+        balance = self.algod_client.account_info(self.asa_user_addr)["amount"]
+        swap_cr = swap(
+            algod_client=algod_client,
+            account_pk=self.asa_user_pk,
+            app_id=self.app_id,
+            asset_id_from=self.token_a_id,
+            asset_id_to=self.token_b_id,
+            amount_to_swap=500_000,
+            policy=policy
+        )
+        self.assertGreater(swap_cr, -1)
+
+        # The swap was executed once.
+        balances = {
+            a["asset-id"]: a["amount"]
+            for a in get_account_info(self.algod_client, self.asa_user_addr)["assets"]
+        }
+        self.assertEqual(balances[self.token_a_id],   500_000)
+        self.assertEqual(balances[self.token_b_id], 1_250_000)
+
+        return balance - self.algod_client.account_info(self.asa_user_addr)["amount"]
+
+
+    def test_swap_with_policy(self):
+        fee = self.swap(self.algod_client, FeeBumpPolicy())
+
+        # Confirmed right away: the planned fees (one for the transfer,
+        # two for the call and its inner transaction).
+        self.assertEqual(fee, 3000)
+
+
+    def test_bumped_swap(self):
+        algod_client = CongestedClient(self.algod_client, held=2)
+        fee = self.swap(algod_client, FeeBumpPolicy(bump_after=1, factor=2))
+
+        # Two versions got stuck, the third one paid two bumps.
+        self.assertEqual(len(algod_client.sent), 3)
+        self.assertEqual(fee, 12_000)
+        leases = {txns[0].transaction.lease for txns in algod_client.sent}
+        self.assertEqual(len(leases), 1)
+
+
+    def test_max_fee(self):
+        algod_client = CongestedClient(self.algod_client, held=3)
+        policy = FeeBumpPolicy(bump_after=1, factor=2, max_fee=10_000)
+
+        # 3000, then 6000: 12000 is over the maximum fee, and the pending
+        # versions are only waited for until their last valid round.
+        with self.assertRaises(error.ConfirmationTimeoutError):
+            submit.send_with_fee_bumping(
+                algod_client, self.swap_group(validity=5), policy
+            )
+        self.assertEqual(len(algod_client.sent), 2)
+        self.assertEqual(policy.max_group_fee([1000, 2000]), 6000)
+
+
+    def test_swap_timeout(self):
+        # No version is ever delivered: the swap fails once its last
+        # valid round is passed.
+        algod_client = CongestedClient(self.algod_client, held=10, validity=3)
+        swap_cr = swap(
+            algod_client=algod_client,
+            account_pk=self.asa_user_pk,
+            app_id=self.app_id,
+            asset_id_from=self.token_a_id,
+            asset_id_to=self.token_b_id,
+            amount_to_swap=500_000,
+            policy=FeeBumpPolicy(bump_after=1, factor=2)
+        )
+        self.assertEqual(swap_cr, -1)
+        self.assertEqual(len(algod_client.sent), 3)
+
+
+    def test_lease(self):
+        # The first version is delivered late, along with the second one:
+        # it expired before the second one was sent, so only the second
+        # one is confirmed.
+        algod_client = CongestedClient(self.algod_client, held=1, late=True)
+        fee = self.swap(algod_client, FeeBumpPolicy(bump_after=1, factor=2))
+
+        self.assertEqual(len(algod_client.sent), 2)
+        self.assertEqual(len(algod_client.rejected), 1)
+        self.assertIn("txn dead", algod_client.rejected[0])
+        self.assertEqual(fee, 6000)
+
+
+    def test_congested_pool(self):
+        # Any pool is congested: the first version pays one bump.
+        fee = self.swap(self.algod_client, FeeBumpPolicy(congestion=0))
+
+        self.assertEqual(fee, 6000)
+
+
+    def swap_group(self, validity):
+        suggested_parameters = self.algod_client.suggested_params()
+        suggested_parameters.last = suggested_parameters.first + validity
+        signer = AccountTransactionSigner(self.asa_user_pk)
+        return [
+            TransactionWithSigner(
+                transaction.PaymentTxn(
+                    sender=self.asa_user_addr,
+                    sp=fee_planner.params(suggested_parameters),
+                    receiver=self.asa_user_addr,
+                    amt=0
+                ),
+                signer
+            ),
+            TransactionWithSigner(
+                transaction.PaymentTxn(
+                    sender=self.asa_user_addr,
+                    sp=fee_planner.params(suggested_parameters, "swap"),
+                    receiver=self.asa_user_addr,
+                    amt=0
+                ),
+                signer
+            ),
+        ]
+
+
+class CongestedPoolTestCase(unittest.TestCase):
+    """
+        Fee bumping against a pooled local node whose blocks hold two
+        transactions, kept full by payments of FILLER_FEE.
+    """
+    FILLER_FEE = 4000
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.faucet_pk, cls.faucet_addr = account.generate_account()
+        cls.user_pk, cls.user_addr = account.generate_account()
+        cls.node = LocalNode(
+            genesis={cls.faucet_addr: 10 ** 12, cls.user_addr: 1_000_000},
+            block_interval=math.inf,
+            max_block_txns=2
+        ).start()
+        cls.algod_client = cls.node.algod_client()
+        cls.snapshot = cls.node.snapshot()
+
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        cls.node.stop()
+
+
+    def setUp(self) -> None:
+        self.fillers = 0
+
+
+    def tearDown(self) -> None:
+        self.node.restore(self.snapshot)
+
+
+    def fill(self):
+        # Two filler payments, outbidding any group paying less per
+        # transaction.
+        sp = self.algod_client.suggested_params()
+        sp.flat_fee, sp.fee = True, self.FILLER_FEE
+        for _ in range(2):
+            self.fillers += 1
+            self.algod_client.send_transaction(
+                transaction.PaymentTxn(
+                    sender=self.faucet_addr,
+                    sp=sp,
+                    receiver=self.faucet_addr,
+                    amt=0,
+                    note=str(self.fillers).encode()
+                ).sign(self.faucet_pk)
+            )
+
+
+    def group(self):
+        # 1000 and 2000 microAlgos, as a swap.
+        sp = self.algod_client.suggested_params()
+        signer = AccountTransactionSigner(self.user_pk)
+        txns = []
+        for fee in (1000, 2000):
+            sp = transaction.SuggestedParams(sp.fee, sp.first, sp.last, sp.gh, sp.gen, flat_fee=True)
+            sp.fee = fee
+            txns.append(TransactionWithSigner(
+                transaction.PaymentTxn(sender=self.user_addr, sp=sp, receiver=self.user_addr, amt=0),
+                signer
+            ))
+        return txns
+
+
+    def balance(self) -> int:
+        return self.algod_client.account_info(self.user_addr)["amount"]
+
+
+    def test_congested_blocks(self):
+        algod_client = PooledClient(self.node, self.fill)
+        info = submit.send_with_fee_bumping(
+            algod_client, self.group(), FeeBumpPolicy(bump_after=1, factor=2)
+        )
+
+        # 1500 and 3000 per transaction stay behind the fillers; 6000
+        # takes the block.
+        self.assertEqual(len(algod_client.sent), 3)
+        self.assertEqual(info["txn"]["txn"]["fee"], 4000)
+        self.assertEqual(1_000_000 - self.balance(), 12_000)
+
+        # Each earlier version expired before the next one was sent, so
+        # that the node never held two of them.
+        for txns in algod_client.sent[:2]:
+            pool_error = self.algod_client.pending_transaction_info(txns[0].get_txid())["pool-error"]
+            self.assertIn("txn dead", pool_error)
+
+
+    def test_congestion_policy(self):
+        # Two pending transactions are a congestion: the first version
+        # already pays one bump.
+        self.fill()
+        algod_client = PooledClient(self.node, self.fill)
+        submit.send_with_fee_bumping(
+            algod_client, self.group(), FeeBumpPolicy(bump_after=1, factor=2, congestion=2)
+        )
+
+        self.assertEqual(len(algod_client.sent), 2)
+        self.assertEqual([txn.transaction.fee for txn in algod_client.sent[0]], [2000, 4000])
+        self.assertEqual(1_000_000 - self.balance(), 12_000)
+
+
+    def test_rejected_bump(self):
+        # The user spends their balance while the first version is
+        # pending: the bumped version is rejected while no earlier one
+        # was confirmed, which ends the submission.
+        def drain():
+            if self.fillers == 0:
+                sp = self.algod_client.suggested_params()
+                sp.flat_fee, sp.fee = True, 10_000
+                self.algod_client.send_transaction(
+                    transaction.PaymentTxn(
+                        sender=self.user_addr,
+                        sp=sp,
+                        receiver=self.faucet_addr,
+                        amt=1_000_000 - 10_000 - 101_000
+                    ).sign(self.user_pk)
+                )
+            self.fill()
+
+        algod_client = PooledClient(self.node, drain)
+        with self.assertRaises(error.AlgodHTTPError) as raised:
+            submit.send_with_fee_bumping(
+                algod_client, self.group(), FeeBumpPolicy(bump_after=1, factor=2)
+            )
+        self.assertIn("below min", str(raised.exception))
+        self.assertEqual(len(algod_client.sent), 1)
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,235 @@
+import base64
+import unittest
+
+from algosdk import account, encoding
+from algosdk.error import KMDHTTPError
+from algosdk.future import transaction
+
+from pyteal_helpers import ledger, utils
+from pyteal_helpers.node import LocalNode
+
+
+class FakeKMDClient:
+    """
+        In-memory KMD holding one wallet, counting the calls it serves.
+        Handles last expires_seconds; expire() makes them unrenewable.
+    """
+
+    def __init__(self, private_keys: list[str], expires_seconds: int = 60):
+        self.kmd_address     = "http://kmd.invalid"
+        self.private_keys    = {account.address_from_private_key(key): key for key in private_keys}
+        self.expires_seconds = expires_seconds
+        self.handles         = set()
+        self.calls           = {}
+
+    def _count(self, name):
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def expire(self):
+        self.handles.clear()
+
+    def list_wallets(self):
+        self._count("list_wallets")
+        return [{"id": "other-id", "name": "other"}, {"id": "wallet-id", "name": "wallet"}]
+
+    def init_wallet_handle(self, wallet_id, password):
+        self._count("init_wallet_handle")
+        handle = f"handle-{self.calls['init_wallet_handle']}"
+        self.handles.add(handle)
+        return handle
+
+    def renew_wallet_handle(self, handle):
+        self._count("renew_wallet_handle")
+        if handle not in self.handles:
+            raise KMDHTTPError("handle expired")
+        return {"expires_seconds": self.expires_seconds}
+
+    def release_wallet_handle(self, handle):
+        self._count("release_wallet_handle")
+        self.handles.discard(handle)
+        return True
+
+    def list_keys(self, handle):
+        self._count("list_keys")
+        if handle not in self.handles:
+            raise KMDHTTPError("handle expired")
+        return list(self.private_keys)
+
+    def export_key(self, handle, password, address):
+        self._count("export_key")
+        if handle not in self.handles:
+            raise KMDHTTPError("handle expired")
+        return self.private_keys[address]
+
+
+class UtilsTestCase(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.faucet_pk, cls.faucet_addr = account.generate_account()
+        cls.ledger = ledger.Ledger(genesis={cls.faucet_addr: 10 ** 12})
+
+
+    def suggested_params(self) -> transaction.SuggestedParams:
+        return transaction.SuggestedParams(
+            fee=1000,
+            first=self.ledger.round + 1,
+            last=self.ledger.round + 1000,
+            gh=base64.b64encode(ledger.GENESIS_HASH).decode(),
+            gen=ledger.GENESIS_ID,
+            flat_fee=True
+        )
+
+
+    def payment_groups(self, count, senders):
+        # Every group pays from every sender to the faucet, so it needs
+        # one signature per sender.
+        sp = self.suggested_params()
+        return [
+            (
+                [sender_pk for sender_pk, _ in senders],
+                [
+                    transaction.PaymentTxn(
+                        sender=sender_addr,
+                        sp=sp,
+                        receiver=self.faucet_addr,
+                        amt=i,
+                        note=f"{i}-{j}".encode()
+                    )
+                    for j, (_, sender_addr) in enumerate(senders)
+                ]
+            )
+            for i in range(count)
+        ]
+
+
+    def test_make_atomic_batch(self):
+        senders = [account.generate_account() for _ in range(2)]
+        count = utils.PARALLEL_SIGNING_THRESHOLD + 8
+
+        inline   = utils.make_atomic_batch(self.payment_groups(count, senders), processes=1)
+        parallel = utils.make_atomic_batch(self.payment_groups(count, senders), processes=2, chunk_size=16)
+
+        # Signing is deterministic: the process pool returns the same
+        # payloads, in the order of the input groups.
+        self.assertEqual(len(parallel), count)
+        self.assertEqual(parallel, inline)
+
+        # Same encoding as signing every transaction with the SDK.
+        signing_keys, transactions = self.payment_groups(1, senders)[0]
+        expected = b"".join(
+            base64.b64decode(encoding.msgpack_encode(signed_txn))
+            for signed_txn in utils.make_atomic(signing_keys, transactions)
+        )
+        self.assertEqual(base64.b64decode(inline[0]), expected)
+
+
+    def test_make_atomic_batch_accepted(self):
+        senders = [account.generate_account() for _ in range(2)]
+        for _, sender_addr in senders:
+            self.ledger.fund(sender_addr, 1_000_000)
+
+        for signed_group in utils.make_atomic_batch(self.payment_groups(3, senders)):
+            txids = self.ledger.send_raw(base64.b64decode(signed_group))
+            # Both payments were confirmed in the same group.
+            records = [self.ledger.records[txid] for txid in txids]
+            self.assertEqual(len(records), 2)
+            self.assertEqual(records[0].round, records[1].round)
+            self.assertIsNotNone(records[0].txn.get("grp"))
+
+
+    def test_kmd_key_provider(self):
+        private_keys = [account.generate_account()[0] for _ in range(3)]
+        kmd_client = FakeKMDClient(private_keys)
+        provider = utils.KMDKeyProvider(kmd_client, "wallet")
+
+        self.assertEqual(provider.private_keys(), private_keys)
+        # Served from memory, with the same handle.
+        self.assertEqual(provider.private_keys(), private_keys)
+        self.assertEqual(kmd_client.calls["export_key"], 3)
+        self.assertEqual(kmd_client.calls["init_wallet_handle"], 1)
+
+        # Added keys only show up once the provider is invalidated.
+        new_key = account.generate_account()[0]
+        kmd_client.private_keys[account.address_from_private_key(new_key)] = new_key
+        self.assertEqual(len(provider.private_keys()), 3)
+        provider.invalidate()
+        self.assertEqual(provider.private_keys(), private_keys + [new_key])
+        self.assertEqual(kmd_client.calls["init_wallet_handle"], 1)
+
+        provider.release()
+        self.assertEqual(kmd_client.handles, set())
+
+
+    def test_kmd_key_provider_handle(self):
+        # Handles expiring within the renewal margin are renewed on use.
+        kmd_client = FakeKMDClient([], expires_seconds=utils.KMDKeyProvider.RENEW_MARGIN)
+        provider = utils.KMDKeyProvider(kmd_client, "wallet")
+
+        handle = provider.handle()
+        renewals = kmd_client.calls["renew_wallet_handle"]
+        self.assertEqual(provider.handle(), handle)
+        self.assertEqual(kmd_client.calls["renew_wallet_handle"], renewals + 1)
+
+        # An expired handle is replaced by a new one.
+        kmd_client.expire()
+        self.assertNotEqual(provider.handle(), handle)
+        self.assertEqual(kmd_client.calls["init_wallet_handle"], 2)
+
+        with self.assertRaises(Exception):
+            utils.KMDKeyProvider(kmd_client, "missing").handle()
+
+
+    def test_get_keys_from_wallet(self):
+        private_keys = [account.generate_account()[0] for _ in range(2)]
+        kmd_client = FakeKMDClient(private_keys)
+
+        self.assertEqual(utils.get_keys_from_wallet(kmd_client, "wallet"), private_keys)
+        self.assertEqual(utils.get_keys_from_wallet(kmd_client, "wallet"), private_keys)
+        # Every call opens its own handle and releases it.
+        self.assertEqual(kmd_client.calls["init_wallet_handle"], 2)
+        self.assertEqual(kmd_client.calls["release_wallet_handle"], 2)
+        self.assertEqual(kmd_client.handles, set())
+
+        with self.assertRaises(Exception):
+            utils.get_keys_from_wallet(kmd_client, "missing")
+
+
+    def test_kmd_key_provider_context(self):
+        kmd_client = FakeKMDClient([account.generate_account()[0]])
+
+        with utils.KMDKeyProvider(kmd_client, "wallet") as provider:
+            self.assertEqual(len(provider.private_keys()), 1)
+            self.assertEqual(len(kmd_client.handles), 1)
+        self.assertEqual(kmd_client.handles, set())
+
+
+
+    def test_derive_accounts(self):
+        accounts = utils.derive_accounts("seed", 4)
+
+        self.assertEqual(len(accounts), 4)
+        # Same seed, same keys, whether the seed is str or bytes.
+        self.assertEqual(list(accounts), list(utils.derive_accounts(b"seed", 4)))
+        # A longer run extends a shorter one.
+        self.assertEqual(list(utils.derive_accounts("seed", 6))[:4], list(accounts))
+        self.assertEqual(len(set(accounts.addresses())), 4)
+        self.assertNotEqual(accounts.addresses(), utils.derive_accounts("other seed", 4).addresses())
+
+        for private_key, address in accounts:
+            self.assertEqual(account.address_from_private_key(private_key), address)
+
+        with self.assertRaises(IndexError):
+            accounts[4]
+
+
+    def test_unfunded(self):
+        accounts = utils.derive_accounts("unfunded", 3)
+        with LocalNode(genesis={accounts.address(1): 500_000}) as node:
+            algod_client = node.algod_client()
+            self.assertEqual(accounts.unfunded(algod_client, 500_000), [0, 2])
+            self.assertEqual(accounts.unfunded(algod_client, 500_001), [0, 1, 2])
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,25 @@
+import sys
+
+from pyteal_helpers import activity
+from pyteal_helpers import utils
+
+SIMPLESWAP_API_PATH = "./contracts/simpleswap/src/api.json"
+
+if __name__ == "__main__":
+    # Usage: python ./index_activity.py <database> [<app_id>:<contract> ...]
+    # e.g.   python ./index_activity.py ./build/activity.db 12:counter 34:simpleswap
+    database = sys.argv[1]
+
+    index = activity.ActivityIndex(database, SIMPLESWAP_API_PATH)
+
+    for app in sys.argv[2:]:
+        app_id, contract = app.split(":")
+        index.register(int(app_id), contract)
+
+    algod_client = utils.get_algod_client()
+
+    last_round = algod_client.status()["last-round"]
+
+    index.ingest(algod_client, stop_round=last_round)
+
+    print(f"Indexed up to round {index.last_round}.")
@@ -0,0 +1,30 @@
+import sys
+
+from algosdk import account, mnemonic
+
+from pyteal_helpers.node import LocalNode
+
+if __name__ == "__main__":
+    # Usage: python ./local_node.py [<algod_port> <indexer_port>]
+    # Serves the algod and indexer endpoints used by the contracts over an
+    # in-memory ledger, on the sandbox ports by default.
+    algod_port, indexer_port = map(int, sys.argv[1:3]) if len(sys.argv) > 2 else (4001, 8980)
+
+    faucet_pk, faucet_addr = account.generate_account()
+
+    node = LocalNode(
+        genesis={faucet_addr: 10 ** 15},
+        algod_port=algod_port,
+        indexer_port=indexer_port
+    )
+
+    print(f"algod   : {node.algod_address}")
+    print(f"indexer : {node.indexer_address}")
+    print(f"faucet  : {faucet_addr}")
+    print(f"mnemonic: {mnemonic.from_private_key(faucet_pk)}")
+
+    with node:
+        try:
+            node.join()
+        except KeyboardInterrupt:
+            pass
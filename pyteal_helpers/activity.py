@@ -0,0 +1,268 @@
+import sqlite3
+from typing import Callable
+
+from algosdk.abi import Contract
+from algosdk.v2client.algod import AlgodClient
+
+from pyteal_helpers import blocks
+
+CONTRACTS = ("counter", "rps", "simpleswap")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS apps (
+    app_id   INTEGER PRIMARY KEY,
+    contract TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS counter_calls (
+    round     INTEGER NOT NULL,
+    offset    INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    app_id    INTEGER NOT NULL,
+    sender    TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    value     INTEGER,
+    PRIMARY KEY (round, offset)
+);
+CREATE INDEX IF NOT EXISTS counter_calls_app_round ON counter_calls (app_id, round);
+CREATE INDEX IF NOT EXISTS counter_calls_sender ON counter_calls (sender, round);
+CREATE TABLE IF NOT EXISTS rps_calls (
+    round     INTEGER NOT NULL,
+    offset    INTEGER NOT NULL,
+    timestamp INTEGER NOT NULL,
+    app_id    INTEGER NOT NULL,
+    sender    TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    opponent  TEXT,
+    wager     INTEGER,
+    winner    TEXT,
+    PRIMARY KEY (round, offset)
+);
+CREATE INDEX IF NOT EXISTS rps_calls_app_round ON rps_calls (app_id, round);
+CREATE INDEX IF NOT EXISTS rps_calls_sender ON rps_calls (sender, round);
+CREATE INDEX IF NOT EXISTS rps_calls_winner ON rps_calls (winner);
+CREATE TABLE IF NOT EXISTS swaps (
+    round      INTEGER NOT NULL,
+    offset     INTEGER NOT NULL,
+    timestamp  INTEGER NOT NULL,
+    app_id     INTEGER NOT NULL,
+    sender     TEXT NOT NULL,
+    asset_in   INTEGER NOT NULL,
+    amount_in  INTEGER NOT NULL,
+    asset_out  INTEGER NOT NULL,
+    amount_out INTEGER NOT NULL,
+    PRIMARY KEY (round, offset)
+);
+CREATE INDEX IF NOT EXISTS swaps_app_round ON swaps (app_id, round);
+CREATE INDEX IF NOT EXISTS swaps_sender ON swaps (sender, round);
+CREATE INDEX IF NOT EXISTS swaps_timestamp ON swaps (timestamp);
+"""
+
+# OnComplete values.
+OPT_IN      = 1
+CLOSE_OUT   = 2
+CLEAR_STATE = 3
+
+
+class ActivityIndex:
+    """
+        Local SQLite index of counter, rps and simpleswap activity.
+
+        Blocks are fetched with a BlockFollower restricted to the
+        registered applications, decoded into one row per application
+        call and inserted in batches; the last ingested round is stored
+        in the same transaction as the rows, so ingestion can be stopped
+        and resumed at any time.
+    """
+
+    def __init__(self, path: str, simpleswap_api_path: str | None = None):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+        self._simpleswap_methods = {}
+        if simpleswap_api_path is not None:
+            with open(simpleswap_api_path) as f:
+                contract = Contract.from_json(f.read())
+            self._simpleswap_methods = {
+                method.get_selector(): method.name for method in contract.methods
+            }
+
+    @property
+    def last_round(self) -> int:
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = 'last-round'"
+        ).fetchone()
+        return row[0] if row else 0
+
+    @property
+    def apps(self) -> dict[int, str]:
+        return dict(self.connection.execute("SELECT app_id, contract FROM apps"))
+
+    def register(self, app_id: int, contract: str):
+        """
+            Add an application to the index. Only the rounds ingested
+            after the registration are indexed for it.
+        """
+        if contract not in CONTRACTS:
+            raise ValueError(f"Unknown contract {contract!r}, expected one of {CONTRACTS}")
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO apps (app_id, contract) VALUES (?, ?)",
+                (app_id, contract),
+            )
+
+    def ingest(
+        self,
+        algod_client: AlgodClient,
+        stop_round  : int,
+        batch_rounds: int = 100,
+    ):
+        """
+            Index the rounds after the last ingested one, up to stop_round
+            included, committing every batch_rounds rounds.
+        """
+        apps = self.apps
+        rows = {"counter_calls": [], "rps_calls": [], "swaps": []}
+        follower = blocks.BlockFollower(
+            algod_client=algod_client,
+            start_round=self.last_round + 1,
+            stop_round=stop_round,
+            app_ids=set(apps),
+        )
+
+        pending = 0
+        round = self.last_round
+        for round, block in follower.blocks():
+            for table, row in self.decode_block(round, block, apps):
+                rows[table].append(row)
+            pending += 1
+            if pending >= batch_rounds:
+                self._flush(rows, round)
+                pending = 0
+
+        if round > self.last_round:
+            self._flush(rows, round)
+
+    def decode_block(
+        self,
+        round: int,
+        block: dict,
+        apps : dict[int, str],
+    ) -> list[tuple[str, tuple]]:
+        """
+            Turn the calls to the indexed applications contained in a
+            block into (table, row) pairs. Each call is decoded along with
+            the transactions right before and after it in its group ({}
+            if there are none).
+        """
+        decoders: dict[str, Callable] = {
+            "counter"   : self._decode_counter_call,
+            "rps"       : self._decode_rps_call,
+            "simpleswap": self._decode_simpleswap_call,
+        }
+        txns = {offset: txn for offset, txn, _ in blocks.iter_transactions(block)}
+
+        rows = []
+        for offset, txn, apply_data in blocks.iter_transactions(block):
+            if txn.get("type") != "appl":
+                continue
+            app_id = txn.get("apid", 0) or apply_data.get("apid", 0)
+            if app_id not in apps:
+                continue
+
+            row = decoders[apps[app_id]](
+                txn,
+                apply_data,
+                blocks.group_transaction(txns, offset - 1, txn),
+                blocks.group_transaction(txns, offset + 1, txn),
+            )
+            if row is not None:
+                table, values = row
+                rows.append(
+                    (table, (round, offset, block.get("ts", 0), app_id) + values)
+                )
+        return rows
+
+    def _decode_counter_call(self, txn, apply_data, previous_txn, next_txn):
+        app_args = txn.get("apaa", [])
+        if not app_args:
+            return None
+        global_delta = apply_data.get("dt", {}).get("gd", {})
+        return "counter_calls", (
+            blocks.decode_address(txn["snd"]),
+            blocks.decode_bytes(app_args[0]).decode("utf-8", "replace"),
+            global_delta.get(b"counter", {}).get("ui"),
+        )
+
+    def _decode_rps_call(self, txn, apply_data, previous_txn, next_txn):
+        sender = blocks.decode_address(txn["snd"])
+        on_completion = txn.get("apan", 0)
+        if on_completion != 0:
+            operation = {OPT_IN: "optin", CLOSE_OUT: "closeout", CLEAR_STATE: "clear"}.get(
+                on_completion, "other"
+            )
+            return "rps_calls", (sender, operation, None, None, None)
+
+        app_args = txn.get("apaa", [])
+        accounts = txn.get("apat", [])
+        if not app_args:
+            return None
+        operation = blocks.decode_bytes(app_args[0]).decode("utf-8", "replace")
+        opponent = blocks.decode_address(accounts[0]) if accounts else None
+
+        wager, winner = None, None
+        if operation in ("challenge", "accept") and next_txn.get("type") == "pay":
+            # The wager is paid right after the call (Gtxn[1]).
+            wager = next_txn.get("amt", 0)
+        elif operation == "reveal":
+            payments = blocks.inner_transactions(apply_data)
+            if len(payments) == 1:
+                # Win: the whole pot goes to the winner.
+                winner = blocks.decode_address(payments[0]["rcv"])
+                wager = payments[0].get("amt", 0) // 2
+            elif len(payments) == 2:
+                # Tie: both wagers are returned, no winner.
+                wager = payments[0].get("amt", 0)
+        return "rps_calls", (sender, operation, opponent, wager, winner)
+
+    def _decode_simpleswap_call(self, txn, apply_data, previous_txn, next_txn):
+        app_args = txn.get("apaa", [])
+        if not app_args:
+            return None
+        method = self._simpleswap_methods.get(blocks.decode_bytes(app_args[0]))
+        inner_txns = blocks.inner_transactions(apply_data)
+        if method != "swap" or previous_txn.get("type") != "axfer" or len(inner_txns) != 1:
+            return None
+        return "swaps", (
+            blocks.decode_address(txn["snd"]),
+            previous_txn.get("xaid", 0),
+            previous_txn.get("aamt", 0),
+            inner_txns[0].get("xaid", 0),
+            inner_txns[0].get("aamt", 0),
+        )
+
+    def _flush(self, rows: dict[str, list], round: int):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO counter_calls VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows["counter_calls"],
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO rps_calls VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows["rps_calls"],
+            )
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO swaps VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows["swaps"],
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last-round', ?)",
+                (round,),
+            )
+        for table_rows in rows.values():
+            table_rows.clear()
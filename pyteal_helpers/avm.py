@@ -0,0 +1,1531 @@
+import base64
+import hashlib
+import math
+from dataclasses import dataclass, field
+
+from algosdk import encoding
+from Cryptodome.Hash import keccak
+
+UINT64_MAX = 0xFFFFFFFFFFFFFFFF
+
+MAX_STACK_DEPTH  = 1000
+MAX_BYTES_LENGTH = 4096
+MAX_CALL_DEPTH   = 8
+MAX_LOGS         = 32
+MAX_LOG_SIZE     = 1024
+MAX_INNER_TXNS   = 16
+
+ZERO_ADDRESS = bytes(32)
+
+# Named integer constants accepted by `int` (and their TypeEnum values).
+NAMED_INTS = {
+    "NoOp": 0, "OptIn": 1, "CloseOut": 2, "ClearState": 3,
+    "UpdateApplication": 4, "DeleteApplication": 5,
+    "unknown": 0, "pay": 1, "keyreg": 2, "acfg": 3, "axfer": 4, "afrz": 5, "appl": 6,
+}
+TYPE_ENUMS = {"pay": 1, "keyreg": 2, "acfg": 3, "axfer": 4, "afrz": 5, "appl": 6}
+TYPE_NAMES = {value: name for name, value in TYPE_ENUMS.items()}
+
+# Opcodes that don't cost 1.
+OPCODE_COSTS = {
+    "sha256": 35, "keccak256": 130, "sha512_256": 45, "ed25519verify": 1900,
+    "ed25519verify_bare": 1900, "sqrt": 4, "expw": 10, "divmodw": 20, "divw": 1,
+    "b+": 10, "b-": 10, "b*": 20, "b/": 20, "b%": 20, "bsqrt": 40,
+    "b|": 6, "b&": 6, "b^": 6, "b~": 4,
+}
+
+# Transaction fields: TEAL name -> (msgpack key, kind). Kinds are "uint",
+# "bytes", "addr" (32 bytes, zero address when absent) and "str" (the
+# transaction type, stored as a string in msgpack).
+TXN_FIELDS = {
+    "Sender"                 : ("snd", "addr"),
+    "Fee"                    : ("fee", "uint"),
+    "FirstValid"             : ("fv", "uint"),
+    "LastValid"              : ("lv", "uint"),
+    "Note"                   : ("note", "bytes"),
+    "Lease"                  : ("lx", "addr"),
+    "Receiver"               : ("rcv", "addr"),
+    "Amount"                 : ("amt", "uint"),
+    "CloseRemainderTo"       : ("close", "addr"),
+    "Type"                   : ("type", "str"),
+    "XferAsset"              : ("xaid", "uint"),
+    "AssetAmount"            : ("aamt", "uint"),
+    "AssetSender"            : ("asnd", "addr"),
+    "AssetReceiver"          : ("arcv", "addr"),
+    "AssetCloseTo"           : ("aclose", "addr"),
+    "ApplicationID"          : ("apid", "uint"),
+    "OnCompletion"           : ("apan", "uint"),
+    "ApprovalProgram"        : ("apap", "bytes"),
+    "ClearStateProgram"      : ("apsu", "bytes"),
+    "RekeyTo"                : ("rekey", "addr"),
+    "ConfigAsset"            : ("caid", "uint"),
+    "FreezeAsset"            : ("faid", "uint"),
+    "FreezeAssetAccount"     : ("fadd", "addr"),
+    "FreezeAssetFrozen"      : ("afrz", "uint"),
+    "ExtraProgramPages"      : ("apep", "uint"),
+    "Nonparticipation"       : ("nonpart", "uint"),
+}
+# Asset parameters fields: TEAL name -> (key in "apar", kind).
+ASSET_CONFIG_FIELDS = {
+    "ConfigAssetTotal"        : ("t", "uint"),
+    "ConfigAssetDecimals"     : ("dc", "uint"),
+    "ConfigAssetDefaultFrozen": ("df", "uint"),
+    "ConfigAssetUnitName"     : ("un", "bytes"),
+    "ConfigAssetName"         : ("an", "bytes"),
+    "ConfigAssetURL"          : ("au", "bytes"),
+    "ConfigAssetMetadataHash" : ("am", "bytes"),
+    "ConfigAssetManager"      : ("m", "addr"),
+    "ConfigAssetReserve"      : ("r", "addr"),
+    "ConfigAssetFreeze"       : ("f", "addr"),
+    "ConfigAssetClawback"     : ("c", "addr"),
+}
+# State schema fields: TEAL name -> (schema key, count key).
+SCHEMA_FIELDS = {
+    "GlobalNumUint"     : ("apgs", "nui"),
+    "GlobalNumByteSlice": ("apgs", "nbs"),
+    "LocalNumUint"      : ("apls", "nui"),
+    "LocalNumByteSlice" : ("apls", "nbs"),
+}
+# Array transaction fields: TEAL name -> msgpack key.
+TXN_ARRAY_FIELDS = {
+    "ApplicationArgs": "apaa",
+    "Accounts"       : "apat",
+    "Assets"         : "apas",
+    "Applications"   : "apfa",
+    "Logs"           : "lg",
+}
+
+
+class AVMError(Exception):
+    """
+        Failure of a program evaluation. line is the 1-based line of the
+        TEAL source the failing instruction comes from.
+    """
+
+    def __init__(self, message: str, line: int | None = None, source: str | None = None):
+        self.message = message
+        self.line    = line
+        self.source  = source
+        super().__init__(
+            message if line is None else f"{message} at line {line}: {source}"
+        )
+
+
+@dataclass
+class Instruction:
+    op  : str
+    args: list
+    line: int
+
+
+class Program:
+    """
+        TEAL program, parsed from source and ready to be evaluated.
+    """
+
+    def __init__(self, source: str):
+        self.source       = source
+        self.lines        = source.splitlines()
+        self.version      = 1
+        self.instructions : list[Instruction] = []
+        self.labels       : dict[str, int] = {}
+
+        for number, text in enumerate(self.lines, start=1):
+            tokens = _tokenize(text)
+            if not tokens:
+                continue
+            if tokens[0] == "#pragma":
+                if len(tokens) == 3 and tokens[1] == "version":
+                    self.version = int(tokens[2])
+                continue
+            # Labels may share the line with an instruction.
+            while tokens and tokens[0].endswith(":") and not tokens[0].startswith('"'):
+                self.labels[tokens[0][:-1]] = len(self.instructions)
+                tokens = tokens[1:]
+            if tokens:
+                self.instructions.append(_parse_instruction(tokens, number, text))
+
+        for instruction in self.instructions:
+            if instruction.op in ("b", "bz", "bnz", "callsub"):
+                instruction.args = [self._target(instruction, instruction.args[0])]
+            elif instruction.op == "switch" or instruction.op == "match":
+                instruction.args = [self._target(instruction, label) for label in instruction.args]
+
+    def _target(self, instruction: Instruction, label: str) -> int:
+        if label not in self.labels:
+            raise AVMError(f"unknown label {label!r}", instruction.line, self.lines[instruction.line - 1])
+        return self.labels[label]
+
+
+@dataclass
+class Budget:
+    """
+        Opcode budget, pooled among the application calls of a group.
+    """
+    remaining: int
+    used     : int = 0
+
+
+@dataclass
+class Execution:
+    """
+        Outcome and side information of a program evaluation.
+
+        trace holds the index of every executed instruction when tracing
+        was requested (see Program.instructions for the TEAL line), and
+        stacks the operand stack before each of them. callstack holds the
+        indexes of the callsub instructions still active when the program
+        stopped, outermost first.
+    """
+    passed: bool = False
+    cost  : int = 0
+    logs  : list[bytes] = field(default_factory=list)
+    scratch: list = field(default_factory=lambda: [0] * 256)
+    trace : list[int] | None = None
+    stacks: list[list] | None = None
+    callstack: list[int] = field(default_factory=list)
+    error : AVMError | None = None
+
+
+def evaluate(program: Program, ctx, budget: Budget, trace: bool = False) -> Execution:
+    """
+        Evaluate a program in the given context.
+
+        ctx provides the transaction being evaluated and access to the
+        ledger; see ledger.EvalContext for the interface. The returned
+        Execution tells whether the program approved; evaluation errors
+        are raised as AVMError, after being stored in the Execution passed
+        to ctx.on_error (if any).
+    """
+    machine = _Machine(program, ctx, budget, trace)
+    try:
+        machine.run()
+    except AVMError as e:
+        machine.execution.error = e
+        machine.execution.callstack = [return_pc - 1 for return_pc, _ in machine.callstack]
+        if hasattr(ctx, "on_error"):
+            ctx.on_error(machine.execution)
+        raise
+    return machine.execution
+
+
+class _Machine:
+
+    def __init__(self, program: Program, ctx, budget: Budget, trace: bool):
+        self.program   = program
+        self.ctx       = ctx
+        self.budget    = budget
+        self.execution = Execution(trace=[] if trace else None, stacks=[] if trace else None)
+        self.stack     : list = []
+        self.scratch   = self.execution.scratch
+        self.callstack : list[tuple[int, tuple | None]] = []
+        self.intc      : list[int] = []
+        self.bytec     : list[bytes] = []
+        self.pc        = 0
+        self.inner     : list[dict] | None = None
+        self.last_inner: list[dict] = []
+        self.inner_count = 0
+
+    def run(self):
+        instructions = self.program.instructions
+        trace = self.execution.trace
+        while True:
+            if self.pc >= len(instructions):
+                # Falling off the end: the top of the stack decides.
+                return self._finish()
+            instruction = instructions[self.pc]
+            cost = OPCODE_COSTS.get(instruction.op, 1)
+            self.budget.remaining -= cost
+            self.budget.used += cost
+            self.execution.cost += cost
+            if self.budget.remaining < 0:
+                self.fail("dynamic cost budget exceeded", instruction)
+            if trace is not None:
+                trace.append(self.pc)
+                self.execution.stacks.append(list(self.stack))
+
+            handler = _OPS.get(instruction.op)
+            if handler is None:
+                self.fail(f"unsupported opcode {instruction.op}", instruction)
+            try:
+                next_pc = handler(self, instruction.args)
+            except AVMError as e:
+                if e.line is None:
+                    self.fail(e.message, instruction)
+                raise
+            if next_pc is _RETURN:
+                return
+            if len(self.stack) > MAX_STACK_DEPTH:
+                self.fail("stack overflow", instruction)
+            self.pc = self.pc + 1 if next_pc is None else next_pc
+
+    def _finish(self):
+        if len(self.stack) != 1:
+            self.fail(f"stack len is {len(self.stack)} instead of 1", None)
+        value = self.stack[0]
+        if not isinstance(value, int):
+            self.fail("stack finished with bytes not int", None)
+        self.execution.passed = value != 0
+        return _RETURN
+
+    def fail(self, message: str, instruction: Instruction | None):
+        if instruction is None and self.program.instructions:
+            instruction = self.program.instructions[min(self.pc, len(self.program.instructions) - 1)]
+        if instruction is None:
+            raise AVMError(message)
+        raise AVMError(message, instruction.line, self.program.lines[instruction.line - 1].strip())
+
+    # Stack helpers.
+
+    def pop(self):
+        if not self.stack:
+            raise AVMError("stack underflow")
+        return self.stack.pop()
+
+    def pop_uint(self) -> int:
+        value = self.pop()
+        if not isinstance(value, int):
+            raise AVMError("expected uint64, got bytes")
+        return value
+
+    def pop_bytes(self) -> bytes:
+        value = self.pop()
+        if not isinstance(value, bytes):
+            raise AVMError("expected bytes, got uint64")
+        return value
+
+    def push(self, value):
+        if isinstance(value, bool):
+            value = int(value)
+        if isinstance(value, int):
+            if not 0 <= value <= UINT64_MAX:
+                raise AVMError("uint64 overflow" if value > 0 else "uint64 underflow")
+        elif len(value) > MAX_BYTES_LENGTH:
+            raise AVMError("bytes too long")
+        self.stack.append(value)
+
+
+_RETURN = object()
+
+
+# Parsing.
+
+
+def _tokenize(text: str) -> list[str]:
+    tokens = []
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c.isspace():
+            i += 1
+        elif text.startswith("//", i):
+            break
+        elif c == '"':
+            j = i + 1
+            while j < n and text[j] != '"':
+                j += 2 if text[j] == "\\" else 1
+            tokens.append(text[i : j + 1])
+            i = j + 1
+        else:
+            j = i
+            while j < n and not text[j].isspace() and not text.startswith("//", j):
+                j += 1
+            tokens.append(text[i:j])
+            i = j
+    return tokens
+
+
+def _parse_int(token: str) -> int:
+    if token in NAMED_INTS:
+        return NAMED_INTS[token]
+    if len(token) > 1 and token[0] == "0" and token[1].isdigit():
+        return int(token, 8)
+    return int(token, 0)
+
+
+def _parse_string(token: str) -> bytes:
+    out = bytearray()
+    body = token[1:-1]
+    i = 0
+    while i < len(body):
+        c = body[i]
+        if c != "\\":
+            out += c.encode("utf-8")
+            i += 1
+            continue
+        escape = body[i + 1]
+        if escape == "x":
+            out.append(int(body[i + 2 : i + 4], 16))
+            i += 4
+            continue
+        out += {"n": b"\n", "r": b"\r", "t": b"\t", "\\": b"\\", '"': b'"'}[escape]
+        i += 2
+    return bytes(out)
+
+
+def _parse_bytes(tokens: list[str]) -> tuple[bytes, int]:
+    token = tokens[0]
+    if token.startswith('"'):
+        return _parse_string(token), 1
+    if token.startswith("0x"):
+        return bytes.fromhex(token[2:]), 1
+    if token in ("base64", "b64"):
+        return base64.b64decode(tokens[1]), 2
+    if token in ("base32", "b32"):
+        return _b32decode(tokens[1]), 2
+    for prefix in ("base64(", "b64("):
+        if token.startswith(prefix):
+            return base64.b64decode(token[len(prefix) : -1]), 1
+    for prefix in ("base32(", "b32("):
+        if token.startswith(prefix):
+            return _b32decode(token[len(prefix) : -1]), 1
+    raise ValueError(f"invalid byte constant {token}")
+
+
+def _b32decode(text: str) -> bytes:
+    return base64.b32decode(text + "=" * (-len(text) % 8))
+
+
+def method_selector(signature: str) -> bytes:
+    return encoding.checksum(signature.encode())[:4]
+
+
+def _parse_instruction(tokens: list[str], line: int, text: str) -> Instruction:
+    op, args = tokens[0], tokens[1:]
+    try:
+        if op in ("int", "pushint"):
+            return Instruction("pushint", [_parse_int(args[0])], line)
+        if op in ("byte", "pushbytes"):
+            return Instruction("pushbytes", [_parse_bytes(args)[0]], line)
+        if op == "addr":
+            return Instruction("pushbytes", [encoding.decode_address(args[0])], line)
+        if op == "method":
+            return Instruction("pushbytes", [method_selector(_parse_string(args[0]).decode())], line)
+        if op in ("intcblock", "pushints"):
+            return Instruction(op, [_parse_int(arg) for arg in args], line)
+        if op in ("bytecblock", "pushbytess"):
+            values = []
+            while args:
+                value, consumed = _parse_bytes(args)
+                values.append(value)
+                args = args[consumed:]
+            return Instruction(op, values, line)
+        if op in ("intc_0", "intc_1", "intc_2", "intc_3"):
+            return Instruction("intc", [int(op[-1])], line)
+        if op in ("bytec_0", "bytec_1", "bytec_2", "bytec_3"):
+            return Instruction("bytec", [int(op[-1])], line)
+        if op in ("b", "bz", "bnz", "callsub", "switch", "match"):
+            return Instruction(op, list(args), line)
+        # Remaining immediates are either field names or integers.
+        return Instruction(
+            op,
+            [arg if not _is_int(arg) else _parse_int(arg) for arg in args],
+            line,
+        )
+    except (IndexError, ValueError, KeyError) as e:
+        raise AVMError(f"cannot parse {op}: {e}", line, text.strip())
+
+
+def _is_int(token: str) -> bool:
+    try:
+        int(token, 0) if not (len(token) > 1 and token[0] == "0" and token[1].isdigit()) else int(token, 8)
+        return True
+    except ValueError:
+        return False
+
+
+# Field access.
+
+
+def txn_field(ctx, txn: dict, group_index: int, name: str, index: int | None = None):
+    """
+        Read a field of a transaction dict (msgpack keys, see TXN_FIELDS).
+    """
+    if name in TXN_ARRAY_FIELDS:
+        values = txn_array(ctx, txn, name)
+        if index is None:
+            raise AVMError(f"{name} requires an index")
+        if not 0 <= index < len(values):
+            raise AVMError(f"invalid {name} index {index}")
+        return values[index]
+
+    if name in TXN_FIELDS:
+        key, kind = TXN_FIELDS[name]
+        value = txn.get(key)
+        if kind == "addr":
+            return value or ZERO_ADDRESS
+        if kind == "bytes":
+            return value or b""
+        if kind == "str":
+            return (value or "").encode()
+        return value or 0
+    if name in ASSET_CONFIG_FIELDS:
+        key, kind = ASSET_CONFIG_FIELDS[name]
+        value = txn.get("apar", {}).get(key)
+        if kind == "addr":
+            return value or ZERO_ADDRESS
+        if kind == "bytes":
+            return value.encode() if isinstance(value, str) else (value or b"")
+        return int(value or 0)
+    if name in SCHEMA_FIELDS:
+        schema, key = SCHEMA_FIELDS[name]
+        return txn.get(schema, {}).get(key, 0)
+    if name == "TypeEnum":
+        return TYPE_ENUMS.get(txn.get("type", ""), 0)
+    if name == "GroupIndex":
+        return group_index
+    if name == "TxID":
+        return _txid_bytes(ctx, txn)
+    if name == "NumAppArgs":
+        return len(txn.get("apaa", []))
+    if name == "NumAccounts":
+        return len(txn.get("apat", []))
+    if name == "NumAssets":
+        return len(txn.get("apas", []))
+    if name == "NumApplications":
+        return len(txn.get("apfa", []))
+    if name == "NumLogs":
+        return len(txn.get("dt", {}).get("lg", []))
+    if name == "LastLog":
+        logs = txn.get("dt", {}).get("lg", [])
+        return logs[-1] if logs else b""
+    if name == "CreatedAssetID":
+        return txn.get("caid_created", 0)
+    if name == "CreatedApplicationID":
+        return txn.get("apid_created", 0)
+    raise AVMError(f"unknown txn field {name}")
+
+
+def txn_array(ctx, txn: dict, name: str) -> list:
+    if name == "Accounts":
+        return [txn.get("snd", ZERO_ADDRESS)] + list(txn.get("apat", []))
+    if name == "Applications":
+        return [txn.get("apid", 0)] + list(txn.get("apfa", []))
+    if name == "Logs":
+        return list(txn.get("dt", {}).get("lg", []))
+    return list(txn.get(TXN_ARRAY_FIELDS[name], []))
+
+
+def _txid_bytes(ctx, txn: dict) -> bytes:
+    return _b32decode(ctx.txid(txn))
+
+
+def global_field(ctx, name: str):
+    if name == "MinTxnFee":
+        return ctx.min_fee
+    if name == "MinBalance":
+        return 100_000
+    if name == "MaxTxnLife":
+        return 1000
+    if name == "ZeroAddress":
+        return ZERO_ADDRESS
+    if name == "GroupSize":
+        return len(ctx.group)
+    if name == "LogicSigVersion":
+        return 8
+    if name == "Round":
+        return ctx.round
+    if name == "LatestTimestamp":
+        return ctx.timestamp
+    if name == "CurrentApplicationID":
+        return ctx.app_id
+    if name == "CreatorAddress":
+        return ctx.creator
+    if name == "CurrentApplicationAddress":
+        return ctx.app_address
+    if name == "GroupID":
+        return ctx.group[0].get("grp", ZERO_ADDRESS)
+    if name == "OpcodeBudget":
+        return max(ctx.budget.remaining, 0)
+    if name == "CallerApplicationID":
+        return ctx.caller_app_id
+    if name == "CallerApplicationAddress":
+        return ctx.caller_app_address
+    raise AVMError(f"unknown global field {name}")
+
+
+# Opcodes. Each handler receives the machine and the instruction
+# immediates and returns the next pc (None for pc + 1) or _RETURN.
+
+_OPS = {}
+
+
+def _op(*names):
+    def register(handler):
+        for name in names:
+            _OPS[name] = handler
+        return handler
+    return register
+
+
+def _binary_uint(name, function):
+    def handler(m, args):
+        b = m.pop_uint()
+        a = m.pop_uint()
+        m.push(function(a, b))
+    _OPS[name] = handler
+
+
+def _div(a, b):
+    if b == 0:
+        raise AVMError("/ 0")
+    return a // b
+
+
+def _mod(a, b):
+    if b == 0:
+        raise AVMError("% 0")
+    return a % b
+
+
+def _exp(a, b):
+    if a == 0 and b == 0:
+        raise AVMError("0^0 is undefined")
+    if a > 1 and b > 64:
+        raise AVMError("exp overflow")
+    return a ** b
+
+
+def _shl(a, b):
+    if b > 63:
+        raise AVMError("shl arg too big")
+    return (a << b) & UINT64_MAX
+
+
+def _shr(a, b):
+    if b > 63:
+        raise AVMError("shr arg too big")
+    return a >> b
+
+
+for _name, _function in {
+    "+": lambda a, b: a + b, "-": lambda a, b: a - b, "*": lambda a, b: a * b,
+    "/": _div, "%": _mod, "<": lambda a, b: a < b, ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b, ">=": lambda a, b: a >= b,
+    "&&": lambda a, b: bool(a and b), "||": lambda a, b: bool(a or b),
+    "|": lambda a, b: a | b, "&": lambda a, b: a & b, "^": lambda a, b: a ^ b,
+    "exp": _exp, "shl": _shl, "shr": _shr,
+}.items():
+    _binary_uint(_name, _function)
+
+
+def _equal(m) -> bool:
+    b = m.pop()
+    a = m.pop()
+    if isinstance(a, int) != isinstance(b, int):
+        raise AVMError("cannot compare uint64 to bytes")
+    return a == b
+
+
+@_op("==")
+def _op_equal(m, args):
+    m.push(_equal(m))
+
+
+@_op("!=")
+def _op_not_equal(m, args):
+    m.push(not _equal(m))
+
+
+@_op("!")
+def _op_not(m, args):
+    m.push(m.pop_uint() == 0)
+
+
+@_op("~")
+def _op_bitnot(m, args):
+    m.push(m.pop_uint() ^ UINT64_MAX)
+
+
+@_op("sqrt")
+def _op_sqrt(m, args):
+    m.push(math.isqrt(m.pop_uint()))
+
+
+@_op("bitlen")
+def _op_bitlen(m, args):
+    value = m.pop()
+    m.push((value if isinstance(value, int) else int.from_bytes(value, "big")).bit_length())
+
+
+@_op("addw")
+def _op_addw(m, args):
+    b = m.pop_uint()
+    a = m.pop_uint()
+    total = a + b
+    m.push(total >> 64)
+    m.push(total & UINT64_MAX)
+
+
+@_op("mulw")
+def _op_mulw(m, args):
+    b = m.pop_uint()
+    a = m.pop_uint()
+    product = a * b
+    m.push(product >> 64)
+    m.push(product & UINT64_MAX)
+
+
+@_op("expw")
+def _op_expw(m, args):
+    b = m.pop_uint()
+    a = m.pop_uint()
+    if a == 0 and b == 0:
+        raise AVMError("0^0 is undefined")
+    result = a ** b if a < 2 or b <= 128 else 1 << 128
+    if result >= 1 << 128:
+        raise AVMError("expw overflow")
+    m.push(result >> 64)
+    m.push(result & UINT64_MAX)
+
+
+@_op("divw")
+def _op_divw(m, args):
+    c = m.pop_uint()
+    b = m.pop_uint()
+    a = m.pop_uint()
+    if c == 0:
+        raise AVMError("/ 0")
+    quotient = ((a << 64) | b) // c
+    if quotient > UINT64_MAX:
+        raise AVMError("divw overflow")
+    m.push(quotient)
+
+
+@_op("divmodw")
+def _op_divmodw(m, args):
+    d = m.pop_uint()
+    c = m.pop_uint()
+    b = m.pop_uint()
+    a = m.pop_uint()
+    divisor = (c << 64) | d
+    if divisor == 0:
+        raise AVMError("/ 0")
+    quotient, remainder = divmod((a << 64) | b, divisor)
+    m.push(quotient >> 64)
+    m.push(quotient & UINT64_MAX)
+    m.push(remainder >> 64)
+    m.push(remainder & UINT64_MAX)
+
+
+def _binary_bytes_math(name, function):
+    def handler(m, args):
+        b = m.pop_bytes()
+        a = m.pop_bytes()
+        if len(a) > 64 or len(b) > 64:
+            raise AVMError("byte math input too long")
+        result = function(int.from_bytes(a, "big"), int.from_bytes(b, "big"), len(a), len(b))
+        if isinstance(result, bool):
+            m.push(result)
+        elif isinstance(result, bytes):
+            m.push(result)
+        else:
+            if result < 0:
+                raise AVMError("byte math would have negative result")
+            m.push(result.to_bytes(max(1, (result.bit_length() + 7) // 8), "big").lstrip(b"\x00") or b"")
+    _OPS[name] = handler
+
+
+def _bdiv(a, b, *_):
+    if b == 0:
+        raise AVMError("division by zero")
+    return a // b
+
+
+def _bmod(a, b, *_):
+    if b == 0:
+        raise AVMError("modulo by zero")
+    return a % b
+
+
+def _bitwise(function):
+    def apply(a, b, len_a, len_b):
+        size = max(len_a, len_b)
+        return function(a, b).to_bytes(size, "big")
+    return apply
+
+
+for _name, _function in {
+    "b+": lambda a, b, *_: a + b, "b-": lambda a, b, *_: a - b,
+    "b*": lambda a, b, *_: a * b, "b/": _bdiv, "b%": _bmod,
+    "b<": lambda a, b, *_: a < b, "b>": lambda a, b, *_: a > b,
+    "b<=": lambda a, b, *_: a <= b, "b>=": lambda a, b, *_: a >= b,
+    "b==": lambda a, b, *_: a == b, "b!=": lambda a, b, *_: a != b,
+    "b|": _bitwise(lambda a, b: a | b), "b&": _bitwise(lambda a, b: a & b),
+    "b^": _bitwise(lambda a, b: a ^ b),
+}.items():
+    _binary_bytes_math(_name, _function)
+
+
+@_op("b~")
+def _op_bnot(m, args):
+    m.push(bytes(byte ^ 0xFF for byte in m.pop_bytes()))
+
+
+@_op("bzero")
+def _op_bzero(m, args):
+    size = m.pop_uint()
+    if size > MAX_BYTES_LENGTH:
+        raise AVMError("bzero attempted to create a too large string")
+    m.push(bytes(size))
+
+
+@_op("sha256")
+def _op_sha256(m, args):
+    m.push(hashlib.sha256(m.pop_bytes()).digest())
+
+
+@_op("sha512_256")
+def _op_sha512_256(m, args):
+    m.push(encoding.checksum(m.pop_bytes()))
+
+
+@_op("keccak256")
+def _op_keccak256(m, args):
+    m.push(keccak.new(data=m.pop_bytes(), digest_bits=256).digest())
+
+
+@_op("len")
+def _op_len(m, args):
+    m.push(len(m.pop_bytes()))
+
+
+@_op("itob")
+def _op_itob(m, args):
+    m.push(m.pop_uint().to_bytes(8, "big"))
+
+
+@_op("btoi")
+def _op_btoi(m, args):
+    value = m.pop_bytes()
+    if len(value) > 8:
+        raise AVMError(f"btoi arg too long, got {len(value)} bytes")
+    m.push(int.from_bytes(value, "big"))
+
+
+@_op("concat")
+def _op_concat(m, args):
+    b = m.pop_bytes()
+    a = m.pop_bytes()
+    m.push(a + b)
+
+
+def _substring(m, value: bytes, start: int, end: int):
+    if end < start:
+        raise AVMError("substring end before start")
+    if end > len(value):
+        raise AVMError("substring range beyond length of string")
+    m.push(value[start:end])
+
+
+@_op("substring")
+def _op_substring(m, args):
+    _substring(m, m.pop_bytes(), args[0], args[1])
+
+
+@_op("substring3")
+def _op_substring3(m, args):
+    end = m.pop_uint()
+    start = m.pop_uint()
+    _substring(m, m.pop_bytes(), start, end)
+
+
+def _extract(m, value: bytes, start: int, length: int):
+    if start > len(value) or start + length > len(value):
+        raise AVMError("extraction out of range")
+    m.push(value[start : start + length])
+
+
+@_op("extract")
+def _op_extract(m, args):
+    value = m.pop_bytes()
+    start, length = args
+    if length == 0:
+        if start > len(value):
+            raise AVMError("extraction start beyond length")
+        m.push(value[start:])
+    else:
+        _extract(m, value, start, length)
+
+
+@_op("extract3")
+def _op_extract3(m, args):
+    length = m.pop_uint()
+    start = m.pop_uint()
+    _extract(m, m.pop_bytes(), start, length)
+
+
+def _extract_uint(size):
+    def handler(m, args):
+        start = m.pop_uint()
+        value = m.pop_bytes()
+        if start + size > len(value):
+            raise AVMError("extraction out of range")
+        m.push(int.from_bytes(value[start : start + size], "big"))
+    return handler
+
+
+_OPS["extract_uint16"] = _extract_uint(2)
+_OPS["extract_uint32"] = _extract_uint(4)
+_OPS["extract_uint64"] = _extract_uint(8)
+
+
+@_op("replace2")
+def _op_replace2(m, args):
+    replacement = m.pop_bytes()
+    value = m.pop_bytes()
+    _replace(m, value, args[0], replacement)
+
+
+@_op("replace3")
+def _op_replace3(m, args):
+    replacement = m.pop_bytes()
+    start = m.pop_uint()
+    value = m.pop_bytes()
+    _replace(m, value, start, replacement)
+
+
+def _replace(m, value: bytes, start: int, replacement: bytes):
+    if start + len(replacement) > len(value):
+        raise AVMError("replacement end exceeds original length")
+    m.push(value[:start] + replacement + value[start + len(replacement) :])
+
+
+@_op("getbyte")
+def _op_getbyte(m, args):
+    index = m.pop_uint()
+    value = m.pop_bytes()
+    if index >= len(value):
+        raise AVMError("getbyte index beyond array length")
+    m.push(value[index])
+
+
+@_op("setbyte")
+def _op_setbyte(m, args):
+    byte = m.pop_uint()
+    index = m.pop_uint()
+    value = bytearray(m.pop_bytes())
+    if index >= len(value):
+        raise AVMError("setbyte index beyond array length")
+    if byte > 255:
+        raise AVMError("setbyte value > 255")
+    value[index] = byte
+    m.push(bytes(value))
+
+
+@_op("getbit")
+def _op_getbit(m, args):
+    index = m.pop_uint()
+    value = m.pop()
+    if isinstance(value, int):
+        if index > 63:
+            raise AVMError("getbit index > 63 with with Uint")
+        m.push((value >> index) & 1)
+    else:
+        if index >= len(value) * 8:
+            raise AVMError("getbit index beyond byteslice")
+        m.push((value[index // 8] >> (7 - index % 8)) & 1)
+
+
+@_op("setbit")
+def _op_setbit(m, args):
+    bit = m.pop_uint()
+    index = m.pop_uint()
+    value = m.pop()
+    if bit > 1:
+        raise AVMError("setbit value > 1")
+    if isinstance(value, int):
+        if index > 63:
+            raise AVMError("setbit index > 63 with Uint")
+        m.push(value | (1 << index) if bit else value & ~(1 << index))
+    else:
+        if index >= len(value) * 8:
+            raise AVMError("setbit index beyond byteslice")
+        data = bytearray(value)
+        mask = 1 << (7 - index % 8)
+        data[index // 8] = data[index // 8] | mask if bit else data[index // 8] & ~mask
+        m.push(bytes(data))
+
+
+# Constants.
+
+
+@_op("pushint")
+def _op_pushint(m, args):
+    m.push(args[0])
+
+
+@_op("pushbytes")
+def _op_pushbytes(m, args):
+    m.push(args[0])
+
+
+@_op("pushints", "pushbytess")
+def _op_pushmany(m, args):
+    for value in args:
+        m.push(value)
+
+
+@_op("intcblock")
+def _op_intcblock(m, args):
+    m.intc = list(args)
+
+
+@_op("bytecblock")
+def _op_bytecblock(m, args):
+    m.bytec = list(args)
+
+
+@_op("intc")
+def _op_intc(m, args):
+    if args[0] >= len(m.intc):
+        raise AVMError("intc index beyond constant block")
+    m.push(m.intc[args[0]])
+
+
+@_op("bytec")
+def _op_bytec(m, args):
+    if args[0] >= len(m.bytec):
+        raise AVMError("bytec index beyond constant block")
+    m.push(m.bytec[args[0]])
+
+
+# Stack manipulation.
+
+
+@_op("pop")
+def _op_pop(m, args):
+    m.pop()
+
+
+@_op("popn")
+def _op_popn(m, args):
+    for _ in range(args[0]):
+        m.pop()
+
+
+@_op("dup")
+def _op_dup(m, args):
+    value = m.pop()
+    m.stack += [value, value]
+
+
+@_op("dup2")
+def _op_dup2(m, args):
+    if len(m.stack) < 2:
+        raise AVMError("stack underflow")
+    m.stack += m.stack[-2:]
+
+
+@_op("dupn")
+def _op_dupn(m, args):
+    value = m.pop()
+    m.stack += [value] * (args[0] + 1)
+
+
+@_op("dig")
+def _op_dig(m, args):
+    if args[0] >= len(m.stack):
+        raise AVMError("dig beyond stack")
+    m.stack.append(m.stack[-1 - args[0]])
+
+
+@_op("bury")
+def _op_bury(m, args):
+    value = m.pop()
+    if args[0] == 0 or args[0] > len(m.stack):
+        raise AVMError("bury beyond stack")
+    m.stack[-args[0]] = value
+
+
+@_op("swap")
+def _op_swap(m, args):
+    if len(m.stack) < 2:
+        raise AVMError("stack underflow")
+    m.stack[-1], m.stack[-2] = m.stack[-2], m.stack[-1]
+
+
+@_op("select")
+def _op_select(m, args):
+    condition = m.pop_uint()
+    b = m.pop()
+    a = m.pop()
+    m.stack.append(b if condition else a)
+
+
+@_op("cover")
+def _op_cover(m, args):
+    if args[0] >= len(m.stack):
+        raise AVMError("cover beyond stack")
+    value = m.stack.pop()
+    m.stack.insert(len(m.stack) - args[0], value)
+
+
+@_op("uncover")
+def _op_uncover(m, args):
+    if args[0] >= len(m.stack):
+        raise AVMError("uncover beyond stack")
+    m.stack.append(m.stack.pop(-1 - args[0]))
+
+
+# Scratch space.
+
+
+@_op("load")
+def _op_load(m, args):
+    m.stack.append(m.scratch[args[0]])
+
+
+@_op("store")
+def _op_store(m, args):
+    m.scratch[args[0]] = m.pop()
+
+
+@_op("loads")
+def _op_loads(m, args):
+    slot = m.pop_uint()
+    if slot > 255:
+        raise AVMError("invalid scratch slot")
+    m.stack.append(m.scratch[slot])
+
+
+@_op("stores")
+def _op_stores(m, args):
+    value = m.pop()
+    slot = m.pop_uint()
+    if slot > 255:
+        raise AVMError("invalid scratch slot")
+    m.scratch[slot] = value
+
+
+# Flow control.
+
+
+@_op("err")
+def _op_err(m, args):
+    raise AVMError("err opcode executed")
+
+
+@_op("b")
+def _op_b(m, args):
+    return args[0]
+
+
+@_op("bz")
+def _op_bz(m, args):
+    return args[0] if m.pop_uint() == 0 else None
+
+
+@_op("bnz")
+def _op_bnz(m, args):
+    return args[0] if m.pop_uint() != 0 else None
+
+
+@_op("switch")
+def _op_switch(m, args):
+    index = m.pop_uint()
+    return args[index] if index < len(args) else None
+
+
+@_op("match")
+def _op_match(m, args):
+    value = m.pop()
+    candidates = [m.pop() for _ in range(len(args))][::-1]
+    for target, candidate in zip(args, candidates):
+        if isinstance(candidate, int) == isinstance(value, int) and candidate == value:
+            return target
+    return None
+
+
+@_op("return")
+def _op_return(m, args):
+    value = m.pop_uint()
+    m.stack = [value]
+    m.execution.passed = value != 0
+    return _RETURN
+
+
+@_op("assert")
+def _op_assert(m, args):
+    if m.pop_uint() == 0:
+        raise AVMError("assert failed")
+
+
+@_op("callsub")
+def _op_callsub(m, args):
+    if len(m.callstack) >= 1024:
+        raise AVMError("call stack overflow")
+    m.callstack.append((m.pc + 1, None))
+    return args[0]
+
+
+@_op("proto")
+def _op_proto(m, args):
+    if not m.callstack:
+        raise AVMError("proto was executed without a callsub")
+    if len(m.stack) < args[0]:
+        raise AVMError("callsub to proto that requires more args than available")
+    # The frame starts above the arguments, which frame_dig reaches with
+    # negative indexes.
+    m.callstack[-1] = (m.callstack[-1][0], (len(m.stack), args[0], args[1]))
+
+
+@_op("retsub")
+def _op_retsub(m, args):
+    if not m.callstack:
+        raise AVMError("retsub with empty callstack")
+    return_pc, frame = m.callstack.pop()
+    if frame is not None:
+        pointer, arguments, returns = frame
+        if len(m.stack) < pointer + returns:
+            raise AVMError("retsub executed with stack below frame")
+        results = m.stack[len(m.stack) - returns :] if returns else []
+        m.stack = m.stack[: pointer - arguments] + results
+    return return_pc
+
+
+@_op("frame_dig")
+def _op_frame_dig(m, args):
+    frame = _current_frame(m)
+    index = frame + args[0]
+    if not 0 <= index < len(m.stack):
+        raise AVMError("frame_dig out of range")
+    m.stack.append(m.stack[index])
+
+
+@_op("frame_bury")
+def _op_frame_bury(m, args):
+    value = m.pop()
+    frame = _current_frame(m)
+    index = frame + args[0]
+    if not 0 <= index < len(m.stack):
+        raise AVMError("frame_bury out of range")
+    m.stack[index] = value
+
+
+def _current_frame(m) -> int:
+    if not m.callstack or m.callstack[-1][1] is None:
+        raise AVMError("frame op without proto")
+    return m.callstack[-1][1][0]
+
+
+# Transaction and global fields.
+
+
+@_op("txn")
+def _op_txn(m, args):
+    ctx = m.ctx
+    m.push(txn_field(ctx, ctx.txn, ctx.group_index, args[0], args[1] if len(args) > 1 else None))
+
+
+@_op("txna")
+def _op_txna(m, args):
+    m.push(txn_field(m.ctx, m.ctx.txn, m.ctx.group_index, args[0], args[1]))
+
+
+@_op("txnas")
+def _op_txnas(m, args):
+    m.push(txn_field(m.ctx, m.ctx.txn, m.ctx.group_index, args[0], m.pop_uint()))
+
+
+def _group_txn(m, index: int) -> dict:
+    if index >= len(m.ctx.group):
+        raise AVMError(f"gtxn lookup TxnGroup[{index}] but it only has {len(m.ctx.group)}")
+    return m.ctx.group[index]
+
+
+@_op("gtxn")
+def _op_gtxn(m, args):
+    index = args[0]
+    m.push(txn_field(m.ctx, _group_txn(m, index), index, args[1], args[2] if len(args) > 2 else None))
+
+
+@_op("gtxna")
+def _op_gtxna(m, args):
+    index = args[0]
+    m.push(txn_field(m.ctx, _group_txn(m, index), index, args[1], args[2]))
+
+
+@_op("gtxnas")
+def _op_gtxnas(m, args):
+    array_index = m.pop_uint()
+    index = args[0]
+    m.push(txn_field(m.ctx, _group_txn(m, index), index, args[1], array_index))
+
+
+@_op("gtxns")
+def _op_gtxns(m, args):
+    index = m.pop_uint()
+    m.push(txn_field(m.ctx, _group_txn(m, index), index, args[0], args[1] if len(args) > 1 else None))
+
+
+@_op("gtxnsa")
+def _op_gtxnsa(m, args):
+    index = m.pop_uint()
+    m.push(txn_field(m.ctx, _group_txn(m, index), index, args[0], args[1]))
+
+
+@_op("gtxnsas")
+def _op_gtxnsas(m, args):
+    array_index = m.pop_uint()
+    index = m.pop_uint()
+    m.push(txn_field(m.ctx, _group_txn(m, index), index, args[0], array_index))
+
+
+@_op("global")
+def _op_global(m, args):
+    m.push(global_field(m.ctx, args[0]))
+
+
+# State access.
+
+
+@_op("balance")
+def _op_balance(m, args):
+    m.push(m.ctx.balance(m.ctx.account_ref(m.pop())))
+
+
+@_op("min_balance")
+def _op_min_balance(m, args):
+    m.push(m.ctx.min_balance(m.ctx.account_ref(m.pop())))
+
+
+@_op("app_opted_in")
+def _op_app_opted_in(m, args):
+    app_id = m.ctx.app_ref(m.pop())
+    account = m.ctx.account_ref(m.pop())
+    m.push(m.ctx.opted_in(account, app_id))
+
+
+@_op("app_local_get")
+def _op_app_local_get(m, args):
+    key = m.pop_bytes()
+    account = m.ctx.account_ref(m.pop())
+    value = m.ctx.local_get(account, m.ctx.app_id, key)
+    m.push(0 if value is None else value)
+
+
+@_op("app_local_get_ex")
+def _op_app_local_get_ex(m, args):
+    key = m.pop_bytes()
+    app_id = m.ctx.app_ref(m.pop())
+    account = m.ctx.account_ref(m.pop())
+    value = m.ctx.local_get(account, app_id, key, strict=False)
+    m.push(0 if value is None else value)
+    m.push(value is not None)
+
+
+@_op("app_global_get")
+def _op_app_global_get(m, args):
+    value = m.ctx.global_get(m.ctx.app_id, m.pop_bytes())
+    m.push(0 if value is None else value)
+
+
+@_op("app_global_get_ex")
+def _op_app_global_get_ex(m, args):
+    key = m.pop_bytes()
+    app_id = m.ctx.app_ref(m.pop())
+    value = m.ctx.global_get(app_id, key)
+    m.push(0 if value is None else value)
+    m.push(value is not None)
+
+
+def _check_state_value(key: bytes, value):
+    if len(key) > 64:
+        raise AVMError("key too long")
+    if isinstance(value, bytes) and len(key) + len(value) > 128:
+        raise AVMError("key/value total too long")
+
+
+@_op("app_local_put")
+def _op_app_local_put(m, args):
+    value = m.pop()
+    key = m.pop_bytes()
+    account = m.ctx.account_ref(m.pop())
+    _check_state_value(key, value)
+    m.ctx.local_put(account, key, value)
+
+
+@_op("app_global_put")
+def _op_app_global_put(m, args):
+    value = m.pop()
+    key = m.pop_bytes()
+    _check_state_value(key, value)
+    m.ctx.global_put(key, value)
+
+
+@_op("app_local_del")
+def _op_app_local_del(m, args):
+    key = m.pop_bytes()
+    m.ctx.local_del(m.ctx.account_ref(m.pop()), key)
+
+
+@_op("app_global_del")
+def _op_app_global_del(m, args):
+    m.ctx.global_del(m.pop_bytes())
+
+
+@_op("asset_holding_get")
+def _op_asset_holding_get(m, args):
+    asset_id = m.ctx.asset_ref(m.pop())
+    account = m.ctx.account_ref(m.pop())
+    holding = m.ctx.asset_holding(account, asset_id)
+    if holding is None:
+        m.push(0)
+        m.push(0)
+        return
+    m.push({"AssetBalance": holding[0], "AssetFrozen": int(holding[1])}[args[0]])
+    m.push(1)
+
+
+@_op("asset_params_get")
+def _op_asset_params_get(m, args):
+    params = m.ctx.asset_params(m.ctx.asset_ref(m.pop()))
+    if params is None:
+        m.push(0)
+        m.push(0)
+        return
+    m.push(params[args[0]])
+    m.push(1)
+
+
+@_op("app_params_get")
+def _op_app_params_get(m, args):
+    params = m.ctx.app_params(m.ctx.app_ref(m.pop()))
+    if params is None:
+        m.push(0)
+        m.push(0)
+        return
+    m.push(params[args[0]])
+    m.push(1)
+
+
+@_op("acct_params_get")
+def _op_acct_params_get(m, args):
+    params = m.ctx.acct_params(m.ctx.account_ref(m.pop()))
+    m.push(params[args[0]])
+    m.push(params["AcctBalance"] > 0)
+
+
+@_op("log")
+def _op_log(m, args):
+    message = m.pop_bytes()
+    logs = m.execution.logs
+    if len(logs) >= MAX_LOGS or sum(map(len, logs)) + len(message) > MAX_LOG_SIZE:
+        raise AVMError("too many log calls in program" if len(logs) >= MAX_LOGS else "program logs too large")
+    logs.append(message)
+    m.ctx.log(message)
+
+
+# Inner transactions.
+
+
+@_op("itxn_begin")
+def _op_itxn_begin(m, args):
+    if m.inner is not None:
+        raise AVMError("itxn_begin without itxn_submit")
+    m.inner = [m.ctx.new_inner_txn()]
+
+
+@_op("itxn_next")
+def _op_itxn_next(m, args):
+    if m.inner is None:
+        raise AVMError("itxn_next without itxn_begin")
+    m.inner.append(m.ctx.new_inner_txn())
+
+
+@_op("itxn_field")
+def _op_itxn_field(m, args):
+    if m.inner is None:
+        raise AVMError("itxn_field without itxn_begin")
+    set_txn_field(m.inner[-1], args[0], m.pop())
+
+
+@_op("itxn_submit")
+def _op_itxn_submit(m, args):
+    if m.inner is None:
+        raise AVMError("itxn_submit without itxn_begin")
+    m.inner_count += len(m.inner)
+    if m.inner_count > MAX_INNER_TXNS * max(1, m.ctx.app_calls_in_group):
+        raise AVMError("too many inner transactions")
+    m.last_inner = m.ctx.submit_inner(m.inner)
+    m.inner = None
+
+
+def _last_inner(m) -> dict:
+    if not m.last_inner:
+        raise AVMError("no inner transaction available")
+    return m.last_inner[-1]
+
+
+@_op("itxn")
+def _op_itxn(m, args):
+    m.push(txn_field(m.ctx, _last_inner(m), 0, args[0], args[1] if len(args) > 1 else None))
+
+
+@_op("itxna")
+def _op_itxna(m, args):
+    m.push(txn_field(m.ctx, _last_inner(m), 0, args[0], args[1]))
+
+
+@_op("itxnas")
+def _op_itxnas(m, args):
+    m.push(txn_field(m.ctx, _last_inner(m), 0, args[0], m.pop_uint()))
+
+
+@_op("gitxn")
+def _op_gitxn(m, args):
+    if args[0] >= len(m.last_inner):
+        raise AVMError("gitxn index out of range")
+    m.push(txn_field(m.ctx, m.last_inner[args[0]], args[0], args[1], args[2] if len(args) > 2 else None))
+
+
+def set_txn_field(txn: dict, name: str, value):
+    """
+        Set a field of an inner transaction dict, as itxn_field does.
+    """
+    if name in TXN_ARRAY_FIELDS:
+        key = TXN_ARRAY_FIELDS[name]
+        txn.setdefault(key, []).append(value)
+        return
+    if name == "TypeEnum":
+        if value not in TYPE_NAMES:
+            raise AVMError(f"unknown TypeEnum {value}")
+        txn["type"] = TYPE_NAMES[value]
+        return
+    if name == "Type":
+        txn["type"] = _expect_bytes(value).decode()
+        return
+    if name in TXN_FIELDS:
+        key, kind = TXN_FIELDS[name]
+    elif name in ASSET_CONFIG_FIELDS:
+        key, kind = ASSET_CONFIG_FIELDS[name]
+        txn = txn.setdefault("apar", {})
+    elif name in SCHEMA_FIELDS:
+        schema, key = SCHEMA_FIELDS[name]
+        txn.setdefault(schema, {})[key] = _expect_uint(value)
+        return
+    else:
+        raise AVMError(f"{name} is not a settable inner transaction field")
+
+    if kind == "addr":
+        value = _expect_bytes(value)
+        if len(value) != 32:
+            raise AVMError(f"{name} must be a 32 byte address")
+    elif kind == "bytes":
+        value = _expect_bytes(value)
+    else:
+        value = _expect_uint(value)
+    txn[key] = value
+
+
+def _expect_bytes(value) -> bytes:
+    if not isinstance(value, bytes):
+        raise AVMError("expected bytes, got uint64")
+    return value
+
+
+def _expect_uint(value) -> int:
+    if not isinstance(value, int):
+        raise AVMError("expected uint64, got bytes")
+    return value
@@ -0,0 +1,313 @@
+import base64
+import json
+import os
+from typing import Callable, Iterator
+
+import msgpack
+from algosdk import encoding, error
+from algosdk.v2client.algod import AlgodClient
+
+# Transaction fields kept when decoding a block: everything the counter,
+# rps and simpleswap transactions are made of (payments, asset transfers
+# and application calls). Programs, notes, signatures and the like are
+# skipped without being decoded.
+TXN_FIELDS = {
+    "type", "snd", "fee", "grp",
+    # Payment.
+    "rcv", "amt", "close",
+    # Asset transfer.
+    "xaid", "arcv", "aamt", "aclose",
+    # Application call.
+    "apid", "apan", "apaa", "apat", "apas", "apfa",
+}
+# Signed transaction fields kept as they are: the ids of the application
+# and asset created by the transaction (apply data). The transaction
+# ("txn") and its evaluation delta ("dt") have their own readers, and
+# signatures ("sig", "msig", "lsig") and the like are skipped.
+SIGNED_TXN_FIELDS = {"apid", "caid"}
+# Evaluation delta fields kept besides the ones with their own readers
+# (global and local state deltas "gd"/"ld", inner transactions "itx"):
+# the logs, turned into bytes.
+EVAL_DELTA_FIELDS = {"lg"}
+
+
+class Checkpoint:
+    """
+        Persisted "next round to process" of a block follower.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self, default: int) -> int:
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)["next-round"]
+        except FileNotFoundError:
+            return default
+
+    def save(self, next_round: int):
+        # Write then rename, so a crash never leaves a truncated file.
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"next-round": next_round}, f)
+        os.replace(tmp_path, self.path)
+
+
+class BlockFollower:
+    """
+        Walk the ledger block by block, starting from a checkpointed round.
+
+        After a block has been handed to the caller and the caller asked
+        for the next one, the checkpoint is moved past it, so a restarted
+        follower resumes where it stopped (a block may be delivered twice
+        if the process dies while handling it, never skipped).
+    """
+
+    def __init__(
+        self,
+        algod_client   : AlgodClient,
+        start_round    : int = 1,
+        checkpoint_path: str | None = None,
+        stop_round     : int | None = None,
+        app_ids        : set[int] | None = None,
+    ):
+        self.algod_client = algod_client
+        self.start_round  = start_round
+        self.checkpoint   = Checkpoint(checkpoint_path) if checkpoint_path else None
+        self.stop_round   = stop_round
+        self.app_ids      = app_ids
+
+    def blocks(self) -> Iterator[tuple[int, dict]]:
+        """
+            Yield (round, block) pairs. When the follower reaches the tip
+            of the ledger it waits for the next block, unless stop_round
+            was given, in which case iteration ends after that round.
+
+            Raises:
+                AlgodHTTPError: if a round the ledger already reached
+                can't be read, e.g. it was pruned by the node.
+        """
+        next_round = self.start_round
+        if self.checkpoint is not None:
+            next_round = self.checkpoint.load(self.start_round)
+
+        while self.stop_round is None or next_round <= self.stop_round:
+            try:
+                block = self.read_block(next_round)
+            except error.AlgodHTTPError:
+                last_round = self.algod_client.status()["last-round"]
+                if next_round > last_round:
+                    # Not produced yet: wait for it.
+                    self.algod_client.status_after_block(last_round)
+                    continue
+                # Either committed since the first read, or not served by
+                # this node (e.g. pruned by a non-archival node), in which
+                # case the error propagates.
+                block = self.read_block(next_round)
+
+            yield next_round, block
+
+            next_round += 1
+            if self.checkpoint is not None:
+                self.checkpoint.save(next_round)
+
+    def read_block(self, round: int) -> dict:
+        """
+            Read a block as msgpack and decode only the fields listed in
+            TXN_FIELDS, SIGNED_TXN_FIELDS and EVAL_DELTA_FIELDS (plus
+            state deltas and inner transactions). If app_ids was given,
+            only the groups calling one of those applications are kept.
+        """
+        return decode_block(
+            self.algod_client.block_info(round, response_format="msgpack"),
+            self.app_ids
+        )
+
+
+def decode_block(data: bytes, app_ids: set[int] | None = None) -> dict:
+    """
+        Selectively decode a msgpack encoded block (as returned by
+        `/v2/blocks/{round}?format=msgpack`).
+
+        Unneeded fields are skipped by the unpacker without being
+        materialized. When app_ids is given, the transactions that don't
+        belong to a group calling one of those applications are replaced
+        by None, so that the offsets of the remaining ones are preserved.
+
+        Returns:
+            (dict): {"rnd": round, "ts": timestamp, "txns": [...]}, where
+            addresses and byte strings are raw bytes, and so are state
+            delta keys and byte values and logs.
+    """
+    unpacker = msgpack.Unpacker(
+        raw=False, unicode_errors="surrogateescape", strict_map_key=False
+    )
+    unpacker.feed(data)
+
+    block = {}
+    for _ in range(unpacker.read_map_header()):
+        if unpacker.unpack() == "block":
+            block = _read_map(unpacker, {"rnd", "ts"}, {"txns": _read_signed_txns})
+        else:
+            unpacker.skip()
+
+    if app_ids is not None:
+        txns = block.get("txns", [])
+        groups = {
+            signed_txn["txn"]["grp"]
+            for signed_txn in txns
+            if "grp" in signed_txn["txn"] and _calls(signed_txn, app_ids)
+        }
+        block["txns"] = [
+            signed_txn
+            if _calls(signed_txn, app_ids) or signed_txn["txn"].get("grp") in groups
+            else None
+            for signed_txn in txns
+        ]
+    return block
+
+
+def _calls(signed_txn: dict, app_ids: set[int]) -> bool:
+    # Application creations carry the new id in the apply data only.
+    txn = signed_txn["txn"]
+    return txn.get("type") == "appl" and (
+        txn.get("apid", 0) in app_ids or signed_txn.get("apid", 0) in app_ids
+    )
+
+
+def _read_map(
+    unpacker: msgpack.Unpacker,
+    fields  : set[str],
+    readers : dict[str, Callable[[msgpack.Unpacker], object]] | None = None,
+) -> dict:
+    readers = readers or {}
+    result = {}
+    for _ in range(unpacker.read_map_header()):
+        key = unpacker.unpack()
+        if key in readers:
+            result[key] = readers[key](unpacker)
+        elif key in fields:
+            result[key] = unpacker.unpack()
+        else:
+            unpacker.skip()
+    return result
+
+
+def _read_signed_txns(unpacker: msgpack.Unpacker) -> list[dict]:
+    return [
+        _read_map(
+            unpacker,
+            SIGNED_TXN_FIELDS,
+            {"txn": _read_txn, "dt": _read_eval_delta},
+        )
+        for _ in range(unpacker.read_array_header())
+    ]
+
+
+def _read_txn(unpacker: msgpack.Unpacker) -> dict:
+    return _read_map(unpacker, TXN_FIELDS)
+
+
+def _read_eval_delta(unpacker: msgpack.Unpacker) -> dict:
+    eval_delta = _read_map(
+        unpacker,
+        EVAL_DELTA_FIELDS,
+        {
+            "gd" : _read_state_delta,
+            "ld" : _read_local_deltas,
+            "itx": _read_signed_txns,
+        },
+    )
+    # Logs are Go strings too.
+    if "lg" in eval_delta:
+        eval_delta["lg"] = [_to_bytes(log) for log in eval_delta["lg"]]
+    return eval_delta
+
+
+def _read_local_deltas(unpacker: msgpack.Unpacker) -> dict[int, dict]:
+    # Local deltas are indexed by account position: 0 is the sender, i is
+    # the (i - 1)-th entry of the "apat" accounts array.
+    return {
+        unpacker.unpack(): _read_state_delta(unpacker)
+        for _ in range(unpacker.read_map_header())
+    }
+
+
+def _read_state_delta(unpacker: msgpack.Unpacker) -> dict[bytes, dict]:
+    # State keys and byte values are Go strings, i.e. arbitrary bytes
+    # encoded as msgpack str: turn them back into bytes.
+    delta = {}
+    for _ in range(unpacker.read_map_header()):
+        key = _to_bytes(unpacker.unpack())
+        value = unpacker.unpack()
+        if "bs" in value:
+            value["bs"] = _to_bytes(value["bs"])
+        delta[key] = value
+    return delta
+
+
+def _to_bytes(value: str | bytes) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return value.encode("utf-8", "surrogateescape")
+
+
+def group_transaction(txns: dict[int, dict], offset: int, txn: dict) -> dict:
+    """
+        Return the transaction at offset of a block (txns maps offsets to
+        transaction fields, as yielded by iter_transactions) if it belongs
+        to the same group as txn, {} otherwise: txn is not grouped, the
+        offset is out of the block, or the transaction there is part of
+        another group.
+    """
+    other = txns.get(offset) or {}
+    if "grp" not in txn or other.get("grp") != txn["grp"]:
+        return {}
+    return other
+
+
+def iter_transactions(block: dict) -> Iterator[tuple[int, dict, dict]]:
+    """
+        Yield (offset, txn, apply data) for every top-level transaction of
+        a block, where txn holds the transaction fields (e.g. "type",
+        "snd", "apid") and apply data the effects ("dt" with inner
+        transactions under "itx"). Transactions filtered out by
+        decode_block are skipped.
+    """
+    for offset, signed_txn in enumerate(block.get("txns", [])):
+        if signed_txn is not None:
+            yield offset, signed_txn["txn"], signed_txn
+
+
+def inner_transactions(apply_data: dict) -> list[dict]:
+    """
+        Return the transaction fields of the inner transactions issued
+        by an application call.
+    """
+    return [
+        inner["txn"] for inner in apply_data.get("dt", {}).get("itx", [])
+    ]
+
+
+def decode_address(value: str | bytes) -> str:
+    """
+        Normalize an address taken from a block to its base32 form.
+        Blocks encode addresses as base32 strings in JSON and as raw
+        32 bytes in msgpack.
+    """
+    if isinstance(value, bytes):
+        return encoding.encode_address(value)
+    if len(value) == 58:
+        return value
+    return encoding.encode_address(base64.b64decode(value))
+
+
+def decode_bytes(value: str | bytes) -> bytes:
+    """
+        Normalize a byte string taken from a block: base64 in JSON, raw
+        in msgpack.
+    """
+    if isinstance(value, bytes):
+        return value
+    return base64.b64decode(value)
@@ -0,0 +1,157 @@
+import copy
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+
+class RoundCache:
+    """
+        Read-through cache for algod/indexer reads, scoped to a ledger
+        round.
+
+        Entries are keyed by endpoint and arguments. Round-scoped entries
+        are dropped as soon as the cache learns that the ledger moved past
+        the round they were read at: either through advance() (e.g. with
+        the confirmation round of a transaction) or through the round
+        reported by a later response. Permanent entries, meant for
+        immutable data such as ASA decimals and total supply, are never
+        invalidated.
+
+        Changes made by other clients are only noticed by asking for the
+        current round: a round-scoped entry is served for max_age seconds
+        after the round was last known to be current, then the read's
+        current_round is called (at most once per max_age across reads),
+        or without one the entry is fetched again.
+
+        Values are deep-copied into and out of the cache: callers own
+        what they get and may modify it without affecting later reads.
+    """
+
+    def __init__(self, max_age: float = 1.0):
+        self.max_age = max_age
+        self.hits    = 0
+        self.misses  = 0
+
+        self._lock       = threading.Lock()
+        self._round      = 0
+        self._checked_at = float("-inf")
+        self._entries    : dict[Hashable, tuple[Any, float]] = {}
+        self._permanent  : dict[Hashable, Any] = {}
+
+    @property
+    def round(self) -> int:
+        return self._round
+
+    def get(
+        self,
+        key          : Hashable,
+        fetch        : Callable[[], Any],
+        permanent    : bool = False,
+        round_of     : Callable[[Any], int | None] | None = None,
+        current_round: Callable[[], int] | None = None,
+    ) -> Any:
+        """
+            Return a copy of the cached value for key, calling fetch on
+            a miss.
+
+            Args:
+                key (Hashable): endpoint and arguments of the read.
+                fetch (Callable): performs the read; exceptions propagate
+                and nothing is cached.
+                permanent (bool, default=False): keep the value regardless
+                of the round.
+                round_of (Callable | None, default=None): extracts the
+                ledger round from the response, if it reports one.
+                current_round (Callable | None, default=None): returns the
+                current ledger round (e.g. algod's "last-round"), called
+                to revalidate an entry older than max_age.
+        """
+        if permanent:
+            with self._lock:
+                if key in self._permanent:
+                    self.hits += 1
+                    return copy.deepcopy(self._permanent[key])
+                self.misses += 1
+            value = fetch()
+            with self._lock:
+                self._permanent[key] = copy.deepcopy(value)
+            return value
+
+        with self._lock:
+            hit, value, stale = self._lookup(key)
+        if stale and current_round is not None:
+            # Checking the round revalidates every entry, not only this one.
+            round = current_round()
+            with self._lock:
+                self._observe(round)
+                hit, value, _ = self._lookup(key)
+        if hit:
+            return copy.deepcopy(value)
+
+        with self._lock:
+            self.misses += 1
+        fetched_at = time.monotonic()
+        value = fetch()
+        response_round = round_of(value) if round_of is not None else None
+
+        with self._lock:
+            if response_round is not None:
+                self._observe(response_round)
+            # A response older than the newest known round (e.g. from an
+            # indexer that hasn't caught up yet) is returned, not cached.
+            if response_round is None or response_round >= self._round:
+                self._entries[key] = (copy.deepcopy(value), fetched_at)
+        return value
+
+    def advance(self, round: int):
+        """
+            Tell the cache that the ledger reached round, invalidating
+            the entries read at earlier rounds.
+        """
+        with self._lock:
+            self._observe(round)
+
+    def clear(self):
+        """
+            Forget every entry and the known round, e.g. after the ledger
+            was rewound (see LocalNode.restore).
+        """
+        with self._lock:
+            self._round      = 0
+            self._checked_at = float("-inf")
+            self._entries.clear()
+            self._permanent.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits"     : self.hits,
+                "misses"   : self.misses,
+                "entries"  : len(self._entries),
+                "permanent": len(self._permanent),
+                "round"    : self._round,
+            }
+
+    def _lookup(self, key: Hashable) -> tuple[bool, Any, bool]:
+        # (hit, value, stale): a stale entry is cached but older than
+        # max_age.
+        if key not in self._entries:
+            return False, None, False
+        value, fetched_at = self._entries[key]
+        if time.monotonic() - max(fetched_at, self._checked_at) < self.max_age:
+            self.hits += 1
+            return True, value, False
+        return False, None, True
+
+    def _observe(self, round: int):
+        if round > self._round:
+            self._round = round
+            self._entries.clear()
+        if round >= self._round:
+            self._checked_at = time.monotonic()
+
+
+# Cache shared by the operations of a project (contract operations,
+# faucet, environment), so that a transaction confirmed by any of them
+# invalidates the reads of all the others.
+read_cache = RoundCache()
@@ -0,0 +1,22 @@
+# Consensus parameters of the protocol, shared by the funding planner and
+# the in-memory ledger that evaluates transactions the way algod does.
+
+MIN_TXN_FEE  = 1000
+MAX_TXN_LIFE = 1000
+APP_BUDGET   = 700
+
+# Minimum balance requirement components, in microAlgos.
+MIN_BALANCE          = 100_000
+ASSET_MIN_BALANCE    = 100_000
+APP_PAGE_MIN_BALANCE = 100_000
+SCHEMA_MIN_BALANCE   = 25_000
+UINT_MIN_BALANCE     = 3_500
+BYTES_MIN_BALANCE    = 25_000
+# Minimum balance requirement of a box: a flat amount plus an amount per
+# byte of its name and contents.
+BOX_FLAT_MIN_BALANCE = 2_500
+BOX_BYTE_MIN_BALANCE = 400
+
+
+if __name__ == "__main__":
+    pass
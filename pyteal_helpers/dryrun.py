@@ -0,0 +1,303 @@
+import base64
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+from algosdk import encoding, error
+from algosdk.future import transaction
+from algosdk.source_map import SourceMap
+from algosdk.v2client.algod import AlgodClient
+
+from pyteal_helpers.state import TEAL_BYTES
+
+# EvalDelta "action" field values.
+_SET_BYTES, _SET_UINT = 1, 2
+
+
+@dataclass
+class TraceLine:
+    """
+        One executed instruction. line is the 1-based line of the TEAL
+        source when the program's source was registered with the client
+        (see DryrunClient.add_source), of algod's disassembly otherwise.
+        stack is the operand stack before the instruction ran.
+    """
+    pc    : int
+    line  : int
+    source: str
+    stack : list[int | bytes]
+
+
+@dataclass
+class CallReport:
+    """
+        Dryrun of one application call of a group.
+    """
+    index       : int
+    app_id      : int
+    passed      : bool
+    cost        : int
+    budget_added: int
+    messages    : list[str]
+    scratch     : dict[int, int | bytes]
+    global_delta: dict[bytes, int | bytes | None]
+    local_deltas: dict[str, dict[bytes, int | bytes | None]]
+    logs        : list[bytes]
+    trace       : list[TraceLine]
+    error       : str | None = None
+
+    @property
+    def failure(self) -> TraceLine | None:
+        """
+            Instruction the call failed at, if it failed with an error.
+        """
+        return self.trace[-1] if self.error is not None and self.trace else None
+
+    def format_trace(self, last: int = 10) -> str:
+        """
+            Format the last executed instructions, most recent last, as
+            "pc line: source [stack]".
+        """
+        lines = []
+        for step in self.trace[-last:]:
+            stack = ", ".join(_format_value(value) for value in step.stack)
+            lines.append(f"{step.pc:>5} {step.line:>5}: {step.source:<40} [{stack}]")
+        if self.error is not None:
+            lines.append(f"error: {self.error}")
+        return "\n".join(lines)
+
+
+@dataclass
+class DryrunReport:
+    """
+        Dryrun of a transaction group: error holds the rejection of the
+        group that isn't tied to a program (e.g. an overspend), if any.
+    """
+    txids: list[str]
+    calls: list[CallReport] = field(default_factory=list)
+    error: str = ""
+
+    @property
+    def passed(self) -> bool:
+        return not self.error and all(call.passed for call in self.calls)
+
+    @property
+    def cost(self) -> int:
+        return sum(call.cost for call in self.calls)
+
+    def message(self) -> str:
+        if self.error:
+            return self.error
+        for call in self.calls:
+            if not call.passed:
+                failure = call.failure
+                where = f" at line {failure.line}: {failure.source}" if failure is not None else ""
+                return f"transaction {self.txids[call.index]}: {call.error or 'rejected by logic'}{where}"
+        return ""
+
+
+class DryrunStop(Exception):
+    """
+        Raised by a DryrunClient that doesn't submit, once the group an
+        operation sends has been dryrun.
+    """
+
+    def __init__(self, report: DryrunReport):
+        super().__init__(report.message() or "dryrun passed")
+        self.report = report
+
+
+class DryrunClient:
+    """
+        Wrapper of an algod client that dryruns every group before sending
+        it, so contract operations can be profiled or diagnosed by passing
+        it as their algod client:
+
+            client = DryrunClient(algod_client, sources=[approval_source])
+            swap(algod_client=client, ...)
+            client.reports[-1].calls[0].cost
+
+        A group the dryrun rejects is not sent: AlgodHTTPError is raised
+        with the failing TEAL line, as algod would reject it. Unless submit
+        is set, no group is sent at all (see dryrun).
+    """
+
+    def __init__(
+        self,
+        algod_client: AlgodClient,
+        sources     : list[str] = (),
+        submit      : bool = True
+    ):
+        self.algod_client = algod_client
+        self.submit       = submit
+        self.reports      : list[DryrunReport] = []
+
+        self._sources: dict[bytes, tuple[list[str], SourceMap]] = {}
+        for source in sources:
+            self.add_source(source)
+
+    def add_source(self, source: str):
+        """
+            Register the TEAL source of a program, so that program counters
+            are mapped back to it.
+        """
+        result = self.algod_client.compile(source, source_map=True)
+        program = base64.b64decode(result["result"])
+        self._sources[program] = (source.splitlines(), SourceMap(result["sourcemap"]))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.algod_client, name)
+
+    def send_transaction(self, txn, **kwargs) -> str:
+        return self.send_transactions([txn], **kwargs)
+
+    def send_transactions(self, txns: list, **kwargs) -> str:
+        report = self.dryrun(txns)
+        if not report.passed:
+            raise error.AlgodHTTPError(f"TransactionPool.Remember: {report.message()}", 400)
+        if not self.submit:
+            raise DryrunStop(report)
+        return self.algod_client.send_transactions(txns, **kwargs)
+
+    def dryrun(self, txns: list) -> DryrunReport:
+        """
+            Dryrun a signed group and record the report.
+        """
+        request = transaction.create_dryrun(self.algod_client, txns)
+        response = self.algod_client.dryrun(request)
+
+        report = DryrunReport(
+            txids=[txn.get_txid() for txn in txns],
+            error=response.get("error") or ""
+        )
+        for index, (txn, result) in enumerate(zip(txns, response["txns"])):
+            if "app-call-messages" not in result:
+                continue
+            report.calls.append(self._call_report(
+                index, txn.transaction, result, _program(request, txn.transaction)
+            ))
+        self.reports.append(report)
+        return report
+
+    def _call_report(self, index: int, txn, result: dict, program: bytes) -> CallReport:
+        source = self._sources.get(program)
+        disassembly = result.get("disassembly") or []
+
+        trace, scratch, failure = [], {}, None
+        for step in result.get("app-call-trace") or []:
+            if source is not None and source[1].get_line_for_pc(step["pc"]) is not None:
+                line = source[1].get_line_for_pc(step["pc"])
+                text = source[0][line].strip()
+            else:
+                line = step["line"]
+                text = disassembly[line].strip() if line < len(disassembly) else ""
+            trace.append(TraceLine(
+                pc=step["pc"],
+                line=line + 1,
+                source=text,
+                stack=[_decode_value(value) for value in step.get("stack", [])]
+            ))
+            if "scratch" in step:
+                scratch = {
+                    slot: _decode_value(value)
+                    for slot, value in enumerate(step["scratch"])
+                    if value.get("bytes") or value.get("uint")
+                }
+            if step.get("error"):
+                failure = step["error"]
+
+        messages = result.get("app-call-messages") or []
+        rejected = "REJECT" in messages
+        if rejected and failure is None:
+            failure = "; ".join(messages[messages.index("REJECT") + 1:]) or None
+
+        cost = result.get("budget-consumed")
+        return CallReport(
+            index=index,
+            app_id=txn.index,
+            passed=not rejected,
+            cost=cost if cost is not None else result.get("cost") or 0,
+            budget_added=result.get("budget-added") or 0,
+            messages=messages,
+            scratch=scratch,
+            global_delta=_decode_delta(result.get("global-delta") or []),
+            local_deltas={
+                delta["address"]: _decode_delta(delta["delta"])
+                for delta in result.get("local-deltas") or []
+            },
+            logs=[base64.b64decode(log) for log in result.get("logs") or []],
+            trace=trace,
+            error=failure
+        )
+
+
+def dryrun(
+    operation   : Callable[..., Any],
+    algod_client: AlgodClient,
+    *args,
+    sources     : list[str] = (),
+    **kwargs
+) -> DryrunReport | None:
+    """
+        Dryrun the group a contract operation would send, without sending
+        it. The operation is called with a non-submitting DryrunClient as
+        its algod_client, plus args and kwargs.
+
+        Args:
+            operation (Callable): contract operation, e.g. contract_ops.swap.
+            algod_client (AlgodClient): algod client.
+            sources (list[str], default=()): TEAL source of the programs,
+            to map program counters back to.
+
+        Returns:
+            (DryrunReport | None): report of the group the operation sent,
+            None if it didn't send any.
+    """
+    client = DryrunClient(algod_client, sources=sources, submit=False)
+    try:
+        operation(*args, algod_client=client, **kwargs)
+    except DryrunStop as stop:
+        return stop.report
+    return client.reports[-1] if client.reports else None
+
+
+def _program(request, txn) -> bytes:
+    if not isinstance(txn, transaction.ApplicationCallTxn):
+        return b""
+    clear = txn.on_complete == transaction.OnComplete.ClearStateOC
+    if txn.index == 0:
+        return (txn.clear_program if clear else txn.approval_program) or b""
+    for app in request.apps:
+        if isinstance(app, dict) and app["id"] == txn.index:
+            return app["params"]["clear-state-program" if clear else "approval-program"]
+    return b""
+
+
+def _decode_value(value: dict) -> int | bytes:
+    if value.get("type") == TEAL_BYTES:
+        return base64.b64decode(value.get("bytes", ""))
+    return value.get("uint", 0)
+
+
+def _decode_delta(delta: list[dict]) -> dict[bytes, int | bytes | None]:
+    decoded = {}
+    for entry in delta:
+        value = entry["value"]
+        if value["action"] == _SET_BYTES:
+            decoded[base64.b64decode(entry["key"])] = base64.b64decode(value.get("bytes", ""))
+        elif value["action"] == _SET_UINT:
+            decoded[base64.b64decode(entry["key"])] = value.get("uint", 0)
+        else:
+            decoded[base64.b64decode(entry["key"])] = None
+    return decoded
+
+
+def _format_value(value: int | bytes) -> str:
+    if isinstance(value, bytes):
+        if len(value) == 32:
+            return encoding.encode_address(value)
+        return "0x" + value.hex()
+    return str(value)
+
+
+if __name__ == "__main__":
+    pass
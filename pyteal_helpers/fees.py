@@ -0,0 +1,140 @@
+import copy
+import threading
+from typing import Any, Callable
+
+from algosdk import constants
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from pyteal_helpers import dryrun
+
+# Opcodes starting an inner transaction.
+_INNER_TXN_OPS = ("itxn_begin", "itxn_next")
+
+
+class FeePlanner:
+    """
+        Flat fees of the transactions sent by contract operations, derived
+        from the number of inner transactions each method issues. A
+        transaction pays the minimum fee for itself plus one minimum fee
+        for every inner transaction of the method it calls (inner
+        transactions of this project's contracts set their fee to 0 and
+        draw on the group's pooled fee), so a group pays exactly what it
+        needs whatever the network's minimum fee:
+
+            fee_planner = fees.FeePlanner({"optin_assets": 2, "swap": 1})
+            sp = fee_planner.params(algod_client.suggested_params(), "swap")
+
+        Counts are either declared, or measured by dryrunning an operation
+        (see measure). The fee per byte, non-zero only under congestion,
+        isn't accounted for.
+
+        A planner is shared by the threads sending operations: a count
+        being measured is only seen by the measuring thread, the others
+        keep the previous one until the measure is complete.
+    """
+
+    def __init__(self, inner_txns: dict[str, int] | None = None):
+        self._inner_txns = dict(inner_txns or {})
+        self._lock       = threading.Lock()
+        # Counts of the measure in progress in the current thread.
+        self._measuring  = threading.local()
+
+    def inner_txns(self, method: str | None) -> int:
+        """
+            Inner transactions issued by a method, 0 for the transactions
+            that don't call any (method None) or whose count is unknown.
+        """
+        if method is None:
+            return 0
+        measuring = getattr(self._measuring, "inner_txns", {})
+        if method in measuring:
+            return measuring[method]
+        with self._lock:
+            return self._inner_txns.get(method, 0)
+
+    def declare(self, method: str, inner_txns: int):
+        if inner_txns < 0:
+            raise ValueError(f"invalid inner transaction count: {inner_txns}")
+        with self._lock:
+            self._inner_txns[method] = inner_txns
+
+    def fee(self, min_fee: int, method: str | None = None) -> int:
+        """
+            Flat fee of a transaction calling method (None for any other
+            transaction).
+        """
+        return min_fee * (1 + self.inner_txns(method))
+
+    def group_fee(self, methods: list[str | None], min_fee: int = constants.min_txn_fee) -> int:
+        """
+            Pooled fee of a group, given the method called by each of its
+            transactions (None for the ones that aren't method calls).
+        """
+        return sum(self.fee(min_fee, method) for method in methods)
+
+    def params(
+        self,
+        suggested_parameters: transaction.SuggestedParams,
+        method              : str | None = None
+    ) -> transaction.SuggestedParams:
+        """
+            Copy of the suggested parameters with the flat fee of a
+            transaction calling method (None for any other transaction).
+        """
+        planned = copy.copy(suggested_parameters)
+        planned.flat_fee = True
+        planned.fee = self.fee(
+            suggested_parameters.min_fee or constants.min_txn_fee, method
+        )
+        return planned
+
+    def measure(
+        self,
+        method      : str,
+        operation   : Callable[..., Any],
+        algod_client: AlgodClient,
+        *args,
+        **kwargs
+    ) -> int:
+        """
+            Measure and declare the inner transactions issued by a method,
+            by dryrunning the group operation sends (see dryrun.dryrun).
+            The operation must plan its fees with this planner.
+
+            An evaluator checking fees (e.g. the local node) stops at the
+            first inner transaction the pooled fee doesn't cover, so the
+            dryrun is repeated with the count found so far until it stops
+            growing. Only the inner transactions of the group's top-level
+            calls are counted. The count is declared once measured; until
+            then, other threads keep planning with the previous one.
+
+            Returns:
+                (int): number of inner transactions.
+        """
+        outer = getattr(self._measuring, "inner_txns", {})
+        measuring = self._measuring.inner_txns = {**outer, method: 0}
+        try:
+            while True:
+                report = dryrun.dryrun(operation, algod_client, *args, **kwargs)
+                if report is None:
+                    raise ValueError(f"{operation.__name__} didn't send any transaction")
+                count = sum(
+                    1
+                    for call in report.calls
+                    for step in call.trace
+                    if step.source.split(" ", 1)[0] in _INNER_TXN_OPS
+                )
+                if count == measuring[method]:
+                    break
+                measuring[method] = count
+            if not report.passed:
+                raise ValueError(f"dryrun of {operation.__name__} failed: {report.message()}")
+        finally:
+            self._measuring.inner_txns = outer
+        self.declare(method, count)
+        return count
+
+
+if __name__ == "__main__":
+    pass
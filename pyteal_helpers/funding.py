@@ -0,0 +1,123 @@
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+from pyteal_helpers import utils
+from pyteal_helpers.consensus import (
+    APP_PAGE_MIN_BALANCE,
+    ASSET_MIN_BALANCE,
+    BOX_BYTE_MIN_BALANCE,
+    BOX_FLAT_MIN_BALANCE,
+    BYTES_MIN_BALANCE,
+    MIN_BALANCE,
+    MIN_TXN_FEE,
+    SCHEMA_MIN_BALANCE,
+    UINT_MIN_BALANCE,
+)
+
+
+def schema_min_balance(schema: transaction.StateSchema | None) -> int:
+    if schema is None:
+        return 0
+    return (
+        (SCHEMA_MIN_BALANCE + UINT_MIN_BALANCE) * (schema.num_uints or 0)
+        + (SCHEMA_MIN_BALANCE + BYTES_MIN_BALANCE) * (schema.num_byte_slices or 0)
+    )
+
+
+class FundPlan:
+    """
+        Balance an account needs for what it is planned to do: the minimum
+        balance requirement it ends up with, plus the microAlgos it spends
+        (fees and amounts sent). Steps can be chained:
+
+            plan = FundPlan().create_app(global_schema).transactions(2)
+            faucet.dispense(algod_client, address, plan.total)
+
+        The requirements follow the consensus parameters, as the local
+        node's ledger does.
+    """
+
+    def __init__(self):
+        self.min_balance = MIN_BALANCE
+        self.spending    = 0
+
+    @property
+    def total(self) -> int:
+        return self.min_balance + self.spending
+
+    def shortfall(self, balance: int) -> int:
+        """
+            Amount an account with the given balance is missing, 0 if none.
+        """
+        return max(self.total - balance, 0)
+
+    def create_app(
+        self,
+        global_schema: transaction.StateSchema | None = None,
+        extra_pages  : int = 0
+    ) -> "FundPlan":
+        """
+            Create an application (the creation's fee isn't included, see
+            transactions).
+        """
+        self.min_balance += APP_PAGE_MIN_BALANCE * (1 + extra_pages) + schema_min_balance(global_schema)
+        return self
+
+    def opt_in_app(self, local_schema: transaction.StateSchema | None = None) -> "FundPlan":
+        self.min_balance += APP_PAGE_MIN_BALANCE + schema_min_balance(local_schema)
+        return self
+
+    def hold_assets(self, count: int = 1) -> "FundPlan":
+        """
+            Hold count ASAs, opted in to or created.
+        """
+        self.min_balance += ASSET_MIN_BALANCE * count
+        return self
+
+    def boxes(self, name_length: int, size: int, count: int = 1) -> "FundPlan":
+        """
+            Hold count boxes of an application (for its account).
+        """
+        self.min_balance += count * (BOX_FLAT_MIN_BALANCE + BOX_BYTE_MIN_BALANCE * (name_length + size))
+        return self
+
+    def transactions(self, count: int = 1, fee: int = MIN_TXN_FEE) -> "FundPlan":
+        """
+            Pay the fee of count transactions.
+        """
+        self.spending += count * fee
+        return self
+
+    def spend(self, amount: int) -> "FundPlan":
+        """
+            Spend amount microAlgos, e.g. payments or fees of groups
+            planned with a fees.FeePlanner.
+        """
+        self.spending += amount
+        return self
+
+
+def top_up(
+    algod_client: AlgodClient,
+    funder_pk   : str,
+    addresses   : list[str],
+    plan        : FundPlan
+) -> int:
+    """
+        Send every account only what it is missing to carry out the plan,
+        so accounts funded by a previous run are reused as they are.
+
+        Returns:
+            (int): microAlgos sent.
+    """
+    shortfalls = {
+        address: plan.shortfall(algod_client.account_info(address, exclude="all")["amount"])
+        for address in addresses
+    }
+    shortfalls = {address: amount for address, amount in shortfalls.items() if amount > 0}
+    utils.fund_accounts(algod_client, funder_pk, list(shortfalls), list(shortfalls.values()))
+    return sum(shortfalls.values())
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,267 @@
+import base64
+import bisect
+import json
+import os
+
+from algosdk.v2client.algod import AlgodClient
+
+from pyteal_helpers import blocks
+from pyteal_helpers.state import KeyValueSchema
+
+# EvalDelta "at" (action) field values.
+SET_BYTES = 1
+SET_UINT  = 2
+DELETE    = 3
+
+# OnComplete values that remove the sender's local state.
+CLOSE_OUT   = 2
+CLEAR_STATE = 3
+
+
+class StateHistory:
+    """
+        Local, append-only history of an application's global and local
+        state.
+
+        State deltas of every call to the application are appended to a
+        delta log and, every snapshot_interval rounds, the whole state is
+        written as a snapshot which remembers the log offset it was taken
+        at. The state at any round N is rebuilt by loading the newest
+        snapshot not after N and replaying the few deltas between the two.
+
+        Layout of the store directory:
+            meta.json          last ingested round;
+            deltas.jsonl       one line per application call;
+            snapshots/R.json   full state after round R.
+    """
+
+    def __init__(
+        self,
+        directory        : str,
+        app_id           : int,
+        snapshot_interval: int = 1000,
+        schema           : KeyValueSchema | None = None,
+    ):
+        self.directory         = directory
+        self.app_id            = app_id
+        self.snapshot_interval = snapshot_interval
+        self.schema            = schema
+
+        os.makedirs(self._path("snapshots"), exist_ok=True)
+
+        self._snapshot_rounds = sorted(
+            int(name[: -len(".json")])
+            for name in os.listdir(self._path("snapshots"))
+            if name.endswith(".json")
+        )
+        try:
+            with open(self._path("meta.json"), "r") as f:
+                self.last_round = json.load(f)["last-round"]
+        except FileNotFoundError:
+            self.last_round = 0
+
+        # Rebuild the current state from the newest snapshot and the log
+        # tail written after it.
+        self._global, self._local = self._replay(self.last_round)
+
+    def ingest(self, algod_client: AlgodClient, stop_round: int):
+        """
+            Fetch and apply the blocks after the last ingested round, up to
+            stop_round included.
+        """
+        follower = blocks.BlockFollower(
+            algod_client=algod_client,
+            start_round=self.last_round + 1,
+            stop_round=stop_round,
+            app_ids={self.app_id},
+        )
+        for round, block in follower.blocks():
+            self.apply_block(round, block)
+
+    def apply_block(self, round: int, block: dict):
+        """
+            Apply the state deltas of the application calls in a block
+            (as decoded by blocks.decode_block). Blocks must be applied in
+            increasing round order.
+        """
+        if round <= self.last_round:
+            return
+
+        with open(self._path("deltas.jsonl"), "a") as log:
+            for _, txn, apply_data in blocks.iter_transactions(block):
+                delta = self._extract_delta(txn, apply_data)
+                if delta is None:
+                    continue
+                delta["round"] = round
+                _apply_delta(self._global, self._local, delta)
+                log.write(json.dumps(delta) + "\n")
+
+        last_snapshot = self._snapshot_rounds[-1] if self._snapshot_rounds else 0
+        if round - last_snapshot >= self.snapshot_interval:
+            self._write_snapshot(round)
+
+        self.last_round = round
+        # Write then rename, so a crash never leaves a truncated file.
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"last-round": round}, f)
+        os.replace(tmp_path, self._path("meta.json"))
+
+    def state_at(self, round: int) -> dict:
+        """
+            Return the application state right after a round, as 
+            {"global": {...}, "local": {address: {...}}}.
+
+            Keys are decoded with the schema if one was given, otherwise
+            they are UTF-8 strings and values are ints or bytes.
+        """
+        if round > self.last_round:
+            raise ValueError(
+                f"Round {round} not ingested yet (last round: {self.last_round})"
+            )
+
+        global_state, local_states = self._replay(round)
+        return {
+            "global": self._decode(global_state),
+            "local" : {
+                address: self._decode(local_state)
+                for address, local_state in local_states.items()
+            },
+        }
+
+    def _extract_delta(self, txn: dict, apply_data: dict) -> dict | None:
+        if txn.get("type") != "appl":
+            return None
+        app_id = txn.get("apid", 0) or apply_data.get("apid", 0)
+        if app_id != self.app_id:
+            return None
+
+        sender = blocks.decode_address(txn["snd"])
+        accounts = [sender] + [
+            blocks.decode_address(address) for address in txn.get("apat", [])
+        ]
+        eval_delta = apply_data.get("dt", {})
+
+        delta = {
+            "global": _encode_state_delta(eval_delta.get("gd", {})),
+            "local" : {
+                accounts[index]: _encode_state_delta(state_delta)
+                for index, state_delta in eval_delta.get("ld", {}).items()
+                if index < len(accounts)
+            },
+        }
+        if txn.get("apan", 0) in (CLOSE_OUT, CLEAR_STATE):
+            delta["closed"] = sender
+        return delta
+
+    def _replay(self, round: int) -> tuple[dict, dict]:
+        index = bisect.bisect_right(self._snapshot_rounds, round) - 1
+        if index >= 0:
+            with open(self._snapshot_path(self._snapshot_rounds[index]), "r") as f:
+                snapshot = json.load(f)
+            global_state = _decode_state(snapshot["global"])
+            local_states = {
+                address: _decode_state(local_state)
+                for address, local_state in snapshot["local"].items()
+            }
+            offset = snapshot["log-offset"]
+        else:
+            global_state, local_states, offset = {}, {}, 0
+
+        try:
+            with open(self._path("deltas.jsonl"), "r") as log:
+                log.seek(offset)
+                for line in log:
+                    delta = json.loads(line)
+                    if delta["round"] > round:
+                        break
+                    _apply_delta(global_state, local_states, delta)
+        except FileNotFoundError:
+            pass
+
+        return global_state, local_states
+
+    def _write_snapshot(self, round: int):
+        try:
+            log_offset = os.path.getsize(self._path("deltas.jsonl"))
+        except FileNotFoundError:
+            log_offset = 0
+
+        snapshot = {
+            "round"     : round,
+            "log-offset": log_offset,
+            "global"    : _encode_state(self._global),
+            "local"     : {
+                address: _encode_state(local_state)
+                for address, local_state in self._local.items()
+            },
+        }
+        tmp_path = self._snapshot_path(round) + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self._snapshot_path(round))
+        self._snapshot_rounds.append(round)
+
+    def _decode(self, raw_state: dict[bytes, int | bytes]) -> dict:
+        if self.schema is not None:
+            return self.schema.decode_raw(raw_state)
+        return {
+            key.decode("utf-8", "surrogateescape"): value
+            for key, value in raw_state.items()
+        }
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _snapshot_path(self, round: int) -> str:
+        return os.path.join(self.directory, "snapshots", f"{round}.json")
+
+
+def _apply_delta(global_state: dict, local_states: dict, delta: dict):
+    _apply_state_delta(global_state, delta["global"])
+    for address, state_delta in delta["local"].items():
+        _apply_state_delta(local_states.setdefault(address, {}), state_delta)
+    if "closed" in delta:
+        local_states.pop(delta["closed"], None)
+
+
+def _apply_state_delta(state: dict, encoded_delta: dict):
+    for key, (action, value) in encoded_delta.items():
+        key = base64.b64decode(key)
+        if action == SET_BYTES:
+            state[key] = base64.b64decode(value)
+        elif action == SET_UINT:
+            state[key] = value
+        else:
+            state.pop(key, None)
+
+
+def _encode_state_delta(state_delta: dict[bytes, dict]) -> dict:
+    encoded = {}
+    for key, value_delta in state_delta.items():
+        action = value_delta.get("at", DELETE)
+        if action == SET_BYTES:
+            value = base64.b64encode(value_delta.get("bs", b"")).decode()
+        elif action == SET_UINT:
+            value = value_delta.get("ui", 0)
+        else:
+            value = None
+        encoded[base64.b64encode(key).decode()] = [action, value]
+    return encoded
+
+
+def _encode_state(state: dict[bytes, int | bytes]) -> dict:
+    return {
+        base64.b64encode(key).decode(): (
+            [SET_BYTES, base64.b64encode(value).decode()]
+            if isinstance(value, bytes)
+            else [SET_UINT, value]
+        )
+        for key, value in state.items()
+    }
+
+
+def _decode_state(encoded_state: dict) -> dict[bytes, int | bytes]:
+    state = {}
+    _apply_state_delta(state, encoded_state)
+    return state
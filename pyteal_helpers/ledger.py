@@ -0,0 +1,1151 @@
+import base64
+import copy
+import time
+from dataclasses import dataclass, field
+
+import msgpack
+from algosdk import encoding
+from nacl.exceptions import BadSignatureError
+from nacl.signing import VerifyKey
+
+from pyteal_helpers import avm
+from pyteal_helpers.consensus import (
+    APP_BUDGET,
+    APP_PAGE_MIN_BALANCE,
+    ASSET_MIN_BALANCE,
+    BYTES_MIN_BALANCE,
+    MAX_TXN_LIFE,
+    MIN_BALANCE,
+    MIN_TXN_FEE,
+    SCHEMA_MIN_BALANCE,
+    UINT_MIN_BALANCE,
+)
+
+GENESIS_ID   = "pyteal-helpers-v1"
+GENESIS_HASH = encoding.checksum(GENESIS_ID.encode())
+
+NO_OP, OPT_IN, CLOSE_OUT, CLEAR_STATE, UPDATE_APPLICATION, DELETE_APPLICATION = range(6)
+
+# asset_params_get fields -> key in Asset.params.
+ASSET_PARAMS = {
+    "AssetTotal"        : "t",
+    "AssetDecimals"     : "dc",
+    "AssetDefaultFrozen": "df",
+    "AssetUnitName"     : "un",
+    "AssetName"         : "an",
+    "AssetURL"          : "au",
+    "AssetMetadataHash" : "am",
+    "AssetManager"      : "m",
+    "AssetReserve"      : "r",
+    "AssetFreeze"       : "f",
+    "AssetClawback"     : "c",
+}
+_ADDRESS_PARAMS = {"m", "r", "f", "c"}
+_UINT_PARAMS    = {"t", "dc", "df"}
+
+# Tag of the programs returned by compile_teal: a version byte of 0, which
+# no TEAL bytecode starts with, then a marker, so that the source they
+# carry can't be mistaken for bytecode.
+SOURCE_PROGRAM_PREFIX = b"\x00teal-source\x00"
+
+# Keys added to transaction dicts during evaluation (see Record.transaction).
+_APPLY_KEYS = ("dt", "caid_created", "apid_created")
+
+_MISSING = object()
+
+
+class LedgerError(Exception):
+    """
+        Rejection of a transaction group. result holds whatever was
+        evaluated before the failure (see GroupResult).
+    """
+
+    def __init__(self, message: str, result: "GroupResult | None" = None):
+        super().__init__(message)
+        self.result = result
+
+
+@dataclass
+class Account:
+    amount      : int = 0
+    assets      : dict[int, list] = field(default_factory=dict)   # id -> [amount, frozen]
+    local_states: dict[int, dict[bytes, int | bytes]] = field(default_factory=dict)
+    created_apps  : set[int] = field(default_factory=set)
+    created_assets: set[int] = field(default_factory=set)
+    auth_addr   : bytes | None = None
+
+
+@dataclass
+class Application:
+    id           : int
+    creator      : bytes
+    approval     : bytes
+    clear        : bytes
+    global_schema: tuple[int, int]    # (uints, byte slices)
+    local_schema : tuple[int, int]
+    extra_pages  : int = 0
+    global_state : dict[bytes, int | bytes] = field(default_factory=dict)
+
+
+@dataclass
+class Asset:
+    id     : int
+    creator: bytes
+    params : dict
+
+
+@dataclass
+class Record:
+    """
+        A confirmed (or, for inner transactions, executed) transaction.
+
+        txn uses msgpack keys and raw addresses; apply_data follows the
+        block encoding ("dt" with "gd", "ld", "lg" and "itx", plus "caid"
+        and "apid" for created assets and applications).
+    """
+    txid      : str
+    txn       : dict
+    sig       : bytes | None
+    round     : int
+    offset    : int
+    apply_data: dict = field(default_factory=dict)
+    inner     : list["Record"] = field(default_factory=list)
+
+    def transaction(self) -> dict:
+        """
+            Return the transaction fields, without the evaluation results
+            attached for the programs reading them.
+        """
+        return {key: value for key, value in self.txn.items() if key not in _APPLY_KEYS}
+
+
+@dataclass
+class Block:
+    round    : int
+    timestamp: int
+    records  : list[Record] = field(default_factory=list)
+
+
+@dataclass
+class Snapshot:
+    """
+        Point the ledger can be restored to (see Ledger.snapshot).
+    """
+    checkpoint : tuple
+    blocks     : int
+    time_offset: int
+
+
+@dataclass
+class GroupResult:
+    """
+        Outcome of a group: its records and, for every program run, the
+        avm.Execution paired with the application id and group index.
+        calls holds the executions of the top-level application calls
+        alone, by group index.
+    """
+    records   : list[Record] = field(default_factory=list)
+    executions: list[tuple[int, int, avm.Execution]] = field(default_factory=list)
+    calls     : dict[int, avm.Execution] = field(default_factory=dict)
+
+
+def compile_teal(source: str) -> bytes:
+    """
+        "Compile" TEAL for this ledger: programs are stored and evaluated
+        as source, so the result is the UTF-8 encoded text tagged with
+        SOURCE_PROGRAM_PREFIX (see decompile_teal). It isn't bytecode:
+        its bytes and hash differ from the ones algod compiles.
+    """
+    return SOURCE_PROGRAM_PREFIX + source.encode()
+
+
+def decompile_teal(program: bytes) -> str:
+    """
+        TEAL source of a program returned by compile_teal.
+
+        Raises:
+            LedgerError: if the program wasn't returned by compile_teal
+            (e.g. it is bytecode compiled by algod).
+    """
+    if not program.startswith(SOURCE_PROGRAM_PREFIX):
+        raise LedgerError("program is not tagged TEAL source; compile it with ledger.compile_teal")
+    try:
+        return program[len(SOURCE_PROGRAM_PREFIX):].decode()
+    except UnicodeDecodeError:
+        raise LedgerError("program is not tagged TEAL source; compile it with ledger.compile_teal")
+
+
+def application_address(app_id: int) -> bytes:
+    return encoding.checksum(b"appID" + app_id.to_bytes(8, "big"))
+
+
+def transaction_id(txn: dict) -> str:
+    digest = encoding.checksum(b"TX" + _pack(txn))
+    return base64.b32encode(digest).decode().rstrip("=")
+
+
+def group_id(txids: list[str]) -> bytes:
+    raw = [base64.b32decode(txid + "=" * (-len(txid) % 8)) for txid in txids]
+    return encoding.checksum(b"TG" + _pack({"txlist": raw}))
+
+
+def decode_signed_transactions(data: bytes) -> list[dict]:
+    """
+        Decode the concatenated msgpack signed transactions accepted by
+        algod's /v2/transactions endpoint.
+    """
+    unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+    unpacker.feed(data)
+    return list(unpacker)
+
+
+def _pack(value) -> bytes:
+    return msgpack.packb(_canonical(value), use_bin_type=True)
+
+
+def _canonical(value):
+    if isinstance(value, dict):
+        return {
+            key: _canonical(item)
+            for key, item in sorted(value.items())
+            if item not in (None, 0, b"", "", [], {}, False)
+        }
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def _address(address: str | bytes) -> bytes:
+    return encoding.decode_address(address) if isinstance(address, str) else address
+
+
+class Ledger:
+    """
+        In-memory ledger evaluating transaction groups the way algod does,
+        one round per group (or per batch of groups, see apply_groups), so
+        contracts can be exercised without a node.
+
+        Programs must be TEAL source as returned by compile_teal. Groups are
+        applied atomically: any failure leaves the ledger untouched.
+    """
+
+    def __init__(self, genesis: dict[str, int] | None = None, verify_signatures: bool = True):
+        self.verify_signatures = verify_signatures
+
+        self.accounts: dict[bytes, Account] = {}
+        self.apps    : dict[int, Application] = {}
+        self.assets  : dict[int, Asset] = {}
+        self.records : dict[str, Record] = {}
+        self.leases  : dict[tuple[bytes, bytes], int] = {}
+        self.blocks  : list[Block] = [Block(0, int(time.time()))]
+        self.next_id = 1
+        self.time_offset = 0
+
+        self._programs: dict[bytes, avm.Program] = {}
+        self._undo    : list[tuple[dict, object, object]] = []
+        self._saved   : set[tuple[int, object]] = set()
+        self._snapshots: list[Snapshot] = []
+
+        for address, amount in (genesis or {}).items():
+            self.fund(address, amount)
+
+    # Queries.
+
+    @property
+    def round(self) -> int:
+        return self.blocks[-1].round
+
+    @property
+    def timestamp(self) -> int:
+        return self.blocks[-1].timestamp
+
+    def account(self, address: str | bytes) -> Account:
+        return self.accounts.get(_address(address)) or Account()
+
+    def min_balance(self, address: str | bytes) -> int:
+        account = self.accounts.get(_address(address))
+        if account is None:
+            return MIN_BALANCE
+        total = MIN_BALANCE + ASSET_MIN_BALANCE * len(account.assets)
+        for app_id in account.created_apps:
+            app = self.apps[app_id]
+            total += APP_PAGE_MIN_BALANCE * (1 + app.extra_pages)
+            total += _schema_min_balance(app.global_schema)
+        for app_id in account.local_states:
+            total += APP_PAGE_MIN_BALANCE + _schema_min_balance(self.apps[app_id].local_schema)
+        return total
+
+    def program(self, data: bytes) -> avm.Program:
+        program = self._programs.get(data)
+        if program is None:
+            program = self._programs[data] = avm.Program(decompile_teal(data))
+        return program
+
+    # Updates.
+
+    def fund(self, address: str | bytes, amount: int):
+        """
+            Credit an account outside of any transaction (genesis funds).
+        """
+        self._mutable_account(_address(address)).amount += amount
+        self._settle()
+
+    def advance(self, seconds: int = 0) -> Block:
+        """
+            Close an empty round, optionally moving the clock forward.
+        """
+        self.time_offset += seconds
+        return self._new_block()
+
+    def send_raw(self, data: bytes) -> list[str]:
+        return self.send(decode_signed_transactions(data))
+
+    def send(self, stxns: list[dict]) -> list[str]:
+        """
+            Apply a signed transaction group (msgpack dicts) in a new round
+            and return the transaction ids.
+        """
+        return [record.txid for record in self.apply_group(stxns).records]
+
+    def apply_group(self, stxns: list[dict], commit: bool = True, trace: bool = False) -> GroupResult:
+        """
+            Evaluate a group in the next round. Unless commit is set the
+            ledger is rolled back afterwards, which makes this a dry run.
+        """
+        block = Block(self.round + 1, self._clock())
+        if not commit:
+            result = GroupResult()
+            checkpoint = self._checkpoint()
+            try:
+                _Group(self, stxns, block, result, trace).apply()
+            finally:
+                self._rollback(checkpoint)
+            return result
+
+        result = self._apply_in_block(stxns, block, trace)
+        self._settle()
+        self.blocks.append(block)
+        return result
+
+    def apply_groups(self, groups: list[list[dict]], commit: bool = True) -> list[GroupResult | LedgerError]:
+        """
+            Evaluate groups in order in a single new round, the way a
+            block is assembled from the pending pool: every group is
+            applied atomically on top of the previous ones, and the ones
+            that fail are left out of the block. Unless commit is set the
+            ledger is rolled back afterwards.
+
+            Returns:
+                (list): for every group, its GroupResult or the
+                LedgerError that rejected it.
+        """
+        block = Block(self.round + 1, self._clock())
+        checkpoint = self._checkpoint()
+        outcomes = []
+        try:
+            for stxns in groups:
+                try:
+                    outcomes.append(self._apply_in_block(stxns, block))
+                except LedgerError as e:
+                    outcomes.append(e)
+        except BaseException:
+            commit = False
+            raise
+        finally:
+            if commit:
+                self._commit(checkpoint)
+                self._settle()
+                self.blocks.append(block)
+            else:
+                self._rollback(checkpoint)
+                for record in block.records:
+                    self.records.pop(record.txid, None)
+        return outcomes
+
+    def snapshot(self) -> Snapshot:
+        """
+            Mark the current state so restore() can return to it. Until
+            the snapshot is released, every change is journaled, so
+            restoring costs as much as the changes made since, regardless
+            of the size of the ledger.
+        """
+        snapshot = Snapshot(self._checkpoint(), len(self.blocks), self.time_offset)
+        self._snapshots.append(snapshot)
+        return snapshot
+
+    def restore(self, snapshot: Snapshot):
+        """
+            Undo every change made since snapshot, rounds included. The
+            snapshot stays valid and can be restored again; the ones taken
+            after it are released.
+        """
+        index = self._snapshot_index(snapshot)
+        del self._snapshots[index + 1:]
+
+        length, _, next_id = snapshot.checkpoint
+        self._rollback((length, set(), next_id))
+        for block in self.blocks[snapshot.blocks:]:
+            for record in block.records:
+                self.records.pop(record.txid, None)
+        del self.blocks[snapshot.blocks:]
+        self.time_offset = snapshot.time_offset
+
+    def release(self, snapshot: Snapshot):
+        """
+            Keep the changes made since snapshot and stop journaling for it.
+        """
+        index = self._snapshot_index(snapshot)
+        for released in reversed(self._snapshots[index:]):
+            self._commit(released.checkpoint)
+        del self._snapshots[index:]
+        self._settle()
+
+    def _snapshot_index(self, snapshot: Snapshot) -> int:
+        for index, active in enumerate(self._snapshots):
+            if active is snapshot:
+                return index
+        raise LedgerError("snapshot was released")
+
+    def _apply_in_block(self, stxns: list[dict], block: Block, trace: bool = False) -> GroupResult:
+        # Apply a group and append its records to block, which is only
+        # added to the ledger by the caller.
+        result = GroupResult()
+        checkpoint = self._checkpoint()
+        try:
+            _Group(self, stxns, block, result, trace).apply()
+        except BaseException:
+            self._rollback(checkpoint)
+            raise
+        self._commit(checkpoint)
+        for record in result.records:
+            record.offset = len(block.records)
+            block.records.append(record)
+            self.records[record.txid] = record
+        return result
+
+    def _clock(self) -> int:
+        return max(self.timestamp, int(time.time()) + self.time_offset)
+
+    def _new_block(self) -> Block:
+        block = Block(self.round + 1, self._clock())
+        self.blocks.append(block)
+        return block
+
+    # Journal: every mutable object is copied before its first change so
+    # failed groups (and failed clear programs) can be undone. Entries are
+    # kept past the end of a group while a snapshot is active.
+
+    def _checkpoint(self):
+        checkpoint = (len(self._undo), self._saved, self.next_id)
+        self._saved = set()
+        return checkpoint
+
+    def _rollback(self, checkpoint):
+        length, saved, next_id = checkpoint
+        while len(self._undo) > length:
+            table, key, previous = self._undo.pop()
+            if previous is _MISSING:
+                table.pop(key, None)
+            else:
+                table[key] = previous
+        self._saved = saved
+        self.next_id = next_id
+
+    def _commit(self, checkpoint):
+        self._saved |= checkpoint[1]
+
+    def _settle(self):
+        # Without snapshots, committed changes never need to be undone.
+        if not self._snapshots:
+            self._undo.clear()
+            self._saved.clear()
+
+    def _touch(self, table: dict, key):
+        marker = (id(table), key)
+        if marker not in self._saved:
+            self._saved.add(marker)
+            previous = table.get(key, _MISSING)
+            self._undo.append((table, key, previous if previous is _MISSING else copy.deepcopy(previous)))
+
+    def _mutable_account(self, address: bytes) -> Account:
+        self._touch(self.accounts, address)
+        return self.accounts.setdefault(address, Account())
+
+    def _mutable_app(self, app_id: int) -> Application:
+        self._touch(self.apps, app_id)
+        return self.apps[app_id]
+
+    def _mutable_asset(self, asset_id: int) -> Asset:
+        self._touch(self.assets, asset_id)
+        return self.assets[asset_id]
+
+    def _lease(self, key: tuple[bytes, bytes], last_valid: int):
+        self._touch(self.leases, key)
+        self.leases[key] = last_valid
+
+
+def _schema_min_balance(schema: tuple[int, int]) -> int:
+    uints, byte_slices = schema
+    return (
+        (SCHEMA_MIN_BALANCE + UINT_MIN_BALANCE) * uints
+        + (SCHEMA_MIN_BALANCE + BYTES_MIN_BALANCE) * byte_slices
+    )
+
+
+def _schema(schema: dict | None) -> tuple[int, int]:
+    schema = schema or {}
+    return schema.get("nui", 0), schema.get("nbs", 0)
+
+
+def _count_schema(state: dict) -> tuple[int, int]:
+    uints = sum(1 for value in state.values() if isinstance(value, int))
+    return uints, len(state) - uints
+
+
+def _state_delta(changes: dict) -> dict:
+    delta = {}
+    for key, value in changes.items():
+        if value is None:
+            delta[key] = {"at": 3}
+        elif isinstance(value, int):
+            delta[key] = {"at": 2, "ui": value}
+        else:
+            delta[key] = {"at": 1, "bs": value}
+    return delta
+
+
+class _Group:
+    """
+        Evaluation of one top-level group against the ledger.
+    """
+
+    def __init__(self, ledger: Ledger, stxns: list[dict], block: Block, result: GroupResult, trace: bool):
+        self.ledger = ledger
+        self.stxns  = stxns
+        self.block  = block
+        self.result = result
+        self.trace  = trace
+        # Evaluation adds apply data to the transactions (see _APPLY_KEYS):
+        # work on copies so the same group can be evaluated again.
+        self.txns   = [dict(stxn.get("txn", {})) for stxn in stxns]
+
+        app_calls = sum(1 for txn in self.txns if txn.get("type") == "appl")
+        self.budget     = avm.Budget(APP_BUDGET * app_calls)
+        self.app_calls  = app_calls
+        self.fee_credit = 0
+        self.touched    : set[bytes] = set()
+
+    def apply(self):
+        if not 0 < len(self.stxns) <= 16:
+            raise LedgerError(f"group size {len(self.stxns)} is out of range")
+        txids = [transaction_id(txn) for txn in self.txns]
+        self._check_group(txids)
+
+        total_fees = sum(txn.get("fee", 0) for txn in self.txns)
+        self.fee_credit = total_fees - MIN_TXN_FEE * len(self.txns)
+        if self.fee_credit < 0:
+            raise LedgerError(
+                f"transaction {txids[0]}: fee too small: group pays {total_fees}, "
+                f"requires {MIN_TXN_FEE * len(self.txns)}"
+            )
+
+        for index, (stxn, txn, txid) in enumerate(zip(self.stxns, self.txns, txids)):
+            try:
+                self._check_transaction(stxn, txn, txid)
+                record = Record(txid, txn, stxn.get("sig"), self.block.round, 0)
+                self.result.records.append(record)
+                self.touched = set()
+                self.apply_transaction(txn, index, self.txns, record, caller=0, depth=0)
+                self._check_min_balances()
+            except avm.AVMError as e:
+                raise LedgerError(f"transaction {txid}: logic eval error: {e}", self.result)
+            except LedgerError as e:
+                if e.result is not None:
+                    raise
+                raise LedgerError(f"transaction {txid}: {e}", self.result)
+
+    def _check_group(self, txids: list[str]):
+        groups = {txn.get("grp") for txn in self.txns}
+        if len(self.txns) == 1 and groups == {None}:
+            return
+        if len(groups) != 1 or None in groups:
+            raise LedgerError("inconsistent group values")
+        # The group id hashes the ids the transactions have without it.
+        ungrouped = [transaction_id({k: v for k, v in txn.items() if k != "grp"}) for txn in self.txns]
+        if groups.pop() != group_id(ungrouped):
+            raise LedgerError("incomplete group: group id does not match transactions")
+
+    def _check_transaction(self, stxn: dict, txn: dict, txid: str):
+        ledger = self.ledger
+        if txid in ledger.records:
+            raise LedgerError("transaction already in ledger")
+        if txn.get("gh", GENESIS_HASH) != GENESIS_HASH:
+            raise LedgerError("genesis hash mismatch")
+        first, last = txn.get("fv", 0), txn.get("lv", 0)
+        if not first <= self.block.round <= last:
+            raise LedgerError(f"txn dead: round {self.block.round} outside of {first}--{last}")
+        if last - first > MAX_TXN_LIFE:
+            raise LedgerError(f"validity period {last - first} exceeds {MAX_TXN_LIFE}")
+        if txn.get("fee", 0) < 0:
+            raise LedgerError("negative fee")
+
+        sender = txn.get("snd", avm.ZERO_ADDRESS)
+        if "lx" in txn:
+            key = (sender, txn["lx"])
+            if ledger.leases.get(key, -1) >= self.block.round:
+                raise LedgerError(f"using an overlapping lease (sender {encoding.encode_address(sender)})")
+            ledger._lease(key, last)
+
+        if not ledger.verify_signatures:
+            return
+        if "lsig" in stxn or "msig" in stxn:
+            raise LedgerError("only single signatures are supported")
+        signer = stxn.get("sgnr") or ledger.account(sender).auth_addr or sender
+        try:
+            VerifyKey(signer).verify(b"TX" + _pack(txn), stxn.get("sig", b""))
+        except (BadSignatureError, ValueError):
+            raise LedgerError("signature validation failed")
+
+    def _check_min_balances(self):
+        ledger = self.ledger
+        for address in self.touched:
+            account = ledger.accounts.get(address)
+            if account is None:
+                continue
+            required = ledger.min_balance(address)
+            if account.amount < required:
+                raise LedgerError(
+                    f"account {encoding.encode_address(address)} balance {account.amount} "
+                    f"below min {required}"
+                )
+
+    # Transactions.
+
+    def apply_transaction(self, txn: dict, index: int, group: list[dict], record: Record, caller: int, depth: int):
+        ledger = self.ledger
+        sender = txn.get("snd", avm.ZERO_ADDRESS)
+        account = self._debit(sender, txn.get("fee", 0))
+
+        rekey = txn.get("rekey")
+        if rekey:
+            account.auth_addr = None if rekey == sender else rekey
+
+        kind = txn.get("type")
+        if kind == "pay":
+            self._payment(txn, sender)
+        elif kind == "axfer":
+            self._asset_transfer(txn, sender)
+        elif kind == "acfg":
+            self._asset_config(txn, sender, record)
+        elif kind == "afrz":
+            self._asset_freeze(txn, sender)
+        elif kind == "appl":
+            self._application_call(txn, index, group, record, caller, depth)
+        elif kind == "keyreg":
+            pass
+        else:
+            raise LedgerError(f"unknown transaction type {kind}")
+
+        # The sender's account goes away once it holds nothing.
+        account = ledger.accounts.get(sender)
+        if account is not None and account == Account():
+            ledger._touch(ledger.accounts, sender)
+            del ledger.accounts[sender]
+
+    def _debit(self, address: bytes, amount: int) -> Account:
+        account = self.ledger._mutable_account(address)
+        self.touched.add(address)
+        if account.amount < amount:
+            raise LedgerError(
+                f"overspend (account {encoding.encode_address(address)}, "
+                f"data {{_struct:{{}} Status:Offline MicroAlgos:{{Raw:{account.amount}}}}}, "
+                f"tried to spend {{{amount}}})"
+            )
+        account.amount -= amount
+        return account
+
+    def _credit(self, address: bytes, amount: int):
+        account = self.ledger._mutable_account(address)
+        self.touched.add(address)
+        account.amount += amount
+
+    def _payment(self, txn: dict, sender: bytes):
+        amount = txn.get("amt", 0)
+        self._debit(sender, amount)
+        self._credit(txn.get("rcv", avm.ZERO_ADDRESS), amount)
+
+        close_to = txn.get("close")
+        if close_to:
+            account = self.ledger._mutable_account(sender)
+            if account.assets or account.local_states or account.created_apps:
+                raise LedgerError("cannot close account with assets, applications or local state")
+            remainder = account.amount
+            account.amount = 0
+            self._credit(close_to, remainder)
+            account.auth_addr = None
+
+    def _holding(self, address: bytes, asset_id: int) -> list:
+        account = self.ledger._mutable_account(address)
+        self.touched.add(address)
+        holding = account.assets.get(asset_id)
+        if holding is None:
+            raise LedgerError(
+                f"asset {asset_id} missing from {encoding.encode_address(address)}"
+            )
+        return holding
+
+    def _asset_transfer(self, txn: dict, sender: bytes):
+        ledger = self.ledger
+        asset_id = txn.get("xaid", 0)
+        asset = ledger.assets.get(asset_id)
+        if asset is None:
+            raise LedgerError(f"asset {asset_id} does not exist or has been deleted")
+        receiver = txn.get("arcv", avm.ZERO_ADDRESS)
+        amount = txn.get("aamt", 0)
+
+        # Opt-in: a zero transfer to oneself.
+        if receiver == sender and amount == 0 and "asnd" not in txn:
+            account = ledger._mutable_account(sender)
+            self.touched.add(sender)
+            if asset_id not in account.assets:
+                account.assets[asset_id] = [0, bool(asset.params.get("df"))]
+            return
+
+        source = sender
+        clawback = txn.get("asnd")
+        if clawback:
+            if asset.params.get("c") != sender:
+                raise LedgerError("clawback called by non-clawback address")
+            source = clawback
+
+        if amount:
+            from_holding = self._holding(source, asset_id)
+            to_holding = self._holding(receiver, asset_id)
+            if not clawback and (from_holding[1] or to_holding[1]):
+                raise LedgerError(f"asset {asset_id} frozen")
+            if from_holding[0] < amount:
+                raise LedgerError(
+                    f"underflow on subtracting {amount} from sender amount {from_holding[0]}"
+                )
+            from_holding[0] -= amount
+            to_holding[0] += amount
+
+        close_to = txn.get("aclose")
+        if close_to:
+            if sender == asset.creator:
+                raise LedgerError("cannot close asset by its creator")
+            holding = self._holding(sender, asset_id)
+            remainder = holding[0]
+            if remainder:
+                self._holding(close_to, asset_id)[0] += remainder
+            del ledger._mutable_account(sender).assets[asset_id]
+
+    def _asset_config(self, txn: dict, sender: bytes, record: Record):
+        ledger = self.ledger
+        asset_id = txn.get("caid", 0)
+        params = dict(txn.get("apar", {}))
+
+        if asset_id == 0:
+            asset_id = ledger.next_id
+            ledger.next_id += 1
+            ledger._touch(ledger.assets, asset_id)
+            ledger.assets[asset_id] = Asset(asset_id, sender, params)
+            account = ledger._mutable_account(sender)
+            account.created_assets.add(asset_id)
+            account.assets[asset_id] = [params.get("t", 0), False]
+            record.apply_data["caid"] = asset_id
+            self.touched.add(sender)
+            return
+
+        asset = ledger.assets.get(asset_id)
+        if asset is None:
+            raise LedgerError(f"asset {asset_id} does not exist or has been deleted")
+        if asset.params.get("m") != sender:
+            raise LedgerError("this transaction should be issued by the manager")
+
+        if not params:
+            holding = ledger.account(asset.creator).assets.get(asset_id, [0])
+            if holding[0] != asset.params.get("t", 0):
+                raise LedgerError("cannot destroy asset: creator is holding only part of the supply")
+            del ledger._mutable_account(asset.creator).assets[asset_id]
+            ledger._mutable_account(asset.creator).created_assets.discard(asset_id)
+            ledger._touch(ledger.assets, asset_id)
+            del ledger.assets[asset_id]
+            return
+
+        # Only the role addresses can change, and cleared ones stay cleared.
+        asset = ledger._mutable_asset(asset_id)
+        for key in _ADDRESS_PARAMS:
+            if params.get(key) and not asset.params.get(key):
+                raise LedgerError("cannot change an empty asset role address")
+            asset.params[key] = params.get(key)
+
+    def _asset_freeze(self, txn: dict, sender: bytes):
+        asset = self.ledger.assets.get(txn.get("faid", 0))
+        if asset is None:
+            raise LedgerError(f"asset {txn.get('faid', 0)} does not exist or has been deleted")
+        if asset.params.get("f") != sender:
+            raise LedgerError("freeze not allowed: sender is not the freeze account")
+        self._holding(txn.get("fadd", avm.ZERO_ADDRESS), asset.id)[1] = bool(txn.get("afrz"))
+
+    def _application_call(self, txn: dict, index: int, group: list[dict], record: Record, caller: int, depth: int):
+        ledger = self.ledger
+        sender = txn.get("snd", avm.ZERO_ADDRESS)
+        on_completion = txn.get("apan", NO_OP)
+        app_id = txn.get("apid", 0)
+
+        if app_id == 0:
+            app_id = ledger.next_id
+            ledger.next_id += 1
+            extra_pages = txn.get("apep", 0)
+            if extra_pages > 3:
+                raise LedgerError("tx.ExtraProgramPages exceeds MaxExtraAppProgramPages = 3")
+            ledger._touch(ledger.apps, app_id)
+            ledger.apps[app_id] = Application(
+                id            = app_id,
+                creator       = sender,
+                approval      = txn.get("apap", b""),
+                clear         = txn.get("apsu", b""),
+                global_schema = _schema(txn.get("apgs")),
+                local_schema  = _schema(txn.get("apls")),
+                extra_pages   = extra_pages,
+            )
+            ledger._mutable_account(sender).created_apps.add(app_id)
+            self.touched.add(sender)
+            record.apply_data["apid"] = app_id
+        elif app_id not in ledger.apps:
+            raise LedgerError(f"application {app_id} does not exist")
+
+        app = ledger.apps[app_id]
+        if on_completion == OPT_IN:
+            account = ledger._mutable_account(sender)
+            if app_id in account.local_states:
+                raise LedgerError(f"account {encoding.encode_address(sender)} has already opted in to app {app_id}")
+            account.local_states[app_id] = {}
+            self.touched.add(sender)
+        elif on_completion in (CLOSE_OUT, CLEAR_STATE):
+            if app_id not in ledger.account(sender).local_states:
+                raise LedgerError(f"account {encoding.encode_address(sender)} is not opted in to app {app_id}")
+
+        ctx = EvalContext(self, txn, index, group, app_id, caller, depth, record)
+        if on_completion == CLEAR_STATE:
+            # A failing clear program only discards its own changes.
+            checkpoint = ledger._checkpoint()
+            try:
+                passed = self._run(ctx, app.clear, index)
+            except avm.AVMError:
+                passed = False
+            if passed:
+                ledger._commit(checkpoint)
+            else:
+                ledger._rollback(checkpoint)
+                ctx.reset_deltas()
+            ledger._mutable_account(sender).local_states.pop(app_id, None)
+            self.touched.add(sender)
+        else:
+            if not self._run(ctx, app.approval, index):
+                raise LedgerError("rejected by logic")
+
+            if on_completion == CLOSE_OUT:
+                ledger._mutable_account(sender).local_states.pop(app_id, None)
+            elif on_completion == UPDATE_APPLICATION:
+                app = ledger._mutable_app(app_id)
+                app.approval = txn.get("apap", b"")
+                app.clear = txn.get("apsu", b"")
+            elif on_completion == DELETE_APPLICATION:
+                ledger._touch(ledger.apps, app_id)
+                del ledger.apps[app_id]
+                ledger._mutable_account(app.creator).created_apps.discard(app_id)
+                self.touched.add(app.creator)
+
+        if app_id in ledger.apps:
+            self._check_schema(app_id, ctx)
+        ctx.finish()
+
+    def _run(self, ctx: "EvalContext", program: bytes, index: int) -> bool:
+        try:
+            ctx.execution = avm.evaluate(self.ledger.program(program), ctx, self.budget, self.trace)
+            return ctx.execution.passed
+        finally:
+            # Failed evaluations are reported through ctx.on_error.
+            execution = ctx.execution
+            if execution is not None:
+                self.result.executions.append((ctx.app_id, index, execution))
+                if ctx.depth == 0:
+                    self.result.calls[index] = execution
+
+    def _check_schema(self, app_id: int, ctx: "EvalContext"):
+        app = self.ledger.apps[app_id]
+        uints, byte_slices = _count_schema(app.global_state)
+        if uints > app.global_schema[0] or byte_slices > app.global_schema[1]:
+            raise LedgerError(f"store integer count {uints} exceeds schema integer count {app.global_schema[0]}"
+                              if uints > app.global_schema[0] else
+                              f"store bytes count {byte_slices} exceeds schema bytes count {app.global_schema[1]}")
+        for address in ctx.local_deltas:
+            state = self.ledger.account(address).local_states.get(app_id)
+            if state is None:
+                continue
+            uints, byte_slices = _count_schema(state)
+            if uints > app.local_schema[0] or byte_slices > app.local_schema[1]:
+                raise LedgerError(f"local state of {encoding.encode_address(address)} exceeds schema")
+
+
+class EvalContext:
+    """
+        State and ledger access of one application call, as used by
+        avm.evaluate.
+    """
+
+    def __init__(self, group: _Group, txn: dict, index: int, txns: list[dict], app_id: int, caller: int, depth: int, record: Record):
+        self.group_state = group
+        self.ledger      = group.ledger
+        self.txn         = txn
+        self.group_index = index
+        self.group       = txns
+        self.app_id      = app_id
+        self.caller_app_id = caller
+        self.depth       = depth
+        self.record      = record
+
+        self.app_address = application_address(app_id)
+        self.creator     = self.ledger.apps[app_id].creator
+        self.caller_app_address = application_address(caller) if caller else avm.ZERO_ADDRESS
+        self.round       = group.block.round
+        self.timestamp   = self.ledger.timestamp
+        self.min_fee     = MIN_TXN_FEE
+        self.budget      = group.budget
+
+        self.global_deltas: dict[bytes, int | bytes | None] = {}
+        self.local_deltas : dict[bytes, dict[bytes, int | bytes | None]] = {}
+        self.logs         : list[bytes] = []
+        self.execution    : avm.Execution | None = None
+
+    @property
+    def app_calls_in_group(self) -> int:
+        return self.group_state.app_calls
+
+    def txid(self, txn: dict) -> str:
+        return transaction_id({key: value for key, value in txn.items() if key not in _APPLY_KEYS})
+
+    def on_error(self, execution: avm.Execution):
+        self.execution = execution
+
+    def reset_deltas(self):
+        self.global_deltas = {}
+        self.local_deltas = {}
+        self.logs = []
+
+    def finish(self):
+        """
+            Store the evaluation delta in the apply data of the record.
+        """
+        delta = self.record.apply_data.setdefault("dt", {})
+        if self.global_deltas:
+            delta["gd"] = _state_delta(self.global_deltas)
+        if self.local_deltas:
+            accounts = [self.txn.get("snd")] + list(self.txn.get("apat", []))
+            shared = []
+            local = {}
+            for address, changes in self.local_deltas.items():
+                if address not in accounts:
+                    shared.append(address)
+                    accounts.append(address)
+                local[accounts.index(address)] = _state_delta(changes)
+            delta["ld"] = local
+            if shared:
+                delta["sa"] = shared
+        if self.logs:
+            delta["lg"] = list(self.logs)
+        if self.record.inner:
+            delta["itx"] = [_inner_apply(inner) for inner in self.record.inner]
+        if not delta:
+            del self.record.apply_data["dt"]
+        self.txn_apply_data()
+
+    def txn_apply_data(self):
+        # Expose logs to gtxn/itxn readers of this transaction.
+        if "dt" in self.record.apply_data:
+            self.txn["dt"] = self.record.apply_data["dt"]
+
+    # References.
+
+    def account_ref(self, value) -> bytes:
+        if isinstance(value, int):
+            accounts = [self.txn.get("snd", avm.ZERO_ADDRESS)] + list(self.txn.get("apat", []))
+            if value >= len(accounts):
+                raise avm.AVMError(f"invalid Account reference {value}")
+            return accounts[value]
+        if len(value) != 32:
+            raise avm.AVMError("invalid address length")
+        return value
+
+    def app_ref(self, value) -> int:
+        foreign = self.txn.get("apfa", [])
+        if value == 0:
+            return self.app_id
+        if value in foreign or value == self.app_id:
+            return value
+        if value <= len(foreign):
+            return foreign[value - 1]
+        return value
+
+    def asset_ref(self, value) -> int:
+        foreign = self.txn.get("apas", [])
+        if value in foreign:
+            return value
+        if value < len(foreign):
+            return foreign[value]
+        return value
+
+    # Accounts and assets.
+
+    def balance(self, address: bytes) -> int:
+        return self.ledger.account(address).amount
+
+    def min_balance(self, address: bytes) -> int:
+        return self.ledger.min_balance(address)
+
+    def acct_params(self, address: bytes) -> dict:
+        account = self.ledger.account(address)
+        return {
+            "AcctBalance"   : account.amount,
+            "AcctMinBalance": self.ledger.min_balance(address),
+            "AcctAuthAddr"  : account.auth_addr or avm.ZERO_ADDRESS,
+        }
+
+    def asset_holding(self, address: bytes, asset_id: int) -> list | None:
+        return self.ledger.account(address).assets.get(asset_id)
+
+    def asset_params(self, asset_id: int) -> dict | None:
+        asset = self.ledger.assets.get(asset_id)
+        if asset is None:
+            return None
+        params = {"AssetCreator": asset.creator}
+        for name, key in ASSET_PARAMS.items():
+            value = asset.params.get(key)
+            if key in _UINT_PARAMS:
+                params[name] = int(value or 0)
+            elif key in _ADDRESS_PARAMS:
+                params[name] = value or avm.ZERO_ADDRESS
+            else:
+                params[name] = value.encode() if isinstance(value, str) else (value or b"")
+        return params
+
+    def app_params(self, app_id: int) -> dict | None:
+        app = self.ledger.apps.get(app_id)
+        if app is None:
+            return None
+        return {
+            "AppApprovalProgram"   : app.approval,
+            "AppClearStateProgram" : app.clear,
+            "AppGlobalNumUint"     : app.global_schema[0],
+            "AppGlobalNumByteSlice": app.global_schema[1],
+            "AppLocalNumUint"      : app.local_schema[0],
+            "AppLocalNumByteSlice" : app.local_schema[1],
+            "AppExtraProgramPages" : app.extra_pages,
+            "AppCreator"           : app.creator,
+            "AppAddress"           : application_address(app_id),
+        }
+
+    # Application state.
+
+    def opted_in(self, address: bytes, app_id: int) -> bool:
+        return app_id in self.ledger.account(address).local_states
+
+    def _local_state(self, address: bytes, app_id: int, strict: bool = True) -> dict | None:
+        state = self.ledger.account(address).local_states.get(app_id)
+        if state is None and strict:
+            raise avm.AVMError(f"{encoding.encode_address(address)} has not opted in to app {app_id}")
+        return state
+
+    def local_get(self, address: bytes, app_id: int, key: bytes, strict: bool = True):
+        state = self._local_state(address, app_id, strict)
+        return None if state is None else state.get(key)
+
+    def local_put(self, address: bytes, key: bytes, value):
+        self._local_state(address, self.app_id)
+        account = self.ledger._mutable_account(address)
+        account.local_states[self.app_id][key] = value
+        self.local_deltas.setdefault(address, {})[key] = value
+
+    def local_del(self, address: bytes, key: bytes):
+        self._local_state(address, self.app_id)
+        account = self.ledger._mutable_account(address)
+        if account.local_states[self.app_id].pop(key, _MISSING) is not _MISSING:
+            self.local_deltas.setdefault(address, {})[key] = None
+
+    def global_get(self, app_id: int, key: bytes):
+        app = self.ledger.apps.get(app_id)
+        return None if app is None else app.global_state.get(key)
+
+    def global_put(self, key: bytes, value):
+        self.ledger._mutable_app(self.app_id).global_state[key] = value
+        self.global_deltas[key] = value
+
+    def global_del(self, key: bytes):
+        if self.ledger._mutable_app(self.app_id).global_state.pop(key, _MISSING) is not _MISSING:
+            self.global_deltas[key] = None
+
+    def log(self, message: bytes):
+        self.logs.append(message)
+
+    # Inner transactions.
+
+    def new_inner_txn(self) -> dict:
+        return {
+            "snd": self.app_address,
+            "fv" : self.round,
+            "lv" : self.round + MAX_TXN_LIFE,
+            "gh" : GENESIS_HASH,
+        }
+
+    def submit_inner(self, txns: list[dict]) -> list[dict]:
+        group = self.group_state
+        if self.depth >= avm.MAX_CALL_DEPTH:
+            raise avm.AVMError("appl depth exceeded")
+
+        for txn in txns:
+            if "type" not in txn:
+                raise avm.AVMError("inner transaction has no type")
+            sender = txn["snd"]
+            if sender != self.app_address and self.ledger.account(sender).auth_addr != self.app_address:
+                raise avm.AVMError(f"unauthorized inner transaction sender {encoding.encode_address(sender)}")
+            if "fee" not in txn:
+                # Prefer the group's surplus, paying the minimum otherwise.
+                if group.fee_credit >= MIN_TXN_FEE:
+                    group.fee_credit -= MIN_TXN_FEE
+                    txn["fee"] = 0
+                else:
+                    txn["fee"] = MIN_TXN_FEE
+            else:
+                group.fee_credit += txn["fee"] - MIN_TXN_FEE
+                if group.fee_credit < 0:
+                    raise avm.AVMError("fee too small")
+            if txn["type"] == "appl":
+                group.budget.remaining += APP_BUDGET
+                group.app_calls += 1
+
+        applied = []
+        for index, txn in enumerate(txns):
+            record = Record(self.txid(txn), txn, None, self.record.round, 0)
+            try:
+                group.apply_transaction(txn, index, txns, record, caller=self.app_id, depth=self.depth + 1)
+            except LedgerError as e:
+                raise avm.AVMError(f"inner tx {index} failed: {e}")
+            if "caid" in record.apply_data:
+                txn["caid_created"] = record.apply_data["caid"]
+            if "apid" in record.apply_data:
+                txn["apid_created"] = record.apply_data["apid"]
+            self.record.inner.append(record)
+            applied.append(txn)
+        return applied
+
+
+def _inner_apply(record: Record) -> dict:
+    inner = {"txn": record.transaction()}
+    inner.update(record.apply_data)
+    return inner
+
+
+if __name__ == "__main__":
+    pass
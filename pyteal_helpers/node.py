@@ -0,0 +1,1032 @@
+import base64
+import itertools
+import json
+import math
+import re
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import msgpack
+from algosdk import encoding
+from algosdk.v2client.algod import AlgodClient
+from algosdk.v2client.indexer import IndexerClient
+
+from pyteal_helpers import ledger as ledger_module
+from pyteal_helpers.ledger import Ledger, LedgerError, Record, Snapshot, transaction_id
+
+# Transaction fields holding addresses, encoded as base32 in JSON.
+ADDRESS_FIELDS = {"snd", "rcv", "close", "arcv", "asnd", "aclose", "rekey", "fadd", "m", "r", "f", "c"}
+
+ON_COMPLETIONS = ["noop", "optin", "closeout", "clear", "update", "delete"]
+
+# How long /v2/status/wait-for-block-after waits for a new round.
+WAIT_FOR_BLOCK_TIMEOUT = 1.0
+
+MAX_SEARCH_LIMIT = 1000
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class _PooledGroup:
+    stxns  : list[dict]
+    txids  : list[str]
+    fee    : float
+    arrival: int
+
+
+class LocalNode:
+    """
+        Stand-in for the algod and indexer daemons of a sandbox, serving
+        the endpoints used by this project over an in-memory ledger.
+
+        By default every accepted group is confirmed immediately in its
+        own round, so waiting for confirmations never blocks, but rounds
+        then never hold more than one group. With a block_interval, sent
+        groups wait in a pending pool instead and a block is closed every
+        block_interval seconds (or by close_block), holding the pooled
+        groups by decreasing fee per transaction, up to max_block_txns
+        transactions; the others stay pooled until their last valid
+        round. Usage:
+
+            with LocalNode(genesis={faucet_addr: 10 ** 12}) as node:
+                algod_client = node.algod_client()
+                indexer_client = node.indexer_client()
+    """
+
+    def __init__(
+        self,
+        ledger        : Ledger | None = None,
+        genesis       : dict[str, int] | None = None,
+        host          : str = "localhost",
+        algod_port    : int = 0,
+        indexer_port  : int = 0,
+        block_interval: float | None = None,
+        max_block_txns: int | None = None,
+    ):
+        self.ledger         = ledger if ledger is not None else Ledger(genesis)
+        self.lock           = threading.Condition()
+        self.block_interval = block_interval
+        self.max_block_txns = max_block_txns
+
+        self._servers = [
+            _Server((host, algod_port), self, self.algod_request),
+            _Server((host, indexer_port), self, self.indexer_request),
+        ]
+        self._threads: list[threading.Thread] = []
+
+        self._pool    : list[_PooledGroup] = []
+        self._pooled  : dict[str, _PooledGroup] = {}
+        self._dropped : dict[str, tuple[dict, str]] = {}
+        self._arrivals = itertools.count()
+        self._stopped  = threading.Event()
+
+    @property
+    def algod_address(self) -> str:
+        return _server_address(self._servers[0])
+
+    @property
+    def indexer_address(self) -> str:
+        return _server_address(self._servers[1])
+
+    def algod_client(self, token: str = "a" * 64) -> AlgodClient:
+        return AlgodClient(token, self.algod_address)
+
+    def indexer_client(self, token: str = "") -> IndexerClient:
+        return IndexerClient(token, self.indexer_address)
+
+    @property
+    def pooled(self) -> bool:
+        return self.block_interval is not None
+
+    def start(self) -> "LocalNode":
+        self._stopped.clear()
+        targets = [server.serve_forever for server in self._servers]
+        if self.pooled and math.isfinite(self.block_interval):
+            targets.append(self._close_blocks)
+        for target in targets:
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def join(self):
+        """
+            Block until the servers are stopped.
+        """
+        for thread in self._threads:
+            thread.join()
+
+    def stop(self):
+        self._stopped.set()
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def snapshot(self) -> Snapshot:
+        """
+            Snapshot the ledger between requests (see Ledger.snapshot).
+        """
+        with self.lock:
+            return self.ledger.snapshot()
+
+    def restore(self, snapshot: Snapshot):
+        """
+            Restore the ledger between requests (see Ledger.restore).
+            Clients caching reads by round must drop them, since rounds
+            are rewound too.
+        """
+        with self.lock:
+            self.ledger.restore(snapshot)
+            self._pool.clear()
+            self._pooled.clear()
+            self._dropped.clear()
+
+    def release(self, snapshot: Snapshot):
+        with self.lock:
+            self.ledger.release(snapshot)
+
+    def close_block(self) -> ledger_module.Block:
+        """
+            Commit the pooled groups that fit in one block to a new round
+            (see the class documentation). Groups failing in the block or
+            past their last valid round leave the pool with a pool error.
+        """
+        with self.lock:
+            selected, txns = [], 0
+            for group in sorted(self._pool, key=lambda group: (-group.fee, group.arrival)):
+                if self.max_block_txns is not None and txns + len(group.txids) > self.max_block_txns:
+                    continue
+                selected.append(group)
+                txns += len(group.txids)
+
+            outcomes = self.ledger.apply_groups([group.stxns for group in selected])
+            for group, outcome in zip(selected, outcomes):
+                self._unpool(group, str(outcome) if isinstance(outcome, LedgerError) else None)
+
+            next_round = self.ledger.round + 1
+            for group in list(self._pool):
+                last_valid = min(stxn["txn"].get("lv", 0) for stxn in group.stxns)
+                if last_valid < next_round:
+                    self._unpool(group, f"txn dead: round {next_round} outside of validity window")
+
+            self.lock.notify_all()
+            return self.ledger.blocks[-1]
+
+    def _close_blocks(self):
+        while not self._stopped.wait(self.block_interval):
+            self.close_block()
+
+    def _unpool(self, group: _PooledGroup, pool_error: str | None):
+        self._pool.remove(group)
+        for txid, stxn in zip(group.txids, group.stxns):
+            del self._pooled[txid]
+            if pool_error is not None:
+                self._dropped[txid] = (stxn, pool_error)
+
+    def __enter__(self) -> "LocalNode":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # Routing.
+
+    def algod_request(self, method: str, path: str, query: dict, body: bytes):
+        for route_method, pattern, handler in _ALGOD_ROUTES:
+            match = pattern.fullmatch(path)
+            if match and route_method == method:
+                with self.lock:
+                    return handler(self, query, body, *match.groups())
+        raise HTTPError(404, f"unknown endpoint {method} {path}")
+
+    def indexer_request(self, method: str, path: str, query: dict, body: bytes):
+        for route_method, pattern, handler in _INDEXER_ROUTES:
+            match = pattern.fullmatch(path)
+            if match and route_method == method:
+                with self.lock:
+                    return handler(self, query, body, *match.groups())
+        raise HTTPError(404, f"unknown endpoint {method} {path}")
+
+    # algod endpoints.
+
+    def status(self, query, body) -> dict:
+        ledger = self.ledger
+        return {
+            "last-round"               : ledger.round,
+            "last-version"             : "future",
+            "next-version"             : "future",
+            "next-version-round"       : ledger.round + 1,
+            "next-version-supported"   : True,
+            "time-since-last-round"    : 0,
+            "catchup-time"             : 0,
+            "stopped-at-unsupported-round": False,
+        }
+
+    def wait_for_block_after(self, query, body, round) -> dict:
+        timeout = WAIT_FOR_BLOCK_TIMEOUT
+        if self.pooled and math.isfinite(self.block_interval):
+            # Long enough for the next block to be closed.
+            timeout += self.block_interval
+        self.lock.wait_for(lambda: self.ledger.round > int(round), timeout=timeout)
+        return self.status(query, body)
+
+    def suggested_params(self, query, body) -> dict:
+        return {
+            "consensus-version": "future",
+            "fee"              : 0,
+            "genesis-hash"     : base64.b64encode(ledger_module.GENESIS_HASH).decode(),
+            "genesis-id"       : ledger_module.GENESIS_ID,
+            "last-round"       : self.ledger.round,
+            "min-fee"          : ledger_module.MIN_TXN_FEE,
+        }
+
+    def compile(self, query, body) -> dict:
+        source = body.decode()
+        try:
+            self.ledger.program(ledger_module.compile_teal(source))
+        except Exception as e:
+            raise HTTPError(400, str(e))
+        program = ledger_module.compile_teal(source)
+        response = {
+            "hash"  : encoding.encode_address(encoding.checksum(b"Program" + program)),
+            "result": base64.b64encode(program).decode(),
+        }
+        if query.get("sourcemap", "").lower() == "true":
+            response["sourcemap"] = _source_map(self.ledger.program(program))
+        return response
+
+    def dryrun(self, query, body) -> dict:
+        """
+            Evaluate the request's transactions as a group against the
+            ledger itself, which is where the request's state was read
+            from, and roll it back. Unlike algod, the whole group is
+            checked (signatures, fees, balances), as simulate would.
+        """
+        try:
+            request = msgpack.unpackb(body, raw=False, strict_map_key=False) if body else {}
+            stxns = request.get("txns") or []
+        except Exception as e:
+            raise HTTPError(400, f"could not decode dryrun request: {e}")
+
+        error = ""
+        try:
+            result = self.ledger.apply_group(stxns, commit=False, trace=True)
+        except LedgerError as e:
+            result = e.result or ledger_module.GroupResult()
+            # Program failures are reported by the call that failed.
+            if all(call.passed for call in result.calls.values()):
+                error = str(e)
+
+        txns = []
+        for index, stxn in enumerate(stxns):
+            execution = result.calls.get(index)
+            if execution is None:
+                txns.append({"disassembly": []})
+                continue
+            txns.append(_dryrun_txn_json(
+                execution,
+                self.ledger.program(self._called_program(stxn.get("txn", {}))),
+                result.records[index] if index < len(result.records) else None,
+            ))
+        return {"error": error, "protocol-version": "future", "txns": txns}
+
+    def _called_program(self, txn: dict) -> bytes:
+        program = "apsu" if txn.get("apan") == ledger_module.CLEAR_STATE else "apap"
+        if txn.get("apid", 0) == 0:
+            return txn.get(program, b"")
+        app = self.ledger.apps[txn["apid"]]
+        return app.clear if program == "apsu" else app.approval
+
+    def send_transactions(self, query, body) -> dict:
+        if self.pooled:
+            return self._pool_transactions(body)
+        try:
+            txids = self.ledger.send_raw(body)
+        except LedgerError as e:
+            raise HTTPError(400, f"TransactionPool.Remember: {e}")
+        self.lock.notify_all()
+        return {"txId": txids[0]}
+
+    def _pool_transactions(self, body: bytes) -> dict:
+        try:
+            stxns = ledger_module.decode_signed_transactions(body)
+        except Exception as e:
+            raise HTTPError(400, f"could not decode transactions: {e}")
+        txids = [transaction_id(stxn.get("txn", {})) for stxn in stxns]
+        if any(txid in self._pooled for txid in txids):
+            raise HTTPError(400, "TransactionPool.Remember: transaction already in pool")
+        # As on algod, a lease held by a pooled transaction rejects the
+        # other transactions using it until that one leaves the pool.
+        leases = {
+            (stxn["txn"].get("snd"), stxn["txn"]["lx"])
+            for group in self._pool for stxn in group.stxns if "lx" in stxn["txn"]
+        }
+        for stxn, txid in zip(stxns, txids):
+            txn = stxn.get("txn", {})
+            if "lx" in txn and (txn.get("snd"), txn["lx"]) in leases:
+                raise HTTPError(
+                    400,
+                    f"TransactionPool.Remember: transaction {txid}: using an overlapping lease "
+                    f"(sender {encoding.encode_address(txn.get('snd'))})"
+                )
+
+        # Checked against the last round, then on top of the pooled
+        # groups for the ones depending on them.
+        try:
+            self.ledger.apply_group(stxns, commit=False)
+        except LedgerError as e:
+            pool = [group.stxns for group in self._pool]
+            if not pool:
+                raise HTTPError(400, f"TransactionPool.Remember: {e}")
+            outcome = self.ledger.apply_groups(pool + [stxns], commit=False)[-1]
+            if isinstance(outcome, LedgerError):
+                raise HTTPError(400, f"TransactionPool.Remember: {outcome}")
+
+        group = _PooledGroup(
+            stxns, txids,
+            sum(stxn["txn"].get("fee", 0) for stxn in stxns) / len(stxns),
+            next(self._arrivals),
+        )
+        self._pool.append(group)
+        for txid in txids:
+            self._pooled[txid] = group
+            self._dropped.pop(txid, None)
+        return {"txId": txids[0]}
+
+    def pending_transactions(self, query, body) -> dict:
+        # Without a block interval, groups are confirmed as soon as they
+        # are sent: the pool is always empty.
+        limit = int(query.get("max", 0)) or None
+        stxns = [stxn for group in self._pool for stxn in group.stxns]
+        return {
+            "top-transactions"  : [_signed_txn_json(stxn) for stxn in stxns[:limit]],
+            "total-transactions": len(stxns),
+        }
+
+    def pending_transaction(self, query, body, txid) -> dict:
+        group = self._pooled.get(txid)
+        if group is not None:
+            stxn = group.stxns[group.txids.index(txid)]
+            return {"pool-error": "", "txn": _signed_txn_json(stxn)}
+        if txid in self._dropped:
+            stxn, pool_error = self._dropped[txid]
+            return {"pool-error": pool_error, "txn": _signed_txn_json(stxn)}
+
+        record = self.ledger.records.get(txid)
+        if record is None:
+            raise HTTPError(404, "txn does not exist")
+        return _pending_json(record, self.ledger.blocks[record.round].timestamp)
+
+    def account(self, query, body, address) -> dict:
+        return self._account_json(_decode_address(address))
+
+    def account_application(self, query, body, address, app_id) -> dict:
+        address, app_id = _decode_address(address), int(app_id)
+        account = self.ledger.account(address)
+        response = {"round": self.ledger.round}
+        if app_id in account.local_states:
+            response["app-local-state"] = self._local_state_json(app_id, account.local_states[app_id])
+        if app_id in account.created_apps:
+            response["created-app"] = self._app_params_json(self.ledger.apps[app_id])
+        if len(response) == 1:
+            raise HTTPError(404, "account application info not found")
+        return response
+
+    def account_asset(self, query, body, address, asset_id) -> dict:
+        address, asset_id = _decode_address(address), int(asset_id)
+        account = self.ledger.account(address)
+        response = {"round": self.ledger.round}
+        if asset_id in account.assets:
+            response["asset-holding"] = _holding_json(asset_id, account.assets[asset_id])
+        if asset_id in account.created_assets:
+            response["created-asset"] = _asset_params_json(self.ledger.assets[asset_id])
+        if len(response) == 1:
+            raise HTTPError(404, "account asset info not found")
+        return response
+
+    def application(self, query, body, app_id) -> dict:
+        app = self.ledger.apps.get(int(app_id))
+        if app is None:
+            raise HTTPError(404, "application does not exist")
+        return {"id": app.id, "params": self._app_params_json(app)}
+
+    def asset(self, query, body, asset_id) -> dict:
+        asset = self.ledger.assets.get(int(asset_id))
+        if asset is None:
+            raise HTTPError(404, "asset does not exist")
+        return {"index": asset.id, "params": _asset_params_json(asset)}
+
+    def block(self, query, body, round):
+        round = int(round)
+        if round > self.ledger.round:
+            raise HTTPError(404, f"failed to retrieve information from the ledger: round {round} not available")
+        block = self.ledger.blocks[round]
+        encoded = {
+            "block": {
+                "rnd" : block.round,
+                "ts"  : block.timestamp,
+                "gen" : ledger_module.GENESIS_ID,
+                "gh"  : ledger_module.GENESIS_HASH,
+                "txns": [_block_txn(record) for record in block.records],
+            },
+            "cert": {},
+        }
+        if query.get("format") == "msgpack":
+            return msgpack.packb(encoded, use_bin_type=True)
+        return _to_json(encoded)
+
+    def health(self, query, body) -> dict:
+        return {}
+
+    # indexer endpoints.
+
+    def indexer_health(self, query, body) -> dict:
+        return {"round": self.ledger.round, "db-available": True, "is-migrating": False, "message": ""}
+
+    def indexer_account(self, query, body, address) -> dict:
+        account = self._account_json(_decode_address(address))
+        return {"account": account, "current-round": self.ledger.round}
+
+    def indexer_application(self, query, body, app_id) -> dict:
+        app = self.ledger.apps.get(int(app_id))
+        if app is None:
+            raise HTTPError(404, f"no application found for application-id: {app_id}")
+        return {
+            "application"  : {"id": app.id, "params": self._app_params_json(app), "deleted": False},
+            "current-round": self.ledger.round,
+        }
+
+    def indexer_asset(self, query, body, asset_id) -> dict:
+        asset = self.ledger.assets.get(int(asset_id))
+        if asset is None:
+            raise HTTPError(404, f"no assets found for asset-id: {asset_id}")
+        return {
+            "asset"        : {"index": asset.id, "params": _asset_params_json(asset), "deleted": False},
+            "current-round": self.ledger.round,
+        }
+
+    def indexer_transaction(self, query, body, txid) -> dict:
+        record = self.ledger.records.get(txid)
+        if record is None:
+            raise HTTPError(404, f"no transaction found for transaction id: {txid}")
+        return {
+            "transaction"  : _indexer_txn_json(record, self.ledger.blocks[record.round].timestamp),
+            "current-round": self.ledger.round,
+        }
+
+    def search_transactions(self, query, body, address=None, asset_id=None) -> dict:
+        if address is not None:
+            query = dict(query, address=address)
+        if asset_id is not None:
+            query = dict(query, **{"asset-id": asset_id})
+
+        limit = min(int(query.get("limit", MAX_SEARCH_LIMIT)), MAX_SEARCH_LIMIT)
+        after = _parse_token(query.get("next"))
+        matches = _TransactionFilter(query)
+
+        transactions = []
+        position = None
+        for block in self.ledger.blocks[matches.min_round : matches.max_round + 1]:
+            if not matches.timestamp(block.timestamp):
+                continue
+            for record in block.records:
+                if after is not None and (record.round, record.offset) <= after:
+                    continue
+                if not matches(record):
+                    continue
+                transactions.append(_indexer_txn_json(record, block.timestamp))
+                position = (record.round, record.offset)
+                if len(transactions) == limit:
+                    break
+            if len(transactions) == limit:
+                break
+
+        response = {"current-round": self.ledger.round, "transactions": transactions}
+        if position is not None:
+            response["next-token"] = f"{position[0]}-{position[1]}"
+        return response
+
+    # JSON views.
+
+    def _account_json(self, address: bytes) -> dict:
+        ledger = self.ledger
+        account = ledger.account(address)
+        total_uints = total_byte_slices = 0
+        for app_id in account.local_states:
+            total_uints += ledger.apps[app_id].local_schema[0]
+            total_byte_slices += ledger.apps[app_id].local_schema[1]
+        for app_id in account.created_apps:
+            total_uints += ledger.apps[app_id].global_schema[0]
+            total_byte_slices += ledger.apps[app_id].global_schema[1]
+
+        response = {
+            "address"                      : encoding.encode_address(address),
+            "amount"                       : account.amount,
+            "amount-without-pending-rewards": account.amount,
+            "min-balance"                  : ledger.min_balance(address),
+            "pending-rewards"              : 0,
+            "rewards"                      : 0,
+            "reward-base"                  : 0,
+            "round"                        : ledger.round,
+            "status"                       : "Offline",
+            "assets"                       : [
+                _holding_json(asset_id, holding) for asset_id, holding in sorted(account.assets.items())
+            ],
+            "apps-local-state"             : [
+                self._local_state_json(app_id, state) for app_id, state in sorted(account.local_states.items())
+            ],
+            "created-apps"                 : [
+                {"id": app_id, "params": self._app_params_json(ledger.apps[app_id])}
+                for app_id in sorted(account.created_apps)
+            ],
+            "created-assets"               : [
+                {"index": asset_id, "params": _asset_params_json(ledger.assets[asset_id])}
+                for asset_id in sorted(account.created_assets)
+            ],
+            "apps-total-schema"            : {"num-uint": total_uints, "num-byte-slice": total_byte_slices},
+            "apps-total-extra-pages"       : sum(ledger.apps[app_id].extra_pages for app_id in account.created_apps),
+            "total-apps-opted-in"          : len(account.local_states),
+            "total-assets-opted-in"        : len(account.assets),
+            "total-created-apps"           : len(account.created_apps),
+            "total-created-assets"         : len(account.created_assets),
+        }
+        if account.auth_addr:
+            response["auth-addr"] = encoding.encode_address(account.auth_addr)
+        return response
+
+    def _local_state_json(self, app_id: int, state: dict) -> dict:
+        schema = self.ledger.apps[app_id].local_schema
+        return {
+            "id"       : app_id,
+            "key-value": _key_values_json(state),
+            "schema"   : {"num-uint": schema[0], "num-byte-slice": schema[1]},
+        }
+
+    def _app_params_json(self, app) -> dict:
+        return {
+            "creator"            : encoding.encode_address(app.creator),
+            "approval-program"   : base64.b64encode(app.approval).decode(),
+            "clear-state-program": base64.b64encode(app.clear).decode(),
+            "extra-program-pages": app.extra_pages,
+            "global-state"       : _key_values_json(app.global_state),
+            "global-state-schema": {"num-uint": app.global_schema[0], "num-byte-slice": app.global_schema[1]},
+            "local-state-schema" : {"num-uint": app.local_schema[0], "num-byte-slice": app.local_schema[1]},
+        }
+
+
+_ALGOD_ROUTES = [
+    ("GET" , r"/health", LocalNode.health),
+    ("GET" , r"/v2/status", LocalNode.status),
+    ("GET" , r"/v2/status/wait-for-block-after/(\d+)", LocalNode.wait_for_block_after),
+    ("GET" , r"/v2/transactions/params", LocalNode.suggested_params),
+    ("POST", r"/v2/teal/compile", LocalNode.compile),
+    ("POST", r"/v2/teal/dryrun", LocalNode.dryrun),
+    ("POST", r"/v2/transactions", LocalNode.send_transactions),
+    ("GET" , r"/v2/transactions/pending", LocalNode.pending_transactions),
+    ("GET" , r"/v2/transactions/pending/(\w+)", LocalNode.pending_transaction),
+    ("GET" , r"/v2/accounts/(\w+)", LocalNode.account),
+    ("GET" , r"/v2/accounts/(\w+)/applications/(\d+)", LocalNode.account_application),
+    ("GET" , r"/v2/accounts/(\w+)/assets/(\d+)", LocalNode.account_asset),
+    ("GET" , r"/v2/applications/(\d+)", LocalNode.application),
+    ("GET" , r"/v2/assets/(\d+)", LocalNode.asset),
+    ("GET" , r"/v2/blocks/(\d+)", LocalNode.block),
+]
+_INDEXER_ROUTES = [
+    ("GET", r"/health", LocalNode.indexer_health),
+    ("GET", r"/v2/accounts/(\w+)", LocalNode.indexer_account),
+    ("GET", r"/v2/accounts/(\w+)/transactions", LocalNode.search_transactions),
+    ("GET", r"/v2/applications/(\d+)", LocalNode.indexer_application),
+    ("GET", r"/v2/assets/(\d+)", LocalNode.indexer_asset),
+    ("GET", r"/v2/assets/(\d+)/transactions", lambda node, query, body, asset_id: node.search_transactions(query, body, asset_id=asset_id)),
+    ("GET", r"/v2/transactions", LocalNode.search_transactions),
+    ("GET", r"/v2/transactions/(\w+)", LocalNode.indexer_transaction),
+]
+_ALGOD_ROUTES   = [(method, re.compile(path), handler) for method, path, handler in _ALGOD_ROUTES]
+_INDEXER_ROUTES = [(method, re.compile(path), handler) for method, path, handler in _INDEXER_ROUTES]
+
+
+class _Server(ThreadingHTTPServer):
+
+    daemon_threads = True
+    # The default backlog of 5 resets connections under load tests.
+    request_queue_size = 128
+
+    def __init__(self, address, node: LocalNode, dispatch):
+        self.node     = node
+        self.dispatch = dispatch
+        super().__init__(address, _Handler)
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str):
+        url = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            response = self.server.dispatch(method, url.path, query, body)
+            status = 200
+        except HTTPError as e:
+            response, status = {"message": str(e)}, e.status
+
+        if isinstance(response, bytes):
+            content_type, payload = "application/msgpack", response
+        else:
+            content_type, payload = "application/json", json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _server_address(server: _Server) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+def _decode_address(address: str) -> bytes:
+    try:
+        return encoding.decode_address(address)
+    except Exception:
+        raise HTTPError(400, f"failed to parse the address: {address}")
+
+
+def _parse_token(token: str | None) -> tuple[int, int] | None:
+    if not token:
+        return None
+    round, offset = token.split("-")
+    return int(round), int(offset)
+
+
+def _source_map(program) -> dict:
+    # Program counters are instruction indexes on this ledger: one
+    # segment per instruction, holding the delta of its 0-based line.
+    segments, line = [], 0
+    for instruction in program.instructions:
+        segments.append("AA" + _vlq(instruction.line - 1 - line) + "A")
+        line = instruction.line - 1
+    return {"version": 3, "sources": [], "names": [], "mappings": ";".join(segments)}
+
+
+def _vlq(value: int) -> str:
+    value = (-value << 1) | 1 if value < 0 else value << 1
+    digits = ""
+    while True:
+        digit, value = value & 31, value >> 5
+        digits += _BASE64[digit | (32 if value else 0)]
+        if not value:
+            return digits
+
+
+_BASE64 = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+
+def _stack_value_json(value) -> dict:
+    if isinstance(value, int):
+        return {"type": 2, "bytes": "", "uint": value}
+    return {"type": 1, "bytes": base64.b64encode(value).decode(), "uint": 0}
+
+
+def _dryrun_txn_json(execution, program, record: Record | None) -> dict:
+    trace = []
+    for pc, stack in zip(execution.trace, execution.stacks):
+        trace.append({
+            "pc"   : pc,
+            "line" : program.instructions[pc].line - 1,
+            "stack": [_stack_value_json(value) for value in stack],
+        })
+    # Scratch space is only reported as it is at the end.
+    used = [slot for slot, value in enumerate(execution.scratch) if value != 0]
+    if trace and used:
+        trace[-1]["scratch"] = [_stack_value_json(value) for value in execution.scratch[:used[-1] + 1]]
+    if trace and execution.error is not None:
+        trace[-1]["error"] = execution.error.message
+
+    if execution.error is not None:
+        messages = ["ApprovalProgram", "REJECT", execution.error.message]
+    else:
+        messages = ["ApprovalProgram", "PASS" if execution.passed else "REJECT"]
+
+    response = {
+        "disassembly"      : program.lines,
+        "app-call-trace"   : trace,
+        "app-call-messages": messages,
+        "budget-added"     : ledger_module.APP_BUDGET,
+        "budget-consumed"  : execution.cost,
+        "cost"             : execution.cost,
+        "logs"             : [base64.b64encode(log).decode() for log in execution.logs],
+    }
+    if record is not None:
+        eval_delta = record.apply_data.get("dt", {})
+        txn = record.transaction()
+        response["global-delta"] = _delta_json(eval_delta.get("gd", {}))
+        response["local-deltas"] = _local_deltas_json(txn, eval_delta)
+    return response
+
+
+def _to_json(value, key=None):
+    """
+        Encode msgpack-style values for JSON: addresses in base32, other
+        byte strings in base64.
+    """
+    if isinstance(value, dict):
+        return {str(k) if not isinstance(k, bytes) else base64.b64encode(k).decode(): _to_json(v, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_to_json(item, key) for item in value]
+    if isinstance(value, bytes):
+        if (key in ADDRESS_FIELDS or key == "apat") and len(value) == 32:
+            return encoding.encode_address(value)
+        return base64.b64encode(value).decode()
+    return value
+
+
+def _key_values_json(state: dict) -> list[dict]:
+    return [
+        {
+            "key"  : base64.b64encode(key).decode(),
+            "value": (
+                {"type": 2, "uint": value, "bytes": ""}
+                if isinstance(value, int) else
+                {"type": 1, "uint": 0, "bytes": base64.b64encode(value).decode()}
+            ),
+        }
+        for key, value in state.items()
+    ]
+
+
+def _delta_json(delta: dict) -> list[dict]:
+    result = []
+    for key, value in delta.items():
+        entry = {"action": value["at"]}
+        if "bs" in value:
+            entry["bytes"] = base64.b64encode(value["bs"]).decode()
+        if "ui" in value:
+            entry["uint"] = value["ui"]
+        result.append({"key": base64.b64encode(key).decode(), "value": entry})
+    return result
+
+
+def _local_deltas_json(txn: dict, eval_delta: dict) -> list[dict]:
+    accounts = [txn.get("snd")] + list(txn.get("apat", [])) + list(eval_delta.get("sa", []))
+    return [
+        {"address": encoding.encode_address(accounts[index]), "delta": _delta_json(delta)}
+        for index, delta in eval_delta.get("ld", {}).items()
+    ]
+
+
+def _holding_json(asset_id: int, holding: list) -> dict:
+    return {"asset-id": asset_id, "amount": holding[0], "is-frozen": holding[1]}
+
+
+def _asset_params_json(asset) -> dict:
+    params = asset.params
+    response = {
+        "creator"       : encoding.encode_address(asset.creator),
+        "total"         : params.get("t", 0),
+        "decimals"      : params.get("dc", 0),
+        "default-frozen": bool(params.get("df")),
+    }
+    for key, name in (("un", "unit-name"), ("an", "name"), ("au", "url")):
+        if params.get(key):
+            value = params[key]
+            response[name] = value if isinstance(value, str) else value.decode("utf-8", "replace")
+            raw = value.encode() if isinstance(value, str) else value
+            response[name + "-b64"] = base64.b64encode(raw).decode()
+    if params.get("am"):
+        response["metadata-hash"] = base64.b64encode(params["am"]).decode()
+    for key, name in (("m", "manager"), ("r", "reserve"), ("f", "freeze"), ("c", "clawback")):
+        if params.get(key):
+            response[name] = encoding.encode_address(params[key])
+    return response
+
+
+def _block_txn(record: Record) -> dict:
+    signed_txn = {"txn": record.transaction(), "hgi": True}
+    if record.sig is not None:
+        signed_txn["sig"] = record.sig
+    signed_txn.update(record.apply_data)
+    return signed_txn
+
+
+def _signed_txn_json(stxn: dict) -> dict:
+    signed_txn = {"txn": _to_json(stxn.get("txn", {}))}
+    if "sig" in stxn:
+        signed_txn["sig"] = base64.b64encode(stxn["sig"]).decode()
+    return signed_txn
+
+
+def _pending_json(record: Record, timestamp: int) -> dict:
+    txn = record.transaction()
+    signed_txn = {"txn": _to_json(txn)}
+    if record.sig is not None:
+        signed_txn["sig"] = base64.b64encode(record.sig).decode()
+    response = {"pool-error": "", "txn": signed_txn, "confirmed-round": record.round}
+    response.update(_apply_json(record, txn, lambda inner: _pending_json(inner, timestamp)))
+    if "caid" in record.apply_data:
+        response["asset-index"] = record.apply_data["caid"]
+    if "apid" in record.apply_data:
+        response["application-index"] = record.apply_data["apid"]
+    return response
+
+
+def _apply_json(record: Record, txn: dict, inner_json) -> dict:
+    eval_delta = record.apply_data.get("dt", {})
+    response = {}
+    if "gd" in eval_delta:
+        response["global-state-delta"] = _delta_json(eval_delta["gd"])
+    if "ld" in eval_delta:
+        response["local-state-delta"] = _local_deltas_json(txn, eval_delta)
+    if "lg" in eval_delta:
+        response["logs"] = [base64.b64encode(log).decode() for log in eval_delta["lg"]]
+    if record.inner:
+        response["inner-txns"] = [inner_json(inner) for inner in record.inner]
+    return response
+
+
+def _indexer_txn_json(record: Record, timestamp: int) -> dict:
+    txn = record.transaction()
+    kind = txn.get("type")
+    response = {
+        "id"                : record.txid,
+        "sender"            : encoding.encode_address(txn["snd"]),
+        "fee"               : txn.get("fee", 0),
+        "first-valid"       : txn.get("fv", 0),
+        "last-valid"        : txn.get("lv", 0),
+        "confirmed-round"   : record.round,
+        "round-time"        : timestamp,
+        "intra-round-offset": record.offset,
+        "tx-type"           : kind,
+        "genesis-id"        : txn.get("gen", ""),
+        "genesis-hash"      : base64.b64encode(txn.get("gh", b"")).decode(),
+    }
+    if record.sig is not None:
+        response["signature"] = {"sig": base64.b64encode(record.sig).decode()}
+    for key, name, encode in (
+        ("note" , "note"    , lambda value: base64.b64encode(value).decode()),
+        ("grp"  , "group"   , lambda value: base64.b64encode(value).decode()),
+        ("lx"   , "lease"   , lambda value: base64.b64encode(value).decode()),
+        ("rekey", "rekey-to", encoding.encode_address),
+    ):
+        if txn.get(key):
+            response[name] = encode(txn[key])
+
+    if kind == "pay":
+        response["payment-transaction"] = {
+            "amount"  : txn.get("amt", 0),
+            "receiver": encoding.encode_address(txn.get("rcv", bytes(32))),
+        }
+        if txn.get("close"):
+            response["payment-transaction"]["close-remainder-to"] = encoding.encode_address(txn["close"])
+    elif kind == "axfer":
+        response["asset-transfer-transaction"] = {
+            "amount"  : txn.get("aamt", 0),
+            "asset-id": txn.get("xaid", 0),
+            "receiver": encoding.encode_address(txn.get("arcv", bytes(32))),
+        }
+        if txn.get("asnd"):
+            response["asset-transfer-transaction"]["sender"] = encoding.encode_address(txn["asnd"])
+        if txn.get("aclose"):
+            response["asset-transfer-transaction"]["close-to"] = encoding.encode_address(txn["aclose"])
+    elif kind == "acfg":
+        response["asset-config-transaction"] = {"asset-id": txn.get("caid", 0)}
+        if "apar" in txn:
+            response["asset-config-transaction"]["params"] = _asset_params_json(
+                ledger_module.Asset(txn.get("caid", 0), txn["snd"], txn["apar"])
+            )
+        if "caid" in record.apply_data:
+            response["created-asset-index"] = record.apply_data["caid"]
+    elif kind == "afrz":
+        response["asset-freeze-transaction"] = {
+            "address"         : encoding.encode_address(txn.get("fadd", bytes(32))),
+            "asset-id"        : txn.get("faid", 0),
+            "new-freeze-status": bool(txn.get("afrz")),
+        }
+    elif kind == "appl":
+        global_schema = txn.get("apgs", {})
+        local_schema = txn.get("apls", {})
+        response["application-transaction"] = {
+            "application-id"     : txn.get("apid", 0),
+            "on-completion"      : ON_COMPLETIONS[txn.get("apan", 0)],
+            "application-args"   : [base64.b64encode(arg).decode() for arg in txn.get("apaa", [])],
+            "accounts"           : [encoding.encode_address(account) for account in txn.get("apat", [])],
+            "foreign-apps"       : list(txn.get("apfa", [])),
+            "foreign-assets"     : list(txn.get("apas", [])),
+            "approval-program"   : base64.b64encode(txn.get("apap", b"")).decode(),
+            "clear-state-program": base64.b64encode(txn.get("apsu", b"")).decode(),
+            "extra-program-pages": txn.get("apep", 0),
+            "global-state-schema": {"num-uint": global_schema.get("nui", 0), "num-byte-slice": global_schema.get("nbs", 0)},
+            "local-state-schema" : {"num-uint": local_schema.get("nui", 0), "num-byte-slice": local_schema.get("nbs", 0)},
+        }
+        if "apid" in record.apply_data:
+            response["created-application-index"] = record.apply_data["apid"]
+
+    response.update(_apply_json(record, txn, lambda inner: _indexer_txn_json(inner, timestamp)))
+    return response
+
+
+class _TransactionFilter:
+    """
+        Predicate implementing the /v2/transactions search parameters.
+    """
+
+    def __init__(self, query: dict):
+        self.min_round = int(query.get("min-round", 0))
+        self.max_round = int(query.get("max-round", 2 ** 63))
+        self.after     = _parse_time(query.get("after-time"))
+        self.before    = _parse_time(query.get("before-time"))
+        self.address   = _decode_address(query["address"]) if "address" in query else None
+        self.role      = query.get("address-role")
+        self.app_id    = int(query["application-id"]) if "application-id" in query else None
+        self.asset_id  = int(query["asset-id"]) if "asset-id" in query else None
+        self.txid      = query.get("txid")
+        self.kind      = query.get("tx-type")
+        self.note      = base64.b64decode(query["note-prefix"]) if "note-prefix" in query else None
+        self.min_amount = int(query["currency-greater-than"]) if "currency-greater-than" in query else None
+        self.max_amount = int(query["currency-less-than"]) if "currency-less-than" in query else None
+
+    def timestamp(self, timestamp: int) -> bool:
+        return (
+            (self.after is None or timestamp >= self.after)
+            and (self.before is None or timestamp <= self.before)
+        )
+
+    def __call__(self, record: Record) -> bool:
+        txn = record.txn
+        if self.txid is not None and record.txid != self.txid:
+            return False
+        if self.kind is not None and txn.get("type") != self.kind:
+            return False
+        if self.note is not None and not txn.get("note", b"").startswith(self.note):
+            return False
+        if self.app_id is not None and self.app_id not in _application_ids(record):
+            return False
+        if self.asset_id is not None and self.asset_id not in (txn.get("xaid"), txn.get("caid"), txn.get("faid"), record.apply_data.get("caid")):
+            return False
+        if self.address is not None and not self._involves(record):
+            return False
+        amount = txn.get("amt") if txn.get("type") == "pay" else txn.get("aamt")
+        if self.min_amount is not None and (amount or 0) <= self.min_amount:
+            return False
+        if self.max_amount is not None and (amount or 0) >= self.max_amount:
+            return False
+        return True
+
+    def _involves(self, record: Record) -> bool:
+        txn = record.txn
+        senders = {txn.get("snd"), txn.get("asnd")}
+        receivers = {txn.get("rcv"), txn.get("arcv"), txn.get("close"), txn.get("aclose")}
+        if self.role == "sender":
+            return self.address in senders
+        if self.role == "receiver":
+            return self.address in receivers
+        if self.role == "freeze-target":
+            return self.address == txn.get("fadd")
+        return (
+            self.address in senders
+            or self.address in receivers
+            or self.address == txn.get("fadd")
+            or self.address in txn.get("apat", [])
+            or any(self._involves(inner) for inner in record.inner)
+        )
+
+
+def _application_ids(record: Record) -> set[int]:
+    ids = {record.txn.get("apid"), record.apply_data.get("apid")}
+    for inner in record.inner:
+        ids |= _application_ids(inner)
+    return ids
+
+
+def _parse_time(value: str | None) -> int | None:
+    if not value:
+        return None
+    moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+
+from pyteal_helpers import avm
+from pyteal_helpers.sourcemap import CallSite, PyTealSourceMap
+
+# Name of the code outside of any subroutine.
+MAIN = "main"
+
+
+@dataclass
+class LineProfile:
+    line     : int
+    source   : str
+    count    : int = 0
+    cost     : int = 0
+    call_site: CallSite | None = None
+
+
+@dataclass
+class SubroutineProfile:
+    """
+        cost is spent in the subroutine's own instructions; inclusive_cost
+        adds the cost of the subroutines it calls.
+    """
+    name          : str
+    calls         : int = 0
+    cost          : int = 0
+    inclusive_cost: int = 0
+
+
+class Profiler:
+    """
+        Opcode hot-spot profiler: aggregates the traces of the executions
+        of a program per TEAL line, per subroutine and, given the source
+        map emitted by compile.py, per PyTeal call site. Executions must
+        come from a traced evaluation (e.g. ledger.apply_group with
+        trace=True).
+    """
+
+    def __init__(self, program: avm.Program, source_map: PyTealSourceMap | None = None):
+        self.program    = program
+        self.source_map = source_map
+        self.executions = 0
+        self.cost       = 0
+
+        self.lines      : dict[int, LineProfile] = {}
+        self.subroutines: dict[str, SubroutineProfile] = {MAIN: SubroutineProfile(MAIN, calls=0)}
+
+        # Subroutines are the targets of callsub, named after their label.
+        names = {}
+        for label, index in program.labels.items():
+            names.setdefault(index, label)
+        self._names = {
+            instruction.args[0]: names.get(instruction.args[0], f"pc {instruction.args[0]}")
+            for instruction in program.instructions
+            if instruction.op == "callsub"
+        }
+
+    def add(self, execution: avm.Execution):
+        """
+            Aggregate the trace of one execution of the program.
+        """
+        if execution.trace is None:
+            raise ValueError("execution wasn't traced")
+        self.executions += 1
+        self.subroutines[MAIN].calls += 1
+
+        frames = [MAIN]
+        for pc in execution.trace:
+            instruction = self.program.instructions[pc]
+            cost = avm.OPCODE_COSTS.get(instruction.op, 1)
+            self.cost += cost
+
+            line = self.lines.get(instruction.line)
+            if line is None:
+                line = self.lines[instruction.line] = LineProfile(
+                    instruction.line,
+                    self.program.lines[instruction.line - 1].strip(),
+                    call_site=self.source_map.call_site(instruction.line) if self.source_map else None
+                )
+            line.count += 1
+            line.cost += cost
+
+            self.subroutines[frames[-1]].cost += cost
+            # Recursive subroutines are charged once per instruction.
+            for name in set(frames):
+                self.subroutines[name].inclusive_cost += cost
+
+            if instruction.op == "callsub":
+                name = self._names[instruction.args[0]]
+                subroutine = self.subroutines.get(name)
+                if subroutine is None:
+                    subroutine = self.subroutines[name] = SubroutineProfile(name)
+                subroutine.calls += 1
+                frames.append(name)
+            elif instruction.op == "retsub" and len(frames) > 1:
+                frames.pop()
+
+    def call_sites(self) -> dict[CallSite, int]:
+        """
+            Cost per PyTeal call site, most expensive first.
+        """
+        costs = {}
+        for line in self.lines.values():
+            if line.call_site is not None:
+                costs[line.call_site] = costs.get(line.call_site, 0) + line.cost
+        return dict(sorted(costs.items(), key=lambda item: -item[1]))
+
+    def hot_lines(self, top: int = 10) -> list[LineProfile]:
+        return sorted(self.lines.values(), key=lambda line: -line.cost)[:top]
+
+    def report(self, top: int = 10) -> str:
+        """
+            Format the most expensive subroutines, TEAL lines and PyTeal
+            call sites.
+        """
+        rows = [f"{self.executions} executions, {self.cost} opcode cost", "", "subroutine calls self inclusive"]
+        for subroutine in sorted(self.subroutines.values(), key=lambda s: -s.inclusive_cost)[:top]:
+            rows.append(f"{subroutine.name:<30} {subroutine.calls:>6} {subroutine.cost:>8} {subroutine.inclusive_cost:>8}")
+
+        rows += ["", "line count cost source"]
+        for line in self.hot_lines(top):
+            site = f"  <- {line.call_site}" if line.call_site is not None else ""
+            rows.append(f"{line.line:>5} {line.count:>6} {line.cost:>8}  {line.source}{site}")
+
+        if self.source_map is not None:
+            rows += ["", "cost PyTeal call site"]
+            for site, cost in list(self.call_sites().items())[:top]:
+                rows.append(f"{cost:>8}  {site}: {site.code}")
+        return "\n".join(rows)
+
+
+if __name__ == "__main__":
+    pass
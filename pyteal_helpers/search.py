@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+from algosdk.v2client.indexer import IndexerClient
+
+
+def search_transactions(
+    indexer_client: IndexerClient,
+    page_size     : int = 1000,
+    prefetch      : bool = True,
+    **filters,
+) -> Iterator[dict]:
+    """
+        Lazily iterate over every transaction matching an indexer search.
+
+        Pages are followed through their `next-token` until a page comes
+        without one or empty; a shorter page than page_size is not the
+        last one, as the indexer caps `limit`. While the caller consumes
+        one page, the next one is fetched in the background, so memory
+        stays bounded by two pages whatever the history length.
+
+        Args:
+            indexer_client (IndexerClient): indexer client.
+            page_size (int, default=1000): transactions requested per page.
+            prefetch (bool, default=True): fetch the next page concurrently.
+            filters: any IndexerClient.search_transactions filter, e.g.
+            address, application_id, min_round/max_round or
+            start_time/end_time (RFC 3339 strings).
+
+        Yields:
+            (dict): transactions, in the order returned by the indexer.
+    """
+    for page in search_pages(indexer_client, page_size, prefetch, **filters):
+        yield from page["transactions"]
+
+
+def search_pages(
+    indexer_client: IndexerClient,
+    page_size     : int = 1000,
+    prefetch      : bool = True,
+    **filters,
+) -> Iterator[dict]:
+    """
+        Lazily iterate over the raw response pages of an indexer search.
+        See search_transactions for the arguments.
+    """
+    def fetch(next_page):
+        return indexer_client.search_transactions(
+            limit=page_size, next_page=next_page, **filters
+        )
+
+    if not prefetch:
+        next_page = None
+        while True:
+            page = fetch(next_page)
+            yield page
+            next_page = page.get("next-token")
+            if not next_page or not page["transactions"]:
+                return
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        page = fetch(None)
+        while True:
+            next_page = page.get("next-token")
+            if next_page and page["transactions"]:
+                pending = executor.submit(fetch, next_page)
+            else:
+                pending = None
+
+            yield page
+
+            if pending is None:
+                return
+            page = pending.result()
@@ -0,0 +1,138 @@
+import contextlib
+import json
+import os
+import re
+from dataclasses import asdict, dataclass
+
+import pyteal
+from algosdk.source_map import SourceMap
+from pyteal.compiler import compiler
+
+_PYTEAL_DIR = os.path.dirname(pyteal.__file__) + os.sep
+_FRAME = re.compile(r'\s*File "(?P<file>[^"]+)", line (?P<line>\d+), in (?P<function>[^\n]+)\n\s*(?P<code>[^\n]*)')
+
+
+@dataclass(frozen=True)
+class CallSite:
+    """
+        Python line whose PyTeal expression produced a TEAL line.
+    """
+    file    : str
+    line    : int
+    function: str
+    code    : str
+
+    def __str__(self) -> str:
+        return f"{os.path.basename(self.file)}:{self.line} ({self.function})"
+
+
+class PyTealSourceMap:
+    """
+        Map from the lines of a compiled TEAL program (1-based) to the
+        PyTeal call sites they were generated from. Lines PyTeal emits on
+        its own (e.g. the pragma) have no call site.
+    """
+
+    def __init__(self, lines: dict[int, CallSite]):
+        self.lines = lines
+
+    def call_site(self, line: int) -> CallSite | None:
+        return self.lines.get(line)
+
+    def call_site_for_pc(self, pc: int, teal_source_map: SourceMap) -> CallSite | None:
+        """
+            Call site of a program counter, through the source map of the
+            TEAL program returned by algod's compile endpoint.
+        """
+        line = teal_source_map.get_line_for_pc(pc)
+        return None if line is None else self.lines.get(line + 1)
+
+    def to_json(self) -> dict:
+        return {
+            "version": 1,
+            "lines"  : {str(line): asdict(site) for line, site in sorted(self.lines.items())},
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "PyTealSourceMap":
+        return cls({int(line): CallSite(**site) for line, site in data["lines"].items()})
+
+    def save(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f, indent=4)
+
+    @classmethod
+    def load(cls, path: str) -> "PyTealSourceMap":
+        with open(path, "r") as f:
+            return cls.from_json(json.load(f))
+
+
+@contextlib.contextmanager
+def capture():
+    """
+        Collect a PyTealSourceMap for every program compiled inside the
+        block, in order; the list is filled when the block exits.
+        Router.compile_program yields two: the approval and the clear
+        state programs.
+
+            with sourcemap.capture() as maps:
+                approval, clear, contract = router.compile_program(version=6)
+
+        It hooks functions of the PyTeal compiler module, so it must not
+        be used by several threads at once.
+    """
+    programs: list[list] = []
+    maps    : list[PyTealSourceMap] = []
+    flatten_subroutines    = compiler.flattenSubroutines
+    create_constant_blocks = compiler.createConstantBlocks
+
+    # Every compileTeal call flattens its subroutines once, then, if
+    # asked to, replaces the constants with intc/bytec references.
+    def flatten(*args, **kwargs):
+        programs.append(flatten_subroutines(*args, **kwargs))
+        return programs[-1]
+
+    def constants(*args, **kwargs):
+        programs[-1] = create_constant_blocks(*args, **kwargs)
+        return programs[-1]
+
+    compiler.flattenSubroutines   = flatten
+    compiler.createConstantBlocks = constants
+    try:
+        yield maps
+    finally:
+        compiler.flattenSubroutines   = flatten_subroutines
+        compiler.createConstantBlocks = create_constant_blocks
+    maps.extend(_source_map(components) for components in programs)
+
+
+def _source_map(components: list) -> PyTealSourceMap:
+    lines = {}
+    # Line 1 is the pragma; a component may assemble to several lines
+    # (labels carry their comments).
+    number = 2
+    for component in components:
+        site = _call_site(component.expr)
+        for _ in component.assemble().split("\n"):
+            if site is not None:
+                lines[number] = site
+            number += 1
+    return PyTealSourceMap(lines)
+
+
+def _call_site(expr) -> CallSite | None:
+    # The innermost frame outside of PyTeal (and of this module) is the
+    # line of the contract that built the expression.
+    for frame in reversed(getattr(expr, "trace", None) or []):
+        match = _FRAME.match(frame)
+        if match is None:
+            continue
+        file = match["file"]
+        if file.startswith(_PYTEAL_DIR) or file == __file__ or file.startswith("<"):
+            continue
+        return CallSite(file, int(match["line"]), match["function"], match["code"].strip())
+    return None
+
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,237 @@
+import base64
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from algosdk import encoding
+from algosdk.v2client.algod import AlgodClient
+
+# TealValue "type" field values.
+TEAL_BYTES = 1
+TEAL_UINT  = 2
+
+# Value types that can be declared in a KeyValueSchema.
+UINT    = "uint"
+BYTES   = "bytes"
+ADDRESS = "address"
+
+# Base64 keys whose decoded names are kept, across applications.
+KEY_CACHE_SIZE = 4096
+
+
+class KeyValueSchema:
+    """
+        Declared layout of a contract's global or local state.
+
+        Maps every key name to the type its value is decoded to: UINT
+        (int), BYTES (bytes) or ADDRESS (base32 address string, "" when
+        the value is empty). Base64 keys are resolved with a single dict
+        lookup; keys missing from the schema are decoded generically.
+    """
+
+    def __init__(self, types: dict[str, str]):
+        for name, value_type in types.items():
+            if value_type not in (UINT, BYTES, ADDRESS):
+                raise ValueError(f"Unknown value type {value_type!r} for key {name!r}")
+
+        self.types = types
+        self._by_key = {
+            base64.b64encode(name.encode()).decode(): (name, value_type)
+            for name, value_type in types.items()
+        }
+
+    def decode(self, key_values: list[dict]) -> dict:
+        state = {}
+        for key_value in key_values:
+            value = key_value["value"]
+            name, value_type = self._by_key.get(key_value["key"], (None, None))
+            if name is None:
+                name = _decode_key(key_value["key"])
+
+            if value_type == UINT:
+                state[name] = value.get("uint", 0)
+            elif value_type == ADDRESS:
+                raw = base64.b64decode(value.get("bytes", ""))
+                state[name] = encoding.encode_address(raw) if raw else ""
+            elif value_type == BYTES or value["type"] == TEAL_BYTES:
+                state[name] = base64.b64decode(value.get("bytes", ""))
+            else:
+                state[name] = value.get("uint", 0)
+        return state
+
+    def decode_raw(self, raw_state: dict[bytes, int | bytes]) -> dict:
+        """
+            Decode a state whose keys and byte values are already raw
+            bytes (e.g. rebuilt from block state deltas).
+        """
+        state = {}
+        for key, value in raw_state.items():
+            name = key.decode("utf-8", "surrogateescape")
+            value_type = self.types.get(name)
+            if value_type == ADDRESS:
+                state[name] = encoding.encode_address(value) if value else ""
+            else:
+                state[name] = value
+        return state
+
+
+class LocalStateReader:
+    """
+        Reader of the local state that accounts hold for one application.
+
+        Only the account's entry for the application is requested (algod
+        `/v2/accounts/{address}/applications/{app_id}`), instead of the
+        whole account with every application it is opted into. Decoded
+        states are cached and served until the ledger round advances.
+
+        The current round is asked to algod once per read_many batch and
+        at most once every round_ttl seconds by read; the cache is also
+        invalidated by advance() (e.g. with the confirmation round of a
+        transaction) and by any response reporting a later round.
+    """
+
+    def __init__(
+        self,
+        algod_client: AlgodClient,
+        app_id      : int,
+        schema      : KeyValueSchema | None = None,
+        max_workers : int = 8,
+        round_ttl   : float = 1.0,
+    ):
+        self.algod_client = algod_client
+        self.app_id       = app_id
+        self.schema       = schema
+        self.max_workers  = max_workers
+        self.round_ttl    = round_ttl
+
+        self._lock      = threading.Lock()
+        self._round     = None
+        self._synced_at = None
+        self._cache: dict[str, dict] = {}
+
+    def read(self, address: str) -> dict:
+        """
+            Return the decoded local state of an account.
+
+            Raises:
+                AlgodHTTPError: if the account is not opted into the
+                application.
+        """
+        self._sync_round(self.round_ttl)
+        return self._read(address)
+
+    def read_many(self, addresses: list[str]) -> tuple[dict[str, dict], dict[str, Exception]]:
+        """
+            Return the decoded local state of many accounts, fetching the
+            ones not cached for the current round concurrently.
+
+            Returns:
+                (tuple[dict, dict]): states of the accounts that could be
+                read and errors of the others (e.g. AlgodHTTPError if not
+                opted in), both indexed by address.
+        """
+        self._sync_round(0)
+
+        def read(address):
+            try:
+                return self._read(address), None
+            except Exception as e:
+                return None, e
+
+        states, errors = {}, {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for address, (local_state, e) in zip(addresses, executor.map(read, addresses)):
+                if e is None:
+                    states[address] = local_state
+                else:
+                    errors[address] = e
+        return states, errors
+
+    def advance(self, round: int):
+        """
+            Tell the reader that the ledger reached round, invalidating
+            the states read at earlier rounds.
+        """
+        with self._lock:
+            self._advance(round)
+
+    def _read(self, address: str) -> dict:
+        with self._lock:
+            local_state = self._cache.get(address)
+        if local_state is not None:
+            return local_state
+
+        response = self.algod_client.account_application_info(address, self.app_id)
+        local_state = decode_state(
+            response.get("app-local-state", {}).get("key-value", []),
+            self.schema
+        )
+
+        with self._lock:
+            response_round = response.get("round")
+            if response_round is not None:
+                self._advance(response_round)
+            # Don't cache a state that was read at another round than the
+            # current one.
+            if response_round == self._round:
+                self._cache[address] = local_state
+        return local_state
+
+    def _sync_round(self, max_age: float):
+        with self._lock:
+            if self._synced_at is not None and time.monotonic() - self._synced_at < max_age:
+                return
+        last_round = self.algod_client.status()["last-round"]
+        with self._lock:
+            self._advance(last_round)
+
+    def _advance(self, round: int):
+        if self._round is None or round > self._round:
+            self._round = round
+            self._cache.clear()
+        if round >= self._round:
+            self._synced_at = time.monotonic()
+
+
+def decode_state(
+    key_values: list[dict],
+    schema    : KeyValueSchema | None = None
+) -> dict:
+    """
+        Decode a TealKeyValue list into a {key: value} dict. Without a
+        schema uint values are ints and bytes values are bytes.
+    """
+    if schema is not None:
+        return schema.decode(key_values)
+
+    state = {}
+    for key_value in key_values:
+        value = key_value["value"]
+        if value["type"] == TEAL_BYTES:
+            state[_decode_key(key_value["key"])] = base64.b64decode(value.get("bytes", ""))
+        else:
+            state[_decode_key(key_value["key"])] = value.get("uint", 0)
+    return state
+
+
+def decode_global_states(
+    applications: list[dict],
+    schema      : KeyValueSchema | None = None
+) -> dict[int, dict]:
+    """
+        Decode the global state of many applications (as returned by
+        algod or indexer) into a {app id: state} dict.
+    """
+    return {
+        app["id"]: decode_state(app["params"].get("global-state", []), schema)
+        for app in applications
+    }
+
+
+@functools.lru_cache(maxsize=KEY_CACHE_SIZE)
+def _decode_key(key: str) -> str:
+    # The same handful of keys shows up in every state of an application:
+    # decode each of them only once. Keys that aren't UTF-8 decode as in
+    # decode_raw.
+    return base64.b64decode(key).decode("utf-8", "surrogateescape")
@@ -0,0 +1,179 @@
+import copy
+import math
+import os
+from dataclasses import dataclass
+
+from algosdk import error
+from algosdk.atomic_transaction_composer import TransactionWithSigner
+from algosdk.future import transaction
+from algosdk.v2client.algod import AlgodClient
+
+LEASE_LENGTH = 32
+
+
+@dataclass
+class FeeBumpPolicy:
+    """
+        Submission policy of high-priority groups (see
+        send_with_fee_bumping): each version of a group is valid for
+        bump_after rounds, and once one expires unconfirmed the group is
+        re-signed with its fees multiplied by factor and sent again, at
+        most max_bumps times and as long as its pooled fee stays within
+        max_fee. The last version keeps the whole validity window. When the node's pending pool holds at least congestion
+        transactions, the first version already pays one bump.
+    """
+    bump_after: int = 1
+    factor    : float = 2.0
+    max_bumps : int = 4
+    max_fee   : int = 100_000
+    congestion: int = 1_000
+
+    def fees(self, base_fees: list[int], bumps: int) -> list[int]:
+        """
+            Fees of a group's transactions after bumps bumps.
+        """
+        return [math.ceil(fee * self.factor ** bumps) for fee in base_fees]
+
+    def allows(self, base_fees: list[int], bumps: int) -> bool:
+        return bumps <= self.max_bumps and sum(self.fees(base_fees, bumps)) <= self.max_fee
+
+    def max_group_fee(self, base_fees: list[int]) -> int:
+        """
+            Highest pooled fee the group pays: only one of its versions is
+            ever confirmed, the most bumped one at worst.
+        """
+        bumps = 0
+        while self.allows(base_fees, bumps + 1):
+            bumps += 1
+        return sum(self.fees(base_fees, bumps))
+
+    def congested(self, algod_client: AlgodClient) -> bool:
+        pool = algod_client.pending_transactions(max_txns=1)
+        return pool.get("total-transactions", 0) >= self.congestion
+
+
+def send_with_fee_bumping(
+    algod_client: AlgodClient,
+    txns        : list[TransactionWithSigner],
+    policy      : FeeBumpPolicy,
+    lease       : bytes | None = None
+) -> dict:
+    """
+        Send a group and raise its fees while it is pending, until one
+        version of it is confirmed.
+
+        The versions are sent one at a time: each one is valid for
+        policy.bump_after rounds only and the next one is sent once it
+        expired, so that they can all carry the same lease on their first
+        transaction (the node rejects a lease held by a pending
+        transaction) and at most one of them is ever confirmed. A
+        rejected version is only ignored when an earlier one turns out to
+        be confirmed.
+
+        Args:
+            algod_client (AlgodClient): algod client.
+            txns (list[TransactionWithSigner]): group to send, e.g.
+            AtomicTransactionComposer.build_group(); the fees of its
+            transactions are the ones of the first version.
+            policy (FeeBumpPolicy): when and how much to bump fees.
+            lease (bytes | None, default=None): lease of the group, random
+            if None.
+
+        Returns:
+            (dict): pending transaction information of the first
+            transaction of the confirmed version.
+
+        Raises:
+            error.AlgodHTTPError: if a version is rejected while no
+            earlier one was confirmed, or the pending pool dropped one
+            before it expired.
+            error.ConfirmationTimeoutError: if no version was confirmed
+            by the last valid round.
+    """
+    lease = lease if lease is not None else os.urandom(LEASE_LENGTH)
+    if len(lease) != LEASE_LENGTH:
+        raise error.WrongLeaseLengthError
+
+    base_fees  = [txn.txn.fee for txn in txns]
+    last_valid = min(txn.txn.last_valid_round for txn in txns)
+    bumps      = 0
+    if policy.congested(algod_client) and policy.allows(base_fees, 1):
+        bumps = 1
+
+    current = algod_client.status()["last-round"]
+    txids   = []
+    while True:
+        valid = last_valid
+        if policy.allows(base_fees, bumps + 1):
+            valid = min(last_valid, current + policy.bump_after)
+        try:
+            txids.append(algod_client.send_transactions(
+                _sign(txns, policy.fees(base_fees, bumps), lease, valid)
+            ))
+        except error.AlgodHTTPError:
+            # An earlier version confirmed in the meantime holds the
+            # lease: only its id tells that apart from any rejection.
+            info, _ = _confirmed(algod_client, txids)
+            if info is not None:
+                return info
+            raise
+
+        while True:
+            info, pool_error = _confirmed(algod_client, txids)
+            if info is not None:
+                return info
+            if current >= valid:
+                break
+            if pool_error:
+                raise error.AlgodHTTPError(f"the group was dropped: {pool_error}")
+            current = algod_client.status_after_block(current)["last-round"]
+
+        if current >= last_valid:
+            raise error.ConfirmationTimeoutError(
+                f"no version of the group was confirmed by round {last_valid}"
+            )
+        bumps += 1
+
+def _sign(
+    txns : list[TransactionWithSigner],
+    fees : list[int],
+    lease: bytes,
+    valid: int
+) -> list[transaction.SignedTransaction]:
+    group = []
+    for i, (txn, fee) in enumerate(zip(txns, fees)):
+        txn = copy.copy(txn.txn)
+        txn.fee   = fee
+        txn.group = None
+        txn.last_valid_round = valid
+        if i == 0:
+            txn.lease = lease
+        group.append(txn)
+    if len(group) > 1:
+        transaction.assign_group_id(group)
+    return [
+        txn.signer.sign_transactions(group, [i])[0]
+        for i, txn in enumerate(txns)
+    ]
+
+
+def _confirmed(algod_client: AlgodClient, txids: list[str]) -> tuple[dict | None, str | None]:
+    """
+        Pending transaction information of the confirmed version, if any,
+        and pool error of the last version sent.
+    """
+    pool_error = None
+    for txid in txids:
+        try:
+            info = algod_client.pending_transaction_info(txid)
+        except error.AlgodHTTPError:
+            # Not known to the node (yet, or any more).
+            continue
+        if info.get("confirmed-round", 0) > 0:
+            return info, None
+        if txid == txids[-1]:
+            pool_error = info.get("pool-error") or None
+    return None, pool_error
+
+if __name__ == "__main__":
+    pass
@@ -1,11 +1,26 @@
-from algosdk import account
+import base64
+import hashlib
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+from algosdk import account, constants, encoding
+from algosdk.error import KMDHTTPError
 from algosdk.future import transaction
 from algosdk.kmd import KMDClient
 from algosdk.v2client.algod import AlgodClient
+from nacl.signing import SigningKey
 
 MICRO_ALGO = 1
 ALGO = MICRO_ALGO * (10 ** 6)
 
+# Maximum number of transactions in an atomic group.
+MAX_GROUP_SIZE = 16
+# Below this many groups the cost of spinning up worker processes and
+# pickling transactions outweighs the parallel speed-up.
+PARALLEL_SIGNING_THRESHOLD = 256
+
 
 def get_kmd_client(address="http://localhost:4002", token="a" * 64) -> KMDClient:
     return KMDClient(token, address)
@@ -14,28 +29,127 @@ def get_kmd_client(address="http://localhost:4002", token="a" * 64) -> KMDClient
 def get_keys_from_wallet(
     kmd_client: KMDClient, wallet_name="unencrypted-default-wallet", wallet_password=""
 ) -> list[str] | None:
-    wallets = kmd_client.list_wallets()
-
-    handle = None
-    for wallet in wallets:
-        if wallet["name"] == wallet_name:
-            handle = kmd_client.init_wallet_handle(wallet["id"], wallet_password)
-            break
-
-    if handle is None:
-        raise Exception("Could not find wallet")
-
-    private_keys = None
-    try:
-        addresses = kmd_client.list_keys(handle)
-        private_keys = [
-            kmd_client.export_key(handle, wallet_password, address)
-            for address in addresses
-        ]
-    finally:
-        kmd_client.release_wallet_handle(handle)
+    with KMDKeyProvider(kmd_client, wallet_name, wallet_password) as provider:
+        return provider.private_keys()
+
+
+class KMDKeyProvider:
+    """
+        Memoizing source of the private keys stored in a KMD wallet.
+
+        The wallet handle is kept open between calls and renewed shortly
+        before it expires; keys are exported concurrently the first time
+        they are requested and served from memory afterwards. The handle
+        is released by release(), or on leaving a with block:
+
+            with KMDKeyProvider(kmd_client) as provider:
+                private_keys = provider.private_keys()
+    """
+
+    # Seconds before the handle's expiry at which it gets renewed.
+    RENEW_MARGIN = 5
+
+    def __init__(
+        self,
+        kmd_client     : KMDClient,
+        wallet_name    : str = "unencrypted-default-wallet",
+        wallet_password: str = "",
+        max_workers    : int = 8,
+    ):
+        self.kmd_client      = kmd_client
+        self.wallet_name     = wallet_name
+        self.wallet_password = wallet_password
+        self.max_workers     = max_workers
+
+        self._lock          = threading.Lock()
+        self._handle        = None
+        self._handle_expiry = 0.0
+        self._private_keys  = None
+
+    def __enter__(self) -> "KMDKeyProvider":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def handle(self) -> str:
+        """
+            Return a valid wallet handle, initializing or renewing it
+            if needed.
+        """
+        with self._lock:
+            return self._get_handle()
+
+    def private_keys(self) -> list[str]:
+        """
+            Return the private keys of every account in the wallet.
+        """
+        with self._lock:
+            if self._private_keys is None:
+                handle = self._get_handle()
+                addresses = self.kmd_client.list_keys(handle)
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    self._private_keys = list(
+                        executor.map(
+                            lambda address: self.kmd_client.export_key(
+                                handle, self.wallet_password, address
+                            ),
+                            addresses,
+                        )
+                    )
+            return list(self._private_keys)
+
+    def invalidate(self):
+        """
+            Forget the memoized keys, e.g. after accounts were added to
+            the wallet.
+        """
+        with self._lock:
+            self._private_keys = None
 
-    return private_keys
+    def release(self):
+        """
+            Release the wallet handle held by the provider.
+        """
+        with self._lock:
+            if self._handle is not None:
+                try:
+                    self.kmd_client.release_wallet_handle(self._handle)
+                except KMDHTTPError:
+                    pass
+                self._handle = None
+
+    def _get_handle(self) -> str:
+        now = time.monotonic()
+        if self._handle is not None and now < self._handle_expiry - self.RENEW_MARGIN:
+            return self._handle
+
+        if self._handle is not None:
+            try:
+                renewed = self.kmd_client.renew_wallet_handle(self._handle)
+                self._handle_expiry = now + renewed["expires_seconds"]
+                return self._handle
+            except KMDHTTPError:
+                # The handle already expired: fall back to a fresh one.
+                self._handle = None
+
+        wallet_id = None
+        for wallet in self.kmd_client.list_wallets():
+            if wallet["name"] == self.wallet_name:
+                wallet_id = wallet["id"]
+                break
+
+        if wallet_id is None:
+            raise Exception("Could not find wallet")
+
+        self._handle = self.kmd_client.init_wallet_handle(
+            wallet_id, self.wallet_password
+        )
+        # init_wallet_handle doesn't report the handle lifetime: renew it
+        # once to learn when it expires.
+        renewed = self.kmd_client.renew_wallet_handle(self._handle)
+        self._handle_expiry = now + renewed["expires_seconds"]
+        return self._handle
 
 
 def get_algod_client(address="http://localhost:4001", token="a" * 64):
@@ -47,6 +161,74 @@ def generate_account():
     return private_key
 
 
+class DerivedAccounts:
+    """
+        Stable set of accounts derived from a seed, without KMD.
+
+        The same seed always yields the same keypairs, so accounts funded
+        during a previous run can be reused instead of generating and
+        funding new ones. Keys are kept as raw bytes in a single
+        bytearray (ed25519 seed followed by public key, 64 bytes per
+        account); the base64 private keys and addresses used by the SDK
+        are only built on access.
+    """
+
+    KEY_SIZE = 2 * constants.key_len_bytes
+
+    def __init__(self, seed: bytes | str, count: int):
+        if isinstance(seed, str):
+            seed = seed.encode("utf-8")
+
+        self._keys = bytearray(count * self.KEY_SIZE)
+        for i in range(count):
+            key_seed = hashlib.sha256(
+                b"pyteal-helpers/account" + seed + i.to_bytes(8, "big")
+            ).digest()
+            public_key = bytes(SigningKey(key_seed).verify_key)
+            offset = i * self.KEY_SIZE
+            self._keys[offset : offset + self.KEY_SIZE] = key_seed + public_key
+
+    def __len__(self) -> int:
+        return len(self._keys) // self.KEY_SIZE
+
+    def __getitem__(self, index: int) -> tuple[str, str]:
+        return self.private_key(index), self.address(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def private_key(self, index: int) -> str:
+        return base64.b64encode(self._raw(index)).decode()
+
+    def address(self, index: int) -> str:
+        return encoding.encode_address(self._raw(index)[constants.key_len_bytes :])
+
+    def addresses(self) -> list[str]:
+        return [self.address(i) for i in range(len(self))]
+
+    def unfunded(self, algod_client: AlgodClient, min_balance: int) -> list[int]:
+        """
+            Return the indexes of the accounts whose balance is lower
+            than min_balance, i.e. the only ones that need funding.
+        """
+        return [
+            i
+            for i, address in enumerate(self.addresses())
+            if algod_client.account_info(address, exclude="all")["amount"] < min_balance
+        ]
+
+    def _raw(self, index: int) -> bytes:
+        if not 0 <= index < len(self):
+            raise IndexError("account index out of range")
+        offset = index * self.KEY_SIZE
+        return bytes(self._keys[offset : offset + self.KEY_SIZE])
+
+
+def derive_accounts(seed: bytes | str, count: int) -> DerivedAccounts:
+    return DerivedAccounts(seed, count)
+
+
 def make_atomic(
     signing_keys=[], transactions=[]
 ) -> list[transaction.SignedTransaction]:
@@ -56,3 +238,127 @@ def make_atomic(
             signing_keys, transaction.assign_group_id(transactions), strict=True
         )
     ]
+
+
+def make_atomic_batch(
+    groups: list[tuple[list[str], list[transaction.Transaction]]],
+    processes: int | None = None,
+    chunk_size: int = 64,
+) -> list[str]:
+    """
+        Group and sign many atomic groups at once.
+
+        Args:
+            groups (list): (signing keys, transactions) pairs, one per
+            atomic group.
+            processes (int | None, default=None): size of the signing
+            process pool; None uses the number of CPUs, 1 signs inline.
+            chunk_size (int, default=64): number of groups handed to a
+            worker process at a time.
+
+        Returns:
+            (list): for every group, in the same order as the input, the
+            base64 encoded concatenation of its signed transactions, ready
+            to be passed to AlgodClient.send_raw_transaction.
+    """
+    if processes == 1 or len(groups) < PARALLEL_SIGNING_THRESHOLD:
+        return _sign_groups(groups)
+
+    chunks = [
+        groups[i : i + chunk_size] for i in range(0, len(groups), chunk_size)
+    ]
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        # Executor.map yields results in submission order, so the output
+        # lines up with the input groups regardless of completion order.
+        return [
+            signed_group
+            for signed_chunk in executor.map(_sign_groups, chunks)
+            for signed_group in signed_chunk
+        ]
+
+
+def fund_accounts(
+    algod_client: AlgodClient,
+    funder_pk: str,
+    addresses: list[str],
+    amount: int | list[int],
+    group_size: int = MAX_GROUP_SIZE,
+) -> list[str]:
+    """
+        Send amount (or the amount at the same position of the list) to
+        every address, packing the payments in atomic groups of
+        group_size so that many accounts are funded in few rounds, and
+        wait for their confirmation.
+
+        Returns:
+            (list): the id of the first transaction of every group.
+    """
+    amounts = amount if isinstance(amount, list) else [amount] * len(addresses)
+    payments = list(zip(addresses, amounts, strict=True))
+    funder_addr = account.address_from_private_key(funder_pk)
+    suggested_parameters = algod_client.suggested_params()
+    groups = [
+        (
+            [funder_pk] * len(chunk),
+            [
+                transaction.PaymentTxn(
+                    sender=funder_addr,
+                    sp=suggested_parameters,
+                    receiver=address,
+                    amt=amount,
+                )
+                for address, amount in chunk
+            ],
+        )
+        for chunk in (
+            payments[i : i + group_size] for i in range(0, len(payments), group_size)
+        )
+    ]
+    txn_ids = [
+        algod_client.send_raw_transaction(signed_group)
+        for signed_group in make_atomic_batch(groups)
+    ]
+    for txn_id in txn_ids:
+        transaction.wait_for_confirmation(algod_client, txn_id, wait_rounds=4)
+    return txn_ids
+
+
+def _sign_groups(
+    groups: list[tuple[list[str], list[transaction.Transaction]]]
+) -> list[str]:
+    signed_groups = []
+    for signing_keys, transactions in groups:
+        transactions = transaction.assign_group_id(transactions)
+        signed_groups.append(
+            base64.b64encode(
+                b"".join(
+                    _sign_raw(key, tx)
+                    for key, tx in zip(signing_keys, transactions, strict=True)
+                )
+            ).decode()
+        )
+    return signed_groups
+
+
+def _sign_raw(private_key: str, tx: transaction.Transaction) -> bytes:
+    # Equivalent to Transaction.sign, but the ed25519 key and the sender
+    # address are derived once per private key instead of three times per
+    # transaction.
+    signing_key, address = _signing_key(private_key)
+    to_sign = constants.txid_prefix + base64.b64decode(encoding.msgpack_encode(tx))
+    signature = signing_key.sign(to_sign).signature
+    signed_tx = transaction.SignedTransaction(
+        tx,
+        base64.b64encode(signature).decode(),
+        None if tx.sender == address else address,
+    )
+    return base64.b64decode(encoding.msgpack_encode(signed_tx))
+
+
+@lru_cache(maxsize=4096)
+def _signing_key(private_key: str) -> tuple[SigningKey, str]:
+    key = base64.b64decode(private_key)
+    return (
+        SigningKey(key[: constants.key_len_bytes]),
+        encoding.encode_address(key[constants.key_len_bytes :]),
+    )